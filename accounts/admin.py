@@ -1,8 +1,14 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
 from django.contrib.auth.admin import UserAdmin
 from django.db.models import Q
+from django.template.response import TemplateResponse
 
+from appointments.changelist import AgentFilter
+from appointments.permissions import sub_agent_earnings
+from .forms import ClientReassignmentForm
 from .models import CustomUser, Expert, CustomerAgent
+from .reassignment import reassign_clients
 
 
 class CustomUserAdmin(UserAdmin):
@@ -24,12 +30,24 @@ class CustomUserAdmin(UserAdmin):
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Temsilci formundaki müşteri otomatik tamamlaması (assigned_clients) yalnızca
+        henüz bir temsilciye atanmamış müşterileri önerir; filter_horizontal
+        kullanılırken uygulanan kuralın aynısıdır.
+        """
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if request.GET.get('model_name') == 'customeragent' and request.GET.get('field_name') == 'assigned_clients':
+            queryset = queryset.filter(agents__isnull=True)
+        return queryset, may_have_duplicates
+
 
 class ExpertAdmin(admin.ModelAdmin):
     list_display = ('user', 'specialization', 'commission_rate')
-    search_fields = ('user__username', 'specialization')
+    search_fields = ('user__username', 'user__first_name', 'user__last_name', 'specialization')
     list_filter = ('specialization',)
     ordering = ('user__first_name',)
+    autocomplete_fields = ('user',)
 
 
 class AltTemsilciInline(admin.TabularInline):
@@ -54,19 +72,29 @@ class AltTemsilciInline(admin.TabularInline):
 
 class CustomerAgentAdmin(admin.ModelAdmin):
     list_display = ('user', 'commission_rate', 'alt_temsilci_komisyon_orani', 'ust_temsilci_adi', 'toplam_alt_temsilci_kazanci')
-    search_fields = ('user__username', 'user__first_name', 'user__last_name')
-    list_filter = ('ust_temsilci',)
-    filter_horizontal = ('assigned_clients',)
+    # Önek aramaları (accounts/migrations/0015 indeksleri)
+    search_fields = ('^user__username', '^user__first_name', '^user__last_name')
+    list_filter = (('ust_temsilci', AgentFilter),)
+    # Tüm müşterileri sayfaya basan filter_horizontal yerine arama ile yüklenen seçim kutusu
+    autocomplete_fields = ('user', 'ust_temsilci', 'assigned_clients')
     inlines = [AltTemsilciInline]
+    actions = ['reassign_clients_action']
+
+    # user ve ust_temsilci_adi sütunları satır başına sorgu yapmasın
+    list_select_related = ('user', 'ust_temsilci__user')
+
+    def get_queryset(self, request):
+        # Alt temsilci kazancı satır başına iç içe döngüyle değil, tek bir ilişkili alt sorguyla hesaplanır
+        return super().get_queryset(request).annotate(alt_temsilci_kazanci=sub_agent_earnings())
 
     def ust_temsilci_adi(self, obj):
         return obj.ust_temsilci.user.get_full_name() if obj.ust_temsilci else "-"
     ust_temsilci_adi.short_description = "Üst Temsilci"
 
     def toplam_alt_temsilci_kazanci(self, obj):
-        toplam = obj.get_alt_temsilci_kazanci()
-        return f"{toplam:.2f} ₺"
+        return f"{obj.alt_temsilci_kazanci:.2f} ₺"
     toplam_alt_temsilci_kazanci.short_description = "Alt Temsilcilerden Kazanç"
+    toplam_alt_temsilci_kazanci.admin_order_field = 'alt_temsilci_kazanci'
 
     def formfield_for_manytomany(self, db_field, request, **kwargs):
         if db_field.name == "assigned_clients":
@@ -84,6 +112,42 @@ class CustomerAgentAdmin(admin.ModelAdmin):
 
         return super().formfield_for_manytomany(db_field, request, **kwargs)
 
+    def reassign_clients_action(self, request, queryset):
+        """
+        Seçili temsilcilerin müşterilerini (filtreye göre) başka bir temsilciye aktarır.
+        Önce ara sayfada hedef temsilci ve filtreler seçilir.
+        """
+        if 'apply' in request.POST:
+            form = ClientReassignmentForm(request.POST)
+            if form.is_valid():
+                target = form.cleaned_data['target_agent']
+                for source in queryset.exclude(pk=target.pk):
+                    counts = reassign_clients(
+                        source,
+                        target,
+                        repoint_open_appointments=form.cleaned_data['repoint_open_appointments'],
+                        **form.filter_kwargs()
+                    )
+                    self.message_user(
+                        request,
+                        f"{source}: {counts['removed']} müşteri aktarıldı "
+                        f"({counts['added']} yeni atama, {counts['appointments']} açık randevu yönlendirildi).",
+                        messages.SUCCESS
+                    )
+                return None
+        else:
+            form = ClientReassignmentForm()
+
+        return TemplateResponse(request, 'admin/accounts/customeragent/reassign_clients.html', {
+            **self.admin_site.each_context(request),
+            'title': "Müşterileri başka temsilciye aktar",
+            'opts': self.model._meta,
+            'form': form,
+            'queryset': queryset,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
+    reassign_clients_action.short_description = "Müşterilerini başka temsilciye aktar"
+
     
 
 admin.site.register(CustomUser, CustomUserAdmin)
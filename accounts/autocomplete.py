@@ -0,0 +1,124 @@
+# accounts/autocomplete.py
+"""
+Müşteri, uzman ve temsilci seçimleri için otomatik tamamlama (autocomplete) sorguları.
+
+Formlar tüm tabloyu <select> içine basmak yerine yalnızca seçili değeri render eder;
+seçenekler bu sorgular üzerinden sayfa sayfa (PAGE_SIZE) aranır. Arama, kelime
+başına ad/soyad/kullanıcı adı önek eşleşmesi (istartswith) ve telefon önek
+eşleşmesi olarak yapılır; PostgreSQL'de bu aramalar UPPER(...) text_pattern_ops
+indeksleriyle karşılanır (accounts/migrations/0015).
+"""
+
+from django.db.models import Q
+
+from appointments.permissions import is_staff_user
+from .models import CustomUser, CustomerAgent, Expert
+from .utils import normalize_phone
+
+PAGE_SIZE = 20
+MAX_TERMS = 4
+
+
+def client_choices(user):
+    """Kullanıcının seçebileceği müşteriler; yetkisi yoksa None döndürür."""
+    if is_staff_user(user):
+        return CustomUser.objects.filter(user_type='client')
+    if user.is_authenticated and user.user_type == 'agent':
+        try:
+            return user.agent_profile.assigned_clients.all()
+        except CustomerAgent.DoesNotExist:
+            return None
+    return None
+
+
+def expert_choices(user):
+    """Tüm giriş yapmış kullanıcılar uzman seçebilir."""
+    if not user.is_authenticated:
+        return None
+    return Expert.objects.select_related('user')
+
+
+def agent_choices(user):
+    """Temsilci seçimi yalnızca yönetim tarafından yapılır."""
+    if not is_staff_user(user):
+        return None
+    return CustomerAgent.objects.select_related('user')
+
+
+def _term_filter(term, prefix):
+    condition = (
+        Q(**{f'{prefix}first_name__istartswith': term})
+        | Q(**{f'{prefix}last_name__istartswith': term})
+        | Q(**{f'{prefix}username__istartswith': term})
+    )
+    if term.lstrip('+').isdigit():
+        # Telefonlar 10 hane saklanır (5xx...); yazılan '0532' veya '+90532' önekleri '532' olarak aranır.
+        digits = term.lstrip('+')
+        if digits.startswith('90'):
+            digits = digits[2:]
+        digits = normalize_phone(digits).lstrip('0')
+        if len(digits) >= 3:
+            condition |= Q(**{f'{prefix}phone__startswith': digits})
+    return condition
+
+
+def search(queryset, query, prefix=''):
+    """
+    Sorgudaki her kelimenin ad, soyad, kullanıcı adı veya telefondan biriyle
+    başlaması gerekir ("ayşe yıl" -> Ayşe Yılmaz). prefix, CustomUser'a giden
+    ilişki yoludur (örn. uzmanlar için 'user__').
+    """
+    for term in (query or '').split()[:MAX_TERMS]:
+        queryset = queryset.filter(_term_filter(term, prefix))
+    return queryset
+
+
+def paginate(queryset, page, label):
+    """
+    select2 uyumlu {'results': [{'id', 'text'}], 'more': bool} sözlüğü döndürür.
+    COUNT sorgusu çalıştırmamak için bir fazla kayıt okunur.
+    """
+    try:
+        page = max(1, int(page))
+    except (TypeError, ValueError):
+        page = 1
+    offset = (page - 1) * PAGE_SIZE
+    rows = list(queryset[offset:offset + PAGE_SIZE + 1])
+    return {
+        'results': [{'id': obj.pk, 'text': label(obj)} for obj in rows[:PAGE_SIZE]],
+        'more': len(rows) > PAGE_SIZE,
+    }
+
+
+def user_label(user):
+    return user.get_full_name() or user.username
+
+
+def client_results(user, query, page):
+    queryset = client_choices(user)
+    if queryset is None:
+        return None
+    queryset = search(queryset, query).only('pk', 'username', 'first_name', 'last_name')
+    return paginate(queryset.order_by('first_name', 'last_name', 'pk'), page, user_label)
+
+
+def expert_results(user, query, page):
+    queryset = expert_choices(user)
+    if queryset is None:
+        return None
+    queryset = search(queryset, query, prefix='user__')
+    return paginate(
+        queryset.order_by('user__first_name', 'user__last_name', 'pk'), page,
+        lambda expert: expert.get_display_name()
+    )
+
+
+def agent_results(user, query, page):
+    queryset = agent_choices(user)
+    if queryset is None:
+        return None
+    queryset = search(queryset, query, prefix='user__')
+    return paginate(
+        queryset.order_by('user__first_name', 'user__last_name', 'pk'), page,
+        lambda agent: user_label(agent.user)
+    )
@@ -0,0 +1,110 @@
+# accounts/catalog.py
+"""
+Filtre açılır menüleri ve form etiketleri için önbelleğe alınmış (id, ad) katalogları.
+
+Liste sayfaları her istekte Expert/CustomerAgent tablolarını okuyup her satır için
+`.user` ilişkisine gitmek yerine, tek sorguda hazırlanmış listeyi önbellekten alır.
+Kayıtlar bir sürüm anahtarıyla adlandırılır; Expert, CustomerAgent veya (uzman /
+temsilci) CustomUser kaydedildiğinde ya da silindiğinde accounts.signals sürümü
+işlem tamamlanınca (on_commit) artırır ve eski kayıtlar kendiliğinden geçersiz kalır.
+"""
+
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import CustomerAgent, Expert
+
+CatalogEntry = namedtuple('CatalogEntry', ['id', 'name', 'label'])
+
+VERSION_KEY = 'accounts:catalog:version'
+
+
+def _timeout():
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+
+
+def get_version():
+    """Geçerli katalog sürümünü döndürür; anahtar yoksa (ilk kullanım, önbellek boşaltılmış) oluşturur."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Anahtar silinmişse eski sürüm numaralarıyla çakışmamak için zaman damgası kullanılır
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """Tüm katalogları geçersiz kılar."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def _cached(name, build):
+    key = f'accounts:catalog:{name}:{get_version()}'
+    entries = cache.get(key)
+    if entries is None:
+        entries = build()
+        cache.set(key, entries, _timeout())
+    return entries
+
+
+def _full_name(first_name, last_name, username):
+    return f"{first_name} {last_name}".strip() or username
+
+
+def _build_experts():
+    rows = Expert.objects.order_by('user__first_name', 'user__last_name', 'pk').values_list(
+        'pk', 'user__first_name', 'user__last_name', 'user__username', 'specialization'
+    )
+    entries = []
+    for pk, first_name, last_name, username, specialization in rows:
+        name = _full_name(first_name, last_name, username)
+        # Expert.get_display_name ile aynı biçim
+        entries.append(CatalogEntry(pk, name, f"Dr. {name} - {specialization}"))
+    return entries
+
+
+def _build_agents():
+    rows = CustomerAgent.objects.order_by('user__first_name', 'user__last_name', 'pk').values_list(
+        'pk', 'user__first_name', 'user__last_name', 'user__username'
+    )
+    entries = []
+    for pk, first_name, last_name, username in rows:
+        name = _full_name(first_name, last_name, username)
+        entries.append(CatalogEntry(pk, name, name))
+    return entries
+
+
+def experts():
+    """Uzmanların (id, ad, etiket) listesi."""
+    return _cached('experts', _build_experts)
+
+
+def agents():
+    """Temsilcilerin (id, ad, etiket) listesi."""
+    return _cached('agents', _build_agents)
+
+
+def services():
+    """Hizmet tipleri ((değer, ad) çiftleri). Sabit seçeneklerdir, önbellek gerektirmez."""
+    from appointments.models import Appointment
+    return Appointment.SERVICE_CHOICES
+
+
+def expert_labels():
+    """Uzman kimliğinden Expert.get_display_name ile aynı etikete sözlük (form etiketleri için)."""
+    return {entry.id: entry.label for entry in experts()}
+
+
+def filter_options():
+    """Liste sayfalarındaki filtre açılır menüleri için bağlam sözlüğü."""
+    return {
+        'experts': experts(),
+        'agents': agents(),
+        'service_choices': services(),
+    }
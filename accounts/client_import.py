@@ -0,0 +1,171 @@
+# accounts/client_import.py
+"""
+Müşteri temsilcilerinin CSV dosyasından toplu müşteri eklemesi için yardımcılar.
+
+Tek tek form gönderimi yerine satırlar normalleştirilir, dosya içinde ve mevcut
+kullanıcılarla (telefon ve e-posta indeksleri üzerinden) mükerrer kontrolü yapılır
+ve kullanıcılar temsilci atamalarıyla birlikte tek bir işlem (transaction) içinde
+toplu olarak eklenir. Hesaplar kullanılamaz şifreyle açılır; müşteriler şifrelerini
+temsilciye gösterilen davet (şifre belirleme) bağlantısıyla kendileri belirler.
+"""
+
+import csv
+import io
+import re
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from appointments import client_stats
+from .models import CustomUser, CustomerAgent
+from .utils import normalize_email, normalize_phone
+
+MAX_IMPORT_ROWS = getattr(settings, 'CLIENT_IMPORT_MAX_ROWS', 20000)
+
+_USERNAME_CLEAN_RE = re.compile(r'[^\w.@+-]+')
+
+
+class ClientImportResult:
+    """Toplu aktarımın özetini taşır."""
+
+    def __init__(self):
+        self.created = []          # Oluşturulan CustomUser nesneleri
+        self.invites = []          # (kullanıcı, davet bağlantısı) çiftleri
+        self.duplicates = []       # (satır_no, açıklama)
+        self.rejected = []         # (satır_no, açıklama)
+
+
+def read_rows(uploaded_file):
+    """
+    Yüklenen CSV dosyasını okur. Excel'in Türkçe yerel ayarında oluşan ';'
+    ayraçlı dosyalar da desteklenir. (satır_no, sözlük) listesi döndürür.
+    """
+    content = uploaded_file.read().decode('utf-8-sig', errors='replace')
+    try:
+        dialect = csv.Sniffer().sniff(content[:2048], delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(io.StringIO(content), dialect=dialect)
+    rows = []
+    for line_no, row in enumerate(reader, start=2):
+        rows.append((line_no, {
+            (key or '').strip().lower(): (value or '').strip()
+            for key, value in row.items()
+        }))
+    return rows
+
+
+def _username_base(row, phone, email):
+    candidate = row.get('username') or (email.split('@')[0] if email else '') or (f"m{phone}" if phone else '')
+    candidate = _USERNAME_CLEAN_RE.sub('', candidate.lower())[:140]
+    return candidate or f"musteri{get_random_string(6).lower()}"
+
+
+def _invite_url(request, user):
+    path = reverse('password_reset_confirm', kwargs={
+        'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': default_token_generator.make_token(user),
+    })
+    return request.build_absolute_uri(path) if request else path
+
+
+def import_clients_for_agent(agent_profile, rows, request=None):
+    """
+    Satırlardan müşteri oluşturur, temsilciye atar ve her müşteri için davet
+    bağlantısı üretir (result.invites). Kullanılamaz şifreler hash maliyeti taşımaz.
+    """
+    result = ClientImportResult()
+    if len(rows) > MAX_IMPORT_ROWS:
+        result.rejected.append((None, f"Dosya en fazla {MAX_IMPORT_ROWS} satır içerebilir."))
+        return result
+
+    # 1. Normalleştirme ve dosya içi mükerrer kontrolü
+    candidates = []
+    seen_phones, seen_emails = set(), set()
+    for line_no, row in rows:
+        phone = normalize_phone(row.get('phone') or row.get('telefon'))
+        email = normalize_email(row.get('email') or row.get('e-posta'))
+        first_name = row.get('first_name') or row.get('ad') or ''
+        last_name = row.get('last_name') or row.get('soyad') or ''
+        if not phone and not email:
+            result.rejected.append((line_no, "Telefon veya e-posta bilgisinden en az biri zorunludur."))
+            continue
+        if len(phone) > 15:
+            result.rejected.append((line_no, f"Geçersiz telefon numarası: {row.get('phone')}"))
+            continue
+        if (phone and phone in seen_phones) or (email and email in seen_emails):
+            result.duplicates.append((line_no, "Dosyada aynı telefon/e-posta ile tekrar eden satır."))
+            continue
+        if phone:
+            seen_phones.add(phone)
+        if email:
+            seen_emails.add(email)
+        candidates.append((line_no, row, phone, email, first_name[:150], last_name[:150]))
+
+    # 2. Mevcut kullanıcılarla mükerrer kontrolü (telefon ve lower(email) indeksleri)
+    existing_phones = set(
+        CustomUser.objects.filter(phone__in=seen_phones).values_list('phone', flat=True)
+    ) if seen_phones else set()
+    existing_emails = set(
+        CustomUser.objects.annotate(email_lower=Lower('email'))
+        .filter(email_lower__in=seen_emails).values_list('email_lower', flat=True)
+    ) if seen_emails else set()
+
+    new_rows = []
+    for line_no, row, phone, email, first_name, last_name in candidates:
+        if (phone and phone in existing_phones) or (email and email in existing_emails):
+            result.duplicates.append((line_no, "Bu telefon veya e-posta ile kayıtlı bir kullanıcı zaten var."))
+            continue
+        new_rows.append((line_no, row, phone, email, first_name, last_name))
+    if not new_rows:
+        return result
+
+    # 3. Kullanıcı adları: dosyadaki ve veritabanındaki adlarla çakışmayacak şekilde üretilir
+    bases = [_username_base(row, phone, email) for _line, row, phone, email, _f, _l in new_rows]
+    taken = set(CustomUser.objects.filter(username__in=bases).values_list('username', flat=True))
+    usernames = []
+    for base in bases:
+        username, suffix = base, 1
+        while username in taken:
+            suffix += 1
+            username = f"{base}{suffix}"
+        taken.add(username)
+        usernames.append(username)
+
+    now = timezone.now()
+    users = [
+        CustomUser(
+            username=username,
+            first_name=first_name,
+            last_name=last_name,
+            email=email,
+            phone=phone,
+            user_type='client',
+            password=make_password(None),
+            date_joined=now,
+        )
+        for (_line, _row, phone, email, first_name, last_name), username in zip(new_rows, usernames)
+    ]
+
+    # 4. Kullanıcılar ve temsilci atamaları tek işlemde eklenir
+    through = CustomerAgent.assigned_clients.through
+    with transaction.atomic():
+        CustomUser.objects.bulk_create(users, batch_size=1000)
+        through.objects.bulk_create(
+            [through(customeragent_id=agent_profile.pk, customuser_id=user.pk) for user in users],
+            batch_size=1000
+        )
+        # Toplu ekleme sinyal tetiklemez; müşteri istatistik satırları burada açılır
+        client_stats.create_rows([user.pk for user in users])
+
+    result.created = users
+    result.invites = [(user, _invite_url(request, user)) for user in users]
+    return result
@@ -1,5 +1,8 @@
 # klinik_yonetim/accounts/context_processors.py
 
+from appointments import permissions
+
+
 def user_roles(request):
     """
     Her isteğe kullanıcının rollerini ve profil bilgilerini ekleyen context processor.
@@ -11,9 +14,8 @@ def user_roles(request):
 
     # Kullanıcı oturum açmışsa profillerini kontrol et
     if user.is_authenticated:
-        # admin kontrolü
-        if hasattr(user, 'user_type') and user.user_type == 'admin':
-            is_admin = True
+        # admin kontrolü (süper kullanıcılar dahil; bkz. appointments.permissions.is_admin)
+        is_admin = permissions.is_admin(user)
 
         # Expert profilini kontrol et (Expert modelinin CustomUser ile OneToOne ilişkisi varsa)
         # Eğer CustomUser modelinde 'expert_profile' isminde bir related_name yoksa, 
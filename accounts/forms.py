@@ -4,7 +4,7 @@ from django.contrib.auth.forms import (
     UserCreationForm,
     AuthenticationForm
 )
-from .models import CustomUser
+from .models import CustomUser, CustomerAgent
 
 class SignUpForm(UserCreationForm):
     """
@@ -75,4 +75,68 @@ class CustomUserUpdateForm(forms.ModelForm):
             'last_name': forms.TextInput(attrs={'class': 'form-control'}),
             'email': forms.EmailInput(attrs={'class': 'form-control'}),
             'phone': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Örn: 5xx xxx xxxx'}),
-        }
\ No newline at end of file
+        }
+
+class AgentClientImportForm(forms.Form):
+    """
+    Müşteri temsilcisinin CSV dosyasından toplu müşteri eklemesi için kullanılan form.
+    Müşteriler şifresiz oluşturulur; her biri için davet (şifre belirleme) bağlantısı üretilir.
+    """
+    csv_file = forms.FileField(
+        label='CSV Dosyası',
+        help_text='Sütunlar: first_name, last_name, phone, email (isteğe bağlı: username). Virgül veya noktalı virgül ayraçlı olabilir.',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,text/csv'})
+    )
+
+    def clean_csv_file(self):
+        csv_file = self.cleaned_data['csv_file']
+        if not csv_file.name.lower().endswith('.csv'):
+            raise forms.ValidationError('Lütfen .csv uzantılı bir dosya yükleyin.')
+        if csv_file.size > 10 * 1024 * 1024:
+            raise forms.ValidationError('Dosya boyutu 10 MB\'ı geçemez.')
+        return csv_file
+
+
+class ClientReassignmentForm(forms.Form):
+    """
+    Müşterilerin başka bir temsilciye toplu aktarımı için kullanılan form.
+    Yönetim panelindeki 'Müşterileri başka temsilciye aktar' işleminde kullanılır.
+    """
+    target_agent = forms.ModelChoiceField(
+        queryset=CustomerAgent.objects.select_related('user').order_by('user__first_name', 'user__last_name'),
+        label='Hedef Temsilci'
+    )
+    last_visit_before = forms.DateField(
+        required=False,
+        label='Son ziyareti bu tarihten önce olanlar',
+        help_text='Hiç ziyareti olmayan müşteriler de dahil edilir.',
+        widget=forms.DateInput(attrs={'type': 'date'})
+    )
+    last_visit_after = forms.DateField(
+        required=False,
+        label='Son ziyareti bu tarihte veya sonra olanlar',
+        widget=forms.DateInput(attrs={'type': 'date'})
+    )
+    service_type = forms.ChoiceField(
+        required=False,
+        label='Bu hizmeti almış olanlar',
+        choices=[]
+    )
+    repoint_open_appointments = forms.BooleanField(
+        required=False,
+        initial=True,
+        label='Açık randevuları da hedef temsilciye aktar'
+    )
+
+    def __init__(self, *args, **kwargs):
+        from appointments.models import Appointment
+        super().__init__(*args, **kwargs)
+        self.fields['service_type'].choices = [('', 'Tümü')] + list(Appointment.SERVICE_CHOICES)
+
+    def filter_kwargs(self):
+        """reassign_clients() fonksiyonuna geçirilecek filtreleri döndürür."""
+        return {
+            'last_visit_before': self.cleaned_data.get('last_visit_before'),
+            'last_visit_after': self.cleaned_data.get('last_visit_after'),
+            'service_type': self.cleaned_data.get('service_type') or None,
+        }
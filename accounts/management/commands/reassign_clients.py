@@ -0,0 +1,58 @@
+# accounts/management/commands/reassign_clients.py
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import CustomerAgent
+from accounts.reassignment import reassign_clients
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        raise CommandError(f"Geçersiz tarih: {value} (YYYY-AA-GG bekleniyor)")
+
+
+class Command(BaseCommand):
+    help = "Bir temsilcinin müşterilerini (isteğe bağlı filtrelerle) başka bir temsilciye toplu olarak aktarır."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='source', required=True, help="Kaynak temsilcinin kullanıcı adı.")
+        parser.add_argument('--to', dest='target', required=True, help="Hedef temsilcinin kullanıcı adı.")
+        parser.add_argument('--last-visit-before', help="Son ziyareti bu tarihten önce olan (veya hiç olmayan) müşteriler.")
+        parser.add_argument('--last-visit-after', help="Son ziyareti bu tarihte veya sonra olan müşteriler.")
+        parser.add_argument('--service-type', help="Bu hizmeti almış müşteriler (örn. botox).")
+        parser.add_argument('--repoint-appointments', action='store_true', help="Açık randevuları da hedef temsilciye aktar.")
+        parser.add_argument('--dry-run', action='store_true', help="Sadece aktarılacak müşteri sayısını göster.")
+
+    def _agent(self, username):
+        try:
+            return CustomerAgent.objects.select_related('user').get(user__username=username)
+        except CustomerAgent.DoesNotExist:
+            raise CommandError(f"'{username}' kullanıcı adına sahip bir temsilci bulunamadı.")
+
+    def handle(self, *args, **options):
+        source = self._agent(options['source'])
+        target = self._agent(options['target'])
+        try:
+            counts = reassign_clients(
+                source,
+                target,
+                repoint_open_appointments=options['repoint_appointments'],
+                dry_run=options['dry_run'],
+                last_visit_before=_parse_date(options['last_visit_before']),
+                last_visit_after=_parse_date(options['last_visit_after']),
+                service_type=options['service_type'],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if options['dry_run']:
+            self.stdout.write(f"{counts['selected']} müşteri aktarılacak (deneme çalıştırması, değişiklik yapılmadı).")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts['removed']} müşteri {source} -> {target} aktarıldı. "
+            f"Yeni atama: {counts['added']}, yönlendirilen açık randevu: {counts['appointments']}."
+        ))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.2 on 2026-10-19 04:16
+
+import django.db.models.functions.text
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_remove_customeragent_parent_agent_and_more'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customeragent',
+            name='commission_rate',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.15'), max_digits=5, verbose_name='Komisyon Oranı'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['phone'], name='accounts_user_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='accounts_user_email_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# accounts/migrations/0015_customuser_prefix_search_indexes.py
+#
+# Otomatik tamamlama aramaları (accounts.autocomplete) istartswith kullanır; PostgreSQL
+# bunu UPPER("kolon"::text) LIKE 'ABC%' olarak üretir. Bu ifadeler ancak
+# text_pattern_ops operatör sınıfıyla oluşturulmuş ifade indeksleriyle karşılanır.
+# Telefon aramaları (startswith) için de varchar_pattern_ops indeksi eklenir.
+# Diğer veritabanlarında (geliştirme ortamındaki SQLite) işlem yapılmaz.
+
+from django.db import migrations
+
+INDEXES = [
+    ('accounts_user_first_name_prefix_idx', 'UPPER("first_name") text_pattern_ops'),
+    ('accounts_user_last_name_prefix_idx', 'UPPER("last_name") text_pattern_ops'),
+    ('accounts_user_username_prefix_idx', 'UPPER("username") text_pattern_ops'),
+    ('accounts_user_phone_prefix_idx', '"phone" varchar_pattern_ops'),
+]
+
+
+def create_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = schema_editor.quote_name(apps.get_model('accounts', 'CustomUser')._meta.db_table)
+    for name, expression in INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON {table} ({expression})')
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _expression in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_customuser_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.2 on 2026-10-19 05:21
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_customuser_prefix_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('visit_count', models.PositiveIntegerField(default=0, verbose_name='Ziyaret Sayısı')),
+                ('lifetime_spend', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Toplam Harcama')),
+                ('last_visit', models.DateTimeField(blank=True, null=True, verbose_name='Son Ziyaret')),
+                ('next_appointment', models.DateTimeField(blank=True, null=True, verbose_name='Sonraki Randevu')),
+                ('favorite_service', models.CharField(blank=True, max_length=50, verbose_name='En Sık Hizmet')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Güncellenme Tarihi')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='client_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Müşteri Profili',
+                'verbose_name_plural': 'Müşteri Profilleri',
+                'indexes': [models.Index(fields=['visit_count'], name='client_stats_visits_idx'), models.Index(fields=['lifetime_spend'], name='client_stats_spend_idx'), models.Index(fields=['last_visit'], name='client_stats_last_visit_idx'), models.Index(fields=['next_appointment'], name='client_stats_next_appt_idx'), models.Index(fields=['favorite_service'], name='client_stats_service_idx')],
+            },
+        ),
+    ]
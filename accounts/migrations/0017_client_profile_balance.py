@@ -0,0 +1,32 @@
+# Generated by Django 5.2.2 on 2026-10-19 05:25
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_client_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientprofile',
+            name='last_payment_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Son Ödeme Tutarı'),
+        ),
+        migrations.AddField(
+            model_name='clientprofile',
+            name='open_balance',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Saati geçmiş, iptal edilmemiş ve ödemesi alınmamış randevuların ücret toplamı.', max_digits=14, verbose_name='Açık Bakiye'),
+        ),
+        migrations.AddIndex(
+            model_name='clientprofile',
+            index=models.Index(fields=['last_payment_amount'], name='client_stats_last_pay_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clientprofile',
+            index=models.Index(fields=['open_balance'], name='client_stats_balance_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# accounts/migrations/0018_normalize_phones.py
+#
+# Telefon numaraları kayıtta normalleştirilir (CustomUser.save, accounts.utils.normalize_phone).
+# Mevcut satırlar aynı biçime getirilir; mükerrer kontrolü ve önek araması buna dayanır.
+
+from django.db import migrations
+
+from accounts.utils import normalize_phone
+
+BATCH_SIZE = 1000
+
+
+def normalize_phones(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    changed = []
+    for user in CustomUser.objects.exclude(phone='').only('pk', 'phone').iterator(chunk_size=BATCH_SIZE):
+        phone = normalize_phone(user.phone)
+        if phone != user.phone:
+            user.phone = phone
+            changed.append(user)
+    CustomUser.objects.bulk_update(changed, ['phone'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_client_profile_balance'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_phones, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,11 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models.functions import Lower
 from django.utils.translation import gettext_lazy as _
 from decimal import Decimal
 
+from .utils import normalize_phone
+
 
 class CustomUser(AbstractUser):
     USER_TYPE_CHOICES = [
@@ -29,6 +32,16 @@ class CustomUser(AbstractUser):
     class Meta:
         verbose_name = _('Kullanıcı')
         verbose_name_plural = _('Kullanıcılar')
+        indexes = [
+            # Toplu müşteri aktarımında mükerrer kontrolü telefon ve e-posta üzerinden yapılır.
+            models.Index(fields=['phone'], name='accounts_user_phone_idx'),
+            models.Index(Lower('email'), name='accounts_user_email_lower_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Mükerrer kontrolü (client_import) ve telefon önek araması saklanan biçime dayanır
+        self.phone = normalize_phone(self.phone)
+        super().save(*args, **kwargs)
 
 
 class Expert(models.Model):
@@ -105,19 +118,79 @@ class CustomerAgent(models.Model):
             self.commission_rate = self._meta.get_field('commission_rate').default
         if self.alt_temsilci_komisyon_orani is None or self.alt_temsilci_komisyon_orani == Decimal('0.00'):
             self.alt_temsilci_komisyon_orani = self._meta.get_field('alt_temsilci_komisyon_orani').default
-        super().save(*args, **kwargs)
+        # Giden kutusu olayı (post_save) kayıtla aynı işlemde yazılır
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(type(self), instance=self)):
+            super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = _('Müşteri Temsilcisi')
         verbose_name_plural = _('Müşteri Temsilcileri')
 
     def get_alt_temsilci_kazanci(self):
-        toplam_kazanc = Decimal('0.00')
-        for alt_temsilci in self.alt_temsilciler.all():
-            for musteri in alt_temsilci.assigned_clients.all():
-                # Bu müşteriye ait işlemler üzerinden hesaplama yapılmalı
-                islem_listesi = getattr(musteri, 'islem_set', None)
-                if islem_listesi:
-                    for islem in islem_listesi.all():
-                        toplam_kazanc += islem.tutar * self.alt_temsilci_komisyon_orani
-        return toplam_kazanc
+        """
+        Alt temsilcilerin temsilci komisyonlarından bu temsilciye düşen pay. Liste sayfaları
+        bunu satır başına çağırmak yerine aynı ifadeyi sorguya ekler (appointments.permissions.sub_agent_earnings).
+        """
+        from appointments.permissions import sub_agent_earnings
+        return CustomerAgent.objects.filter(pk=self.pk).annotate(
+            kazanc=sub_agent_earnings()
+        ).values_list('kazanc', flat=True).get()
+
+
+class ClientProfile(models.Model):
+    """
+    Müşterinin önceden hesaplanmış randevu/ödeme istatistikleri. Randevu ve ödeme
+    yazımlarıyla aynı işlemde appointments.client_stats üzerinden yenilenir; temsilci
+    müşteri listesi bu alanlara göre sıralanır ve süzülür.
+    """
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='client_stats')
+
+    visit_count = models.PositiveIntegerField(default=0, verbose_name=_('Ziyaret Sayısı'))
+
+    lifetime_spend = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name=_('Toplam Harcama')
+    )
+
+    last_visit = models.DateTimeField(null=True, blank=True, verbose_name=_('Son Ziyaret'))
+
+    next_appointment = models.DateTimeField(null=True, blank=True, verbose_name=_('Sonraki Randevu'))
+
+    favorite_service = models.CharField(max_length=50, blank=True, verbose_name=_('En Sık Hizmet'))
+
+    last_payment_amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name=_('Son Ödeme Tutarı')
+    )
+
+    open_balance = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name=_('Açık Bakiye'),
+        help_text=_('Saati geçmiş, iptal edilmemiş ve ödemesi alınmamış randevuların ücret toplamı.')
+    )
+
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_('Güncellenme Tarihi'))
+
+    class Meta:
+        verbose_name = _('Müşteri Profili')
+        verbose_name_plural = _('Müşteri Profilleri')
+        indexes = [
+            # Temsilci müşteri listesinin sıralama ve süzme alanları
+            models.Index(fields=['visit_count'], name='client_stats_visits_idx'),
+            models.Index(fields=['lifetime_spend'], name='client_stats_spend_idx'),
+            models.Index(fields=['last_visit'], name='client_stats_last_visit_idx'),
+            models.Index(fields=['next_appointment'], name='client_stats_next_appt_idx'),
+            models.Index(fields=['favorite_service'], name='client_stats_service_idx'),
+            models.Index(fields=['last_payment_amount'], name='client_stats_last_pay_idx'),
+            models.Index(fields=['open_balance'], name='client_stats_balance_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.get_full_name() or self.user.username}: {self.visit_count} {_('ziyaret')}"
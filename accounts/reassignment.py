@@ -0,0 +1,120 @@
+# accounts/reassignment.py
+"""
+Müşterilerin temsilciler arasında toplu olarak aktarılması.
+
+İşlemler CustomerAgent.assigned_clients ara tablosu (through table) üzerinde
+küme tabanlı (INSERT ... SELECT / DELETE) sorgularla yapılır; müşteriler
+Python belleğine yüklenmez.
+"""
+
+from datetime import datetime, time
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from appointments import bulk
+from appointments.models import Appointment
+from appointments.visibility import transfer_clients
+from notifications import outbox
+from .models import CustomerAgent
+
+AssignedClient = CustomerAgent.assigned_clients.through
+
+
+def _start_of_day(value):
+    """Tarih (date) değerini yerel saat diliminde günün başlangıcına çevirir."""
+    if value is None or isinstance(value, datetime):
+        return value
+    return timezone.make_aware(datetime.combine(value, time.min))
+
+
+def selected_clients(source_agent, last_visit_before=None, last_visit_after=None, service_type=None):
+    """
+    Kaynak temsilcinin aktarılacak müşterilerini seçen ara tablo sorgusunu döndürür.
+
+    - last_visit_before: Son tamamlanmış ziyareti bu tarihten önce olan (veya hiç ziyareti olmayan) müşteriler.
+    - last_visit_after: Son tamamlanmış ziyareti bu tarihte veya sonrasında olan müşteriler.
+    - service_type: Bu hizmeti daha önce almış (tamamlanmış randevusu olan) müşteriler.
+    """
+    queryset = AssignedClient.objects.filter(customeragent=source_agent)
+
+    last_visit_before = _start_of_day(last_visit_before)
+    last_visit_after = _start_of_day(last_visit_after)
+    if last_visit_before or last_visit_after:
+        last_visit = Appointment.objects.filter(
+            client=OuterRef('customuser_id'),
+            status='completed',
+        ).order_by('-date').values('date')[:1]
+        queryset = queryset.annotate(last_visit=Subquery(last_visit))
+        if last_visit_before:
+            queryset = queryset.filter(Q(last_visit__lt=last_visit_before) | Q(last_visit__isnull=True))
+        if last_visit_after:
+            queryset = queryset.filter(last_visit__gte=last_visit_after)
+
+    if service_type:
+        queryset = queryset.filter(Exists(Appointment.objects.filter(
+            client=OuterRef('customuser_id'),
+            service_type=service_type,
+            status='completed',
+        )))
+
+    return queryset.values('customuser_id')
+
+
+def reassign_clients(source_agent, target_agent, repoint_open_appointments=False, dry_run=False, **filters):
+    """
+    Seçilen müşterileri kaynak temsilciden hedef temsilciye aktarır.
+
+    repoint_open_appointments True ise müşterilerin kaynak temsilciye bağlı,
+    henüz gerçekleşmemiş bekleyen/onaylı randevuları tek bir UPDATE ile hedef
+    temsilciye aktarılır. Sayaçları içeren bir sözlük döndürür.
+    """
+    if source_agent.pk == target_agent.pk:
+        raise ValueError("Kaynak ve hedef temsilci aynı olamaz.")
+
+    selection = selected_clients(source_agent, **filters)
+    counts = {'selected': selection.count(), 'added': 0, 'removed': 0, 'appointments': 0}
+    if dry_run or not counts['selected']:
+        return counts
+
+    with transaction.atomic():
+        # 1. Hedef temsilciye, zaten atanmış olmayan müşterileri ekle (INSERT ... SELECT)
+        selection_sql, selection_params = selection.query.sql_with_params()
+        table = connection.ops.quote_name(AssignedClient._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (customeragent_id, customuser_id) "
+                f"SELECT %s, sel.customuser_id FROM ({selection_sql}) sel "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {table} t "
+                f"WHERE t.customeragent_id = %s AND t.customuser_id = sel.customuser_id)",
+                [target_agent.pk, *selection_params, target_agent.pk]
+            )
+            counts['added'] = cursor.rowcount
+
+        # 2. Açık randevuları hedef temsilciye yönlendir (tek UPDATE)
+        if repoint_open_appointments:
+            open_appointments = Appointment.objects.filter(
+                agent=source_agent,
+                client_id__in=Subquery(selection),
+                status__in=['pending', 'confirmed'],
+                date__gte=timezone.now(),
+            )
+            # Toplu güncelleme sinyal tetiklemez; panel sayaçları iki temsilci arasında aktarılır, akış ve
+            # (kaynak temsilcininki dahil) takvim beslemeleri appointments.bulk ile güncellenir
+            with bulk.changes() as change:
+                counts['appointments'] = change.update(open_appointments, agent_id=target_agent.pk)
+
+        # 3. Randevu görünürlük tablosunu güncelle (kaynak atamalar silinmeden önce)
+        transfer_clients(source_agent, target_agent, selection)
+
+        # 4. Kaynak temsilciden kaldır (tek DELETE)
+        counts['removed'], _ = AssignedClient.objects.filter(
+            customeragent=source_agent,
+            customuser_id__in=Subquery(selection),
+        ).delete()
+
+        # Ham SQL ve toplu silme m2m sinyali tetiklemez; iki temsilcinin güncel hali akışa yazılır
+        outbox.record_bulk(CustomerAgent, [source_agent.pk, target_agent.pk], 'updated')
+
+    return counts
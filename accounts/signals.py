@@ -0,0 +1,38 @@
+# accounts/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import bump_version
+from .models import CustomUser, CustomerAgent, Expert
+
+# Katalogda görünen ad bu alanlardan üretilir; yalnızca last_login gibi alanların
+# güncellendiği kayıtlar (her girişte) katalogu geçersiz kılmaz.
+DISPLAY_FIELDS = {'first_name', 'last_name', 'username', 'user_type'}
+
+
+def _bump_on_commit(using):
+    # Sürüm işlem tamamlanınca artırılır; önce artırılsaydı eşzamanlı bir istek katalogu işlenmemiş
+    # verilerle yeniden kurup yeni sürüm anahtarına (CATALOG_CACHE_TIMEOUT boyunca) yazabilirdi.
+    transaction.on_commit(bump_version, using=using)
+
+
+@receiver(post_save, sender=Expert)
+@receiver(post_delete, sender=Expert)
+@receiver(post_save, sender=CustomerAgent)
+@receiver(post_delete, sender=CustomerAgent)
+def invalidate_catalog_for_profile(sender, using=None, **kwargs):
+    """Uzman veya temsilci eklendiğinde, değiştiğinde ya da silindiğinde katalogları yeniler."""
+    _bump_on_commit(using)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_catalog_for_user(sender, instance, update_fields=None, using=None, **kwargs):
+    """Uzman/temsilci kullanıcılarının ad bilgisi değiştiğinde katalogları yeniler."""
+    if instance.user_type == 'client':
+        return
+    if update_fields is not None and not DISPLAY_FIELDS.intersection(update_fields):
+        return
+    _bump_on_commit(using)
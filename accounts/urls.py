@@ -7,6 +7,11 @@ from .views import (
     AgentClientManagementView, 
     ExpertDashboardView,     # ExpertDashboardView artık aktif olarak import edildiği için burada tanımlanıyor
     AgentAddClientView,  # Yeni müşteri ekleme view'ı eklendi
+    AgentClientImportView,
+    agent_workspace,
+    autocomplete_clients,
+    autocomplete_experts,
+    autocomplete_agents,
 )
 from django.contrib.auth.views import LogoutView # Django'nun hazır çıkış görünümü
 
@@ -24,8 +29,19 @@ urlpatterns = [
 
     # Müşteri temsilcisi yeni müşteri ekleme
     path('musteri-ekle/', AgentAddClientView.as_view(), name='agent_add_client'),
+
+    # Müşteri temsilcisi CSV dosyasından toplu müşteri ekleme
+    path('musteri-aktar/', AgentClientImportView.as_view(), name='agent_client_import'),
     
+    # Temsilci çalışma alanı (JSON): müşteri başına sonraki randevu, son ziyaret, son ödeme ve açık bakiye
+    path('calisma-alani/', agent_workspace, name='agent_workspace'),
+
     # Uzmanlar için özel panel sayfası
     # "_navbar.html" dosyanızdaki 'accounts:uzman_panosu' URL'sine uygun olarak tanımlanmıştır.
     path('uzman-paneli/', ExpertDashboardView.as_view(), name='uzman_panosu'), 
+
+    # Form seçim alanları için otomatik tamamlama (JSON) uç noktaları
+    path('autocomplete/musteri/', autocomplete_clients, name='autocomplete_clients'),
+    path('autocomplete/uzman/', autocomplete_experts, name='autocomplete_experts'),
+    path('autocomplete/temsilci/', autocomplete_agents, name='autocomplete_agents'),
 ]
@@ -0,0 +1,29 @@
+# accounts/utils.py
+
+import re
+
+# Türkiye cep/sabit hatları 10 haneli (5xx xxx xx xx) olarak saklanır.
+_NON_DIGIT_RE = re.compile(r'\D+')
+
+
+def normalize_phone(value):
+    """
+    Telefon numarasını karşılaştırılabilir tek bir biçime (10 hane) indirger.
+    '+90 (532) 123 45 67', '0532 123 4567' ve '5321234567' aynı değeri üretir.
+    Tanınamayan değerlerde sadece rakamlar döndürülür; boş girdi için '' döner.
+    """
+    if not value:
+        return ''
+    digits = _NON_DIGIT_RE.sub('', str(value))
+    if len(digits) == 12 and digits.startswith('90'):
+        digits = digits[2:]
+    elif len(digits) == 11 and digits.startswith('0'):
+        digits = digits[1:]
+    return digits
+
+
+def normalize_email(value):
+    """E-posta adresini boşluklardan arındırır ve küçük harfe çevirir."""
+    if not value:
+        return ''
+    return str(value).strip().lower()
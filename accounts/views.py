@@ -5,6 +5,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.messages.views import SuccessMessageMixin
 from django import forms
 from django.contrib.auth import get_user_model
+from django.db import transaction
 # Müşteri temsilcisi için müşteri ekleme formu
 class AgentAddClientForm(forms.ModelForm):
     class Meta:
@@ -28,7 +29,9 @@ class AgentAddClientView(LoginRequiredMixin, UserPassesTestMixin, SuccessMessage
     def test_func(self):
         return self.request.user.user_type == 'agent'
 
+    @transaction.atomic
     def form_valid(self, form):
+        # Müşteri ve temsilci ataması birlikte kalıcı olur veya birlikte geri alınır
         # Yeni müşteri oluşturuluyor
         user = form.save(commit=False)
         user.user_type = 'client'
@@ -43,22 +46,31 @@ class AgentAddClientView(LoginRequiredMixin, UserPassesTestMixin, SuccessMessage
         return super().form_valid(form)
 # accounts/views.py
 
-from django.views.generic import CreateView, UpdateView, DetailView, ListView, TemplateView
+from django.views.generic import CreateView, UpdateView, DetailView, ListView, TemplateView, FormView
 from django.contrib.auth.views import LoginView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.messages.views import SuccessMessageMixin
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from .models import CustomUser, Expert, CustomerAgent
-from .forms import SignUpForm, CustomUserUpdateForm
-from django.db.models import ObjectDoesNotExist, Sum
+from .forms import SignUpForm, CustomUserUpdateForm, AgentClientImportForm
+from .client_import import import_clients_for_agent, read_rows
+from . import autocomplete
+from django.db import transaction
+from django.db.models import F, ObjectDoesNotExist, Sum
 from django.shortcuts import render, redirect 
 from django.contrib import messages 
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
 
 from django.utils import timezone
 from datetime import timedelta
 
-from appointments.models import Appointment
-from payments.models import Payment
+from appointments import counters, workspace
+from appointments.listing import choice_labels
+from appointments.models import Appointment, CalendarFeed, ExpertDashboardCounters
+from appointments.permissions import is_admin
+from klinik_yonetim.db_router import ReportsDatabaseMixin
 
 class CustomLoginView(SuccessMessageMixin, LoginView):
     """
@@ -138,9 +150,13 @@ class ProfileView(LoginRequiredMixin, UpdateView):
                 print(f"Temsilci profili bulunurken hata oluştu: {e}")
                 context['agent_profile'] = None
                 
-        elif user.user_type == 'admin':
+        elif is_admin(user):
             context['is_admin'] = True
 
+        # Takvim aboneliği (uzman, temsilci, müşteri); adres kullanıcı isteğiyle oluşturulur
+        if not context['is_admin']:
+            context['calendar_feed'] = CalendarFeed.objects.filter(user=user).first()
+
         return context
 
 
@@ -152,6 +168,21 @@ class AgentClientManagementView(LoginRequiredMixin, UserPassesTestMixin, ListVie
     template_name = 'accounts/agent_client_management.html'
     context_object_name = 'clients'
     paginate_by = 10 # Sayfalama ekleyebiliriz, eğer müşteri sayısı çok artarsa
+    # ?sort= değeri -> sıralama; son anahtar (pk) sayfalar arasında sırayı kararlı tutar
+    CLIENT_SORTS = {
+        'name': ('first_name', 'last_name', 'pk'),
+        'visits': ('-client_stats__visit_count', 'pk'),
+        'spend': ('-client_stats__lifetime_spend', 'pk'),
+        'last_visit': (F('client_stats__last_visit').desc(nulls_last=True), 'pk'),
+        'next': (F('client_stats__next_appointment').asc(nulls_last=True), 'pk'),
+    }
+    SORT_LABELS = {
+        'name': 'Ad', 'visits': 'Ziyaret Sayısı', 'spend': 'Toplam Harcama',
+        'last_visit': 'Son Ziyaret', 'next': 'Sonraki Randevu',
+    }
+    service_labels = choice_labels(Appointment, 'service_type')
+    # Yaklaşan randevu listesi sınırlıdır; müşteri başına sonraki randevu çalışma alanında (agent_workspace)
+    UPCOMING_LIST_LIMIT = 20
 
     def test_func(self):
         """Kullanıcının 'agent' rolünde olup olmadığını kontrol eder."""
@@ -163,11 +194,23 @@ class AgentClientManagementView(LoginRequiredMixin, UserPassesTestMixin, ListVie
         return redirect(reverse_lazy('home')) 
 
     def get_queryset(self):
-        """Mevcut temsilcinin atanmış müşterilerini getirir."""
+        """
+        Mevcut temsilcinin atanmış müşterilerini önceden hesaplanmış istatistikleriyle
+        (ClientProfile) getirir; sıralama ve süzme bu satırların indeksli alanlarıyla yapılır.
+        """
         if self.request.user.user_type == 'agent':
             try:
                 agent_profile = self.request.user.agent_profile
-                return agent_profile.assigned_clients.all().order_by('first_name', 'last_name')
+                # İstatistikler yazım yolunda ve refresh_client_stats --stale ile güncel tutulur (bkz. appointments.client_stats)
+                clients = agent_profile.assigned_clients.select_related('client_stats')
+                params = self.request.GET
+                if params.get('service') in self.service_labels:
+                    clients = clients.filter(client_stats__favorite_service=params['service'])
+                if params.get('min_visits', '').isdigit():
+                    clients = clients.filter(client_stats__visit_count__gte=int(params['min_visits']))
+                if params.get('upcoming') == '1':
+                    clients = clients.filter(client_stats__next_appointment__isnull=False)
+                return clients.order_by(*self.CLIENT_SORTS.get(params.get('sort'), self.CLIENT_SORTS['name']))
             except ObjectDoesNotExist:
                 messages.warning(self.request, "Müşteri temsilcisi profiliniz bulunamadı veya atanmış müşteriniz yok.")
                 return CustomUser.objects.none()
@@ -178,10 +221,25 @@ class AgentClientManagementView(LoginRequiredMixin, UserPassesTestMixin, ListVie
         context = super().get_context_data(**kwargs)
         user = self.request.user
         context['title'] = 'Müşteri Yönetimi'
+        params = self.request.GET
+        context['sort_labels'] = self.SORT_LABELS
+        context['service_labels'] = self.service_labels
+        context['current_sort'] = params.get('sort') if params.get('sort') in self.CLIENT_SORTS else 'name'
+        context['current_service'] = params.get('service', '')
+        context['current_min_visits'] = params.get('min_visits', '')
+        context['current_upcoming'] = params.get('upcoming', '')
+        # Sayfalama bağlantıları mevcut sıralama ve süzgeçleri korur
+        query = params.copy()
+        query.pop('page', None)
+        context['list_query'] = query.urlencode()
+        for client in context['clients']:
+            stats = getattr(client, 'client_stats', None)
+            client.favorite_service_label = self.service_labels.get(stats.favorite_service, '') if stats else ''
 
         if user.user_type == 'agent':
             try:
                 agent_profile = user.agent_profile
+                context['counters'] = counters.for_agent(agent_profile)
                 now = timezone.now()
                 # Sonraki 7 gün içinde olan ve bu temsilcinin müşterilerine ait bekleyen veya onaylanmış randevular
                 context['upcoming_appointments'] = Appointment.objects.filter(
@@ -189,7 +247,7 @@ class AgentClientManagementView(LoginRequiredMixin, UserPassesTestMixin, ListVie
                     date__gte=now,
                     date__lt=now + timedelta(days=7), # Sonraki 7 gün içinde
                     status__in=['pending', 'confirmed'] # Sadece bekleyen veya onaylanmış randevular
-                ).select_related('client', 'expert__user').order_by('date') # İlişkili objeleri önceden yükle
+                ).select_related('client', 'expert__user').order_by('date')[:self.UPCOMING_LIST_LIMIT] # İlişkili objeleri önceden yükle
             except CustomerAgent.DoesNotExist:
                 context['upcoming_appointments'] = []
             except Exception as e:
@@ -201,17 +259,60 @@ class AgentClientManagementView(LoginRequiredMixin, UserPassesTestMixin, ListVie
 
         return context
 
-class ExpertDashboardView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+class AgentClientImportView(LoginRequiredMixin, UserPassesTestMixin, FormView):
+    """
+    Müşteri temsilcisinin CSV dosyasından toplu müşteri eklemesini sağlar.
+    Eklenen müşteriler otomatik olarak temsilciye atanır.
+    """
+    form_class = AgentClientImportForm
+    template_name = 'accounts/agent_client_import.html'
+
+    def test_func(self):
+        """Sadece temsilci profili olan 'agent' kullanıcılar erişebilir."""
+        user = self.request.user
+        return user.user_type == 'agent' and hasattr(user, 'agent_profile')
+
+    def handle_no_permission(self):
+        """Yetkisiz erişimde kullanıcıyı ana sayfaya yönlendirir ve hata mesajı gösterir."""
+        messages.error(self.request, "Bu sayfayı görüntülemek için yetkiniz bulunmamaktadır.")
+        return redirect(reverse_lazy('home'))
+
+    def form_valid(self, form):
+        """Dosyayı işler ve aynı sayfada aktarım özetini gösterir."""
+        rows = read_rows(form.cleaned_data['csv_file'])
+        result = import_clients_for_agent(
+            self.request.user.agent_profile,
+            rows,
+            request=self.request,
+        )
+        if result.created:
+            messages.success(self.request, f"{len(result.created)} müşteri eklendi ve size atandı.")
+        if result.duplicates or result.rejected:
+            messages.warning(
+                self.request,
+                f"{len(result.duplicates)} mükerrer satır atlandı, {len(result.rejected)} satır reddedildi."
+            )
+        return self.render_to_response(self.get_context_data(form=self.form_class(), result=result))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['title'] = 'Toplu Müşteri Aktarımı'
+        return context
+
+class ExpertDashboardView(ReportsDatabaseMixin, LoginRequiredMixin, UserPassesTestMixin, TemplateView):
     """
     Uzmanların kendi panellerini görüntülemesini sağlar.
     Profil bilgileri, yaklaşan randevuları ve kazanılan komisyon özetini içerir.
+    Sayılar ve komisyon toplamları panel sayaçlarından (appointments.counters) tek satırla okunur;
+    yaklaşan randevu listesi ilk UPCOMING_LIST_LIMIT kayıtla sınırlıdır.
     Sadece 'expert' veya 'admin' rolündeki kullanıcılar bu sayfaya erişebilir.
     """
     template_name = 'accounts/expert_dashboard.html' 
+    UPCOMING_LIST_LIMIT = 20
 
     def test_func(self):
         """Kullanıcının 'expert' veya 'admin' rolünde olup olmadığını kontrol eder."""
-        return self.request.user.user_type == 'expert' or self.request.user.user_type == 'admin'
+        return self.request.user.user_type == 'expert' or is_admin(self.request.user)
 
     def handle_no_permission(self):
         """Yetkisiz erişimde kullanıcıyı ana sayfaya yönlendirir ve hata mesajı gösterir."""
@@ -239,15 +340,12 @@ class ExpertDashboardView(LoginRequiredMixin, UserPassesTestMixin, TemplateView)
                     date__gte=local_now, 
                     date__lt=local_now + timedelta(days=30), 
                     status__in=['pending', 'confirmed'] 
-                ).select_related('client', 'agent__user').order_by('date')
-
-                # Uzmanın toplam kazanılan komisyonunu Payment modelinden çekmek için
-                # is_commission_calculated=True olan ödemelerdeki expert_commission toplamı
-                total_commission = Payment.objects.filter(
-                    appointment__expert=expert_profile,
-                    is_commission_calculated=True 
-                ).aggregate(Sum('expert_commission'))['expert_commission__sum'] or 0
-                context['total_commission'] = total_commission
+                ).select_related('client', 'agent__user').order_by('date')[:self.UPCOMING_LIST_LIMIT]
+
+                # Sayılar ve komisyonlar (is_commission_calculated=True ödemelerdeki expert_commission
+                # toplamı) ödemeler taranmadan panel sayacı satırından okunur
+                context['counters'] = counters.for_expert(expert_profile)
+                context['total_commission'] = context['counters'].lifetime_commission
                 
             except Expert.DoesNotExist:
                 messages.warning(self.request, "Uzman profiliniz bulunamadı.")
@@ -260,11 +358,106 @@ class ExpertDashboardView(LoginRequiredMixin, UserPassesTestMixin, TemplateView)
                 context['expert_profile'] = None
                 context['upcoming_appointments'] = []
                 context['total_commission'] = 0
-        elif user.user_type == 'admin': # Adminler için genel bakış
+        elif is_admin(user): # Adminler için genel bakış
             context['upcoming_appointments'] = Appointment.objects.filter(
                 date__gte=timezone.localtime(timezone.now()), 
                 date__lt=timezone.localtime(timezone.now()) + timedelta(days=30), 
                 status__in=['pending', 'confirmed']
-            ).select_related('expert__user', 'client', 'agent__user').order_by('date')
-            context['total_commission'] = Payment.objects.aggregate(Sum('expert_commission'))['expert_commission__sum'] or 0 
+            ).select_related('expert__user', 'client', 'agent__user').order_by('date')[:self.UPCOMING_LIST_LIMIT]
+            # Tüm ödemeler yerine uzman başına tek satırlık sayaçlar toplanır
+            context['total_commission'] = ExpertDashboardCounters.objects.aggregate(
+                total=Sum('lifetime_commission')
+            )['total'] or 0
         return context
+
+
+# --- Otomatik Tamamlama (Autocomplete) Uç Noktaları ---
+
+def _autocomplete_response(request, search):
+    """Arama sonucunu JSON olarak döndürür; kullanıcının yetkisi yoksa 403 döner."""
+    data = search(request.user, request.GET.get('q', '').strip(), request.GET.get('page'))
+    if data is None:
+        return JsonResponse({'error': 'Bu listeye erişim yetkiniz yok.'}, status=403)
+    return JsonResponse(data)
+
+
+@login_required
+@require_GET
+def autocomplete_clients(request):
+    """Admin için tüm müşteriler, temsilci için yalnızca kendisine atanmış müşteriler aranır."""
+    return _autocomplete_response(request, autocomplete.client_results)
+
+
+@login_required
+@require_GET
+def autocomplete_experts(request):
+    """Uzman (doktor) araması."""
+    return _autocomplete_response(request, autocomplete.expert_results)
+
+
+@login_required
+@require_GET
+def autocomplete_agents(request):
+    """Temsilci araması (yalnızca admin/personel)."""
+    return _autocomplete_response(request, autocomplete.agent_results)
+
+
+# --- Temsilci Çalışma Alanı (JSON) ---
+
+def _workspace_datetime(value):
+    return timezone.localtime(value).strftime('%d.%m.%Y %H:%M') if value else None
+
+
+@login_required
+@require_GET
+def agent_workspace(request):
+    """
+    Temsilcinin atanmış müşterileri; her biri için sonraki randevu, son tamamlanan ziyaret,
+    son ödeme ve açık bakiye tek sorguda okunur (appointments.workspace). `sort` ile
+    sıralanır; `next` imleci `after` parametresiyle gönderilerek sonraki sayfa alınır.
+    """
+    agent = getattr(request.user, 'agent_profile', None) if request.user.user_type == 'agent' else None
+    if agent is None:
+        return JsonResponse({'error': 'Bu listeye erişim yetkiniz yok.'}, status=403)
+    sort = request.GET.get('sort') or workspace.DEFAULT_SORT
+    try:
+        limit = min(max(int(request.GET.get('limit', workspace.PAGE_SIZE)), 1), workspace.MAX_PAGE_SIZE)
+        rows, next_cursor = workspace.page(agent, sort, after=request.GET.get('after'), limit=limit)
+    except ValueError:
+        # Geçersiz limit, sıralama veya sayfa imleci (InvalidCursor)
+        return JsonResponse({'error': 'Geçersiz sayfa parametresi.'}, status=400)
+
+    services = AgentClientManagementView.service_labels
+    statuses = dict(Appointment.STATUS_CHOICES)
+    return JsonResponse({
+        'results': [
+            {
+                'id': row['client_id'],
+                'name': row['name'],
+                'phone': row['phone'],
+                'visit_count': row['visit_count'],
+                'open_balance': str(row['open_balance']),
+                'next_appointment': row['next_id'] and {
+                    'id': row['next_id'],
+                    'date': _workspace_datetime(row['next_date']),
+                    'status': statuses.get(row['next_status'], row['next_status']),
+                    'service': services.get(row['next_service'], row['next_service']),
+                    'expert': row['next_expert'],
+                    'url': reverse('appointments:update', args=[row['next_id']]),
+                },
+                'last_visit': row['visit_id'] and {
+                    'id': row['visit_id'],
+                    'date': _workspace_datetime(row['visit_date']),
+                    'service': services.get(row['visit_service'], row['visit_service']),
+                    'expert': row['visit_expert'],
+                },
+                'last_payment': row['payment_id'] and {
+                    'id': row['payment_id'],
+                    'amount': str(row['last_payment_amount']),
+                    'date': _workspace_datetime(row['payment_date']),
+                },
+            }
+            for row in rows
+        ],
+        'next': next_cursor,
+    })
@@ -0,0 +1,54 @@
+# accounts/widgets.py
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    Büyük tablolar için seçim kutusu. Sadece boş seçenek ve seçili değer HTML'e
+    basılır; diğer seçenekler static/js/autocomplete.js tarafından
+    `url_name` uç noktasından (accounts.autocomplete) aranarak yüklenir.
+    Alanın queryset'i doğrulama için kullanılmaya devam eder.
+    """
+
+    def __init__(self, url_name, attrs=None, placeholder="Aramak için yazın...", min_chars=2):
+        self.url_name = url_name
+        self.placeholder = placeholder
+        self.min_chars = min_chars
+        super().__init__(attrs)
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs.setdefault('class', 'form-select')
+        attrs['data-autocomplete-url'] = reverse(self.url_name)
+        attrs['data-placeholder'] = self.placeholder
+        attrs['data-min-chars'] = self.min_chars
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        """Tüm queryset yerine yalnızca seçili kayıtları seçenek olarak üretir."""
+        selected = {str(v) for v in value if v not in (None, '')}
+        choices = self.choices
+        options = []
+
+        empty_label = getattr(getattr(choices, 'field', None), 'empty_label', None)
+        if empty_label is not None:
+            options.append(self.create_option(name, '', empty_label, not selected, 0, attrs=attrs))
+
+        queryset = getattr(choices, 'queryset', None)
+        if selected and queryset is not None:
+            try:
+                selected_objects = list(queryset.filter(pk__in=selected))
+            except (ValueError, ValidationError):
+                # Geçersiz gönderilmiş değer: form hatası zaten gösterilecek
+                selected_objects = []
+            for index, obj in enumerate(selected_objects, start=len(options)):
+                option_value, option_label = choices.choice(obj)
+                options.append(self.create_option(name, option_value, option_label, True, index, attrs=attrs))
+
+        return [(None, options, 0)]
+
+    class Media:
+        js = ('js/autocomplete.js',)
@@ -1,21 +1,41 @@
 # appointments/admin.py
 
 from django.contrib import admin
-from .models import Appointment, ExpertAvailability, ExpertHoliday 
+from django import forms
+from .models import (
+    Appointment, CalendarFeed, ExpertAvailability, ExpertAvailabilityOverride, ExpertDaySchedule, ExpertHoliday, Resource,
+)
+from . import bulk
+from .changelist import AgentFilter, ExpertFilter, LargeTableAdminMixin
+from .permissions import can_edit, scope_appointments
+from .scheduling import ResourceUnavailableError
+from .versioning import VersionedAdminMixin
 from accounts.models import Expert, CustomerAgent, CustomUser # CustomerAgent ve CustomUser'ı da import edin
 
 @admin.register(Appointment)
-class AppointmentAdmin(admin.ModelAdmin):
+class AppointmentAdmin(LargeTableAdminMixin, VersionedAdminMixin, admin.ModelAdmin):
+    # Kaydetme sırasında boş oda/cihaz kalmadıysa değişiklik geri alınır ve hata gösterilir
+    conflict_errors = VersionedAdminMixin.conflict_errors + (ResourceUnavailableError,)
     # 'service_type' alanı list_display'e eklendi
     list_display = ('id', 'expert', 'client', 'agent_display', 'service_type', 'formatted_date', 'status', 'payment_status') 
+    # expert/client/agent_display sütunları satır başına sorgu yapmasın (agent boş olabildiği için açıkça verilir)
+    list_select_related = ('client', 'expert__user', 'agent__user')
     
-    # 'service_type' alanı list_filter'a eklendi
-    list_filter = ('status', 'service_type', 'expert', 'agent', 'payment_status', 'date')
+    # 'service_type' alanı list_filter'a eklendi; uzman/temsilci seçenekleri önbellekteki katalogdan gelir
+    list_filter = ('status', 'service_type', ('expert', ExpertFilter), ('agent', AgentFilter), 'payment_status', 'date')
     
-    search_fields = ('client__username', 'expert__user__username', 'expert__user__first_name', 'expert__user__last_name', 'notes') 
+    # Önek aramaları PostgreSQL'de UPPER(...) text_pattern_ops indeksleriyle karşılanır (accounts/migrations/0015);
+    # sayısal terimler randevu numarasıyla eşleşir
+    search_fields = (
+        '^client__first_name', '^client__last_name', '^client__username',
+        '^expert__user__first_name', '^expert__user__last_name', '^expert__user__username',
+    )
+    numeric_search_fields = ('pk',)
     
     actions = ['approve_appointments', 'cancel_appointments'] 
+    # Yıl/ay bağlantıları aylık randevu sayılarından üretilir (appointments.rollups)
     date_hierarchy = 'date' 
+    month_count_hierarchy = True
 
     list_editable = ('status',) # Randevu durumu list üzerinden düzenlenebilsin
 
@@ -26,8 +46,18 @@ class AppointmentAdmin(admin.ModelAdmin):
         }),
     )
     
-    # 'agent' raw_id_fields'tan da kaldırıldı, çünkü manuel seçilmeyecek
-    raw_id_fields = ('client', 'expert',) 
+    # 'agent' manuel seçilmeyecek; müşteri ve uzman arama ile seçilir (CustomUserAdmin/ExpertAdmin.search_fields)
+    autocomplete_fields = ('client', 'expert',) 
+
+    def get_queryset(self, request):
+        # Panele erişimi olan admin dışı personel (uzman/temsilci) yalnızca kendi kapsamındaki randevuları görür
+        queryset = super().get_queryset(request).select_related('client', 'expert__user', 'agent__user')
+        return scope_appointments(request.user, queryset)
+
+    def has_change_permission(self, request, obj=None):
+        if obj is not None and not can_edit(request.user, obj):
+            return False
+        return super().has_change_permission(request, obj)
 
     def get_form(self, request, obj=None, **kwargs):
         form = super().get_form(request, obj, **kwargs)
@@ -78,13 +108,19 @@ class AppointmentAdmin(admin.ModelAdmin):
     agent_display.short_description = 'Atanan Temsilci'
 
 
+    def _bulk_transition(self, request, queryset, to_status):
+        # queryset.update sinyal tetiklemez; geçmiş, sayaçlar, akış ve kaynaklar appointments.bulk ile güncellenir
+        changing = queryset.filter(status__in=['pending', 'confirmed']).exclude(status=to_status)
+        with bulk.changes(user=request.user) as change:
+            return change.update(changing, status=to_status)
+
     def approve_appointments(self, request, queryset):
-        updated = queryset.filter(status__in=['pending', 'confirmed']).update(status='confirmed')
+        updated = self._bulk_transition(request, queryset, 'confirmed')
         self.message_user(request, f"{updated} adet randevu onaylandı.")
     approve_appointments.short_description = "Seçili randevuları onayla"
     
     def cancel_appointments(self, request, queryset):
-        updated = queryset.filter(status__in=['pending', 'confirmed']).update(status='cancelled')
+        updated = self._bulk_transition(request, queryset, 'cancelled')
         self.message_user(request, f"{updated} adet randevu iptal edildi.")
     cancel_appointments.short_description = "Seçili randevuları iptal et"
 
@@ -107,4 +143,59 @@ class ExpertHolidayAdmin(admin.ModelAdmin):
     list_filter = ('expert',)
     search_fields = ('expert__user__username', 'description')
     date_hierarchy = 'start_date'
-    ordering = ['expert__user__username', 'start_date']
\ No newline at end of file
+    ordering = ['expert__user__username', 'start_date']
+
+@admin.register(ExpertAvailabilityOverride)
+class ExpertAvailabilityOverrideAdmin(admin.ModelAdmin):
+    list_display = ('expert', 'date', 'kind', 'start_time', 'end_time', 'description')
+    list_filter = ('kind', 'expert')
+    search_fields = ('expert__user__username', 'description')
+    date_hierarchy = 'date'
+    ordering = ['-date', 'start_time']
+
+
+@admin.register(ExpertDaySchedule)
+class ExpertDayScheduleAdmin(admin.ModelAdmin):
+    """Derlenmiş program salt okunurdur; kaynağı müsaitlik, izin ve istisna kayıtlarıdır."""
+    list_display = ('expert', 'date', 'intervals', 'on_holiday', 'compiled_at')
+    list_filter = ('on_holiday', 'expert')
+    date_hierarchy = 'date'
+    list_select_related = ('expert__user',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+class ResourceForm(forms.ModelForm):
+    service_types = forms.MultipleChoiceField(
+        choices=Appointment.SERVICE_CHOICES,
+        widget=forms.CheckboxSelectMultiple,
+        required=False,
+        label="Hizmet Tipleri",
+        help_text="Bu kaynağı gerektiren hizmetler. Bir hizmet, işaretlendiği her türden (oda, cihaz) bir kaynak ister."
+    )
+
+    class Meta:
+        model = Resource
+        fields = '__all__'
+
+
+@admin.register(Resource)
+class ResourceAdmin(admin.ModelAdmin):
+    form = ResourceForm
+    list_display = ('name', 'kind', 'capacity', 'is_active')
+    list_filter = ('kind', 'is_active')
+    search_fields = ('name',)
+
+
+@admin.register(CalendarFeed)
+class CalendarFeedAdmin(admin.ModelAdmin):
+    list_display = ('user', 'version', 'changed_at', 'created_at')
+    search_fields = ('user__username', 'user__first_name', 'user__last_name')
+    readonly_fields = ('token', 'version', 'changed_at', 'created_at')
+    list_select_related = ('user',)
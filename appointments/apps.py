@@ -5,3 +5,7 @@ class AppointmentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'appointments'
     verbose_name = 'Randevu Yönetimi'  # Admin panelde görünecek isim
+
+    def ready(self):
+        """Randevu–temsilci görünürlük tablosunu güncel tutan sinyalleri bağlar."""
+        import appointments.signals
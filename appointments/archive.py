@@ -0,0 +1,132 @@
+# appointments/archive.py
+"""
+Eski randevuların soğuk depoya (ArchivedAppointment) taşınması.
+
+Belirli bir yaştan eski, tamamlanmış veya iptal edilmiş randevular ödemeleriyle
+birlikte tek bir JSON belgesine dönüştürülüp arşiv tablosuna yazılır, ardından
+sıcak tablolardan (randevu, ödeme, temsilci erişimi) silinir.
+
+Sıcak tabloları kilitlememek için:
+- İş küçük partiler halinde yürür; her parti kendi kısa işleminde (transaction)
+  çalışır ve partiler arasında beklenir (throttling).
+- PostgreSQL'de satırlar `FOR UPDATE SKIP LOCKED` ile seçilir; o anda başka bir
+  işlemin tuttuğu satırlar atlanır ve sonraki çalıştırmaya kalır. `lock_timeout`
+  ile kilit beklemesi sınırlandırılır; süre aşılırsa parti geri alınıp sonra denenir.
+- Arşiv yazımı `original_id` üzerinden tekildir; yarıda kalan bir çalıştırma
+  tekrarlandığında aynı randevu iki kez arşivlenmez.
+"""
+
+import time
+from datetime import timedelta
+
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from accounts import catalog
+from . import bulk
+from .models import Appointment, ArchivedAppointment
+
+ARCHIVABLE_STATUSES = ('completed', 'cancelled')
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_SLEEP_SECONDS = 0.5
+LOCK_TIMEOUT = '2s'
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+def cutoff_for_years(years):
+    """Şu andan `years` yıl önceki an (arşivleme sınırı)."""
+    return timezone.now() - timedelta(days=365 * years)
+
+
+def archivable(cutoff):
+    """Sınırdan eski, arşive taşınabilir randevular."""
+    return Appointment.objects.filter(status__in=ARCHIVABLE_STATUSES, date__lt=cutoff)
+
+
+def _field_names(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _build_archive_rows(ids):
+    from payments.models import Payment
+
+    payments = {
+        row['appointment_id']: row
+        for row in Payment.objects.filter(appointment_id__in=ids).values(*_field_names(Payment))
+    }
+    expert_names = {entry.id: entry.name for entry in catalog.experts()}
+    agent_names = {entry.id: entry.name for entry in catalog.agents()}
+
+    rows = []
+    for data in Appointment.objects.filter(pk__in=ids).values(*_field_names(Appointment)):
+        # Liste sayfaları arşiv satırını ilişkili tablolara gitmeden gösterebilsin diye adlar da saklanır
+        data['expert_name'] = expert_names.get(data['expert_id'], '')
+        data['agent_name'] = agent_names.get(data['agent_id'], '')
+        rows.append(ArchivedAppointment(
+            original_id=data['id'],
+            client_id=data['client_id'],
+            expert_id=data['expert_id'],
+            date=data['date'],
+            status=data['status'],
+            service_type=data['service_type'],
+            payload={'appointment': data, 'payment': payments.get(data['id'])},
+        ))
+    return rows
+
+
+def archive_batch(cutoff, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Tek bir partiyi kendi işleminde arşivler. Arşivlenen randevu sayısını döndürür;
+    0 dönerse taşınacak (kilitsiz) kayıt kalmamıştır.
+    """
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+
+        candidates = archivable(cutoff).order_by('date', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return 0
+
+        ArchivedAppointment.objects.bulk_create(_build_archive_rows(ids), ignore_conflicts=True)
+        # Değişiklik akışına silme yerine 'archived' olayı yazılır; sayaçlar ve istatistikler
+        # sinyal başına değil parti başına güncellenir (bkz. appointments.bulk)
+        with bulk.changes() as change:
+            change.delete(ids, action='archived')
+    return len(ids)
+
+
+def archive_appointments(cutoff, batch_size=DEFAULT_BATCH_SIZE, sleep=DEFAULT_SLEEP_SECONDS,
+                         max_batches=None, log=None):
+    """
+    Sınırdan eski randevuları partiler halinde arşivler. Toplam arşivlenen sayıyı döndürür.
+    Kilit zaman aşımına uğrayan partiler beklendikten sonra yeniden denenir; art arda
+    MAX_CONSECUTIVE_FAILURES kez başarısız olunursa çalıştırma durdurulur.
+    """
+    total = batches = failures = 0
+    while max_batches is None or batches < max_batches:
+        try:
+            archived = archive_batch(cutoff, batch_size)
+        except OperationalError as exc:
+            failures += 1
+            if log:
+                log(f"Parti geri alındı ({failures}/{MAX_CONSECUTIVE_FAILURES}): {exc}")
+            if failures >= MAX_CONSECUTIVE_FAILURES:
+                break
+            time.sleep(sleep * 2 ** failures)
+            continue
+
+        failures = 0
+        if not archived:
+            break
+        batches += 1
+        total += archived
+        if log:
+            log(f"Parti {batches}: {archived} randevu arşivlendi (toplam {total}).")
+        if archived < batch_size:
+            break
+        time.sleep(sleep)
+    return total
@@ -0,0 +1,165 @@
+# appointments/availability.py
+"""
+Uzmanların günlük etkin çalışma programı (ExpertDaySchedule).
+
+Bir günün programı şöyle derlenir:
+    (haftalık müsaitlik, izinli değilse) ∪ tarihli ek aralıklar − tarihli kaldırılan aralıklar
+İzin tüm günü kaldırır; aynı güne girilen tarihli ek aralık ise izne rağmen geçerlidir
+(ör. izin sırasında iki saatliğine gelmek).
+
+Önümüzdeki AVAILABILITY_SCHEDULE_WEEKS hafta `materialize` ile (ör. her gece
+`compile_schedules` komutuyla) tüm uzmanlar için derlenir; derlenmiş bir günde her
+uzmanın (programı boş olsa da) satırı bulunur. Haftalık müsaitlik, izin, istisna veya
+uzman değiştiğinde sinyaller yalnızca etkilenen uzman ve günleri yeniden derler
+(`refresh`). Derlenmemiş günler (ufuk dışı) okunurken anında hesaplanır.
+"""
+
+from collections import defaultdict
+from datetime import time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Expert
+from .intervals import subtract, union
+from .models import ExpertAvailability, ExpertAvailabilityOverride, ExpertDaySchedule, ExpertHoliday
+
+
+def _weeks():
+    return getattr(settings, 'AVAILABILITY_SCHEDULE_WEEKS', 8)
+
+
+def horizon():
+    """Derlenen günler: bugünden itibaren [ilk gün, son gün)."""
+    today = timezone.localdate()
+    return today, today + timedelta(weeks=_weeks())
+
+
+def days_between(start, end):
+    return [start + timedelta(days=offset) for offset in range((end - start).days)]
+
+
+def compile_days(expert_ids, days):
+    """{(uzman, gün): ([(başlangıç, bitiş) time çiftleri], izinli mi)}; tüm günler için sabit sayıda sorgu."""
+    days = sorted(days)
+    if not days or not expert_ids:
+        return {}
+    weekly = defaultdict(list)
+    for expert_id, weekday, start, end in ExpertAvailability.objects.filter(
+        expert_id__in=expert_ids
+    ).values_list('expert_id', 'day_of_week', 'start_time', 'end_time'):
+        weekly[expert_id, weekday].append((start, end))
+    holidays = defaultdict(list)
+    for expert_id, start, end in ExpertHoliday.objects.filter(
+        expert_id__in=expert_ids, start_date__lte=days[-1], end_date__gte=days[0]
+    ).values_list('expert_id', 'start_date', 'end_date'):
+        holidays[expert_id].append((start, end))
+    added, removed = defaultdict(list), defaultdict(list)
+    for expert_id, day, kind, start, end in ExpertAvailabilityOverride.objects.filter(
+        expert_id__in=expert_ids, date__in=days
+    ).values_list('expert_id', 'date', 'kind', 'start_time', 'end_time'):
+        (added if kind == 'add' else removed)[expert_id, day].append((start, end))
+
+    compiled = {}
+    for expert_id in expert_ids:
+        for day in days:
+            on_holiday = any(start <= day <= end for start, end in holidays[expert_id])
+            base = [] if on_holiday else weekly.get((expert_id, day.weekday()), [])
+            intervals = subtract(union(base, added.get((expert_id, day), [])), union(removed.get((expert_id, day), [])))
+            compiled[expert_id, day] = (intervals, on_holiday)
+    return compiled
+
+
+def _store(compiled):
+    now = timezone.now()
+    ExpertDaySchedule.objects.bulk_create(
+        [
+            ExpertDaySchedule(
+                expert_id=expert_id,
+                date=day,
+                intervals=[[start.strftime('%H:%M'), end.strftime('%H:%M')] for start, end in intervals],
+                on_holiday=on_holiday,
+                compiled_at=now,
+            )
+            for (expert_id, day), (intervals, on_holiday) in compiled.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['expert', 'date'],
+        update_fields=['intervals', 'on_holiday', 'compiled_at'],
+        batch_size=1000,
+    )
+    return len(compiled)
+
+
+def materialize():
+    """Ufuktaki tüm günleri tüm uzmanlar için derler, geçmiş günlerin satırlarını siler. Derlenen satır sayısını döndürür."""
+    first, last = horizon()
+    expert_ids = list(Expert.objects.values_list('pk', flat=True))
+    with transaction.atomic():
+        ExpertDaySchedule.objects.filter(date__lt=first).delete()
+        return _store(compile_days(expert_ids, days_between(first, last)))
+
+
+def refresh(expert_ids, days):
+    """
+    Verilen uzmanların verilen günlerdeki derlenmiş satırlarını yeniden derler. Yalnızca var
+    olan satırlar güncellenir: derlenmemiş günler ufuk dışıdır ve silinmekte olan bir uzman
+    (CASCADE sırasında gelen sinyaller) için yeni satır eklenmez.
+    """
+    first, last = horizon()
+    days = [day for day in days if first <= day < last]
+    if not days:
+        return 0
+    existing = set(ExpertDaySchedule.objects.filter(
+        expert_id__in=list(expert_ids), date__in=days
+    ).values_list('expert_id', 'date'))
+    if not existing:
+        return 0
+    compiled = compile_days(sorted({expert_id for expert_id, _day in existing}), {day for _expert_id, day in existing})
+    return _store({pair: schedule for pair, schedule in compiled.items() if pair in existing})
+
+
+def add_expert(expert_id):
+    """Yeni uzmanın derlenmiş günlerdeki (boş) programını ekler; derlenmiş günlerde her uzmanın satırı bulunur."""
+    first, last = horizon()
+    days = ExpertDaySchedule.objects.filter(date__gte=first, date__lt=last).values_list('date', flat=True).distinct()
+    return _store(compile_days([expert_id], set(days)))
+
+
+def refresh_range(expert_id, start, end):
+    """[start, end] (ikisi dahil) tarih aralığını ufukla kırparak yeniden derler."""
+    first, last = horizon()
+    start, end = max(start, first), min(end + timedelta(days=1), last)
+    return refresh([expert_id], days_between(start, end)) if start < end else 0
+
+
+def refresh_weekday(expert_id, weekday):
+    first, last = horizon()
+    return refresh([expert_id], [day for day in days_between(first, last) if day.weekday() == weekday])
+
+
+def _parse(intervals):
+    return [(time.fromisoformat(start), time.fromisoformat(end)) for start, end in intervals]
+
+
+def day_schedules(day, expert_ids=None):
+    """
+    {uzman: ([(başlangıç, bitiş) time çiftleri], izinli mi)}. Derlenmiş günlerde tek sorgu;
+    çalışma aralığı olmayan uzmanlar da sonuçta yer alır.
+    """
+    rows = ExpertDaySchedule.objects.filter(date=day)
+    if expert_ids is not None:
+        rows = rows.filter(expert_id__in=expert_ids)
+    schedules = {
+        expert_id: (_parse(intervals), on_holiday)
+        for expert_id, intervals, on_holiday in rows.values_list('expert_id', 'intervals', 'on_holiday')
+    }
+    if expert_ids is None:
+        if schedules:
+            return schedules
+        expert_ids = list(Expert.objects.values_list('pk', flat=True))
+    missing = [expert_id for expert_id in expert_ids if expert_id not in schedules]
+    for (expert_id, _day), schedule in compile_days(missing, [day]).items():
+        schedules[expert_id] = schedule
+    return schedules
@@ -0,0 +1,191 @@
+# appointments/bulk.py
+"""
+Sinyal tetiklemeyen toplu randevu/ödeme yazımlarının yan etkileri.
+
+Tekil kayıtlarda appointments.signals ve notifications.signals; bulk_create,
+queryset.update ve toplu silme kullanan yollar (eski sistem aktarımı, sağlayıcı
+olayları, yönetim paneli toplu durum değişikliği, müşteri devri, arşivleme) ise
+yazımlarını `changes()` bloğu içinde bu modül üzerinden yapar:
+
+    with bulk.changes(source='payment') as change:
+        insert_rows(Payment, payments)
+        change.update(Appointment.objects.filter(pk__in=ids), status='completed', payment_status=True)
+        change.created_payments(payments)
+
+Değişiklikten önce okunması gerekenler (durum geçmişi, sayaç ve ödeme durumları,
+silinecek kayıtların olayları) yazımla birlikte yapılır; diğer bütün kancalar blok
+sonunda `BulkChanges.apply` içinde, aynı işlemde ve her biri tek seferde çalışır:
+görünürlük tablosu, kaynakların bırakılması, aylık sayılar, panel sayaçları, müşteri
+istatistikleri, değişiklik akışı ve takvim beslemeleri.
+"""
+
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import F
+
+from notifications import outbox
+from . import client_stats, counters, ical, rollups
+from .history import log_bulk_transition
+from .models import Appointment
+from .scheduling import ACTIVE_STATUSES, release
+from .visibility import sync_appointments
+
+# Toplu güncellemede değiştirilebilecek alanlar; tarih ve hizmet tipi kaynak ataması
+# gerektirdiğinden (scheduling.allocate) tekil kayıtla değiştirilir
+UPDATABLE_FIELDS = ('status', 'payment_status', 'client_id', 'expert_id', 'agent_id')
+
+
+class BulkChanges:
+    """Bir `changes()` bloğunda yapılan toplu yazımları toplar ve kancalarını `apply` ile çalıştırır."""
+
+    def __init__(self, source='admin_bulk', user=None):
+        self.source = source
+        self.user = user
+        self.created = []             # eklenen randevular
+        self.updated = {}             # randevu id -> (client, expert, agent, date, status) yazımdan önce
+        self.status_changed = set()   # durumu değişen randevular
+        self.released = set()         # kaynakları bırakılacak randevular
+        self.owners_changed = set()   # müşterisi, uzmanı veya temsilcisi değişen randevular
+        self.payments = []            # eklenen ödemeler
+        self.appointment_states = []  # panel sayaçları için (önce, sonra)
+        self.payment_states = []
+        self.client_ids = set()
+
+    def created_appointments(self, appointments):
+        """bulk_create/insert_rows ile eklenmiş (pk'sı dolu) randevular."""
+        self.created.extend(appointments)
+
+    def update(self, queryset, **values):
+        """
+        `queryset.update(**values)` yapar (sürüm artırılır) ve güncellenen satır sayısını döndürür.
+        Durum değişiyorsa geçmiş satırları güncellemeden önce aynı işlemde yazılır.
+        """
+        unsupported = set(values) - set(UPDATABLE_FIELDS)
+        if unsupported:
+            raise ValueError(f"Toplu güncellemede desteklenmeyen alanlar: {', '.join(sorted(unsupported))}")
+        rows = {
+            pk: state for pk, *state in
+            queryset.order_by().values_list('pk', 'client_id', 'expert_id', 'agent_id', 'date', 'status')
+        }
+        if not rows:
+            return 0
+        target = Appointment.objects.filter(pk__in=list(rows))
+        if 'status' in values:
+            log_bulk_transition(target, values['status'], source=self.source, user=self.user)
+        if {'expert_id', 'agent_id'} & set(values):
+            # Ödeme komisyonu randevunun uzman/temsilcisine yazılır; sahip değişince komisyon da taşınır
+            for state in counters.payment_states(list(rows)):
+                self.payment_states.append((state, (
+                    values.get('expert_id', state[0]), values.get('agent_id', state[1]), *state[2:]
+                )))
+        updated = target.update(**values, version=F('version') + 1)
+
+        for pk, (client_id, expert_id, agent_id, moment, status) in rows.items():
+            self.updated.setdefault(pk, (client_id, expert_id, agent_id, moment, status))
+            after = (values.get('expert_id', expert_id), values.get('agent_id', agent_id), moment,
+                     values.get('status', status))
+            self.appointment_states.append(((expert_id, agent_id, moment, status), after))
+            self.client_ids.update({client_id, values.get('client_id', client_id)})
+            if after[3] != status:
+                self.status_changed.add(pk)
+                if after[3] not in ACTIVE_STATUSES:
+                    self.released.add(pk)
+        if {'client_id', 'expert_id', 'agent_id'} & set(values):
+            self.owners_changed.update(rows)
+        return updated
+
+    def created_payments(self, payments):
+        """bulk_create/insert_rows ile eklenmiş ödemeler (randevu başına bir ödeme)."""
+        self.payments.extend(payments)
+
+    def delete(self, appointment_ids, action='archived'):
+        """
+        Randevuları ödemeleriyle siler. Değişiklik akışına silmeden önce `action` olayı yazılır;
+        silme sinyallerinin sayaç ve istatistik güncellemeleri kapatılır, aylık sayılar ay başına
+        bir kez güncellenir. Silinen randevu sayısını döndürür.
+        """
+        from payments.models import Payment
+
+        appointment_ids = list(appointment_ids)
+        payment_ids = list(Payment.objects.filter(appointment_id__in=appointment_ids).values_list('pk', flat=True))
+        outbox.record_bulk(Payment, payment_ids, action)
+        outbox.record_bulk(Appointment, appointment_ids, action)
+        for client_id, *state in Appointment.objects.filter(pk__in=appointment_ids).values_list(
+            'client_id', 'expert_id', 'agent_id', 'date', 'status'
+        ):
+            self.client_ids.add(client_id)
+            self.appointment_states.append((tuple(state), None))
+        self.payment_states.extend((state, None) for state in counters.payment_states(appointment_ids))
+        with outbox.suppressed(), counters.suppressed(), client_stats.suppressed(), rollups.batched():
+            Payment.objects.filter(pk__in=payment_ids).delete()
+            # Temsilci erişim satırları (AppointmentAgentAccess) ORM CASCADE ile silinir
+            _deleted, per_model = Appointment.objects.filter(pk__in=appointment_ids).delete()
+        return per_model.get(Appointment._meta.label, 0)
+
+    def apply(self):
+        """Toplanan yazımların kancalarını çalıştırır (`changes()` blok sonunda çağırır)."""
+        from payments.models import Payment
+
+        created_ids = [appointment.pk for appointment in self.created]
+        payment_appointments = {}
+        if self.payments:
+            payment_appointments = {
+                pk: owners for pk, *owners in Appointment.objects.filter(
+                    pk__in=[payment.appointment_id for payment in self.payments]
+                ).values_list('pk', 'client_id', 'expert_id', 'agent_id')
+            }
+        for payment in self.payments:
+            client_id, expert_id, agent_id = payment_appointments[payment.appointment_id]
+            self.client_ids.add(client_id)
+            self.payment_states.append((None, (
+                expert_id, agent_id, payment.payment_date, payment.is_commission_calculated,
+                payment.expert_commission, payment.agent_commission,
+            )))
+        for appointment in self.created:
+            self.client_ids.add(appointment.client_id)
+            self.appointment_states.append((None, (
+                appointment.expert_id, appointment.agent_id, appointment.date, appointment.status
+            )))
+
+        if created_ids or self.owners_changed:
+            # Uzman değişikliği görünürlüğü etkilemez; fazladan yeniden kurulan satırlar aynı kalır
+            sync_appointments([*created_ids, *self.owners_changed])
+        if self.released:
+            release(self.released)
+        if self.created:
+            rollups.count_created([appointment.date for appointment in self.created])
+        with counters.batched():
+            for before, after in self.appointment_states:
+                counters.track_appointment(before, after)
+            for before, after in self.payment_states:
+                counters.track_payment(before, after)
+        client_stats.refresh(self.client_ids)
+
+        # Değişiklik akışı kayıtların son halini yazar (tekil yoldaki gibi status_changed ile)
+        outbox.record_bulk(Appointment, created_ids, 'created', extra={'status_changed': False})
+        outbox.record_bulk(Appointment, self.status_changed, 'updated', extra={'status_changed': True})
+        outbox.record_bulk(Appointment, set(self.updated) - self.status_changed, 'updated', extra={'status_changed': False})
+        outbox.record_bulk(Payment, [payment.pk for payment in self.payments], 'created')
+
+        ical.touch_appointments([*created_ids, *self.updated])
+        # Sahibi değişen randevular önceki kişilerin beslemelerinden de çıkar
+        previous = [state for pk, state in self.updated.items() if pk in self.owners_changed and ical.in_window(state[3])]
+        if previous:
+            ical.touch(
+                client_ids={state[0] for state in previous},
+                expert_ids={state[1] for state in previous},
+                agent_ids={state[2] for state in previous if state[2]},
+            )
+
+
+@contextmanager
+def changes(source='admin_bulk', user=None):
+    """
+    Toplu yazımları tek bir işlemde yapar; blok hatasız biterse kancaları çalıştırır.
+    source/user durum geçmişine yazılır (bkz. appointments.history.log_bulk_transition).
+    """
+    change = BulkChanges(source, user)
+    with transaction.atomic():
+        yield change
+        change.apply()
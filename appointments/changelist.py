@@ -0,0 +1,147 @@
+# appointments/changelist.py
+"""
+Milyonlarca satırlık tablolar (randevu, ödeme) için yönetim paneli liste sayfası yardımcıları.
+
+- EstimatedCountPaginator: filtresiz listede toplam satır sayısı COUNT(*) yerine
+  PostgreSQL istatistiklerinden (pg_class.reltuples; bölümlenmiş tablolarda
+  bölümlerin toplamı) okunur. Tahmin ADMIN_ESTIMATED_COUNT_THRESHOLD altındaysa,
+  liste filtreliyse veya veritabanı PostgreSQL değilse gerçek sayım yapılır.
+- LargeTableAdminMixin: tahmini sayfalama, ikinci (filtresiz) COUNT sorgusunun
+  kapatılması, sayısal arama terimlerinin indeksli eşitlik aramasına çevrilmesi
+  (metne dönüştürüp LIKE yerine) ve ay sayıları tablosundan üretilen tarih hiyerarşisi.
+- CatalogRelatedFilter: uzman/temsilci filtre seçenekleri her istekte tablo ve her satır
+  için `__str__` sorgusu yerine önbellekteki katalogdan (accounts.catalog) gelir.
+
+Sayfa başına sorgu sayısı (oturum, kullanıcı ve işlem sorguları hariç) satır sayısından
+bağımsızdır: randevu listesi 3 (sayım, ay sayıları, satırlar), ödeme listesi 2 (sayım,
+satırlar), temsilci listesi 3 (sayım, toplam sayım, alt temsilci kazancı alt sorgulu satırlar).
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.utils import get_fields_from_path
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from accounts import catalog
+from . import rollups
+from .permissions import is_admin
+
+
+def _threshold():
+    return getattr(settings, 'ADMIN_ESTIMATED_COUNT_THRESHOLD', 100_000)
+
+
+def estimated_rows(model, using='default'):
+    """Tablonun istatistiklerdeki tahmini satır sayısı; PostgreSQL dışında veya hiç ANALYZE edilmemişse None."""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        # Bölümlenmiş ana tablonun kendi reltuples değeri -1/0'dır; bölümlerinki toplanır
+        cursor.execute(
+            "SELECT SUM(GREATEST(c.reltuples, 0))::bigint FROM pg_class c "
+            "WHERE c.oid = %s::regclass "
+            "OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass)",
+            [table, table]
+        )
+        estimate = cursor.fetchone()[0]
+    return estimate or None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Filtresiz büyük tablolarda toplam sayıyı istatistiklerden tahmin eden sayfalayıcı."""
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where and not query.distinct:
+            estimate = estimated_rows(self.object_list.model, self.object_list.db)
+            if estimate is not None and estimate >= _threshold():
+                return estimate
+        return super().count
+
+
+def numeric_term(search_term):
+    """Arama terimi tek bir sayıysa Decimal olarak döndürür ('150', '150.5', '150,50'); değilse None."""
+    term = search_term.strip().replace(',', '.')
+    if not term or not term.replace('.', '', 1).isdigit():
+        return None
+    try:
+        return Decimal(term)
+    except InvalidOperation:
+        return None
+
+
+class CatalogRelatedFilter(admin.RelatedFieldListFilter):
+    """Seçenekleri önbellekteki katalogdan gelen ilişkili alan filtresi."""
+    catalog = None
+
+    def field_choices(self, field, request, model_admin):
+        return [(entry.id, entry.label) for entry in self.catalog()]
+
+
+class ExpertFilter(CatalogRelatedFilter):
+    catalog = staticmethod(catalog.experts)
+
+
+class AgentFilter(CatalogRelatedFilter):
+    catalog = staticmethod(catalog.agents)
+
+
+class LargeTableAdminMixin:
+    """
+    Büyük tablo yönetim listeleri için ortak ayarlar. `numeric_search_fields` içindeki
+    alanlar sayısal terimlerle eşitlik üzerinden aranır; metin terimleri `search_fields`
+    ile (önek aramaları, ^) aranır. `month_count_hierarchy` açıksa date_hierarchy'nin
+    yıl ve ay bağlantıları appointments.rollups tablosundan üretilir.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    numeric_search_fields = ()
+    month_count_hierarchy = False
+    change_list_template = 'admin/large_table_change_list.html'
+
+    def get_search_results(self, request, queryset, search_term):
+        number = numeric_term(search_term)
+        if number is None or not self.numeric_search_fields:
+            return super().get_search_results(request, queryset, search_term)
+        condition = Q()
+        for name in self.numeric_search_fields:
+            field = self.opts.pk if name == 'pk' else get_fields_from_path(self.model, name)[-1]
+            if isinstance(field, models.DecimalField):
+                condition |= Q(**{name: number})
+            elif number == number.to_integral_value():
+                # Tam sayı alanları (kimlikler) yalnızca tam sayı terimle aranır
+                condition |= Q(**{name: int(number)})
+        return (queryset.filter(condition) if condition else queryset.none()), False
+
+    def get_changelist_instance(self, request):
+        changelist = super().get_changelist_instance(request)
+        changelist.hierarchy_months = self.get_hierarchy_months(request, changelist)
+        return changelist
+
+    def get_hierarchy_months(self, request, changelist):
+        """
+        Tarih hiyerarşisinin yıl/ay seçenekleri için randevusu olan aylar. Ay sayıları tüm
+        tabloyu kapsadığından yalnızca kapsamı kısıtlanmamış (admin) kullanıcıların filtresiz
+        ve aramasız listesinde kullanılır; diğer durumlarda None döner ve Django'nun
+        varsayılan (sorgu tabanlı) hiyerarşisi gösterilir.
+        """
+        if not (self.month_count_hierarchy and changelist.date_hierarchy and is_admin(request.user)):
+            return None
+        field = changelist.date_hierarchy
+        params = changelist.get_filters_params()
+        if changelist.query or any(
+            key for key in params if key not in (f'{field}__year', f'{field}__month', f'{field}__day')
+        ):
+            return None
+        if f'{field}__month' in params:
+            # Gün seçenekleri tek bir ayın indeksli aralığından okunur; ay sayıları gerekmez
+            return None
+        return rollups.months()
@@ -0,0 +1,149 @@
+# appointments/client_stats.py
+"""
+Müşteri istatistikleri (accounts.ClientProfile, `user.client_stats`).
+
+Temsilci müşteri listesi müşteri başına randevu/ödeme toplamı çalıştırmak yerine bu
+satırları birleştirip (join) indeksli alanlara göre sıralar ve süzer.
+
+- Ziyaret sayısı (tamamlanan randevular), toplam harcama (ödemeler), son ziyaret,
+  sonraki randevu (bekleyen/onaylanmış, şimdiden sonra), en sık alınan hizmet
+  (iptal edilmeyen randevular), son ödeme tutarı ve açık bakiye (saati geçmiş, iptal
+  edilmemiş ve ödemesi alınmamış randevuların ücreti).
+- Son ziyaret, sonraki randevu ve en sık hizmet silme/durum geri alma sonrası farkla
+  güncellenemez; bu yüzden yazımdan etkilenen müşterilerin satırları yazımla aynı
+  işlemde, müşteri başına indeksli (appt_client_date_idx) alt sorgularla tek bir
+  UPDATE içinde yeniden hesaplanır (`refresh`). Tablonun tamamı taranmaz.
+- Tekil kayıtlar sinyallerle, toplu yollar (yönetim paneli toplu durum değişikliği,
+  sağlayıcı olayları, eski sistem aktarımı, müşteri devri, arşivleme) appointments.bulk
+  üzerinden tek bir `refresh` ile güncellenir (etkilenen müşteriler BulkChanges içinde
+  toplanır); sinyal tetikleyen toplu silmeler `suppressed()` ile sinyal yolunu kapatır.
+- Yeni müşterinin (boş) satırı kullanıcıyla birlikte açılır (`create_rows`; tekil kayıtta
+  sinyal, toplu müşteri aktarımlarında doğrudan). Okuma yolları (temsilci müşteri listesi,
+  çalışma alanı) yazım yapmaz.
+- Sonraki randevu zamanla geçmişte kalır (saati gelen randevu açık bakiyeye de girer):
+  `refresh_client_stats --stale` komutu cron ile birkaç dakikada bir satırı olmayan veya
+  sonraki randevusu geçmiş müşterileri yeniler (`refresh_stale`); seçenek verilmezse
+  komut tüm satırları yeniden hesaplar.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import Count, DecimalField, IntegerField, Max, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.models import ClientProfile, CustomUser
+from .models import Appointment
+
+ACTIVE_STATUSES = ('pending', 'confirmed')
+STAT_FIELDS = (
+    'visit_count', 'lifetime_spend', 'last_visit', 'next_appointment', 'favorite_service',
+    'last_payment_amount', 'open_balance',
+)
+RECONCILE_BATCH = 1000
+
+_suppressed = ContextVar('client_stats_suppressed', default=False)
+
+
+@contextmanager
+def suppressed():
+    """Blok içinde sinyal tabanlı yenilemeyi kapatır (müşterileri kendisi yenileyen toplu yollar için)."""
+    token = _suppressed.set(True)
+    try:
+        yield
+    finally:
+        _suppressed.reset(token)
+
+
+def is_suppressed():
+    return _suppressed.get()
+
+
+def _aggregate(queryset, expression, output_field):
+    """Müşteri başına tek değer döndüren ilişkili (correlated) alt sorgu."""
+    return Subquery(
+        queryset.order_by().values('client_id').annotate(value=expression).values('value'),
+        output_field=output_field,
+    )
+
+
+def _expressions(now):
+    from payments.models import Payment
+
+    appointments = Appointment.objects.filter(client_id=OuterRef('user_id'))
+    spend = Payment.objects.filter(appointment__client_id=OuterRef('user_id')).order_by().values(
+        'appointment__client_id'
+    ).annotate(value=Sum('amount_paid')).values('value')
+    money = DecimalField(max_digits=14, decimal_places=2)
+    favorite = appointments.exclude(status='cancelled').order_by().values('service_type').annotate(
+        uses=Count('pk')
+    ).order_by('-uses', 'service_type').values('service_type')[:1]
+    last_payment = Payment.objects.filter(appointment__client_id=OuterRef('user_id')).order_by(
+        '-payment_date', '-pk'
+    ).values('amount_paid')[:1]
+    unpaid = appointments.exclude(status='cancelled').filter(payment_status=False, date__lt=now)
+    return {
+        'visit_count': Coalesce(
+            _aggregate(appointments.filter(status='completed'), Count('pk'), IntegerField()), Value(0)
+        ),
+        'lifetime_spend': Coalesce(Subquery(spend, output_field=money), Value(0), output_field=money),
+        'last_visit': _aggregate(appointments.filter(status='completed'), Max('date'), Appointment._meta.get_field('date')),
+        'next_appointment': _aggregate(
+            appointments.filter(status__in=ACTIVE_STATUSES, date__gte=now), Min('date'), Appointment._meta.get_field('date')
+        ),
+        'favorite_service': Coalesce(Subquery(favorite), Value('')),
+        'last_payment_amount': Subquery(last_payment, output_field=Payment._meta.get_field('amount_paid')),
+        'open_balance': Coalesce(_aggregate(unpaid, Sum('amount'), money), Value(0), output_field=money),
+        'updated_at': Value(now),
+    }
+
+
+def refresh(client_ids):
+    """Verilen müşterilerin satırlarını kaynaklardan yeniden hesaplar (yoksa oluşturur)."""
+    client_ids = {client_id for client_id in client_ids if client_id}
+    if not client_ids:
+        return
+    profiles = ClientProfile.objects.filter(user_id__in=client_ids)
+    if profiles.update(**_expressions(timezone.now())) < len(client_ids):
+        # Satırı olmayan müşteriler (yeni kayıt veya ilk hesaplama) eklenip yeniden hesaplanır
+        ClientProfile.objects.bulk_create(
+            [ClientProfile(user_id=client_id) for client_id in client_ids], ignore_conflicts=True
+        )
+        profiles.update(**_expressions(timezone.now()))
+
+
+def refresh_appointments(appointment_ids):
+    """Randevuların müşterilerini yeniler (silinecek randevular için silmeden önce çağrılır)."""
+    refresh(set(Appointment.objects.filter(pk__in=appointment_ids).values_list('client_id', flat=True)))
+
+
+def create_rows(client_ids, using=None):
+    """Yeni müşterilerin satırlarını açar (randevusu olmayan müşterinin değerleri varsayılanlardır)."""
+    ClientProfile.objects.db_manager(using).bulk_create(
+        [ClientProfile(user_id=client_id) for client_id in client_ids], ignore_conflicts=True
+    )
+
+
+def refresh_stale(clients=None, batch_size=RECONCILE_BATCH):
+    """
+    Müşteri queryset'inde (verilmezse tüm müşteriler) satırı olmayan veya sonraki randevusu
+    geçmişte kalmış müşterileri yeniler; yenilenen müşteri sayısını döndürür. Seçim indeksli
+    tek sorgudur; yenilenecek müşteri yoksa başka sorgu yapılmaz.
+    """
+    if clients is None:
+        clients = CustomUser.objects.filter(user_type='client')
+    stale = list(clients.filter(
+        Q(client_stats__isnull=True) | Q(client_stats__next_appointment__lt=timezone.now())
+    ).order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(stale), batch_size):
+        refresh(stale[start:start + batch_size])
+    return len(stale)
+
+
+def reconcile(batch_size=RECONCILE_BATCH):
+    """Tüm müşterilerin satırlarını yeniden hesaplar; yenilenen müşteri sayısını döndürür."""
+    client_ids = list(CustomUser.objects.filter(user_type='client').order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(client_ids), batch_size):
+        refresh(client_ids[start:start + batch_size])
+    return len(client_ids)
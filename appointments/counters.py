@@ -0,0 +1,299 @@
+# appointments/counters.py
+"""
+Uzman ve temsilci paneli sayaçları (ExpertDashboardCounters, AgentDashboardCounters).
+
+Paneller her ziyarette 30 günlük randevu sorgusu ve tüm ödemeler üzerinde
+`Sum(...komisyon)` çalıştırmak yerine sahibin tek satırını okur.
+
+- Randevu durumu: (expert_id, agent_id, date, status); ödeme durumu:
+  (expert_id, agent_id, payment_date, is_commission_calculated, expert_commission,
+  agent_commission). Her yazımda eski ve yeni durumun katkı farkı ilgili satırlara
+  F ifadeleriyle eklenir (`track_appointment`, `track_payment`); güncelleme yazımla
+  aynı işlemde yapılır.
+- Tekil kayıtlar sinyallerle, toplu yollar (sağlayıcı olayları, yönetim paneli toplu
+  durum değişikliği, eski sistem aktarımı, müşteri devri, arşivleme) appointments.bulk
+  üzerinden durumları tek sorguda okuyup izler. Çok
+  satırlı işlemler `batched()` içinde sahip başına tek UPDATE yapar; sinyal tetikleyen
+  toplu silmeler `suppressed()` ile sinyal yolunu kapatır.
+- Güne bağlı alanlar (bugün, yaklaşan 30 gün, bu ay komisyonu) satırın `counted_on`
+  gününe göredir; farklar yalnızca güncel günü sayılmış satırlara uygulanır. Gün
+  değişince satır okunurken (`for_expert`, `for_agent`) bu alanlar yeniden sayılır.
+- `reconcile` tüm satırları kaynaklardan yeniden hesaplar (`reconcile_dashboard_counters`
+  komutu; her gece gün başında çalıştırılması önerilir); bölüm ayırma gibi sinyal
+  tetiklemeyen işlemlerden sonra da kullanılır.
+
+"Yaklaşan" gün bazındadır: bugün (yerel saat) dahil sonraki 30 günün bekleyen ve
+onaylanmış randevuları.
+"""
+
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Q, Sum, When
+from django.utils import timezone
+
+from accounts.models import CustomerAgent, Expert
+from .models import AgentDashboardCounters, Appointment, ExpertDashboardCounters
+from .rollups import month_of, month_range
+
+ACTIVE_STATUSES = ('pending', 'confirmed')
+UPCOMING_DAYS = 30
+WINDOWED_FIELDS = ('today_count', 'upcoming_count', 'month_commission')
+COUNT_FIELDS = ('today_count', 'upcoming_count', 'completed_count')
+COMMISSION_FIELDS = ('lifetime_commission', 'month_commission')
+
+# tür -> (sayaç modeli, sahip modeli, ödemedeki komisyon alanı)
+KINDS = {
+    'expert': (ExpertDashboardCounters, Expert, 'expert_commission'),
+    'agent': (AgentDashboardCounters, CustomerAgent, 'agent_commission'),
+}
+
+_pending = ContextVar('dashboard_counters_pending', default=None)
+_suppressed = ContextVar('dashboard_counters_suppressed', default=False)
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _local_day(moment):
+    return timezone.localtime(moment).date() if timezone.is_aware(moment) else moment.date()
+
+
+def _owners(expert_id, agent_id):
+    return (('expert', expert_id), ('agent', agent_id))
+
+
+@contextmanager
+def batched():
+    """Blok içindeki farkları biriktirir ve blok sonunda sahip başına tek seferde uygular."""
+    pending = defaultdict(Counter)
+    token = _pending.set(pending)
+    try:
+        yield
+    finally:
+        _pending.reset(token)
+    apply(pending)
+
+
+@contextmanager
+def suppressed():
+    """Blok içinde sinyal tabanlı sayaç güncellemesini kapatır (farkları kendisi izleyen toplu yollar için)."""
+    token = _suppressed.set(True)
+    try:
+        yield
+    finally:
+        _suppressed.reset(token)
+
+
+def is_suppressed():
+    return _suppressed.get()
+
+
+def appointment_states(appointment_ids):
+    """Randevuların sayaç durumları (tek sorgu)."""
+    return list(
+        Appointment.objects.filter(pk__in=appointment_ids).values_list('expert_id', 'agent_id', 'date', 'status')
+    )
+
+
+def payment_states(appointment_ids):
+    """Randevulara ait ödemelerin sayaç durumları (tek sorgu)."""
+    from payments.models import Payment
+
+    return list(Payment.objects.filter(appointment_id__in=appointment_ids).values_list(
+        'appointment__expert_id', 'appointment__agent_id', 'payment_date',
+        'is_commission_calculated', 'expert_commission', 'agent_commission',
+    ))
+
+
+def apply(deltas):
+    """{(tür, sahip id): {alan: fark}} farklarını uygular; satırı olmayan sahip baştan sayılır."""
+    pending = _pending.get()
+    if pending is not None:
+        for key, fields in deltas.items():
+            pending[key].update(fields)
+        return
+    today = timezone.localdate()
+    for (kind, owner_id), fields in deltas.items():
+        changes = {name: delta for name, delta in fields.items() if delta}
+        if owner_id is None or not changes:
+            continue
+        model = KINDS[kind][0]
+        updates = {
+            # Güne bağlı alanlar yalnızca bugün sayılmış satırda artar; eski satır okunurken yeniden sayılır
+            name: Case(When(counted_on=today, then=F(name) + delta), default=F(name)) if name in WINDOWED_FIELDS
+            else F(name) + delta
+            for name, delta in changes.items()
+        }
+        if not model.objects.filter(**{f'{kind}_id': owner_id}).update(**updates):
+            # Yazım aynı işlemde önce yapıldığından baştan sayım bu farkı zaten içerir
+            recount(kind, [owner_id])
+
+
+def _appointment_contribution(state, today):
+    expert_id, agent_id, moment, status = state
+    contribution = Counter()
+    if status == 'completed':
+        contribution['completed_count'] = 1
+    elif status in ACTIVE_STATUSES and moment is not None:
+        day = _local_day(moment)
+        if day == today:
+            contribution['today_count'] = 1
+        if today <= day < today + timedelta(days=UPCOMING_DAYS):
+            contribution['upcoming_count'] = 1
+    return contribution
+
+
+def _difference(before, after, contribution):
+    """Eski ve yeni durumun sahip başına katkı farkı."""
+    today = timezone.localdate()
+    deltas = defaultdict(Counter)
+    for state, sign in ((before, -1), (after, 1)):
+        if state is None:
+            continue
+        for owner, values in contribution(state, today).items():
+            for name, value in values.items():
+                deltas[owner][name] += sign * value
+    return deltas
+
+
+def track_appointment(before, after):
+    """Randevu durumu değişimini (yeni kayıtta before, silmede after None) sayaçlara yansıtır."""
+    def contribution(state, today):
+        values = _appointment_contribution(state, today)
+        return {owner: values for owner in _owners(state[0], state[1])}
+    apply(_difference(before, after, contribution))
+
+
+def track_payment(before, after):
+    """Ödeme durumu değişimini (yeni kayıtta before, silmede after None) sayaçlara yansıtır."""
+    def contribution(state, today):
+        expert_id, agent_id, paid_at, calculated, expert_commission, agent_commission = state
+        if not calculated:
+            return {}
+        this_month = paid_at is not None and month_of(paid_at) == month_of(_day_start(today))
+        result = {}
+        for owner, amount in zip(_owners(expert_id, agent_id), (expert_commission, agent_commission)):
+            amount = Decimal(amount or 0)
+            result[owner] = {'lifetime_commission': amount, 'month_commission': amount if this_month else Decimal('0')}
+        return result
+    apply(_difference(before, after, contribution))
+
+
+def _tally(kind, owner_ids, today, windowed_only=False):
+    """Sahip başına sayaç değerleri (kaynak tablolardan); owner_ids None ise tüm sahipler."""
+    from payments.models import Payment
+
+    _model, owner_model, commission = KINDS[kind]
+    start = _day_start(today)
+    tomorrow, horizon = _day_start(today + timedelta(days=1)), _day_start(today + timedelta(days=UPCOMING_DAYS))
+    month_start, month_end = month_range(month_of(start))
+
+    appointments = Appointment.objects.exclude(**{f'{kind}_id': None})
+    payments = Payment.objects.filter(is_commission_calculated=True).exclude(**{f'appointment__{kind}_id': None})
+    if owner_ids is not None:
+        appointments = appointments.filter(**{f'{kind}_id__in': owner_ids})
+        payments = payments.filter(**{f'appointment__{kind}_id__in': owner_ids})
+    active = Q(status__in=ACTIVE_STATUSES)
+    counts = {
+        'today_count': Count('pk', filter=active & Q(date__gte=start, date__lt=tomorrow)),
+        'upcoming_count': Count('pk', filter=active & Q(date__gte=start, date__lt=horizon)),
+    }
+    sums = {'month_commission': Sum(commission, filter=Q(payment_date__gte=month_start, payment_date__lt=month_end))}
+    if windowed_only:
+        # Yalnızca bugünün penceresi ve bu ayın ödemeleri taranır (tarih aralıkları indekslidir)
+        appointments = appointments.filter(active, date__gte=start, date__lt=horizon)
+        payments = payments.filter(payment_date__gte=month_start, payment_date__lt=month_end)
+    else:
+        counts['completed_count'] = Count('pk', filter=Q(status='completed'))
+        sums['lifetime_commission'] = Sum(commission)
+
+    values = defaultdict(dict)
+    for row in appointments.values(f'{kind}_id').order_by().annotate(**counts):
+        values[row.pop(f'{kind}_id')].update(row)
+    for row in payments.values(f'appointment__{kind}_id').order_by().annotate(**sums):
+        values[row.pop(f'appointment__{kind}_id')].update({name: amount or Decimal('0') for name, amount in row.items()})
+
+    ids = owner_ids if owner_ids is not None else owner_model.objects.values_list('pk', flat=True)
+    fields = WINDOWED_FIELDS if windowed_only else COUNT_FIELDS + COMMISSION_FIELDS
+    defaults = {name: Decimal('0') if name in COMMISSION_FIELDS else 0 for name in fields}
+    return {owner_id: {**defaults, **values.get(owner_id, {})} for owner_id in ids}
+
+
+def recount(kind, owner_ids):
+    """Verilen sahiplerin satırlarını kaynaklardan yeniden hesaplar (yoksa oluşturur)."""
+    model = KINDS[kind][0]
+    today = timezone.localdate()
+    for owner_id, values in _tally(kind, list(owner_ids), today).items():
+        try:
+            with transaction.atomic():
+                model.objects.update_or_create(**{f'{kind}_id': owner_id}, defaults={'counted_on': today, **values})
+        except IntegrityError:
+            # Eşzamanlı bir istek satırı az önce açtı
+            model.objects.filter(**{f'{kind}_id': owner_id}).update(counted_on=today, **values)
+
+
+def _current(kind, owner_id):
+    """Sahibin satırı; gün değiştiyse güne bağlı alanlar yeniden sayılır, satır yoksa oluşturulur."""
+    model = KINDS[kind][0]
+    today = timezone.localdate()
+    row = model.objects.filter(**{f'{kind}_id': owner_id}).first()
+    if row is None:
+        recount(kind, [owner_id])
+        return model.objects.get(**{f'{kind}_id': owner_id})
+    if row.counted_on != today:
+        with transaction.atomic():
+            # Satır kilitlenir; eşzamanlı yazımların farkları yeniden sayım bittikten sonra uygulanır
+            row = model.objects.select_for_update().get(pk=row.pk)
+            if row.counted_on != today:
+                values = _tally(kind, [owner_id], today, windowed_only=True)[owner_id]
+                model.objects.filter(pk=row.pk).update(counted_on=today, **values)
+                row.refresh_from_db()
+    return row
+
+
+def for_expert(expert):
+    return _current('expert', expert.pk)
+
+
+def for_agent(agent):
+    return _current('agent', agent.pk)
+
+
+def reconcile(kinds=None):
+    """
+    Satırları kaynaklardan yeniden hesaplar; eksik satırları oluşturur, farklı olanları
+    düzeltir. Tür başına (kontrol edilen, oluşturulan, düzeltilen) satır sayısını döndürür;
+    yalnızca gün değişimi (counted_on) düzeltme sayılmaz.
+    """
+    today = timezone.localdate()
+    fields = ['counted_on', *COUNT_FIELDS, *COMMISSION_FIELDS]
+    result = {}
+    for kind in kinds or KINDS:
+        model = KINDS[kind][0]
+        with transaction.atomic():
+            existing = {getattr(row, f'{kind}_id'): row for row in model.objects.select_for_update()}
+            expected = _tally(kind, None, today)
+            created, changed, drifted = [], [], 0
+            for owner_id, values in expected.items():
+                values = {'counted_on': today, **values}
+                row = existing.get(owner_id)
+                if row is None:
+                    created.append(model(**{f'{kind}_id': owner_id}, **values))
+                    continue
+                stale = [name for name in fields if getattr(row, name) != values[name]]
+                if not stale:
+                    continue
+                drifted += stale != ['counted_on']
+                for name in fields:
+                    setattr(row, name, values[name])
+                changed.append(row)
+            model.objects.bulk_create(created, batch_size=1000)
+            model.objects.bulk_update(changed, fields, batch_size=1000)
+        result[kind] = (len(expected), len(created), drifted)
+    return result
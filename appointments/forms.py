@@ -1,8 +1,13 @@
 # appointments/forms.py
 
 from django import forms
-from .models import Appointment, ExpertAvailability, ExpertHoliday 
+from .models import Appointment
+from .availability import day_schedules
+from .permissions import is_staff_user
+from .scheduling import missing_resources
 from accounts.models import CustomUser, Expert, CustomerAgent
+from accounts import catalog
+from accounts.widgets import AutocompleteSelect
 from django.utils import timezone
 from datetime import datetime, timedelta 
 
@@ -25,7 +30,8 @@ class AppointmentForm(forms.ModelForm):
         queryset=Expert.objects.all().select_related('user').order_by('user__first_name', 'user__last_name'),
         label="Doktor",
         required=True,
-        widget=forms.Select(attrs={'class': 'form-select'})
+        # Seçenekler tamamen HTML'e basılmaz, arama ile yüklenir (accounts:autocomplete_experts)
+        widget=AutocompleteSelect('accounts:autocomplete_experts', attrs={'class': 'form-select'})
     )
 
     service_type = forms.ChoiceField(
@@ -57,8 +63,10 @@ class AppointmentForm(forms.ModelForm):
 
     class Meta:
         model = Appointment
-        fields = ['client', 'expert', 'service_type', 'date', 'notes', 'status', 'payment_status', 'amount']
+        fields = ['client', 'expert', 'service_type', 'date', 'notes', 'status', 'payment_status', 'amount', 'version']
         widgets = {
+            # Düzenleme sayfasının açıldığı andaki sürüm; kayıt başka biri tarafından değiştirildiyse kaydetme reddedilir
+            'version': forms.HiddenInput(),
             'notes': forms.Textarea(attrs={'rows': 3, 'class': 'form-control'}),
             'amount': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'})
         }
@@ -69,12 +77,16 @@ class AppointmentForm(forms.ModelForm):
         """
         self.user = user 
         super().__init__(*args, **kwargs)
+        # Gönderilmezse (ör. JSON istemcisi) kaydın yüklendiği andaki sürüm kullanılır
+        self.fields['version'].required = False
 
-        # Uzman seçeneğinin görünümünü düzenler (Doktorun tam adını gösterir)
-        self.fields['expert'].label_from_instance = lambda obj: obj.get_display_name()
+        # Uzman seçeneğinin görünümünü düzenler (Doktorun tam adını gösterir).
+        # Etiketler önbellekteki katalogdan alınır; katalogda olmayan (yeni) uzmanlar için modele düşülür.
+        expert_labels = catalog.expert_labels()
+        self.fields['expert'].label_from_instance = lambda obj: expert_labels.get(obj.pk) or obj.get_display_name()
         
         # Admin olmayan (veya staff olmayan) kullanıcılar için bazı alanları gizler
-        if self.user and self.user.user_type != 'admin' and not self.user.is_staff:
+        if self.user and not is_staff_user(self.user):
             self.fields['status'].widget = forms.HiddenInput()
             self.fields['status'].required = False
             self.fields['payment_status'].widget = forms.HiddenInput()
@@ -95,8 +107,10 @@ class AppointmentForm(forms.ModelForm):
         if self.user:
             user_type = self.user.user_type
 
-            if user_type == 'admin' or self.user.is_staff:
-                # Adminler tüm müşterileri seçebilir
+            if is_staff_user(self.user):
+                # Adminler tüm müşterileri seçebilir; liste arama ile yüklenir.
+                # Widget queryset'ten önce atanmalı, queryset ataması widget seçeneklerini bağlar.
+                self.fields['client'].widget = AutocompleteSelect('accounts:autocomplete_clients', attrs={'class': 'form-select'})
                 self.fields['client'].queryset = CustomUser.objects.filter(user_type='client').order_by('first_name', 'last_name')
                 self.fields['client'].label_from_instance = lambda obj: obj.get_full_name() or obj.username
             elif user_type == 'agent':
@@ -110,6 +124,7 @@ class AppointmentForm(forms.ModelForm):
                         self.fields['client'].label = '' # Etiketi gizle
                         self.fields['client'].help_text = "Size atanmış hiçbir müşteri bulunmamaktadır."
                     else:
+                        self.fields['client'].widget = AutocompleteSelect('accounts:autocomplete_clients', attrs={'class': 'form-select'})
                         self.fields['client'].queryset = agent_profile.assigned_clients.order_by('first_name', 'last_name')
                         self.fields['client'].label_from_instance = lambda obj: obj.get_full_name() or obj.username
                 except CustomerAgent.DoesNotExist:
@@ -163,6 +178,7 @@ class AppointmentForm(forms.ModelForm):
         - Uzman müsaitliği
         - Uzman tatilleri/izinleri
         - Aynı uzmana aynı saate çakışan randevu olup olmadığı
+        - Hizmetin gerektirdiği oda/cihazlardan boş olanı kalıp kalmadığı
         - Gerekli alanların doldurulup doldurulmadığı
         """
         cleaned_data = super().clean()
@@ -173,27 +189,16 @@ class AppointmentForm(forms.ModelForm):
 
         # Tüm temel alanlar mevcutsa validasyona devam et
         if expert and date and client and service_type:
-            selected_day_of_week = date.weekday() # Haftanın gününü sayı olarak alır (0=Pazartesi)
             selected_time = date.time()
 
-            # 1. Uzman müsaitliği kontrolü
-            availabilities = ExpertAvailability.objects.filter(
-                expert=expert,
-                day_of_week=selected_day_of_week,
-                start_time__lte=selected_time, # Seçilen zaman başlangıç zamanından büyük veya eşit olmalı
-                end_time__gt=selected_time     # Seçilen zaman bitiş zamanından küçük olmalı
-            )
-            if not availabilities.exists():
-                self.add_error('date', "Uzman, seçilen gün ve saatte müsait değil. Lütfen farklı bir zaman seçin.")
-
-            # 2. Uzman tatil/izin kontrolü
-            holidays = ExpertHoliday.objects.filter(
-                expert=expert,
-                start_date__lte=date.date(), # Seçilen tarih tatil başlangıcından büyük veya eşit olmalı
-                end_date__gte=date.date()    # Seçilen tarih tatil bitişinden küçük veya eşit olmalı
-            )
-            if holidays.exists():
-                self.add_error('date', "Uzman, seçilen tarihte izinli veya tatildedir. Lütfen farklı bir tarih seçin.")
+            # 1-2. Uzman müsaitliği ve izin kontrolü: derlenmiş günlük programdan (haftalık müsaitlik,
+            # izinler ve tarihli istisnalar) tek satır okunur
+            intervals, on_holiday = day_schedules(date.date(), [expert.pk])[expert.pk]
+            if not any(start <= selected_time < end for start, end in intervals):
+                if on_holiday:
+                    self.add_error('date', "Uzman, seçilen tarihte izinli veya tatildedir. Lütfen farklı bir tarih seçin.")
+                else:
+                    self.add_error('date', "Uzman, seçilen gün ve saatte müsait değil. Lütfen farklı bir zaman seçin.")
 
             # 3. Randevu çakışması kontrolü (aynı uzman, aynı tarih ve saat, 'beklemede' veya 'onaylandı' durumunda)
             query = Appointment.objects.filter(
@@ -206,6 +211,11 @@ class AppointmentForm(forms.ModelForm):
             
             if query.exists():
                 self.add_error('date', "Bu uzmanın bu tarih ve saate zaten bir randevusu bulunmaktadır. Lütfen farklı bir saat seçiniz.")
+
+            # 4. Kaynak kontrolü (kesin kontrol kayıt sırasında kilitli yapılır, bkz. appointments.scheduling.allocate)
+            missing = missing_resources(service_type, date, exclude_appointment=self.instance.pk)
+            if missing:
+                self.add_error('date', f"Seçilen saatte bu hizmet için boş {', '.join(missing).lower()} bulunmamaktadır. Lütfen farklı bir saat seçiniz.")
         
         # Temel alanların boş olup olmadığı kontrolü (widget HiddenInput değilse)
         # Eğer alan gizliyse (kullanıcı tarafından girilmiyorsa) bu kontrolü yapmaya gerek yoktur.
@@ -0,0 +1,169 @@
+# appointments/history.py
+"""
+Randevu durum geçmişi (AppointmentStatusChange) yazımı.
+
+- Tekil geçişler (durum değişikliği içeren Appointment.save) appointments.signals
+  tarafından `record` ile kaydedilir. Kayıtlar hemen yazılmaz, tamponlanır:
+  bir işlem (transaction) içindeyse işlem başarıyla bittiğinde (on_commit) işlemin
+  bütün kayıtları tek bir bulk_create ile yazılır, geri alınan işlem veya kayıt
+  noktasındaki kayıtlar atılır; işlem dışındaysa StatusHistoryMiddleware'in açtığı
+  istek tamponunda toplanıp istek sonunda yazılır.
+- `queryset.update` ile yapılan toplu geçişler (yönetim paneli eylemleri) için
+  `log_bulk_transition` geçmişi tek bir INSERT ... SELECT ile, satır satır
+  yükleme yapmadan yazar.
+- Kimin ve hangi yoldan değiştirdiği `status_actor` bağlamından okunur; middleware
+  bunu istek başına ayarlar, ödeme gibi özel yollar kaynağı daraltabilir.
+"""
+
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connection, transaction
+from django.db.models import CharField, DateTimeField, F, IntegerField, Value
+from django.utils import timezone
+
+from .models import AppointmentStatusChange
+
+_actor = ContextVar('status_actor', default=(None, 'system'))
+_request_buffer = ContextVar('status_request_buffer', default=None)
+# on_commit bekleyen tamponlar: {bağlantı adı: {kayıt noktası kimlikleri: weakref(_TransactionBatch)}}
+_pending_batches = ContextVar('status_pending_batches', default=None)
+
+
+@contextmanager
+def status_actor(user=None, source=None):
+    """Blok içindeki durum geçişlerini verilen kullanıcı ve kaynakla kaydeder. Verilmeyen değer korunur."""
+    current_user, current_source = _actor.get()
+    token = _actor.set((user if user is not None else current_user, source or current_source))
+    try:
+        yield
+    finally:
+        _actor.reset(token)
+
+
+def _actor_id(user):
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return None
+    return user.pk
+
+
+class _TransactionBatch:
+    """Bir işlem/kayıt noktası (savepoint) seviyesinin kayıtları; on_commit ile yazılır."""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.entries = []
+
+    def __call__(self):
+        # İşlem tamamlandı: ilk çalışan tampon, işlemin hâlâ yaşayan bütün seviyelerini tek bulk_create
+        # ile yazar; sonraki tamponlar boş kalır. Bağlantının kayıtları da bir sonraki işlem için temizlenir.
+        levels = (_pending_batches.get() or {}).pop(self.alias, {})
+        batches = [batch for batch in (ref() for ref in levels.values()) if batch is not None]
+        if self not in batches:
+            batches.append(self)
+        entries = []
+        for batch in batches:
+            entries.extend(batch.entries)
+            batch.entries = []
+        _write(entries)
+
+
+def _transaction_batch():
+    # Tampon, açık kayıt noktalarıyla anahtarlanır ve yalnızca zayıf referansla tutulur: güçlü referansı
+    # on_commit listesindeki çağrıdır. Kayıt noktası ya da işlem geri alınınca Django çağrıyı listeden
+    # siler, tampon da (kayıtlarıyla birlikte) hemen serbest kalır; aynı anahtar sonraki bir işlemde
+    # (ör. en dış seviyede) tekrar geldiğinde ölü referans yerine yeni tampon açılır.
+    pending = _pending_batches.get()
+    if pending is None:
+        pending = {}
+        _pending_batches.set(pending)
+    levels = pending.setdefault(connection.alias, {})
+    key = tuple(connection.savepoint_ids)
+    ref = levels.get(key)
+    batch = ref() if ref is not None else None
+    if batch is None:
+        for stale in [stale for stale, ref in levels.items() if ref() is None]:
+            del levels[stale]
+        batch = _TransactionBatch(connection.alias)
+        transaction.on_commit(batch)
+        levels[key] = weakref.ref(batch)
+    return batch
+
+
+def _write(entries):
+    if entries:
+        AppointmentStatusChange.objects.bulk_create(entries)
+
+
+def record(appointment_id, from_status, to_status, source=None, user=None):
+    """Tek bir durum geçişini tampona ekler (yazım zamanı için modül açıklamasına bakınız)."""
+    actor, actor_source = _actor.get()
+    entry = AppointmentStatusChange(
+        appointment_id=appointment_id,
+        changed_by_id=_actor_id(user if user is not None else actor),
+        from_status=from_status or '',
+        to_status=to_status,
+        source=source or actor_source,
+        created_at=timezone.now(),
+    )
+    if connection.in_atomic_block:
+        _transaction_batch().entries.append(entry)
+        return
+    buffer = _request_buffer.get()
+    if buffer is not None:
+        buffer.append(entry)
+    else:
+        _write([entry])
+
+
+@contextmanager
+def buffered():
+    """İşlem dışında kaydedilen geçişleri blok sonunda tek bir bulk_create ile yazar."""
+    token = _request_buffer.set([])
+    try:
+        yield
+    finally:
+        entries = _request_buffer.get()
+        _request_buffer.reset(token)
+        # Durum değişiklikleri zaten kalıcı olduğundan blok hata ile bitse de geçmiş yazılır
+        _write(entries)
+
+
+def log_bulk_transition(queryset, to_status, source='admin_bulk', user=None):
+    """
+    `queryset.update(status=to_status)` öncesinde çağrılır: durumu değişecek her randevu
+    için bir geçmiş satırını tek bir INSERT ... SELECT ile ekler. Eklenen satır sayısını döndürür.
+    Güncelleme ile aynı işlem içinde çağrılmalıdır.
+    """
+    actor, actor_source = _actor.get()
+    # SELECT listesi yalnızca annotate sırasıyla üretilen ifadelerden oluşur; INSERT kolonlarıyla birebir eşleşir
+    changing = queryset.exclude(status=to_status).order_by().annotate(
+        h_appointment=F('pk'),
+        h_changed_by=Value(_actor_id(user if user is not None else actor), output_field=IntegerField()),
+        h_from=F('status'),
+        h_to=Value(to_status, output_field=CharField()),
+        h_source=Value(source or actor_source, output_field=CharField()),
+        h_created_at=Value(timezone.now(), output_field=DateTimeField()),
+    ).values_list('h_appointment', 'h_changed_by', 'h_from', 'h_to', 'h_source', 'h_created_at')
+    try:
+        select_sql, select_params = changing.query.sql_with_params()
+    except EmptyResultSet:
+        # Örn. pk__in=[]: eklenecek satır yok
+        return 0
+
+    table = connection.ops.quote_name(AppointmentStatusChange._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (appointment_id, changed_by_id, from_status, to_status, source, created_at) {select_sql}",
+            select_params
+        )
+        return cursor.rowcount
+
+
+def timeline(appointment_id):
+    """Bir randevunun durum geçmişi, eskiden yeniye ((appointment, created_at) indeksiyle)."""
+    return AppointmentStatusChange.objects.filter(
+        appointment_id=appointment_id
+    ).select_related('changed_by').order_by('created_at', 'pk')
@@ -0,0 +1,202 @@
+# appointments/ical.py
+"""
+Uzman, temsilci ve müşteriler için iCalendar (RFC 5545) takvim beslemeleri.
+
+- Her kullanıcının bir CalendarFeed satırı ve gizli bir anahtarı vardır; besleme adresi
+  `/appointments/takvim/<anahtar>.ics` olur. Anahtar yenilendiğinde eski adres geçersizleşir.
+- Besleme kişinin bugünden CALENDAR_FEED_PAST_DAYS gün öncesi ile
+  CALENDAR_FEED_FUTURE_DAYS gün sonrası arasındaki randevularını (uzman/müşteri/temsilci,
+  tarih) indeksleriyle okur ve parça parça akıtır (StreamingHttpResponse).
+- ETag ve Last-Modified kişinin değişiklik sayacından (CalendarFeed.version) ve günden
+  üretilir. Randevu kaydedildiğinde sinyaller, toplu güncellemelerde `touch_appointments`
+  ilgili kişilerin sayacını artırır. Koşullu istek (If-None-Match / If-Modified-Since)
+  yalnızca besleme satırı okunarak 304 ile cevaplanır.
+- Temsilcinin beslemesi, temsilci olarak atandığı randevuları içerir.
+"""
+
+import secrets
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Appointment, CalendarFeed
+from .scheduling import SLOT
+
+CHUNK_SIZE = 500
+PRODID = '-//Anka Klinik//Randevular//TR'
+STATUS_MAP = {
+    'pending': 'TENTATIVE',
+    'confirmed': 'CONFIRMED',
+    'completed': 'CONFIRMED',
+    'cancelled': 'CANCELLED',
+}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def new_token():
+    return secrets.token_urlsafe(32)
+
+
+def feed_for(user):
+    """Kullanıcının beslemesini döndürür; yoksa oluşturur."""
+    return CalendarFeed.objects.get_or_create(user=user, defaults={'token': new_token()})[0]
+
+
+def regenerate(user):
+    """Beslemenin anahtarını yeniler (eski adres artık çalışmaz)."""
+    feed = feed_for(user)
+    feed.token = new_token()
+    feed.save(update_fields=['token'])
+    return feed
+
+
+# --- Değişiklik sayacı ---
+
+def touch(client_ids=(), expert_ids=(), agent_ids=()):
+    """Verilen müşteri kullanıcıları, uzman ve temsilci profillerinin beslemelerini değişmiş olarak işaretler."""
+    condition = Q()
+    if client_ids:
+        condition |= Q(user_id__in=list(client_ids))
+    if expert_ids:
+        condition |= Q(user__expert_profile__in=list(expert_ids))
+    if agent_ids:
+        condition |= Q(user__agent_profile__in=list(agent_ids))
+    if not condition:
+        return 0
+    return CalendarFeed.objects.filter(condition).update(version=F('version') + 1, changed_at=timezone.now())
+
+
+def window():
+    """Beslemeye giren tarih aralığı [başlangıç, bitiş)."""
+    today = timezone.localdate()
+    start = today - timedelta(days=_setting('CALENDAR_FEED_PAST_DAYS', 30))
+    end = today + timedelta(days=_setting('CALENDAR_FEED_FUTURE_DAYS', 180))
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end, time.min)),
+    )
+
+
+def in_window(*moments):
+    """Tarihlerden biri besleme penceresindeyse True; pencere dışı değişiklikler hiçbir beslemeyi değiştirmez."""
+    start, end = window()
+    return any(moment is not None and start <= moment < end for moment in moments)
+
+
+def touch_appointments(appointment_ids):
+    """Toplu işlemler (sinyal tetiklemez) için: pencere içindeki randevuların kişilerinin beslemelerini işaretler."""
+    appointment_ids = list(appointment_ids)
+    start, end = window()
+    clients, experts, agents = set(), set(), set()
+    for offset in range(0, len(appointment_ids), CHUNK_SIZE):
+        for client_id, expert_id, agent_id in Appointment.objects.filter(
+            pk__in=appointment_ids[offset:offset + CHUNK_SIZE], date__gte=start, date__lt=end
+        ).values_list('client_id', 'expert_id', 'agent_id'):
+            clients.add(client_id)
+            experts.add(expert_id)
+            if agent_id:
+                agents.add(agent_id)
+    return touch(clients, experts, agents)
+
+
+# --- Koşullu istek ---
+
+def validators(feed):
+    """(ETag, Last-Modified zaman damgası). Pencere günlük kaydığı için gün de ETag'e dahildir."""
+    today = timezone.localdate()
+    etag = f'"{feed.pk}-{feed.version}-{today:%Y%m%d}"'
+    day_start = timezone.make_aware(datetime.combine(today, time.min))
+    return etag, int(max(feed.changed_at, day_start).timestamp())
+
+
+# --- iCalendar üretimi ---
+
+def _escape(text):
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Satırları 75 baytta böler (çok baytlı karakterler bölünmeden)."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts, current, size = [], '', 0
+    for char in line:
+        width = len(char.encode())
+        if size + width > (75 if not parts else 74):
+            parts.append(current)
+            current, size = '', 0
+        current += char
+        size += width
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _stamp(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _name(first, last, username):
+    return f"{first or ''} {last or ''}".strip() or username
+
+
+def owner_filter(user):
+    """Kullanıcının beslemesine giren randevuların filtresi; beslemesi olamayan kullanıcılar için None."""
+    if user.user_type == 'client':
+        return Q(client_id=user.pk)
+    if user.user_type == 'expert':
+        return Q(expert__user_id=user.pk)
+    if user.user_type == 'agent':
+        return Q(agent__user_id=user.pk)
+    return None
+
+
+def render(feed, user, host):
+    """iCalendar gövdesini satır satır üreten üreteç."""
+    window_start, window_end = window()
+    rows = Appointment.objects.filter(
+        owner_filter(user), date__gte=window_start, date__lt=window_end
+    ).order_by('date').values_list(
+        'pk', 'date', 'status', 'service_type', 'version',
+        'client__first_name', 'client__last_name', 'client__username',
+        'expert__user__first_name', 'expert__user__last_name', 'expert__user__username',
+    )
+    services = dict(Appointment.SERVICE_CHOICES)
+    dtstamp = _stamp(feed.changed_at)
+
+    yield 'BEGIN:VCALENDAR\r\nVERSION:2.0\r\n'
+    yield f'PRODID:{PRODID}\r\nCALSCALE:GREGORIAN\r\nMETHOD:PUBLISH\r\n'
+    yield _fold(f'X-WR-CALNAME:{_escape("Anka Klinik - " + _name(user.first_name, user.last_name, user.username))}')
+    yield 'REFRESH-INTERVAL;VALUE=DURATION:PT15M\r\nX-PUBLISHED-TTL:PT15M\r\n'
+    for (pk, start, status, service_type, version,
+         client_first, client_last, client_username,
+         expert_first, expert_last, expert_username) in rows.iterator(chunk_size=CHUNK_SIZE):
+        service = services.get(service_type, service_type)
+        client = _name(client_first, client_last, client_username)
+        expert = f"Dr. {_name(expert_first, expert_last, expert_username)}"
+        if user.user_type == 'client':
+            summary = f"{service} - {expert}"
+        elif user.user_type == 'expert':
+            summary = f"{service} - {client}"
+        else:
+            summary = f"{service} - {client} / {expert}"
+        yield (
+            'BEGIN:VEVENT\r\n'
+            f'UID:appointment-{pk}@{host}\r\n'
+            f'DTSTAMP:{dtstamp}\r\n'
+            f'DTSTART:{_stamp(start)}\r\n'
+            f'DTEND:{_stamp(start + SLOT)}\r\n'
+            f'SEQUENCE:{version}\r\n'
+            f'STATUS:{STATUS_MAP.get(status, "CONFIRMED")}\r\n'
+            + _fold(f'SUMMARY:{_escape(summary)}')
+            + 'END:VEVENT\r\n'
+        )
+    yield 'END:VCALENDAR\r\n'
@@ -0,0 +1,210 @@
+# appointments/idempotency.py
+"""
+Randevu ve ödeme oluşturma POST'ları için tekillik anahtarları (Idempotency-Key).
+
+İstemci anahtarı `Idempotency-Key` başlığında veya formda `idempotency_key` alanında
+gönderir (şablonlar her form için yeni bir anahtar üretir). Anahtar kullanıcı başına
+tekildir ve IDEMPOTENCY_TTL_HOURS boyunca saklanır.
+
+- İlk istek anahtarı sahiplenir (IdempotencyRecord satırı) ve görünümü çalıştırır;
+  anahtar satırı ile oluşturulan randevu/ödeme aynı işlemde (transaction) yazılır.
+- Aynı anahtarla gelen tekrar saklanan yanıtı alır (yönlendirme veya JSON gövdesi),
+  görünüm yeniden çalışmaz. İstek içeriği farklıysa 422 döner.
+- Eşzamanlı tekrar, ilk istek işlemini bitirene kadar tekil indeks kilidinde bekler
+  (en fazla IDEMPOTENCY_LOCK_TIMEOUT); ardından saklanan yanıtı alır. İlk istek
+  başarısız olursa (geri alınırsa) bekleyen istek anahtarı sahiplenip kendisi çalışır.
+- Yalnızca sonuçlanan yanıtlar (yönlendirme ve 2xx JSON) saklanır; doğrulama hataları
+  ve sunucu hataları saklanmaz, istemci aynı anahtarla düzeltilmiş isteği gönderebilir.
+"""
+
+import hashlib
+import json
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib import messages
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyRecord
+
+HEADER = 'Idempotency-Key'
+FIELD = 'idempotency_key'
+# Özet hesaplanırken yok sayılan form alanları (her sayfa yüklemesinde değişir)
+IGNORED_FIELDS = {'csrfmiddlewaretoken', FIELD}
+MAX_KEY_LENGTH = IdempotencyRecord._meta.get_field('key').max_length
+
+
+def _ttl():
+    return timedelta(hours=getattr(settings, 'IDEMPOTENCY_TTL_HOURS', 24))
+
+
+def is_json(request):
+    return request.content_type == 'application/json'
+
+
+def key_from(request):
+    return (request.headers.get(HEADER) or request.POST.get(FIELD) or '').strip()
+
+
+def fingerprint(request):
+    """Yöntem, adres ve gövdenin özeti; aynı anahtarın başka bir istekte kullanılmasını yakalar."""
+    digest = hashlib.sha256(f"{request.method} {request.path}\n".encode())
+    if is_json(request):
+        digest.update(request.body)
+    else:
+        for name in sorted(set(request.POST) - IGNORED_FIELDS):
+            digest.update(f"{name}={request.POST.getlist(name)!r}\n".encode())
+        for name in sorted(request.FILES):
+            digest.update(f"{name}:{[upload.size for upload in request.FILES.getlist(name)]}\n".encode())
+    return digest.hexdigest()
+
+
+def _lock_timeout():
+    return getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', '5s')
+
+
+def claim(user, key, request_fingerprint):
+    """
+    Anahtarı sahiplenir. (kayıt, None) veya zaten sonuçlanmışsa (mevcut kayıt, mevcut kayıt) döndürür.
+    Aynı anahtar başka bir açık işlemde sahiplenilmişse tekil indeks üzerinde beklenir.
+    """
+    now = timezone.now()
+    IdempotencyRecord.objects.filter(user=user, key=key, expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT current_setting('lock_timeout'), set_config('lock_timeout', %s, true)",
+                        [_lock_timeout()]
+                    )
+                    previous = cursor.fetchone()[0]
+            record = IdempotencyRecord.objects.create(
+                user=user, key=key, fingerprint=request_fingerprint, created_at=now, expires_at=now + _ttl()
+            )
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT set_config('lock_timeout', %s, true)", [previous])
+        return record, None
+    except IntegrityError:
+        existing = IdempotencyRecord.objects.get(user=user, key=key)
+        return existing, existing
+
+
+def store(record, response):
+    """Sonuçlanan yanıtı kaydeder; saklanmayacak yanıtlarda anahtarı serbest bırakır."""
+    content_type = response.get('Content-Type', '')
+    if 300 <= response.status_code < 400:
+        record.location = response.get('Location', '')[:500]
+    elif 200 <= response.status_code < 300 and content_type.startswith('application/json'):
+        record.body = response.content.decode(response.charset)
+    else:
+        record.delete()
+        return
+    record.status_code = response.status_code
+    record.content_type = content_type[:100]
+    record.save(update_fields=['status_code', 'content_type', 'location', 'body'])
+
+
+def replay(request, record):
+    if 300 <= record.status_code < 400:
+        response = HttpResponse(status=record.status_code)
+        response['Location'] = record.location
+        if not is_json(request):
+            messages.info(request, "Bu işlem daha önce tamamlandı; tekrar gönderim yok sayıldı.")
+    else:
+        response = HttpResponse(record.body, status=record.status_code, content_type=record.content_type)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def purge(batch_size=5000):
+    """Süresi dolan anahtarları partiler halinde siler; silinen sayıyı döndürür."""
+    deleted = 0
+    while True:
+        ids = list(
+            IdempotencyRecord.objects.filter(expires_at__lte=timezone.now()).values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += IdempotencyRecord.objects.filter(pk__in=ids).delete()[0]
+
+
+class IdempotentPostMixin:
+    """
+    CreateView'lar için tekillik anahtarı desteği. Yetki kontrolünden (UserPassesTestMixin)
+    önce, oturum kontrolünden (LoginRequiredMixin) sonra yer almalıdır; böylece ödemesi
+    alınmış bir randevunun tekrar gönderimi de yetki hatası yerine ilk yanıtı alır.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        key = key_from(request) if request.method == 'POST' else ''
+        if not key:
+            return super().dispatch(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return JsonResponse({'error': f'{HEADER} en fazla {MAX_KEY_LENGTH} karakter olabilir.'}, status=400)
+
+        request_fingerprint = fingerprint(request)
+        with transaction.atomic():
+            try:
+                record, existing = claim(request.user, key, request_fingerprint)
+            except OperationalError:
+                # Kilit zaman aşımı: ilk istek hâlâ sürüyor
+                response = JsonResponse({'error': 'Aynı anahtarlı istek hâlâ işleniyor, lütfen tekrar deneyin.'}, status=409)
+                response['Retry-After'] = '1'
+                return response
+            if existing is not None:
+                if existing.fingerprint != request_fingerprint:
+                    return JsonResponse({'error': f'{HEADER} farklı bir istek için kullanılmış.'}, status=422)
+                return replay(request, existing)
+
+            response = super().dispatch(request, *args, **kwargs)
+            store(record, response)
+        return response
+
+    def get_context_data(self, **kwargs):
+        """Form şablonu için anahtar: hatalı gönderimin yeniden gösteriminde aynı anahtar korunur."""
+        context = super().get_context_data(**kwargs)
+        context['idempotency_key'] = key_from(self.request) or uuid.uuid4().hex
+        return context
+
+
+class JSONFormMixin:
+    """
+    Mobil istemciler için: `application/json` gövdeli POST'ları form verisi olarak işler.
+    Başarıda `json_success_status` (varsayılan 201) + {'id', 'redirect'}, doğrulama
+    hatasında 400 + {'errors'} döner.
+    """
+    json_success_status = 201
+
+    def post(self, request, *args, **kwargs):
+        if is_json(request):
+            try:
+                self.json_data = json.loads(request.body)
+            except (ValueError, UnicodeDecodeError):
+                return JsonResponse({'error': 'Gövde geçerli bir JSON değil.'}, status=400)
+            if not isinstance(self.json_data, dict):
+                return JsonResponse({'error': 'Gövde bir JSON nesnesi olmalıdır.'}, status=400)
+        return super().post(request, *args, **kwargs)
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        if self.request.method == 'POST' and is_json(self.request):
+            kwargs['data'] = self.json_data
+        return kwargs
+
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        if is_json(self.request) and 300 <= response.status_code < 400:
+            return JsonResponse(
+                {'id': self.object.pk, 'redirect': response['Location']}, status=self.json_success_status
+            )
+        return response
+
+    def form_invalid(self, form):
+        if is_json(self.request):
+            return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+        return super().form_invalid(form)
@@ -0,0 +1,65 @@
+# appointments/intervals.py
+"""
+Aralık listeleri üzerinde tek geçişlik işlemler (interval sweep). Her liste başlangıca
+göre sıralı, çakışmayan (başlangıç, bitiş) çiftleridir; uçlar karşılaştırılabilir
+herhangi bir tür olabilir (datetime, time).
+"""
+
+
+def subtract(intervals, busy):
+    """intervals - busy (ikisi de sıralı); tek geçişte."""
+    result = []
+    j = 0
+    for start, end in intervals:
+        # Bu aralıktan önce biten meşguliyetler sonraki aralıkları da etkilemez
+        while j < len(busy) and busy[j][1] <= start:
+            j += 1
+        cursor, k = start, j
+        while k < len(busy) and busy[k][0] < end:
+            if busy[k][0] > cursor:
+                result.append((cursor, busy[k][0]))
+            cursor = max(cursor, busy[k][1])
+            k += 1
+        if cursor < end:
+            result.append((cursor, end))
+    return result
+
+
+def intersect(left, right):
+    result = []
+    i = j = 0
+    while i < len(left) and j < len(right):
+        start = max(left[i][0], right[j][0])
+        end = min(left[i][1], right[j][1])
+        if start < end:
+            result.append((start, end))
+        if left[i][1] < right[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def union(*interval_lists):
+    merged = []
+    for start, end in sorted(interval for intervals in interval_lists for interval in intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def below_capacity(window, usages, capacity):
+    """`window` içinde eşzamanlı kullanım sayısının `capacity` altında kaldığı aralıklar."""
+    events = sorted([(start, 1) for start, _end in usages] + [(end, -1) for _start, end in usages])
+    free, in_use, cursor = [], 0, window[0]
+    for moment, delta in events:
+        moment = min(max(moment, window[0]), window[1])
+        if in_use < capacity and cursor < moment:
+            free.append((cursor, moment))
+        in_use += delta
+        cursor = moment
+    if in_use < capacity and cursor < window[1]:
+        free.append((cursor, window[1]))
+    return union(free)
@@ -0,0 +1,554 @@
+# appointments/legacy_import.py
+"""
+Eski sistemden müşteri, randevu ve ödeme aktarımı için yardımcılar.
+
+Kayıtlar tek tek Appointment.save / Payment.save üzerinden geçirilmez. Her parti
+(batch) önce bellekteki eşleme tablolarıyla (kimlik haritaları, müsaitlikler,
+dolu saatler) doğrulanır, komisyonlar parti bazında hesaplanır ve satırlar
+PostgreSQL'de COPY, diğer veritabanlarında bulk_create ile yüklenir.
+"""
+
+import csv
+import io
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, time
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from accounts.models import CustomUser, Expert, CustomerAgent
+from accounts.utils import normalize_email, normalize_phone
+from payments.models import Payment, commission_amount
+from . import bulk, client_stats
+from .models import Appointment, ExpertAvailability, ExpertHoliday, LegacyIdMap
+
+ACTIVE_STATUSES = ('pending', 'confirmed')
+SERVICE_TYPES = {value for value, _label in Appointment.SERVICE_CHOICES}
+STATUSES = {value for value, _label in Appointment.STATUS_CHOICES}
+PAYMENT_METHODS = {value for value, _label in Payment.PAYMENT_METHOD_CHOICES}
+
+
+# --- Dosya Okuma ---
+
+def iter_rows(path):
+    """
+    CSV veya JSONL dosyasındaki satırları (satır_no, sözlük) olarak döndürür.
+    Dosya türü uzantıdan belirlenir (.jsonl/.ndjson -> JSONL, diğerleri -> CSV).
+    """
+    if path.endswith(('.jsonl', '.ndjson')):
+        with open(path, encoding='utf-8') as handle:
+            for line_no, line in enumerate(handle, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError:
+                    yield line_no, {'__invalid__': line}
+    else:
+        with open(path, encoding='utf-8-sig', newline='') as handle:
+            # Başlık satırı 1. satır olduğu için veriler 2'den başlar.
+            for line_no, row in enumerate(csv.DictReader(handle), start=2):
+                yield line_no, row
+
+
+def iter_batches(rows, batch_size, skip=0):
+    """
+    Satırları batch_size büyüklüğünde partilere böler.
+    skip, kontrol noktasından devam ederken atlanacak satır sayısıdır.
+    Her parti ile birlikte o partiyle tüketilen toplam satır sayısı döner.
+    """
+    batch = []
+    consumed = 0
+    for item in rows:
+        consumed += 1
+        if consumed <= skip:
+            continue
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch, consumed
+            batch = []
+    if batch:
+        yield batch, consumed
+
+
+# --- Kontrol Noktası ve Reddedilen Kayıtlar ---
+
+class ImportState:
+    """
+    Aktarımın kaldığı yeri (checkpoint.json) ve reddedilen satırları (rejects.jsonl) tutar.
+    Kontrol noktası her parti veritabanına işlendikten sonra atomik olarak yazılır.
+    """
+
+    def __init__(self, state_dir, reset=False):
+        self.state_dir = state_dir
+        os.makedirs(state_dir, exist_ok=True)
+        self.checkpoint_path = os.path.join(state_dir, 'checkpoint.json')
+        self.rejects_path = os.path.join(state_dir, 'rejects.jsonl')
+        self.positions = {}
+        if reset:
+            for path in (self.checkpoint_path, self.rejects_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        elif os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding='utf-8') as handle:
+                self.positions = json.load(handle)
+        self.rejected = defaultdict(int)
+
+    def position(self, kind):
+        return self.positions.get(kind, 0)
+
+    def advance(self, kind, position):
+        self.positions[kind] = position
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump(self.positions, handle)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def reject(self, kind, line_no, row, errors):
+        self.rejected[kind] += 1
+        with open(self.rejects_path, 'a', encoding='utf-8') as handle:
+            handle.write(json.dumps(
+                {'kind': kind, 'line': line_no, 'errors': errors, 'row': row},
+                ensure_ascii=False, default=str
+            ) + '\n')
+
+
+# --- Bellek İçi Eşleme Tabloları ---
+
+class IdMaps:
+    """
+    Aktarım boyunca kullanılan kimlik eşlemeleri ve doğrulama verileri.
+    Her tablo bir kez okunur; yeni aktarılan kayıtlar haritalara eklenir.
+    """
+
+    def __init__(self):
+        self.clients = self._legacy_map('client')
+        self.appointments = self._legacy_map('appointment')
+        self.payments = self._legacy_map('payment')
+
+        self.experts = {}
+        self.expert_rates = {}
+        for pk, username, rate in Expert.objects.values_list('pk', 'user__username', 'commission_rate'):
+            self.experts[username] = pk
+            self.expert_rates[pk] = rate
+
+        self.agents = {}
+        self.agent_rates = {}
+        for pk, username, rate in CustomerAgent.objects.values_list('pk', 'user__username', 'commission_rate'):
+            self.agents[username] = pk
+            self.agent_rates[pk] = rate
+
+        # {expert_id: {hafta_günü: [(başlangıç, bitiş), ...]}}
+        self.availability = defaultdict(lambda: defaultdict(list))
+        for expert_id, day, start, end in ExpertAvailability.objects.values_list(
+            'expert_id', 'day_of_week', 'start_time', 'end_time'
+        ):
+            self.availability[expert_id][day].append((start, end))
+
+        # {expert_id: [(başlangıç_tarihi, bitiş_tarihi), ...]}
+        self.holidays = defaultdict(list)
+        for expert_id, start, end in ExpertHoliday.objects.values_list('expert_id', 'start_date', 'end_date'):
+            self.holidays[expert_id].append((start, end))
+
+    @staticmethod
+    def _legacy_map(kind):
+        return dict(LegacyIdMap.objects.filter(kind=kind).values_list('legacy_id', 'object_id'))
+
+    def is_available(self, expert_id, value):
+        """Uzmanın haftalık müsaitliğine ve izinlerine göre verilen anın uygun olup olmadığını döndürür."""
+        local_value = timezone.localtime(value)
+        slot_time = local_value.time()
+        in_schedule = any(
+            start <= slot_time < end
+            for start, end in self.availability[expert_id][local_value.weekday()]
+        )
+        if not in_schedule:
+            return False
+        day = local_value.date()
+        return not any(start <= day <= end for start, end in self.holidays[expert_id])
+
+
+# --- Değer Dönüştürücüler ---
+
+def _text(row, key):
+    value = row.get(key)
+    return '' if value is None else str(value).strip()
+
+
+def _parse_datetime(value):
+    if not value:
+        return None
+    value = str(value).strip()
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _parse_decimal(value):
+    if value in (None, ''):
+        return None
+    try:
+        return Decimal(str(value).strip().replace(',', '.'))
+    except InvalidOperation:
+        raise ValueError(value)
+
+
+def _parse_bool(value):
+    return str(value).strip().lower() in ('1', 'true', 'evet', 'yes', 't')
+
+
+# --- Yükleyici ---
+
+def _copy_value(field, obj):
+    value = field.get_db_prep_save(getattr(obj, field.attname), connection)
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return value
+
+
+def _copy_insert(model, objs):
+    """
+    Satırları PostgreSQL COPY ile yükler. Birincil anahtarlar önceden dizi (sequence)
+    üzerinden ayrılır, böylece ilişkili satırlar aynı partide bağlanabilir.
+    """
+    opts = model._meta
+    fields = opts.concrete_fields
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+            [opts.db_table, opts.pk.column, len(objs)]
+        )
+        for obj, (pk,) in zip(objs, cursor.fetchall()):
+            obj.pk = pk
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for obj in objs:
+            writer.writerow([_copy_value(field, obj) for field in fields])
+        buffer.seek(0)
+
+        columns = ', '.join(quote(field.column) for field in fields)
+        cursor.cursor.copy_expert(
+            f"COPY {quote(opts.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
+
+
+def insert_rows(model, objs, preserve=(), batch_size=1000):
+    """
+    Model örneklerini toplu olarak ekler ve birincil anahtarlarını doldurur.
+
+    preserve: auto_now_add gibi bulk_create sırasında üzerine yazılan alanlar.
+    COPY bu alanlara dokunmaz; bulk_create yolunda ise özgün değerler geri yazılır.
+    """
+    if not objs:
+        return objs
+    if connection.vendor == 'postgresql':
+        _copy_insert(model, objs)
+        return objs
+
+    originals = [{name: getattr(obj, name) for name in preserve} for obj in objs]
+    model._base_manager.bulk_create(objs, batch_size=batch_size)
+    if preserve:
+        for obj, values in zip(objs, originals):
+            for name, value in values.items():
+                setattr(obj, name, value)
+        model._base_manager.bulk_update(objs, list(preserve), batch_size=batch_size)
+    return objs
+
+
+def _map_rows(kind, pairs):
+    now = timezone.now()
+    return [
+        LegacyIdMap(kind=kind, legacy_id=legacy_id, object_id=obj.pk, imported_at=now)
+        for legacy_id, obj in pairs
+    ]
+
+
+# --- Müşteriler ---
+
+def import_clients(batch, maps, state):
+    """Bir parti müşteriyi doğrular ve yükler. Yüklenen kayıt sayısını döndürür."""
+    usernames = {_text(row, 'username') for _line, row in batch if _text(row, 'username')}
+    taken = set(CustomUser.objects.filter(username__in=usernames).values_list('username', flat=True))
+
+    # Aktarılan müşteriler eski sistemde şifre taşımaz; kullanılamaz şifre
+    # ile oluşturulurlar ve şifre sıfırlama akışıyla hesaplarını açarlar.
+    unusable_password = make_password(None)
+    now = timezone.now()
+    pairs, assignments = [], []
+    seen = set()  # partide görülen legacy_id'ler; tekrarlar LegacyIdMap benzersizliğine takılmadan reddedilir
+
+    for line_no, row in batch:
+        errors = []
+        legacy_id = _text(row, 'legacy_id')
+        if not legacy_id:
+            errors.append("legacy_id zorunludur.")
+        elif legacy_id in maps.clients:
+            continue  # Daha önceki bir çalıştırmada aktarılmış
+        elif legacy_id in seen:
+            errors.append(f"'{legacy_id}' legacy_id değeri bu partide tekrar ediyor.")
+        seen.add(legacy_id)
+
+        username = _text(row, 'username') or f"legacy_{legacy_id}"
+        if username in taken:
+            errors.append(f"'{username}' kullanıcı adı zaten kullanılıyor.")
+
+        agent_id = None
+        agent_username = _text(row, 'agent')
+        if agent_username:
+            agent_id = maps.agents.get(agent_username)
+            if agent_id is None:
+                errors.append(f"'{agent_username}' temsilcisi bulunamadı.")
+
+        try:
+            date_joined = _parse_datetime(row.get('date_joined')) or now
+        except ValueError:
+            errors.append("date_joined geçerli bir tarih değil.")
+
+        if errors:
+            state.reject('clients', line_no, row, errors)
+            continue
+
+        taken.add(username)
+        user = CustomUser(
+            username=username,
+            first_name=_text(row, 'first_name')[:150],
+            last_name=_text(row, 'last_name')[:150],
+            email=normalize_email(row.get('email')),
+            phone=normalize_phone(row.get('phone'))[:15],
+            user_type='client',
+            password=unusable_password,
+            date_joined=date_joined,
+        )
+        pairs.append((legacy_id, user))
+        if agent_id:
+            assignments.append((agent_id, user))
+
+    with transaction.atomic():
+        insert_rows(CustomUser, [user for _legacy_id, user in pairs])
+        client_stats.create_rows([user.pk for _legacy_id, user in pairs])
+        through = CustomerAgent.assigned_clients.through
+        insert_rows(through, [
+            through(customeragent_id=agent_id, customuser_id=user.pk)
+            for agent_id, user in assignments
+        ])
+        insert_rows(LegacyIdMap, _map_rows('client', pairs))
+
+    maps.clients.update((legacy_id, user.pk) for legacy_id, user in pairs)
+    return len(pairs)
+
+
+# --- Randevular ---
+
+def _busy_slots(batch_rows):
+    """
+    Partideki uzmanların, partinin tarih aralığındaki aktif randevularını tek sorguda okur.
+    {(expert_id, tarih)} kümesi döner.
+    """
+    expert_ids = {expert_id for expert_id, _date in batch_rows}
+    if not expert_ids:
+        return set()
+    dates = [value for _expert_id, value in batch_rows]
+    return set(Appointment.objects.filter(
+        expert_id__in=expert_ids,
+        date__gte=min(dates),
+        date__lte=max(dates),
+        status__in=ACTIVE_STATUSES,
+    ).values_list('expert_id', 'date'))
+
+
+def import_appointments(batch, maps, state, check_availability=True):
+    """Bir parti randevuyu doğrular ve yükler. Yüklenen kayıt sayısını döndürür."""
+    parsed = []
+    seen = set()  # partide görülen legacy_id'ler; tekrarlar LegacyIdMap benzersizliğine takılmadan reddedilir
+    for line_no, row in batch:
+        errors = []
+        legacy_id = _text(row, 'legacy_id')
+        if not legacy_id:
+            errors.append("legacy_id zorunludur.")
+        elif legacy_id in maps.appointments:
+            continue
+        elif legacy_id in seen:
+            errors.append(f"'{legacy_id}' legacy_id değeri bu partide tekrar ediyor.")
+        seen.add(legacy_id)
+
+        client_id = maps.clients.get(_text(row, 'client'))
+        if client_id is None:
+            errors.append(f"'{_text(row, 'client')}' müşterisi bulunamadı.")
+        expert_id = maps.experts.get(_text(row, 'expert'))
+        if expert_id is None:
+            errors.append(f"'{_text(row, 'expert')}' uzmanı bulunamadı.")
+        agent_id = None
+        if _text(row, 'agent'):
+            agent_id = maps.agents.get(_text(row, 'agent'))
+            if agent_id is None:
+                errors.append(f"'{_text(row, 'agent')}' temsilcisi bulunamadı.")
+
+        service_type = _text(row, 'service_type') or 'other'
+        if service_type not in SERVICE_TYPES:
+            errors.append(f"Geçersiz hizmet tipi: {service_type}")
+        status = _text(row, 'status') or 'completed'
+        if status not in STATUSES:
+            errors.append(f"Geçersiz durum: {status}")
+
+        date = created_at = amount = None
+        try:
+            date = _parse_datetime(row.get('date'))
+            if date is None:
+                errors.append("date zorunludur.")
+            created_at = _parse_datetime(row.get('created_at')) or date
+        except ValueError:
+            errors.append("Tarih alanları geçerli değil.")
+        try:
+            amount = _parse_decimal(row.get('amount'))
+            if amount is not None and amount < 0:
+                errors.append("amount negatif olamaz.")
+        except ValueError:
+            errors.append("amount geçerli bir sayı değil.")
+
+        if errors:
+            state.reject('appointments', line_no, row, errors)
+            continue
+        parsed.append((line_no, row, legacy_id, Appointment(
+            client_id=client_id,
+            expert_id=expert_id,
+            agent_id=agent_id,
+            date=date,
+            status=status,
+            service_type=service_type,
+            amount=amount,
+            notes=_text(row, 'notes'),
+            payment_status=_parse_bool(row.get('payment_status')),
+            created_at=created_at,
+        )))
+
+    # Çakışma kontrolü: veritabanındaki ve partide daha önce gelen aktif randevular
+    busy = _busy_slots([
+        (appointment.expert_id, appointment.date)
+        for _line, _row, _legacy, appointment in parsed
+        if appointment.status in ACTIVE_STATUSES
+    ])
+    pairs = []
+    for line_no, row, legacy_id, appointment in parsed:
+        if check_availability and not maps.is_available(appointment.expert_id, appointment.date):
+            state.reject('appointments', line_no, row, ["Uzman bu tarih ve saatte müsait değil."])
+            continue
+        if appointment.status in ACTIVE_STATUSES:
+            key = (appointment.expert_id, appointment.date)
+            if key in busy:
+                state.reject('appointments', line_no, row, ["Uzmanın bu saatte başka bir aktif randevusu var."])
+                continue
+            busy.add(key)
+        pairs.append((legacy_id, appointment))
+
+    # Toplu ekleme sinyal tetiklemediğinden görünürlük, akış, sayaçlar ve istatistikler appointments.bulk ile güncellenir
+    with bulk.changes() as change:
+        insert_rows(Appointment, [appointment for _legacy_id, appointment in pairs], preserve=('created_at',))
+        insert_rows(LegacyIdMap, _map_rows('appointment', pairs))
+        change.created_appointments([appointment for _legacy_id, appointment in pairs])
+
+    maps.appointments.update((legacy_id, appointment.pk) for legacy_id, appointment in pairs)
+    return len(pairs)
+
+
+# --- Ödemeler ---
+
+def import_payments(batch, maps, state):
+    """
+    Bir parti ödemeyi doğrular, komisyonlarını parti bazında hesaplar ve yükler.
+    İlgili randevuların ödeme durumu tek bir UPDATE ile işaretlenir.
+    """
+    candidates = []
+    seen = set()  # partide görülen legacy_id'ler; tekrarlar LegacyIdMap benzersizliğine takılmadan reddedilir
+    for line_no, row in batch:
+        errors = []
+        legacy_id = _text(row, 'legacy_id')
+        if not legacy_id:
+            errors.append("legacy_id zorunludur.")
+        elif legacy_id in maps.payments:
+            continue
+        elif legacy_id in seen:
+            errors.append(f"'{legacy_id}' legacy_id değeri bu partide tekrar ediyor.")
+        seen.add(legacy_id)
+
+        appointment_id = maps.appointments.get(_text(row, 'appointment'))
+        if appointment_id is None:
+            errors.append(f"'{_text(row, 'appointment')}' randevusu bulunamadı.")
+        method = _text(row, 'payment_method') or 'other'
+        if method not in PAYMENT_METHODS:
+            errors.append(f"Geçersiz ödeme yöntemi: {method}")
+
+        amount = payment_date = None
+        try:
+            amount = _parse_decimal(row.get('amount_paid'))
+            if amount is None or amount <= 0:
+                errors.append("amount_paid pozitif olmalıdır.")
+        except ValueError:
+            errors.append("amount_paid geçerli bir sayı değil.")
+        try:
+            payment_date = _parse_datetime(row.get('payment_date'))
+            if payment_date is None:
+                errors.append("payment_date zorunludur.")
+        except ValueError:
+            errors.append("payment_date geçerli bir tarih değil.")
+
+        if errors:
+            state.reject('payments', line_no, row, errors)
+            continue
+        candidates.append((line_no, row, legacy_id, appointment_id, amount, method, payment_date))
+
+    appointment_ids = {candidate[3] for candidate in candidates}
+    owners = {
+        pk: (expert_id, agent_id)
+        for pk, expert_id, agent_id in Appointment.objects.filter(pk__in=appointment_ids)
+        .values_list('pk', 'expert_id', 'agent_id')
+    }
+    already_paid = set(Payment.objects.filter(appointment_id__in=appointment_ids).values_list('appointment_id', flat=True))
+
+    pairs = []
+    for line_no, row, legacy_id, appointment_id, amount, method, payment_date in candidates:
+        owner = owners.get(appointment_id)
+        if owner is None:
+            # Eşlenen randevu sonradan silinmiş veya arşivlenmiş olabilir
+            state.reject('payments', line_no, row, ["Eşlenen randevu artık mevcut değil."])
+            continue
+        if appointment_id in already_paid:
+            state.reject('payments', line_no, row, ["Bu randevu için zaten bir ödeme kayıtlı."])
+            continue
+        already_paid.add(appointment_id)
+        expert_id, agent_id = owner
+        pairs.append((legacy_id, Payment(
+            appointment_id=appointment_id,
+            amount_paid=amount,
+            payment_method=method,
+            payment_date=payment_date,
+            expert_commission=commission_amount(amount, maps.expert_rates.get(expert_id)),
+            agent_commission=commission_amount(amount, maps.agent_rates.get(agent_id)),
+            is_commission_calculated=True,
+        )))
+
+    with bulk.changes() as change:
+        payments = [payment for _legacy_id, payment in pairs]
+        insert_rows(Payment, payments, preserve=('payment_date',))
+        insert_rows(LegacyIdMap, _map_rows('payment', pairs))
+        change.update(Appointment.objects.filter(pk__in=[payment.appointment_id for payment in payments]), payment_status=True)
+        change.created_payments(payments)
+
+    maps.payments.update((legacy_id, payment.pk) for legacy_id, payment in pairs)
+    return len(pairs)
@@ -0,0 +1,76 @@
+# appointments/listing.py
+"""
+Büyük liste sayfaları (randevu ve ödeme listeleri) için hafif satır yolu.
+
+Sayfa başına 50–100 satırda maliyetin büyük kısmı SQL değil, Python tarafıdır: her satır
+için 3–4 model nesnesi (select_related) oluşturulur, şablon da satır başına
+get_full_name / get_*_display çağırır. Bu yolda:
+
+- Sayfa satırları `values_list` projeksiyonuyla yalnızca gösterilen kolonlar olarak okunur;
+  ad-soyad SQL tarafında birleştirilir (`full_name`).
+- Seçim (choices) etiketleri önceden hesaplanmış sözlüklerden eşlenir (`<alan>_label`).
+- Şablon model nesneleri yerine isimli demetleri (namedtuple) işler.
+
+Süzme, sıralama ve sayfalama yine aynı queryset üzerinde yapılır; yalnızca sayfadaki
+satırlar projekte edilir. Karşılaştırma için: `manage.py benchmark_list_rows`.
+"""
+
+from collections import namedtuple
+
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Coalesce, Concat, NullIf, Trim
+
+
+def full_name(prefix, fallback=None):
+    """
+    `<prefix>first_name` ve `<prefix>last_name` kolonlarından get_full_name karşılığı
+    (ilişki yoksa ''). Ad boşsa ve `fallback` verilmişse o alanın değeri döner.
+    """
+    name = Trim(Concat(F(f'{prefix}first_name'), Value(' '), F(f'{prefix}last_name'), output_field=CharField()))
+    return Coalesce(NullIf(name, Value('')), F(f'{prefix}{fallback}')) if fallback else name
+
+
+def choice_labels(model, field_name):
+    """Alanın seçim değeri -> etiket sözlüğü (get_<alan>_display karşılığı)."""
+    return {value: label for value, label in model._meta.get_field(field_name).flatchoices}
+
+
+class LeanRows:
+    """
+    values_list projeksiyonunu isimli demetlere çeviren satır tanımı.
+
+    fields: {ad: alan yolu veya ifade}; labels: {ad: {değer: etiket}} (her biri için
+    demete `<ad>_label` eklenir).
+    """
+
+    def __init__(self, name, fields, labels=None):
+        self.fields = dict(fields)
+        self.labels = dict(labels or {})
+        names = list(self.fields)
+        self._label_positions = [(names.index(field), mapping) for field, mapping in self.labels.items()]
+        self.row = namedtuple(name, names + [f'{field}_label' for field in self.labels])
+
+    def project(self, queryset):
+        return queryset.values_list(*self.fields.values())
+
+    def rows(self, values):
+        row, positions = self.row._make, self._label_positions
+        return [
+            row(values_row + tuple(mapping.get(values_row[index], values_row[index]) for index, mapping in positions))
+            for values_row in values
+        ]
+
+
+class LeanListMixin:
+    """
+    ListView için: sayfalanan queryset projekte edilir ve sayfa satırları `lean_rows`
+    tanımındaki isimli demetler olarak şablona verilir.
+    """
+    lean_rows = None
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator, page, object_list, is_paginated = super().paginate_queryset(
+            self.lean_rows.project(queryset), page_size
+        )
+        page.object_list = self.lean_rows.rows(object_list)
+        return paginator, page, page.object_list, is_paginated
@@ -0,0 +1,47 @@
+# appointments/management/commands/archive_appointments.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from appointments.archive import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_SLEEP_SECONDS,
+    archivable,
+    archive_appointments,
+    cutoff_for_years,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Belirtilen yıldan eski, tamamlanmış veya iptal edilmiş randevuları ödemeleriyle birlikte "
+        "arşiv tablosuna (ArchivedAppointment) taşır. Küçük partiler halinde ve partiler arasında "
+        "bekleyerek çalışır; örn. her gece cron ile çalıştırılabilir."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-years', type=int, default=3, help="Bu kadar yıldan eski randevular (varsayılan: 3).")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help=f"Parti başına randevu (varsayılan: {DEFAULT_BATCH_SIZE}).")
+        parser.add_argument('--sleep', type=float, default=DEFAULT_SLEEP_SECONDS, help=f"Partiler arası bekleme, saniye (varsayılan: {DEFAULT_SLEEP_SECONDS}).")
+        parser.add_argument('--max-batches', type=int, help="En fazla çalıştırılacak parti sayısı (varsayılan: sınırsız).")
+        parser.add_argument('--dry-run', action='store_true', help="Hiçbir şey taşımadan arşivlenecek randevu sayısını gösterir.")
+
+    def handle(self, *args, **options):
+        if options['older_than_years'] < 1:
+            raise CommandError("--older-than-years en az 1 olmalıdır.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size en az 1 olmalıdır.")
+
+        cutoff = cutoff_for_years(options['older_than_years'])
+        if options['dry_run']:
+            count = archivable(cutoff).count()
+            self.stdout.write(f"{cutoff:%d.%m.%Y} öncesinden {count} randevu arşivlenecek.")
+            return
+
+        total = archive_appointments(
+            cutoff,
+            batch_size=options['batch_size'],
+            sleep=options['sleep'],
+            max_batches=options['max_batches'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Toplam {total} randevu arşivlendi."))
@@ -0,0 +1,84 @@
+# appointments/management/commands/benchmark_list_rows.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from appointments.models import Appointment
+from appointments.views import APPOINTMENT_ROWS
+from payments.models import Payment
+from payments.views import PAYMENT_ROWS
+
+
+def appointment_instances(rows):
+    """Eski yol: select_related model nesneleri ve şablonun satır başına yaptığı çağrılar."""
+    queryset = Appointment.objects.select_related('client', 'expert__user', 'agent__user').order_by('-date')
+    result = []
+    for appointment in queryset[:rows]:
+        payment = None
+        if appointment.status == 'completed' or appointment.payment_status:
+            # Şablon işlemi tamamlanmış satırlarda ödeme kaydını (ters OneToOne) okuyordu
+            payment = getattr(appointment, 'payment', None)
+        result.append((
+            appointment.client.get_full_name() or appointment.client.username,
+            appointment.agent.user.get_full_name() if appointment.agent else None,
+            appointment.expert.user.get_full_name(),
+            appointment.get_service_type_display(),
+            appointment.get_status_display(),
+            payment.pk if payment else None,
+        ))
+    return result
+
+
+def payment_instances(rows):
+    queryset = Payment.objects.select_related(
+        'appointment__client', 'appointment__expert__user', 'appointment__agent__user'
+    ).order_by('-payment_date')
+    return [
+        (
+            payment.appointment.client.get_full_name(),
+            payment.appointment.expert.user.get_full_name(),
+            payment.appointment.agent.user.get_full_name() if payment.appointment.agent else None,
+            payment.appointment.get_service_type_display(),
+            payment.get_payment_method_display(),
+        )
+        for payment in queryset[:rows]
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Randevu ve ödeme listelerinin satır üretim hızını (satır/sn) karşılaştırır: model nesneleri "
+        "(select_related + get_full_name/get_*_display) ile hafif projeksiyon (appointments.listing)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help="Sayfa başına satır (varsayılan 100).")
+        parser.add_argument('--repeat', type=int, default=20, help="Tekrar sayısı (varsayılan 20).")
+
+    def _measure(self, build, repeat):
+        build()  # Isınma: bağlantı ve sorgu derleme maliyeti ölçüme katılmaz
+        count, started = 0, time.perf_counter()
+        for _ in range(repeat):
+            count += len(build())
+        elapsed = time.perf_counter() - started
+        return count / elapsed if elapsed and count else 0.0
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        cases = [
+            ('Randevu', lambda: appointment_instances(rows),
+             lambda: APPOINTMENT_ROWS.rows(APPOINTMENT_ROWS.project(Appointment.objects.order_by('-date'))[:rows])),
+            ('Ödeme', lambda: payment_instances(rows),
+             lambda: PAYMENT_ROWS.rows(PAYMENT_ROWS.project(Payment.objects.order_by('-payment_date'))[:rows])),
+        ]
+        for label, before, after in cases:
+            model_rate = self._measure(before, repeat)
+            lean_rate = self._measure(after, repeat)
+            if not model_rate:
+                self.stdout.write(self.style.WARNING(f"{label}: ölçülecek kayıt yok."))
+                continue
+            self.stdout.write(
+                f"{label:8} model: {model_rate:10,.0f} satır/sn   hafif: {lean_rate:10,.0f} satır/sn   "
+                f"({lean_rate / model_rate:.1f} kat)"
+            )
@@ -0,0 +1,19 @@
+# appointments/management/commands/compile_schedules.py
+
+from django.core.management.base import BaseCommand
+
+from appointments import availability
+
+
+class Command(BaseCommand):
+    help = (
+        "Uzmanların günlük programlarını (ExpertDaySchedule) önümüzdeki AVAILABILITY_SCHEDULE_WEEKS hafta için "
+        "derler ve geçmiş günleri siler (kurulumdan sonra bir kez ve her gece cron ile)."
+    )
+
+    def handle(self, *args, **options):
+        compiled = availability.materialize()
+        first, last = availability.horizon()
+        self.stdout.write(self.style.SUCCESS(
+            f"{compiled} günlük program derlendi ({first:%d.%m.%Y} - {last:%d.%m.%Y})."
+        ))
@@ -0,0 +1,66 @@
+# appointments/management/commands/import_legacy.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from appointments.legacy_import import (
+    IdMaps,
+    ImportState,
+    import_appointments,
+    import_clients,
+    import_payments,
+    iter_batches,
+    iter_rows,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Eski sistemden müşteri, randevu ve ödeme kayıtlarını CSV/JSONL dosyalarından toplu olarak aktarır. "
+        "Aktarım partiler halinde yapılır, kontrol noktasından devam edebilir ve "
+        "reddedilen satırları rejects.jsonl dosyasına yazar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', help="Müşteri dosyası (legacy_id, username, first_name, last_name, email, phone, agent, date_joined)")
+        parser.add_argument('--appointments', help="Randevu dosyası (legacy_id, client, expert, agent, date, service_type, status, amount, notes, payment_status, created_at)")
+        parser.add_argument('--payments', help="Ödeme dosyası (legacy_id, appointment, amount_paid, payment_method, payment_date)")
+        parser.add_argument('--state-dir', default='legacy_import_state', help="Kontrol noktası ve reddedilen kayıtların tutulacağı klasör.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Bir partide işlenecek satır sayısı.")
+        parser.add_argument('--skip-availability', action='store_true', help="Uzman müsaitlik ve izin kontrolünü atla (geçmiş çizelgeler farklıysa).")
+        parser.add_argument('--reset', action='store_true', help="Kontrol noktasını ve reddedilenler dosyasını silip baştan başla.")
+
+    def handle(self, *args, **options):
+        sources = [
+            ('clients', options['clients'], import_clients, {}),
+            ('appointments', options['appointments'], import_appointments,
+             {'check_availability': not options['skip_availability']}),
+            ('payments', options['payments'], import_payments, {}),
+        ]
+        if not any(path for _kind, path, _func, _kwargs in sources):
+            raise CommandError("En az bir dosya belirtilmelidir (--clients, --appointments veya --payments).")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size pozitif olmalıdır.")
+
+        state = ImportState(options['state_dir'], reset=options['reset'])
+        maps = IdMaps()
+
+        # Sıra önemlidir: randevular müşteri, ödemeler randevu eşlemelerine ihtiyaç duyar.
+        for kind, path, import_func, kwargs in sources:
+            if not path:
+                continue
+            start = state.position(kind)
+            if start:
+                self.stdout.write(f"{kind}: kontrol noktasından devam ediliyor ({start} satır atlandı).")
+
+            loaded = 0
+            for batch, consumed in iter_batches(iter_rows(path), options['batch_size'], skip=start):
+                loaded += import_func(batch, maps, state, **kwargs)
+                state.advance(kind, consumed)
+                self.stdout.write(f"{kind}: {consumed} satır işlendi, {loaded} kayıt yüklendi.")
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{kind} tamamlandı: {loaded} kayıt yüklendi, {state.rejected[kind]} satır reddedildi."
+            ))
+
+        if sum(state.rejected.values()):
+            self.stdout.write(self.style.WARNING(f"Reddedilen satırlar: {state.rejects_path}"))
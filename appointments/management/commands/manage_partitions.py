@@ -0,0 +1,80 @@
+# appointments/management/commands/manage_partitions.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from appointments.partitioning import (
+    PartitioningError,
+    convert_table,
+    detach_old_partitions,
+    ensure_future_partitions,
+    explain_recent,
+    list_partitions,
+    partitioned_models,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Randevu ve ödeme tablolarının PostgreSQL aylık bölümlerini yönetir. "
+        "Eylemler: convert (tek seferlik dönüşüm), create (ileriye dönük bölümler, "
+        "örn. her gün cron ile), detach (eski bölümleri ayır/arşivle), list, explain."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['convert', 'create', 'detach', 'list', 'explain'])
+        parser.add_argument(
+            '--table', choices=sorted(partitioned_models()), action='append',
+            help="İşlenecek tablo (varsayılan: hepsi). Birden fazla kez verilebilir."
+        )
+        parser.add_argument('--months-ahead', type=int, default=3, help="Oluşturulacak ileri ay sayısı (varsayılan: 3).")
+        parser.add_argument('--older-than-months', type=int, default=24, help="detach: bu kadar aydan eski bölümler (varsayılan: 24).")
+        parser.add_argument('--archive-schema', help="detach: ayrılan bölümlerin taşınacağı şema (örn. archive).")
+        parser.add_argument('--drop', action='store_true', help="detach: ayrılan bölümleri sil.")
+        parser.add_argument('--keep-old', action='store_true', help="convert: eski (bölümlenmemiş) tabloyu silme.")
+        parser.add_argument('--days', type=int, default=90, help="explain: son kaç günün sorgusu incelensin (varsayılan: 90).")
+
+    def handle(self, *args, **options):
+        action = options['action']
+        tables = options['table'] or sorted(partitioned_models())
+        if action == 'detach' and options['drop'] and options['archive_schema']:
+            raise CommandError("--drop ve --archive-schema birlikte kullanılamaz.")
+
+        try:
+            for key in tables:
+                getattr(self, f'_{action}')(key, options)
+        except PartitioningError as exc:
+            raise CommandError(str(exc))
+
+    def _convert(self, key, options):
+        convert_table(key, months_ahead=options['months_ahead'], keep_old=options['keep_old'], log=self.stdout.write)
+
+    def _create(self, key, options):
+        created = ensure_future_partitions(key, months_ahead=options['months_ahead'])
+        self.stdout.write(f"{key}: {created} yeni bölüm oluşturuldu.")
+
+    def _detach(self, key, options):
+        detached = detach_old_partitions(
+            key,
+            options['older_than_months'],
+            archive_schema=options['archive_schema'],
+            drop=options['drop'],
+        )
+        self.stdout.write(f"{key}: {len(detached)} bölüm ayrıldı{': ' + ', '.join(detached) if detached else '.'}")
+
+    def _list(self, key, options):
+        model, _column = partitioned_models()[key]
+        for name, bound, rows in list_partitions(model._meta.db_table):
+            self.stdout.write(f"{name:45} {rows:>12}  {bound}")
+
+    def _explain(self, key, options):
+        plan, scanned, total = explain_recent(key, days=options['days'])
+        self.stdout.write(plan)
+        self.stdout.write("")
+        if scanned and len(scanned) < total:
+            self.stdout.write(self.style.SUCCESS(
+                f"{key}: bölüm budama çalışıyor, {total} bölümden {len(scanned)} tanesi taranıyor: {', '.join(scanned)}"
+            ))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f"{key}: bölüm budama görünmüyor ({len(scanned)}/{total} bölüm taranıyor)."
+            ))
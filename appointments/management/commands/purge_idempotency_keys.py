@@ -0,0 +1,16 @@
+# appointments/management/commands/purge_idempotency_keys.py
+
+from django.core.management.base import BaseCommand
+
+from appointments import idempotency
+
+
+class Command(BaseCommand):
+    help = "Süresi dolan tekillik anahtarlarını (IdempotencyRecord) siler (örn. saatlik cron ile)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Parti büyüklüğü (varsayılan: 5000).")
+
+    def handle(self, *args, **options):
+        deleted = idempotency.purge(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{deleted} süresi dolmuş anahtar silindi."))
@@ -0,0 +1,16 @@
+# appointments/management/commands/rebuild_agent_access.py
+
+from django.core.management.base import BaseCommand
+
+from appointments.visibility import rebuild_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Randevu–temsilci görünürlük tablosunu (AppointmentAgentAccess) randevuların temsilcisi "
+        "ve müşteri atamalarından baştan oluşturur. Sinyal tetiklemeyen harici toplu işlemlerden sonra kullanılır."
+    )
+
+    def handle(self, *args, **options):
+        created = rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f"{created} görünürlük satırı oluşturuldu."))
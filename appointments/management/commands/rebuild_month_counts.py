@@ -0,0 +1,17 @@
+# appointments/management/commands/rebuild_month_counts.py
+
+from django.core.management.base import BaseCommand
+
+from appointments import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Yönetim panelinin tarih hiyerarşisinin okuduğu aylık randevu sayılarını (AppointmentMonthCount) "
+        "randevu tablosundan baştan hesaplar. Kurulumdan sonra bir kez ve sinyal tetiklemeyen harici "
+        "toplu işlemlerden sonra kullanılır."
+    )
+
+    def handle(self, *args, **options):
+        created = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"{created} ay için randevu sayısı hesaplandı."))
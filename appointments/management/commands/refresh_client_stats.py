@@ -0,0 +1,31 @@
+# appointments/management/commands/refresh_client_stats.py
+
+from django.core.management.base import BaseCommand
+
+from appointments import client_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Müşteri istatistiklerini (ziyaret sayısı, toplam harcama, son ziyaret, sonraki randevu, en sık hizmet) "
+        "randevu ve ödeme tablolarından yeniden hesaplar; eksik satırları oluşturur. Kurulumdan sonra bir kez "
+        "ve sinyal tetiklemeyen harici toplu işlemlerden sonra çalıştırılır. --stale ile yalnızca satırı olmayan "
+        "veya sonraki randevusu geçmişte kalan müşterileri yeniler; cron ile birkaç dakikada bir çalıştırılır."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=client_stats.RECONCILE_BATCH,
+            help=f"Tek UPDATE ile yenilenen müşteri sayısı (varsayılan {client_stats.RECONCILE_BATCH}).",
+        )
+        parser.add_argument(
+            '--stale', action='store_true',
+            help="Yalnızca satırı olmayan veya sonraki randevusu geçmişte kalan müşterileri yeniler.",
+        )
+
+    def handle(self, *args, **options):
+        if options['stale']:
+            refreshed = client_stats.refresh_stale(batch_size=options['batch_size'])
+        else:
+            refreshed = client_stats.reconcile(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{refreshed} müşterinin istatistikleri yenilendi."))
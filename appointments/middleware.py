@@ -3,6 +3,8 @@ from django.shortcuts import redirect
 from django.http import JsonResponse # JsonResponse'ı import edin
 from django.urls import reverse # reverse fonksiyonunu import edin
 
+from .history import buffered, status_actor
+
 class AppointmentCheckMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -32,3 +34,18 @@ class AppointmentCheckMiddleware:
         
         return self.get_response(request)
 
+
+
+class StatusHistoryMiddleware:
+    """
+    Randevu durum geçmişi için istek bağlamını kurar: değişikliği yapan kullanıcıyı ve
+    kaynağı (yönetim paneli / web) belirler, işlem dışında kaydedilen geçişleri istek
+    sonunda tek seferde yazar (bkz. appointments.history).
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        source = 'admin' if request.path.startswith(reverse('admin:index')) else 'web'
+        with status_actor(request.user, source), buffered():
+            return self.get_response(request)
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.2 on 2026-10-19 04:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0004_appointment_service_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LegacyIdMap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('client', 'Müşteri'), ('appointment', 'Randevu'), ('payment', 'Ödeme')], max_length=20, verbose_name='Kayıt Türü')),
+                ('legacy_id', models.CharField(max_length=64, verbose_name='Eski Sistem Kimliği')),
+                ('object_id', models.BigIntegerField(verbose_name='Yeni Kayıt Kimliği')),
+                ('imported_at', models.DateTimeField(auto_now_add=True, verbose_name='Aktarım Tarihi')),
+            ],
+            options={
+                'verbose_name': 'Eski Kayıt Eşlemesi',
+                'verbose_name_plural': 'Eski Kayıt Eşlemeleri',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'legacy_id'), name='unique_legacy_id_per_kind')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.2 on 2026-10-19 04:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_agent_access(apps, schema_editor):
+    """Mevcut randevular için temsilci görünürlük satırlarını tek bir INSERT ... SELECT ile oluşturur."""
+    Appointment = apps.get_model('appointments', 'Appointment')
+    AppointmentAgentAccess = apps.get_model('appointments', 'AppointmentAgentAccess')
+    CustomerAgent = apps.get_model('accounts', 'CustomerAgent')
+    qn = schema_editor.connection.ops.quote_name
+    access = qn(AppointmentAgentAccess._meta.db_table)
+    appointments = qn(Appointment._meta.db_table)
+    through = qn(CustomerAgent.assigned_clients.through._meta.db_table)
+    schema_editor.execute(
+        f"INSERT INTO {access} (appointment_id, agent_id) "
+        f"SELECT a.id, a.agent_id FROM {appointments} a WHERE a.agent_id IS NOT NULL "
+        f"UNION "
+        f"SELECT a.id, t.customeragent_id FROM {appointments} a "
+        f"INNER JOIN {through} t ON t.customuser_id = a.client_id"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_customuser_lookup_indexes'),
+        ('appointments', '0005_legacyidmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentAgentAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointment_access', to='accounts.customeragent', verbose_name='Temsilci')),
+                ('appointment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='agent_access', to='appointments.appointment', verbose_name='Randevu')),
+            ],
+            options={
+                'verbose_name': 'Randevu Temsilci Erişimi',
+                'verbose_name_plural': 'Randevu Temsilci Erişimleri',
+                'indexes': [models.Index(fields=['agent', 'appointment'], name='appt_access_agent_idx')],
+                'constraints': [models.UniqueConstraint(fields=('appointment', 'agent'), name='unique_appointment_agent_access')],
+            },
+        ),
+        migrations.RunPython(populate_agent_access, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.2 on 2026-10-19 04:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0006_appointmentagentaccess'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointmentagentaccess',
+            name='appointment',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='agent_access', to='appointments.appointment', verbose_name='Randevu'),
+        ),
+    ]
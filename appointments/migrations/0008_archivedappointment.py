@@ -0,0 +1,38 @@
+# Generated by Django 5.2.2 on 2026-10-19 04:31
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_customuser_prefix_search_indexes'),
+        ('appointments', '0007_drop_appointment_fk_constraints'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAppointment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True, verbose_name='Orijinal Randevu Kimliği')),
+                ('date', models.DateTimeField(verbose_name='Randevu Tarihi')),
+                ('status', models.CharField(choices=[('pending', 'Onay Bekliyor'), ('confirmed', 'Onaylandı'), ('cancelled', 'İptal Edildi'), ('completed', 'Tamamlandı')], max_length=10, verbose_name='Durum')),
+                ('service_type', models.CharField(choices=[('filler', 'Dolgu Uygulaması'), ('botox', 'Botoks Uygulaması'), ('lip_blush', 'Dudak Renklendirme'), ('skin_care', 'Cilt Bakımı'), ('laser_hair_removal', 'Lazer Epilasyon'), ('chemical_peel', 'Kimyasal Peeling'), ('prp', 'PRP Tedavisi'), ('mesotherapy', 'Mezoterapi'), ('dermapen', 'Dermapen'), ('other', 'Diğer Hizmet')], max_length=50, verbose_name='Hizmet Tipi')),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Arşiv Verisi')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Arşivlenme Tarihi')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_appointments', to=settings.AUTH_USER_MODEL, verbose_name='Müşteri')),
+                ('expert', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_appointments', to='accounts.expert', verbose_name='Uzman')),
+            ],
+            options={
+                'verbose_name': 'Arşivlenmiş Randevu',
+                'verbose_name_plural': 'Arşivlenmiş Randevular',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['client', '-date'], name='archived_appt_client_date_idx')],
+            },
+        ),
+    ]
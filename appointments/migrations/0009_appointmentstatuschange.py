@@ -0,0 +1,35 @@
+# Generated by Django 5.2.2 on 2026-10-19 04:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0008_archivedappointment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentStatusChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, choices=[('pending', 'Onay Bekliyor'), ('confirmed', 'Onaylandı'), ('cancelled', 'İptal Edildi'), ('completed', 'Tamamlandı')], max_length=10, verbose_name='Önceki Durum')),
+                ('to_status', models.CharField(choices=[('pending', 'Onay Bekliyor'), ('confirmed', 'Onaylandı'), ('cancelled', 'İptal Edildi'), ('completed', 'Tamamlandı')], max_length=10, verbose_name='Yeni Durum')),
+                ('source', models.CharField(choices=[('web', 'Web'), ('admin', 'Yönetim Paneli'), ('admin_bulk', 'Toplu Yönetim İşlemi'), ('payment', 'Ödeme'), ('system', 'Sistem')], default='system', max_length=20, verbose_name='Kaynak')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Değişiklik Tarihi')),
+                ('appointment', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='status_changes', to='appointments.appointment', verbose_name='Randevu')),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='appointment_status_changes', to=settings.AUTH_USER_MODEL, verbose_name='Değiştiren')),
+            ],
+            options={
+                'verbose_name': 'Randevu Durum Değişikliği',
+                'verbose_name_plural': 'Randevu Durum Değişiklikleri',
+                'ordering': ['created_at', 'pk'],
+                'indexes': [models.Index(fields=['appointment', 'created_at'], name='appt_status_timeline_idx')],
+            },
+        ),
+    ]
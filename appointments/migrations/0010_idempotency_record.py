@@ -0,0 +1,38 @@
+# Generated by Django 5.2.2 on 2026-10-19 04:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0009_appointmentstatuschange'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, verbose_name='Anahtar')),
+                ('fingerprint', models.CharField(max_length=64, verbose_name='İstek Özeti')),
+                ('status_code', models.PositiveSmallIntegerField(default=0, verbose_name='Yanıt Kodu')),
+                ('content_type', models.CharField(blank=True, max_length=100, verbose_name='Yanıt Türü')),
+                ('location', models.CharField(blank=True, max_length=500, verbose_name='Yönlendirme Adresi')),
+                ('body', models.TextField(blank=True, verbose_name='Yanıt Gövdesi')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Oluşturulma Tarihi')),
+                ('expires_at', models.DateTimeField(verbose_name='Geçerlilik Sonu')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='idempotency_records', to=settings.AUTH_USER_MODEL, verbose_name='Kullanıcı')),
+            ],
+            options={
+                'verbose_name': 'Tekillik Anahtarı',
+                'verbose_name_plural': 'Tekillik Anahtarları',
+                'indexes': [models.Index(fields=['expires_at'], name='idempotency_expires_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'key'), name='idempotency_user_key_uniq')],
+            },
+        ),
+    ]
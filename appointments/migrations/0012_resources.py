@@ -0,0 +1,46 @@
+# Generated by Django 5.2.2 on 2026-10-19 04:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0011_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Resource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Ad')),
+                ('kind', models.CharField(choices=[('room', 'Oda'), ('device', 'Cihaz')], max_length=10, verbose_name='Tür')),
+                ('capacity', models.PositiveSmallIntegerField(default=1, help_text='Kaynağın aynı anda kullanılabileceği en fazla randevu sayısı.', verbose_name='Kapasite')),
+                ('service_types', models.JSONField(blank=True, default=list, verbose_name='Hizmet Tipleri')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Aktif')),
+            ],
+            options={
+                'verbose_name': 'Kaynak',
+                'verbose_name_plural': 'Kaynaklar',
+                'ordering': ['kind', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AppointmentResource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField(verbose_name='Başlangıç')),
+                ('end', models.DateTimeField(verbose_name='Bitiş')),
+                ('appointment', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='resource_allocations', to='appointments.appointment', verbose_name='Randevu')),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='allocations', to='appointments.resource', verbose_name='Kaynak')),
+            ],
+            options={
+                'verbose_name': 'Randevu Kaynağı',
+                'verbose_name_plural': 'Randevu Kaynakları',
+                'indexes': [models.Index(fields=['resource', 'start'], name='appt_resource_usage_idx'), models.Index(fields=['start', 'end'], name='appt_resource_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('appointment', 'resource'), name='unique_appointment_resource')],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.2 on 2026-10-19 04:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_customuser_prefix_search_indexes'),
+        ('appointments', '0012_resources'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpertAvailabilityOverride',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Tarih')),
+                ('kind', models.CharField(choices=[('add', 'Ek Müsaitlik'), ('remove', 'Müsait Değil')], max_length=10, verbose_name='Tür')),
+                ('start_time', models.TimeField(verbose_name='Başlangıç Saati')),
+                ('end_time', models.TimeField(verbose_name='Bitiş Saati')),
+                ('description', models.CharField(blank=True, max_length=255, verbose_name='Açıklama')),
+                ('expert', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_overrides', to='accounts.expert', verbose_name='Uzman')),
+            ],
+            options={
+                'verbose_name': 'Uzman Müsaitlik İstisnası',
+                'verbose_name_plural': 'Uzman Müsaitlik İstisnaları',
+                'ordering': ['date', 'start_time'],
+                'indexes': [models.Index(fields=['expert', 'date'], name='availability_override_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ExpertDaySchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Tarih')),
+                ('intervals', models.JSONField(blank=True, default=list, verbose_name='Çalışma Aralıkları')),
+                ('on_holiday', models.BooleanField(default=False, verbose_name='İzinli')),
+                ('compiled_at', models.DateTimeField(auto_now=True, verbose_name='Derlenme Zamanı')),
+                ('expert', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_schedules', to='accounts.expert', verbose_name='Uzman')),
+            ],
+            options={
+                'verbose_name': 'Uzman Günlük Programı',
+                'verbose_name_plural': 'Uzman Günlük Programları',
+                'ordering': ['date', 'expert'],
+                'indexes': [models.Index(fields=['date'], name='expert_day_schedule_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('expert', 'date'), name='unique_expert_day_schedule')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.2 on 2026-10-19 04:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_customuser_prefix_search_indexes'),
+        ('appointments', '0013_availability_overrides'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64, unique=True, verbose_name='Erişim Anahtarı')),
+                ('version', models.PositiveBigIntegerField(default=1, verbose_name='Değişiklik Sayacı')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Son Değişiklik')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Oluşturulma Tarihi')),
+            ],
+            options={
+                'verbose_name': 'Takvim Aboneliği',
+                'verbose_name_plural': 'Takvim Abonelikleri',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['expert', 'date'], name='appt_expert_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['client', 'date'], name='appt_client_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['agent', 'date'], name='appt_agent_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='calendarfeed',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='calendar_feed', to=settings.AUTH_USER_MODEL, verbose_name='Kullanıcı'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.2 on 2026-10-19 05:04
+
+from datetime import date
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+
+def fill_month_counts(apps, schema_editor):
+    # Mevcut randevular tek bir gruplama sorgusuyla sayılır (bkz. appointments.rollups.rebuild)
+    Appointment = apps.get_model('appointments', 'Appointment')
+    AppointmentMonthCount = apps.get_model('appointments', 'AppointmentMonthCount')
+    rows = []
+    for month, total in Appointment.objects.annotate(month=TruncMonth('date')).order_by().values('month').annotate(
+        total=Count('pk')
+    ).values_list('month', 'total'):
+        local = timezone.localtime(month) if timezone.is_aware(month) else month
+        rows.append(AppointmentMonthCount(month=date(local.year, local.month, 1), total=total))
+    AppointmentMonthCount.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0014_calendar_feeds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentMonthCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True, verbose_name='Ay')),
+                ('total', models.IntegerField(default=0, verbose_name='Randevu Sayısı')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Güncellenme Tarihi')),
+            ],
+            options={
+                'verbose_name': 'Aylık Randevu Sayısı',
+                'verbose_name_plural': 'Aylık Randevu Sayıları',
+                'ordering': ['month'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['date', 'id'], name='appt_date_id_idx'),
+        ),
+        migrations.RunPython(fill_month_counts, migrations.RunPython.noop),
+    ]
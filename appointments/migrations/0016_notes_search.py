@@ -0,0 +1,86 @@
+# appointments/migrations/0016_notes_search.py
+#
+# Randevu notlarında tam metin arama (bkz. appointments/notes_search.py).
+#
+# PostgreSQL: `notes_search` tsvector kolonu (Türkçe yapılandırma), notlar eklenirken veya
+# değiştirilirken kolonu dolduran tetikleyici ve GIN indeksi. Kolon ORM modelinde tanımlı
+# değildir. Mevcut satırlar kısa işlemler halinde (BACKFILL_BATCH kimlik aralıkları)
+# doldurulur; migration bu yüzden atomik değildir.
+# SQLite (geliştirme): FTS5 sanal tablosu (external content) ve eşitleme tetikleyicileri
+# (appointments.notes_search.ensure_sqlite_index).
+
+from django.db import migrations
+
+BACKFILL_BATCH = 10000
+
+PG_FUNCTION = """
+CREATE OR REPLACE FUNCTION appointments_notes_search_update() RETURNS trigger AS $$
+BEGIN
+    NEW.notes_search := to_tsvector('turkish', coalesce(NEW.notes, ''));
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def _table(apps, schema_editor):
+    return schema_editor.quote_name(apps.get_model('appointments', 'Appointment')._meta.db_table)
+
+
+def create_notes_search(apps, schema_editor):
+    table = _table(apps, schema_editor)
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS notes_search tsvector")
+            cursor.execute(PG_FUNCTION)
+            cursor.execute(f"DROP TRIGGER IF EXISTS appointments_notes_search_trg ON {table}")
+            cursor.execute(
+                f"CREATE TRIGGER appointments_notes_search_trg BEFORE INSERT OR UPDATE OF notes ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION appointments_notes_search_update()"
+            )
+            cursor.execute(f"SELECT MIN(id), MAX(id) FROM {table}")
+            first, last = cursor.fetchone()
+        # Her parti kendi kısa işleminde (autocommit) güncellenir; tablo uzun süre kilitlenmez
+        for start in range(first or 0, (last or 0) + 1, BACKFILL_BATCH):
+            with schema_editor.connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {table} SET notes_search = to_tsvector('turkish', notes) "
+                    f"WHERE id >= %s AND id < %s AND notes_search IS NULL AND notes <> ''",
+                    [start, start + BACKFILL_BATCH]
+                )
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS appt_notes_search_idx ON {table} USING gin (notes_search)")
+    elif vendor == 'sqlite':
+        # Geliştirme yedeği; tablo yeniden oluşturan sonraki migration'lardan sonra
+        # tetikleyiciler post_migrate ile yeniden kurulur (bkz. appointments.signals)
+        from appointments.notes_search import ensure_sqlite_index
+        ensure_sqlite_index(schema_editor.connection)
+
+
+def drop_notes_search(apps, schema_editor):
+    table = _table(apps, schema_editor)
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'postgresql':
+            cursor.execute("DROP INDEX IF EXISTS appt_notes_search_idx")
+            cursor.execute(f"DROP TRIGGER IF EXISTS appointments_notes_search_trg ON {table}")
+            cursor.execute("DROP FUNCTION IF EXISTS appointments_notes_search_update()")
+            cursor.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS notes_search")
+        elif vendor == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS appointments_notes_fts_{suffix}")
+            cursor.execute("DROP TABLE IF EXISTS appointments_notes_fts")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('appointments', '0015_month_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_notes_search, drop_notes_search),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.2 on 2026-10-19 05:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_customuser_prefix_search_indexes'),
+        ('appointments', '0016_notes_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentDashboardCounters',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counted_on', models.DateField(verbose_name='Sayım Günü')),
+                ('today_count', models.IntegerField(default=0, verbose_name='Bugünkü Randevular')),
+                ('upcoming_count', models.IntegerField(default=0, verbose_name='Yaklaşan Randevular (30 gün)')),
+                ('completed_count', models.IntegerField(default=0, verbose_name='Tamamlanan Randevular')),
+                ('lifetime_commission', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Toplam Komisyon')),
+                ('month_commission', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Bu Ay Komisyon')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Güncellenme Tarihi')),
+                ('agent', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_counters', to='accounts.customeragent', verbose_name='Temsilci')),
+            ],
+            options={
+                'verbose_name': 'Temsilci Panel Sayacı',
+                'verbose_name_plural': 'Temsilci Panel Sayaçları',
+            },
+        ),
+        migrations.CreateModel(
+            name='ExpertDashboardCounters',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counted_on', models.DateField(verbose_name='Sayım Günü')),
+                ('today_count', models.IntegerField(default=0, verbose_name='Bugünkü Randevular')),
+                ('upcoming_count', models.IntegerField(default=0, verbose_name='Yaklaşan Randevular (30 gün)')),
+                ('completed_count', models.IntegerField(default=0, verbose_name='Tamamlanan Randevular')),
+                ('lifetime_commission', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Toplam Komisyon')),
+                ('month_commission', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Bu Ay Komisyon')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Güncellenme Tarihi')),
+                ('expert', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_counters', to='accounts.expert', verbose_name='Uzman')),
+            ],
+            options={
+                'verbose_name': 'Uzman Panel Sayacı',
+                'verbose_name_plural': 'Uzman Panel Sayaçları',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# appointments/migrations/0018_restore_appointment_fk_constraints.py
+#
+# Randevu/ödeme tablolarına işaret eden yabancı anahtar kısıtlarını geri ekler. Kısıtlar
+# yalnızca tablo PostgreSQL'de bölümlenirken (manage_partitions convert) kaldırılır; hedef
+# tablo zaten bölümlenmişse veritabanı işlemi atlanır (bkz. appointments/partitioning.py).
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from appointments.partitioning import AlterFieldUnlessPartitioned
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0017_dashboard_counters'),
+    ]
+
+    operations = [
+        AlterFieldUnlessPartitioned(
+            model_name='appointmentagentaccess',
+            name='appointment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='agent_access', to='appointments.appointment', verbose_name='Randevu'),
+        ),
+        AlterFieldUnlessPartitioned(
+            model_name='appointmentresource',
+            name='appointment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resource_allocations', to='appointments.appointment', verbose_name='Randevu'),
+        ),
+    ]
@@ -3,10 +3,12 @@
 from django.db import models
 from accounts.models import CustomUser, Expert, CustomerAgent
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from datetime import time, date
 from django.utils import timezone
+from .versioning import VersionedModel
 
-class Appointment(models.Model):
+class Appointment(VersionedModel):
     """
     Klinikteki randevuları temsil eder.
     Bir danışanın bir uzmanla belirli bir tarihte randevu bilgilerini tutar.
@@ -93,6 +95,10 @@ class Appointment(models.Model):
         """
         Modelin veritabanına kaydedilmeden önce validasyonlarını kontrol eder.
         """
+        # Tarih form doğrulamasında reddedildiyse (hata zaten formda) kontrol yapılamaz
+        if self.date is None:
+            return
+
         # Aynı uzmana aynı tarih ve saatte birden fazla aktif randevu olamaz.
         # Kendi PK'sını hariç tutarak güncelleme işlemlerine izin verir.
         conflicting_appointments = Appointment.objects.filter(
@@ -114,6 +120,14 @@ class Appointment(models.Model):
         verbose_name = "Randevu"
         verbose_name_plural = "Randevular"
         ordering = ['-date'] # Randevuları tarihe göre azalan sırada sıralar
+        indexes = [
+            # Kişi başına tarih aralığı sorguları (takvim beslemeleri, bkz. appointments.ical)
+            models.Index(fields=['expert', 'date'], name='appt_expert_date_idx'),
+            models.Index(fields=['client', 'date'], name='appt_client_date_idx'),
+            models.Index(fields=['agent', 'date'], name='appt_agent_date_idx'),
+            # Varsayılan sıralama (-date, -id) ve tarih aralıkları (yönetim listesi, aylık sayımlar)
+            models.Index(fields=['date', 'id'], name='appt_date_id_idx'),
+        ]
         # unique_together = ('expert', 'date') # Bu satır, `clean` metodundaki daha esnek kontrol nedeniyle gereksizleşti.
                                             # Eğer eklerseniz, uzman için aynı tarihte "completed" bile olsa başka randevu alınamaz.
                                             # Mevcut `clean` metodumuz daha spesifik kontrol sağlıyor.
@@ -230,4 +244,448 @@ class ExpertHoliday(models.Model):
             raise ValidationError("Bu uzmanın seçilen tarihlerde çakışan bir tatil/izin dönemi bulunmaktadır.")
 
     def __str__(self):
-        return f"{self.expert.user.username} - Tatil: {self.start_date.strftime('%d.%m.%Y')} - {self.end_date.strftime('%d.%m.%Y')}"
\ No newline at end of file
+        return f"{self.expert.user.username} - Tatil: {self.start_date.strftime('%d.%m.%Y')} - {self.end_date.strftime('%d.%m.%Y')}"
+
+class ExpertAvailabilityOverride(models.Model):
+    """
+    Haftalık müsaitliğe belirli bir tarih için yapılan istisna: ek çalışma aralığı
+    (ör. cumartesi ek mesai) veya kaldırılan aralık (ör. cuma 14:00'te çıkış).
+    Günlük etkin program ExpertDaySchedule tablosuna derlenir (bkz. appointments.availability).
+    """
+    KIND_CHOICES = [
+        ('add', 'Ek Müsaitlik'),
+        ('remove', 'Müsait Değil'),
+    ]
+
+    expert = models.ForeignKey(
+        Expert,
+        on_delete=models.CASCADE,
+        verbose_name="Uzman",
+        related_name="availability_overrides"
+    )
+    date = models.DateField(verbose_name="Tarih")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name="Tür")
+    start_time = models.TimeField(verbose_name="Başlangıç Saati")
+    end_time = models.TimeField(verbose_name="Bitiş Saati")
+    description = models.CharField(max_length=255, blank=True, verbose_name="Açıklama")
+
+    class Meta:
+        verbose_name = "Uzman Müsaitlik İstisnası"
+        verbose_name_plural = "Uzman Müsaitlik İstisnaları"
+        ordering = ['date', 'start_time']
+        indexes = [
+            models.Index(fields=['expert', 'date'], name='availability_override_idx'),
+        ]
+
+    def clean(self):
+        """
+        İstisna aralığının validasyonunu kontrol eder.
+        """
+        if self.start_time and self.end_time and self.start_time >= self.end_time:
+            raise ValidationError("Bitiş saati, başlangıç saatinden sonra olmalıdır.")
+
+    def __str__(self):
+        return f"{self.expert.user.username} - {self.date.strftime('%d.%m.%Y')} {self.get_kind_display()} ({self.start_time.strftime('%H:%M')} - {self.end_time.strftime('%H:%M')})"
+
+
+class ExpertDaySchedule(models.Model):
+    """
+    Uzmanın bir gündeki etkin çalışma aralıkları: haftalık müsaitlik, izinler ve tarihli
+    istisnalardan derlenir. Önümüzdeki AVAILABILITY_SCHEDULE_WEEKS hafta için her uzman
+    ve gün başına bir satır tutulur; kaynak tablolar değiştikçe yalnızca etkilenen günler
+    yeniden derlenir. Elle düzenlenmez.
+    """
+    expert = models.ForeignKey(
+        Expert,
+        on_delete=models.CASCADE,
+        verbose_name="Uzman",
+        related_name="day_schedules"
+    )
+    date = models.DateField(verbose_name="Tarih")
+    # [["09:00", "12:00"], ["13:00", "18:00"]] — yerel saat, sıralı ve çakışmasız
+    intervals = models.JSONField(default=list, blank=True, verbose_name="Çalışma Aralıkları")
+    on_holiday = models.BooleanField(default=False, verbose_name="İzinli")
+    compiled_at = models.DateTimeField(auto_now=True, verbose_name="Derlenme Zamanı")
+
+    class Meta:
+        verbose_name = "Uzman Günlük Programı"
+        verbose_name_plural = "Uzman Günlük Programları"
+        ordering = ['date', 'expert']
+        constraints = [
+            models.UniqueConstraint(fields=['expert', 'date'], name='unique_expert_day_schedule'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='expert_day_schedule_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.expert.user.username} - {self.date.strftime('%d.%m.%Y')}"
+
+
+class CalendarFeed(models.Model):
+    """
+    Kullanıcının (uzman, temsilci, müşteri) randevularını telefon takvimlerine sunan
+    iCalendar aboneliği. Adres tahmin edilemez bir anahtar içerir; oturum gerekmez.
+    `version` kullanıcının randevularından biri her değiştiğinde artar ve ETag olarak
+    kullanılır; takvim uygulamasının periyodik isteği randevu tablosuna gitmeden 304 alır.
+    """
+    user = models.OneToOneField(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='calendar_feed',
+        verbose_name="Kullanıcı"
+    )
+    token = models.CharField(max_length=64, unique=True, verbose_name="Erişim Anahtarı")
+    version = models.PositiveBigIntegerField(default=1, verbose_name="Değişiklik Sayacı")
+    changed_at = models.DateTimeField(default=timezone.now, verbose_name="Son Değişiklik")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Oluşturulma Tarihi")
+
+    class Meta:
+        verbose_name = "Takvim Aboneliği"
+        verbose_name_plural = "Takvim Abonelikleri"
+
+    def __str__(self):
+        return f"{self.user.username} takvimi"
+
+
+class AppointmentMonthCount(models.Model):
+    """
+    Ay başına randevu sayısı (yerel saate göre ay). Yönetim panelindeki tarih
+    hiyerarşisi yıl ve ay listelerini randevu tablosunda DISTINCT taraması yapmak
+    yerine bu küçük tablodan okur. Sinyaller ve toplu yollar appointments.rollups
+    üzerinden günceller; `rebuild_month_counts` komutu tabloyu baştan hesaplar.
+    """
+    month = models.DateField(unique=True, verbose_name="Ay")
+    total = models.IntegerField(default=0, verbose_name="Randevu Sayısı")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Güncellenme Tarihi")
+
+    class Meta:
+        verbose_name = "Aylık Randevu Sayısı"
+        verbose_name_plural = "Aylık Randevu Sayıları"
+        ordering = ['month']
+
+    def __str__(self):
+        return f"{self.month.strftime('%m.%Y')}: {self.total}"
+
+
+class DashboardCounters(models.Model):
+    """
+    Uzman/temsilci paneli sayaçları (tek satır). Randevu ve ödeme yazımlarıyla aynı
+    işlemde appointments.counters üzerinden güncellenir; `reconcile_dashboard_counters`
+    komutu kaynaklardan yeniden hesaplar.
+
+    Gün penceresine bağlı alanlar (bugün, yaklaşan, bu ay komisyonu) `counted_on`
+    gününe göredir; gün değiştiğinde satır okunurken bu alanlar yeniden sayılır.
+    """
+    counted_on = models.DateField(verbose_name="Sayım Günü")
+    today_count = models.IntegerField(default=0, verbose_name="Bugünkü Randevular")
+    upcoming_count = models.IntegerField(default=0, verbose_name="Yaklaşan Randevular (30 gün)")
+    completed_count = models.IntegerField(default=0, verbose_name="Tamamlanan Randevular")
+    lifetime_commission = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Toplam Komisyon")
+    month_commission = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Bu Ay Komisyon")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Güncellenme Tarihi")
+
+    class Meta:
+        abstract = True
+
+
+class ExpertDashboardCounters(DashboardCounters):
+    expert = models.OneToOneField(Expert, on_delete=models.CASCADE, related_name='dashboard_counters', verbose_name="Uzman")
+
+    class Meta:
+        verbose_name = "Uzman Panel Sayacı"
+        verbose_name_plural = "Uzman Panel Sayaçları"
+
+    def __str__(self):
+        return f"{self.expert}: {self.upcoming_count} yaklaşan"
+
+
+class AgentDashboardCounters(DashboardCounters):
+    agent = models.OneToOneField(CustomerAgent, on_delete=models.CASCADE, related_name='dashboard_counters', verbose_name="Temsilci")
+
+    class Meta:
+        verbose_name = "Temsilci Panel Sayacı"
+        verbose_name_plural = "Temsilci Panel Sayaçları"
+
+    def __str__(self):
+        return f"{self.agent}: {self.upcoming_count} yaklaşan"
+
+
+class Resource(models.Model):
+    """
+    Randevularda kullanılan fiziksel kaynaklar (oda, cihaz).
+
+    Bir hizmet, `service_types` listesinde kendisini içeren kaynakların her türünden
+    (oda, cihaz) birer tane gerektirir; örneğin lazer epilasyon bir lazer cihazı ve bir
+    oda ister. Kaynaklar randevu kaydedilirken atanır (bkz. appointments.scheduling).
+    """
+    KIND_CHOICES = [
+        ('room', 'Oda'),
+        ('device', 'Cihaz'),
+    ]
+
+    name = models.CharField(max_length=100, unique=True, verbose_name="Ad")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name="Tür")
+    capacity = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name="Kapasite",
+        help_text="Kaynağın aynı anda kullanılabileceği en fazla randevu sayısı."
+    )
+    service_types = models.JSONField(default=list, blank=True, verbose_name="Hizmet Tipleri")
+    is_active = models.BooleanField(default=True, verbose_name="Aktif")
+
+    class Meta:
+        verbose_name = "Kaynak"
+        verbose_name_plural = "Kaynaklar"
+        ordering = ['kind', 'name']
+
+    def __str__(self):
+        return f"{self.name} ({self.get_kind_display()})"
+
+
+class AppointmentResource(models.Model):
+    """
+    Randevuya atanmış kaynak ve kullanım aralığı. Günlük müsaitlik hesabı randevu
+    tablosuna gitmeden bu tablodan okunur; iptal edilen randevuların satırları silinir.
+    """
+    appointment = models.ForeignKey(
+        Appointment,
+        on_delete=models.CASCADE,
+        related_name='resource_allocations',
+        verbose_name="Randevu"
+    )
+    resource = models.ForeignKey(
+        Resource,
+        on_delete=models.PROTECT,
+        related_name='allocations',
+        verbose_name="Kaynak"
+    )
+    start = models.DateTimeField(verbose_name="Başlangıç")
+    end = models.DateTimeField(verbose_name="Bitiş")
+
+    class Meta:
+        verbose_name = "Randevu Kaynağı"
+        verbose_name_plural = "Randevu Kaynakları"
+        constraints = [
+            models.UniqueConstraint(fields=['appointment', 'resource'], name='unique_appointment_resource'),
+        ]
+        indexes = [
+            models.Index(fields=['resource', 'start'], name='appt_resource_usage_idx'),
+            models.Index(fields=['start', 'end'], name='appt_resource_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.resource} -> #{self.appointment_id}"
+
+
+class LegacyIdMap(models.Model):
+    """
+    Eski sistemden aktarılan kayıtların eski kimliklerini yeni kayıtlarla eşler.
+    Toplu aktarımın (import_legacy komutu) kaldığı yerden devam edebilmesini ve
+    ödemelerin/randevuların eski kimliklerle birbirine bağlanabilmesini sağlar.
+    """
+    KIND_CHOICES = [
+        ('client', 'Müşteri'),
+        ('appointment', 'Randevu'),
+        ('payment', 'Ödeme'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="Kayıt Türü")
+    legacy_id = models.CharField(max_length=64, verbose_name="Eski Sistem Kimliği")
+    object_id = models.BigIntegerField(verbose_name="Yeni Kayıt Kimliği")
+    imported_at = models.DateTimeField(auto_now_add=True, verbose_name="Aktarım Tarihi")
+
+    class Meta:
+        verbose_name = "Eski Kayıt Eşlemesi"
+        verbose_name_plural = "Eski Kayıt Eşlemeleri"
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'legacy_id'], name='unique_legacy_id_per_kind'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.legacy_id} -> {self.object_id}"
+
+
+class AppointmentAgentAccess(models.Model):
+    """
+    Bir randevudan sorumlu olan temsilcilerin denormalize listesi.
+
+    Randevuya doğrudan atanmış temsilci ile müşterinin atandığı tüm temsilciler
+    burada tek satır/temsilci olarak tutulur. Temsilci kapsamlı sorgular
+    `Q(agent=...) | Q(client__agents=...)` yerine tek bir indeksli arama yapar.
+    Tablo sinyaller ve appointments.visibility içindeki toplu senkronizasyon
+    fonksiyonlarıyla güncel tutulur; elle düzenlenmez.
+    """
+    appointment = models.ForeignKey(
+        Appointment,
+        on_delete=models.CASCADE,
+        related_name='agent_access',
+        verbose_name="Randevu"
+    )
+    agent = models.ForeignKey(
+        CustomerAgent,
+        on_delete=models.CASCADE,
+        related_name='appointment_access',
+        verbose_name="Temsilci"
+    )
+
+    class Meta:
+        verbose_name = "Randevu Temsilci Erişimi"
+        verbose_name_plural = "Randevu Temsilci Erişimleri"
+        constraints = [
+            models.UniqueConstraint(fields=['appointment', 'agent'], name='unique_appointment_agent_access'),
+        ]
+        indexes = [
+            models.Index(fields=['agent', 'appointment'], name='appt_access_agent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.agent} -> #{self.appointment_id}"
+
+
+class ArchivedAppointment(models.Model):
+    """
+    Sıcak tablolardan (randevu/ödeme) taşınmış, tamamlanmış veya iptal edilmiş eski randevular.
+
+    Her satır bir randevuyu ve (varsa) ödemesini tek bir JSON belgesinde saklar
+    (PostgreSQL'de JSONB; büyük değerler TOAST ile sıkıştırılır). Liste sayfalarının
+    ihtiyaç duyduğu alanlar ayrıca kolon olarak tutulur ve (müşteri, tarih) indeksiyle
+    sayfalanır. Kayıtlar appointments.archive tarafından yazılır; elle düzenlenmez.
+    """
+    original_id = models.BigIntegerField(unique=True, verbose_name="Orijinal Randevu Kimliği")
+    client = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='archived_appointments',
+        verbose_name="Müşteri"
+    )
+    expert = models.ForeignKey(
+        Expert,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_appointments',
+        verbose_name="Uzman"
+    )
+    date = models.DateTimeField(verbose_name="Randevu Tarihi")
+    status = models.CharField(max_length=10, choices=Appointment.STATUS_CHOICES, verbose_name="Durum")
+    service_type = models.CharField(max_length=50, choices=Appointment.SERVICE_CHOICES, verbose_name="Hizmet Tipi")
+    payload = models.JSONField(encoder=DjangoJSONEncoder, verbose_name="Arşiv Verisi")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Arşivlenme Tarihi")
+
+    class Meta:
+        verbose_name = "Arşivlenmiş Randevu"
+        verbose_name_plural = "Arşivlenmiş Randevular"
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['client', '-date'], name='archived_appt_client_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.original_id} - {self.date.strftime('%d.%m.%Y %H:%M')} ({self.get_status_display()})"
+
+    @property
+    def appointment_data(self):
+        return self.payload.get('appointment', {})
+
+    @property
+    def payment_data(self):
+        """Arşivlenen ödeme bilgisi; randevunun ödemesi yoksa None."""
+        return self.payload.get('payment')
+
+    @property
+    def expert_name(self):
+        return self.appointment_data.get('expert_name', '')
+
+    @property
+    def amount(self):
+        return self.appointment_data.get('amount')
+
+
+class AppointmentStatusChange(models.Model):
+    """
+    Randevu durum geçişlerinin salt eklemeli (append-only) kaydı: kim, hangi durumdan
+    hangisine, ne zaman ve hangi yoldan (web, yönetim paneli, ödeme...).
+
+    Kayıtlar appointments.history üzerinden tamponlanarak toplu yazılır; güncellenmez
+    ve silinmez. Randevu silinse veya arşive taşınsa da geçmiş korunur (DO_NOTHING).
+    """
+    SOURCE_CHOICES = [
+        ('web', 'Web'),
+        ('admin', 'Yönetim Paneli'),
+        ('admin_bulk', 'Toplu Yönetim İşlemi'),
+        ('payment', 'Ödeme'),
+        ('system', 'Sistem'),
+    ]
+
+    appointment = models.ForeignKey(
+        Appointment,
+        on_delete=models.DO_NOTHING,
+        related_name='status_changes',
+        # Geçmiş satırları randevu silindikten/arşivlendikten sonra da kalır; kısıt bunu engellerdi
+        db_constraint=False,
+        verbose_name="Randevu"
+    )
+    changed_by = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='appointment_status_changes',
+        verbose_name="Değiştiren"
+    )
+    # Randevu ilk oluşturulduğunda önceki durum boştur
+    from_status = models.CharField(max_length=10, blank=True, choices=Appointment.STATUS_CHOICES, verbose_name="Önceki Durum")
+    to_status = models.CharField(max_length=10, choices=Appointment.STATUS_CHOICES, verbose_name="Yeni Durum")
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='system', verbose_name="Kaynak")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Değişiklik Tarihi")
+
+    class Meta:
+        verbose_name = "Randevu Durum Değişikliği"
+        verbose_name_plural = "Randevu Durum Değişiklikleri"
+        ordering = ['created_at', 'pk']
+        indexes = [
+            models.Index(fields=['appointment', 'created_at'], name='appt_status_timeline_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.appointment_id}: {self.from_status or '-'} -> {self.to_status} ({self.get_source_display()})"
+
+
+class IdempotencyRecord(models.Model):
+    """
+    Randevu / ödeme oluşturma isteklerinin tekillik anahtarları (Idempotency-Key).
+
+    Mobil istemciler zayıf bağlantıda aynı POST'u yeniden gönderebilir. İstemcinin
+    gönderdiği anahtar, isteğin özeti (fingerprint) ve sonuç yanıtı burada saklanır;
+    aynı anahtarla gelen tekrarlar yeniden çalıştırılmaz, saklanan yanıt döndürülür
+    (bkz. appointments.idempotency). Yanıt gövdesi yalnızca JSON yanıtlarda saklanır,
+    form yanıtlarında yönlendirme adresi yeterlidir.
+    """
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='idempotency_records',
+        verbose_name="Kullanıcı"
+    )
+    key = models.CharField(max_length=100, verbose_name="Anahtar")
+    fingerprint = models.CharField(max_length=64, verbose_name="İstek Özeti")
+    status_code = models.PositiveSmallIntegerField(default=0, verbose_name="Yanıt Kodu")
+    content_type = models.CharField(max_length=100, blank=True, verbose_name="Yanıt Türü")
+    location = models.CharField(max_length=500, blank=True, verbose_name="Yönlendirme Adresi")
+    body = models.TextField(blank=True, verbose_name="Yanıt Gövdesi")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Oluşturulma Tarihi")
+    expires_at = models.DateTimeField(verbose_name="Geçerlilik Sonu")
+
+    class Meta:
+        verbose_name = "Tekillik Anahtarı"
+        verbose_name_plural = "Tekillik Anahtarları"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key} ({self.status_code})"
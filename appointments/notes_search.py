@@ -0,0 +1,171 @@
+# appointments/notes_search.py
+"""
+Randevu notlarında tam metin arama.
+
+PostgreSQL: randevu tablosundaki `notes_search` (tsvector, Türkçe yapılandırma)
+kolonu, notlar eklenirken/değiştirilirken bir tetikleyiciyle (trigger) doldurulur ve
+GIN indeksiyle aranır (bkz. migrations/0016_notes_search). Kolon ORM modelinde
+tanımlı değildir; randevu sorguları bu kolonu okumaz. Sorgu `websearch_to_tsquery`
+ile ayrıştırılır (tırnaklı ifade, -hariç gibi kullanıcı sözdizimi güvenlidir).
+
+SQLite (yerel geliştirme): notlar FTS5 sanal tablosunda (appointments_notes_fts,
+external content) tutulur; tablo yine tetikleyicilerle eşitlenir. SQLite'ta tabloyu
+yeniden oluşturan migration'lar tetikleyicileri sildiğinden `ensure_sqlite_index`
+her migrate sonunda eksik tetikleyicileri kurar ve dizini yeniden oluşturur.
+
+Sonuçlar kullanıcının görebildiği randevularla sınırlanır (scope_appointments),
+ilgiye (rank) ve ardından yeniliğe (tarih) göre sıralanır ve anahtar kümesiyle
+(keyset: rank, tarih, id) sayfalanır; OFFSET kullanılmaz. Eşleşen kelimeler özet
+içinde <mark> ile işaretlenir; not metni önce kaçışlanır (HTML enjeksiyonu olmaz).
+"""
+
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import BooleanField, DecimalField, FloatField, Q, TextField
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+
+from .models import Appointment
+from .permissions import scope_appointments
+
+CONFIG = 'turkish'
+FTS_TABLE = 'appointments_notes_fts'
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_TERMS = 8
+# Özet içinde eşleşmeleri işaretleyen kontrol karakterleri; kaçışlamadan sonra <mark> olur
+START, STOP = '\x02', '\x03'
+# PostgreSQL rank değeri tam (numeric) karşılaştırılır; SQLite yedeğinde REAL kullanılır
+RANK_FIELD = DecimalField(max_digits=12, decimal_places=6)
+
+
+class InvalidCursor(ValueError):
+    """Sayfa imleci çözülemedi."""
+
+
+SQLITE_TRIGGERS = {
+    'appointments_notes_fts_ai': """AFTER INSERT ON {table} BEGIN
+        INSERT INTO appointments_notes_fts(rowid, notes) VALUES (new.id, new.notes);
+    END""",
+    'appointments_notes_fts_ad': """AFTER DELETE ON {table} BEGIN
+        INSERT INTO appointments_notes_fts(appointments_notes_fts, rowid, notes) VALUES ('delete', old.id, old.notes);
+    END""",
+    'appointments_notes_fts_au': """AFTER UPDATE OF notes ON {table} BEGIN
+        INSERT INTO appointments_notes_fts(appointments_notes_fts, rowid, notes) VALUES ('delete', old.id, old.notes);
+        INSERT INTO appointments_notes_fts(rowid, notes) VALUES (new.id, new.notes);
+    END""",
+}
+
+
+def _table():
+    return connection.ops.quote_name(Appointment._meta.db_table)
+
+
+def ensure_sqlite_index(using_connection=connection):
+    """SQLite FTS5 tablosunu ve tetikleyicilerini kurar; eksik tetikleyici varsa dizini yeniden oluşturur."""
+    if using_connection.vendor != 'sqlite':
+        return False
+    db_table = Appointment._meta.db_table
+    with using_connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"notes, content='{db_table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s", [db_table])
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in SQLITE_TRIGGERS if name not in existing]
+        for name in missing:
+            table = using_connection.ops.quote_name(db_table)
+            cursor.execute(f"CREATE TRIGGER {name} {SQLITE_TRIGGERS[name].format(table=table)}")
+        if missing:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return bool(missing)
+
+
+def _fts_query(query):
+    """FTS5 sorgusu: her kelime tırnak içinde (operatörler etkisiz), kelimeler VE ile bağlanır."""
+    terms = query.split()[:MAX_TERMS]
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def _expressions(query):
+    """(eşleşme koşulu, rank, özet) ifadeleri."""
+    table = _table()
+    if connection.vendor == 'postgresql':
+        tsquery = f"websearch_to_tsquery('{CONFIG}', %s)"
+        return (
+            RawSQL(f"{table}.notes_search @@ {tsquery}", [query], output_field=BooleanField()),
+            RawSQL(f"round(ts_rank_cd({table}.notes_search, {tsquery}, 32)::numeric, 6)", [query], output_field=RANK_FIELD),
+            RawSQL(
+                f"ts_headline('{CONFIG}', {table}.notes, {tsquery}, "
+                f"'StartSel={START}, StopSel={STOP}, MaxWords=25, MinWords=8, MaxFragments=2, FragmentDelimiter=\" … \"')",
+                [query], output_field=TextField(),
+            ),
+        )
+    fts = connection.ops.quote_name(FTS_TABLE)
+    match = _fts_query(query)
+    # bm25 küçük değer = daha ilgili; işaret çevrilerek büyük değer = daha ilgili yapılır
+    return (
+        RawSQL(f"{table}.id IN (SELECT rowid FROM {fts} WHERE {fts} MATCH %s)", [match], output_field=BooleanField()),
+        RawSQL(
+            f"(SELECT round(-bm25({fts}), 6) FROM {fts} WHERE {fts} MATCH %s AND rowid = {table}.id)",
+            [match], output_field=FloatField(),
+        ),
+        RawSQL(
+            f"(SELECT snippet({fts}, 0, '{START}', '{STOP}', ' … ', 16) FROM {fts} "
+            f"WHERE {fts} MATCH %s AND rowid = {table}.id)",
+            [match], output_field=TextField(),
+        ),
+    )
+
+
+def encode_cursor(rank, date, pk):
+    raw = json.dumps([str(rank), date.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    try:
+        rank, date, pk = json.loads(base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)))
+        return Decimal(rank), datetime.fromisoformat(date), int(pk)
+    except (ValueError, TypeError, ArithmeticError) as exc:
+        raise InvalidCursor("Geçersiz sayfa imleci.") from exc
+
+
+def highlight(snippet):
+    """Özeti HTML olarak kaçışlar ve işaretli kelimeleri <mark> ile sarar."""
+    return escape(snippet or '').replace(START, '<mark>').replace(STOP, '</mark>')
+
+
+def search(user, query, after=None, limit=PAGE_SIZE):
+    """
+    (sonuç listesi, sonraki sayfa imleci veya None). Her sonuç: randevu, rank ve
+    HTML özet. `after` önceki sayfanın imlecidir.
+    """
+    query = (query or '').strip()
+    if not query or not _fts_query(query):
+        return [], None
+    matches, rank, snippet = _expressions(query)
+    queryset = scope_appointments(user).filter(matches).annotate(rank=rank).select_related('client', 'expert__user')
+    if after:
+        last_rank, last_date, last_pk = decode_cursor(after)
+        if connection.vendor != 'postgresql':
+            # SQLite'ta rank REAL'dir (Decimal parametre metin olarak bağlanır ve sayıyla karşılaştırılamaz)
+            last_rank = float(last_rank)
+        queryset = queryset.filter(
+            Q(rank__lt=last_rank)
+            | Q(rank=last_rank, date__lt=last_date)
+            | Q(rank=last_rank, date=last_date, pk__lt=last_pk)
+        )
+    # Özet yalnızca sayfadaki satırlar için üretilir (PostgreSQL pahalı ifadeleri LIMIT sonrasına erteler)
+    rows = list(queryset.annotate(snippet=snippet).order_by('-rank', '-date', '-pk')[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.rank, last.date, last.pk)
+    return [(appointment, appointment.rank, highlight(appointment.snippet)) for appointment in rows], next_cursor
@@ -0,0 +1,450 @@
+# appointments/partitioning.py
+"""
+Appointment (date) ve Payment (payment_date) tabloları için PostgreSQL aylık aralık
+bölümlemesi (native range partitioning) yardımcıları.
+
+Trafiğin büyük kısmı son aylara ait kayıtlara gittiği için tarih filtresi içeren
+sorgular (listeler, raporlar, COUNT) yalnızca ilgili aylık bölümleri tarar
+(partition pruning). Bölümler `<tablo>_pYYYYMM` adıyla oluşturulur; aralık dışı
+kayıtlar `<tablo>_pdefault` bölümüne düşer.
+
+ORM ve migration uyumluluğu için notlar:
+- Bölümlenmiş tabloda birincil anahtar bölüm kolonunu içermek zorundadır:
+  (id, date). Django modeli birincil anahtarı yine `id` olarak görür; id değerleri
+  tek bir dizi (sequence) ile üretildiğinden tekil kalır.
+- Bu nedenle bölümlenmiş tablolara başka tablolardan veritabanı düzeyinde yabancı
+  anahtar tanımlanamaz. Modellerde kısıtlar tanımlı kalır; `convert_table` tabloya
+  işaret eden kısıtları yalnızca tabloyu gerçekten bölümlerken ve aynı transaction
+  içinde kaldırır (dönüşüm başarısız olursa kısıtlar geri gelir). Bölümlenmiş
+  kurulumlarda on_delete davranışı yalnızca ORM tarafından uygulanır; bu alanları
+  değiştiren migration'lar `AlterFieldUnlessPartitioned` kullanır.
+- Bölüm kolonunu içermeyen tekil kısıtlar (örn. Payment.appointment OneToOne)
+  aynı adla ve bölüm kolonu eklenerek yeniden oluşturulur. Bu indeks tek başına
+  özgün tekilliği SAĞLAMAZ (aynı randevuya farklı tarihli iki ödeme girebilir);
+  özgün kolonlar üzerindeki tekillik bunun yerine tablo tetikleyicisiyle
+  (`<kısıt>_guard`) korunur: tetikleyici aynı değerler için danışma kilidi
+  (advisory lock) alır ve çakışan satır varsa unique_violation (IntegrityError) fırlatır.
+- Sonraki migration'lardaki ADD COLUMN / CREATE INDEX işlemleri ana (parent)
+  tabloya uygulanır ve tüm bölümlere yayılır. Bölüm kolonunu içermeyen yeni
+  tekil kısıtlar eklenemez.
+"""
+
+import re
+from datetime import date, datetime, time, timedelta
+
+from django.db import connection, migrations, transaction
+from django.utils import timezone
+
+DEFAULT_SUFFIX = '_pdefault'
+PARTITION_NAME_RE = re.compile(r'_p(\d{4})(\d{2})$')
+INDEX_DEF_RE = re.compile(r'^CREATE (UNIQUE )?INDEX (\S+) ON (?:ONLY )?(\S+) USING (\w+) \((.*)\)(.*)$')
+
+
+class PartitioningError(Exception):
+    """Bölümleme işlemi yapılamadığında fırlatılır."""
+
+
+def partitioned_models():
+    """Bölümlenebilen tablolar: anahtar -> (model, bölüm kolonu)."""
+    from payments.models import Payment
+    from .models import Appointment
+    return {
+        'appointments': (Appointment, 'date'),
+        'payments': (Payment, 'payment_date'),
+    }
+
+
+def _require_postgresql():
+    if connection.vendor != 'postgresql':
+        raise PartitioningError("Tablo bölümleme yalnızca PostgreSQL üzerinde desteklenir.")
+
+
+def _qn(name):
+    return connection.ops.quote_name(name)
+
+
+def _month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def _add_months(value, months):
+    month_index = value.year * 12 + (value.month - 1) + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _bound(month):
+    # Ay sınırları yerel saat diliminde (Europe/Istanbul) gece yarısıdır
+    return datetime.combine(month, time.min, tzinfo=timezone.get_current_timezone())
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y%m}"
+
+
+def _is_partitioned(cursor, table):
+    cursor.execute(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+        [table]
+    )
+    return cursor.fetchone() is not None
+
+
+def is_partitioned(table):
+    _require_postgresql()
+    with connection.cursor() as cursor:
+        return _is_partitioned(cursor, table)
+
+
+class AlterFieldUnlessPartitioned(migrations.AlterField):
+    """
+    Bölümlenebilen bir tabloya işaret eden yabancı anahtarı değiştiren AlterField.
+    Hedef tablo PostgreSQL'de bölümlenmişse veritabanı işlemi atlanır (kısıt
+    tanımlanamaz); model durumu her durumda güncellenir.
+    """
+
+    def _target_partitioned(self, schema_editor, state, app_label):
+        if schema_editor.connection.vendor != 'postgresql':
+            return False
+        field = state.apps.get_model(app_label, self.model_name_lower)._meta.get_field(self.name)
+        with schema_editor.connection.cursor() as cursor:
+            return _is_partitioned(cursor, field.related_model._meta.db_table)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not self._target_partitioned(schema_editor, to_state, app_label):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not self._target_partitioned(schema_editor, to_state, app_label):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def list_partitions(table):
+    """(bölüm adı, sınır ifadesi, tahmini satır sayısı) listesini döndürür."""
+    _require_postgresql()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid), child.reltuples::bigint "
+            "FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = %s AND pg_table_is_visible(parent.oid) "
+            "ORDER BY child.relname",
+            [table]
+        )
+        return cursor.fetchall()
+
+
+def _table_indexes(cursor, table):
+    """Birincil anahtar dışındaki indeksler: (ad, tanım, kısıt türü veya None)."""
+    cursor.execute(
+        "SELECT ic.relname, pg_get_indexdef(ix.indexrelid), con.contype "
+        "FROM pg_index ix "
+        "JOIN pg_class t ON t.oid = ix.indrelid "
+        "JOIN pg_class ic ON ic.oid = ix.indexrelid "
+        "LEFT JOIN pg_constraint con ON con.conindid = ix.indexrelid AND con.conrelid = t.oid "
+        "WHERE t.relname = %s AND pg_table_is_visible(t.oid) AND NOT ix.indisprimary",
+        [table]
+    )
+    return cursor.fetchall()
+
+
+def _foreign_keys(cursor, table):
+    """Tablodan diğer tablolara giden yabancı anahtarlar: (ad, tanım)."""
+    cursor.execute(
+        "SELECT con.conname, pg_get_constraintdef(con.oid) "
+        "FROM pg_constraint con JOIN pg_class t ON t.oid = con.conrelid "
+        "WHERE t.relname = %s AND pg_table_is_visible(t.oid) AND con.contype = 'f'",
+        [table]
+    )
+    return cursor.fetchall()
+
+
+def _table_triggers(cursor, table):
+    """Tablodaki kullanıcı tetikleyicilerinin tanımları (kısıt tetikleyicileri hariç)."""
+    cursor.execute(
+        "SELECT pg_get_triggerdef(tg.oid) "
+        "FROM pg_trigger tg JOIN pg_class t ON t.oid = tg.tgrelid "
+        "WHERE t.relname = %s AND pg_table_is_visible(t.oid) AND NOT tg.tgisinternal "
+        "ORDER BY tg.tgname",
+        [table]
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _referencing_foreign_keys(cursor, table):
+    """Bu tabloya işaret eden yabancı anahtarlar: (kaynak tablo, ad, tanım)."""
+    cursor.execute(
+        "SELECT src.relname, con.conname, pg_get_constraintdef(con.oid) "
+        "FROM pg_constraint con "
+        "JOIN pg_class src ON src.oid = con.conrelid "
+        "JOIN pg_class dst ON dst.oid = con.confrelid "
+        "WHERE dst.relname = %s AND pg_table_is_visible(dst.oid) AND con.contype = 'f'",
+        [table]
+    )
+    return cursor.fetchall()
+
+
+def _rebuild_index_sql(definition, name, table, column, contype=None):
+    """
+    Eski tablodaki indeks veya tekil kısıt tanımını yeni (bölümlenmiş) tabloya uyarlar.
+    Tekil indekslere/kısıtlara bölüm kolonu eklenir; PostgreSQL bölümlenmiş tablolarda
+    bunu zorunlu tutar. Kısıtlar, Django migration'larının adıyla bulabilmesi için
+    yine kısıt olarak (aynı adla) oluşturulur.
+    """
+    match = INDEX_DEF_RE.match(definition)
+    if not match:
+        raise PartitioningError(f"İndeks tanımı çözümlenemedi: {definition}")
+    unique, _old_name, _old_table, method, columns, rest = match.groups()
+    if unique and column not in [part.strip().strip('"') for part in columns.split(',')]:
+        columns = f"{columns}, {_qn(column)}"
+    if contype == 'u':
+        return f"ALTER TABLE {_qn(table)} ADD CONSTRAINT {_qn(name)} UNIQUE ({columns})"
+    if contype:
+        raise PartitioningError(f"Desteklenmeyen kısıt türü ({contype}): {name}")
+    return f"CREATE {unique or ''}INDEX {_qn(name)} ON {_qn(table)} USING {method} ({columns}){rest}"
+
+
+def _widened_unique_columns(definition, column):
+    """Bölüm kolonunu içermeyen tekil indeksin özgün kolonları (değilse None)."""
+    match = INDEX_DEF_RE.match(definition)
+    unique, columns = match.group(1), match.group(5)
+    names = [part.strip().strip('"') for part in columns.split(',')]
+    if not unique or column in names or not all(re.fullmatch(r'\w+', name) for name in names):
+        return None
+    return names
+
+
+def _unique_guard_sql(name, table, columns):
+    """
+    Bölümlenmiş tabloda özgün kolonlar üzerindeki tekilliği koruyan tetikleyici.
+    Aynı değerleri yazan eşzamanlı işlemler danışma kilidiyle sıraya girer; çakışan
+    satır varsa unique_violation (Django'da IntegrityError) fırlatılır. Varlık kontrolü
+    bölüm kolonu eklenmiş tekil indeksin ön ekini kullanır.
+    """
+    function = f"{name[:57]}_guard"
+    matches = ' AND '.join(f"{_qn(col)} = NEW.{_qn(col)}" for col in columns)
+    values = ', '.join(f"NEW.{_qn(col)}" for col in columns)
+    return [
+        f"""CREATE OR REPLACE FUNCTION {_qn(function)}() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('{name}'), hashtext(concat_ws('|', {values})));
+    IF EXISTS (SELECT 1 FROM {_qn(table)} WHERE {matches} AND id <> NEW.id) THEN
+        RAISE unique_violation USING MESSAGE = 'duplicate key value violates unique constraint "{name}"';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql""",
+        f"CREATE TRIGGER {_qn(function)} BEFORE INSERT OR UPDATE OF {', '.join(_qn(col) for col in columns)} "
+        f"ON {_qn(table)} FOR EACH ROW EXECUTE FUNCTION {_qn(function)}()",
+    ]
+
+
+def create_partition(cursor, table, column, month):
+    """
+    Verilen ay için bölüm oluşturur. Varsayılan (default) bölümde bu aya ait kayıt varsa
+    PostgreSQL bölüm oluşturmayı reddeder; bu durumda kayıtlar yeni bölüme taşınır.
+    """
+    name = partition_name(table, month)
+    start, end = month, _add_months(month, 1)
+    default = f"{table}{DEFAULT_SUFFIX}"
+
+    cursor.execute("SELECT to_regclass(%s)", [name])
+    if cursor.fetchone()[0] is not None:
+        return False
+
+    start, end = _bound(start), _bound(end)
+    cursor.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {_qn(default)} WHERE {_qn(column)} >= %s AND {_qn(column)} < %s)",
+        [start, end]
+    )
+    has_default_rows = cursor.fetchone()[0]
+
+    if has_default_rows:
+        cursor.execute(f"ALTER TABLE {_qn(table)} DETACH PARTITION {_qn(default)}")
+    cursor.execute(
+        f"CREATE TABLE {_qn(name)} PARTITION OF {_qn(table)} FOR VALUES FROM (%s) TO (%s)",
+        [start, end]
+    )
+    if has_default_rows:
+        cursor.execute(
+            f"INSERT INTO {_qn(table)} SELECT * FROM {_qn(default)} "
+            f"WHERE {_qn(column)} >= %s AND {_qn(column)} < %s",
+            [start, end]
+        )
+        cursor.execute(
+            f"DELETE FROM {_qn(default)} WHERE {_qn(column)} >= %s AND {_qn(column)} < %s",
+            [start, end]
+        )
+        cursor.execute(f"ALTER TABLE {_qn(table)} ATTACH PARTITION {_qn(default)} DEFAULT")
+    return True
+
+
+def convert_table(key, months_ahead=3, keep_old=False, log=print):
+    """
+    Mevcut (bölümlenmemiş) tabloyu aylık bölümlenmiş tabloya dönüştürür.
+    İşlem tek bir transaction içinde ve tablo kilitliyken yapılır; büyük tablolarda
+    bakım penceresinde çalıştırılmalıdır.
+    """
+    _require_postgresql()
+    model, column = partitioned_models()[key]
+    table = model._meta.db_table
+    old_table = f"{table}_unpartitioned"
+    sequence = f"{table}_id_part_seq"
+
+    if is_partitioned(table):
+        raise PartitioningError(f"{table} zaten bölümlenmiş.")
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {_qn(table)} IN ACCESS EXCLUSIVE MODE")
+        # Bölümlenmiş tabloya yabancı anahtar tanımlanamaz: bu tabloya işaret eden kısıtlar
+        # kaldırılır. DDL transaction içindedir; dönüşüm başarısız olursa kısıtlar geri gelir.
+        referencing = _referencing_foreign_keys(cursor, table)
+        for src, name, _definition in referencing:
+            cursor.execute(f"ALTER TABLE {_qn(src)} DROP CONSTRAINT {_qn(name)}")
+        indexes = _table_indexes(cursor, table)
+        foreign_keys = _foreign_keys(cursor, table)
+        # Tanımlar yeniden adlandırmadan önce okunur; böylece özgün tablo adını taşırlar
+        triggers = _table_triggers(cursor, table)
+
+        # 1. Eski tabloyu ve indekslerini kenara al (adlar yeni tabloda yeniden kullanılacak)
+        cursor.execute(f"ALTER TABLE {_qn(table)} RENAME TO {_qn(old_table)}")
+        cursor.execute(f"ALTER TABLE {_qn(old_table)} RENAME CONSTRAINT {_qn(table + '_pkey')} TO {_qn(old_table[:58] + '_pkey')}")
+        for name, _definition, contype in indexes:
+            renamed = f"{name[:55]}_old"
+            if contype:
+                cursor.execute(f"ALTER TABLE {_qn(old_table)} RENAME CONSTRAINT {_qn(name)} TO {_qn(renamed)}")
+            else:
+                cursor.execute(f"ALTER INDEX {_qn(name)} RENAME TO {_qn(renamed)}")
+
+        # 2. Bölümlenmiş tabloyu oluştur
+        cursor.execute(
+            f"CREATE TABLE {_qn(table)} (LIKE {_qn(old_table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({_qn(column)})"
+        )
+        cursor.execute(f"ALTER TABLE {_qn(table)} ADD CONSTRAINT {_qn(table + '_pkey')} PRIMARY KEY (id, {_qn(column)})")
+
+        # 3. id üretimi: kimlik (identity) kolonu yerine tabloya ait bir dizi
+        cursor.execute(f"CREATE SEQUENCE {_qn(sequence)}")
+        cursor.execute(f"SELECT setval(%s, COALESCE((SELECT MAX(id) FROM {_qn(old_table)}), 0) + 1, false)", [sequence])
+        cursor.execute(f"ALTER TABLE {_qn(table)} ALTER COLUMN id SET DEFAULT nextval(%s::regclass)", [sequence])
+        cursor.execute(f"ALTER SEQUENCE {_qn(sequence)} OWNED BY {_qn(table)}.id")
+
+        # 4. Bölümler: mevcut verinin ilk ayından itibaren + ileriye dönük aylar + varsayılan bölüm
+        cursor.execute(f"CREATE TABLE {_qn(table + DEFAULT_SUFFIX)} PARTITION OF {_qn(table)} DEFAULT")
+        cursor.execute(f"SELECT MIN({_qn(column)}) FROM {_qn(old_table)}")
+        first = cursor.fetchone()[0]
+        current = _month_start(timezone.localdate())
+        month = _month_start(timezone.localtime(first).date()) if first else current
+        last = _add_months(current, months_ahead)
+        created = 0
+        guarded = []
+        while month <= last:
+            created += create_partition(cursor, table, column, month)
+            month = _add_months(month, 1)
+
+        # 5. Veriyi taşı; indeksleri, dış yabancı anahtarları ve tetikleyicileri (örn. not
+        #    arama kolonu) yeniden oluştur. Tetikleyiciler taşımadan sonra kurulur; taşınan
+        #    satırlar hesaplanmış değerleriyle kopyalanır.
+        cursor.execute(f"INSERT INTO {_qn(table)} SELECT * FROM {_qn(old_table)}")
+        moved = cursor.rowcount
+        for name, definition, contype in indexes:
+            cursor.execute(_rebuild_index_sql(definition, name, table, column, contype))
+            columns = _widened_unique_columns(definition, column)
+            if columns:
+                for statement in _unique_guard_sql(name, table, columns):
+                    cursor.execute(statement)
+                guarded.append(name)
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {_qn(table)} ADD CONSTRAINT {_qn(name)} {definition}")
+        for definition in triggers:
+            cursor.execute(definition)
+
+        if not keep_old:
+            cursor.execute(f"DROP TABLE {_qn(old_table)}")
+        cursor.execute(f"ANALYZE {_qn(table)}")
+
+    log(f"{table}: {moved} kayıt taşındı, {created} aylık bölüm oluşturuldu.")
+    if guarded:
+        log(
+            f"{table}: tekil kısıtlara bölüm kolonu eklendi ({', '.join(guarded)}); "
+            "özgün kolonlardaki tekillik tetikleyiciyle korunuyor."
+        )
+    if referencing:
+        # Tablo eski haline getirilirse (keep_old ile) kısıtlar bu ifadelerle geri eklenir
+        log(f"{table} tablosuna işaret eden {len(referencing)} yabancı anahtar kısıtı kaldırıldı:")
+        for src, name, definition in referencing:
+            log(f"  ALTER TABLE {_qn(src)} ADD CONSTRAINT {_qn(name)} {definition};")
+    return moved, created
+
+
+def ensure_future_partitions(key, months_ahead=3):
+    """Bu ay ve sonraki `months_ahead` ay için eksik bölümleri oluşturur."""
+    _require_postgresql()
+    model, column = partitioned_models()[key]
+    table = model._meta.db_table
+    if not is_partitioned(table):
+        raise PartitioningError(f"{table} bölümlenmiş değil; önce 'convert' çalıştırın.")
+    current = _month_start(timezone.localdate())
+    created = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            created += create_partition(cursor, table, column, _add_months(current, offset))
+    return created
+
+
+def detach_old_partitions(key, older_than_months, archive_schema=None, drop=False):
+    """
+    Üst sınırı bugünden `older_than_months` ay öncesinden eski olan bölümleri ana
+    tablodan ayırır (DETACH). Ayrılan bölümler ORM sorgularında görünmez;
+    archive_schema verilirse o şemaya taşınır, drop=True ise silinir.
+    Randevu ve ödeme tabloları aynı süreyle birlikte işlenmelidir.
+    """
+    _require_postgresql()
+    model, _column = partitioned_models()[key]
+    table = model._meta.db_table
+    cutoff = _add_months(_month_start(timezone.localdate()), -older_than_months)
+    detached = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        if archive_schema:
+            cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {_qn(archive_schema)}")
+        for name, _bound, _rows in list_partitions(table):
+            match = PARTITION_NAME_RE.search(name)
+            if not match:
+                continue
+            month = date(int(match.group(1)), int(match.group(2)), 1)
+            if _add_months(month, 1) > cutoff:
+                continue
+            cursor.execute(f"ALTER TABLE {_qn(table)} DETACH PARTITION {_qn(name)}")
+            if drop:
+                cursor.execute(f"DROP TABLE {_qn(name)}")
+            elif archive_schema:
+                cursor.execute(f"ALTER TABLE {_qn(name)} SET SCHEMA {_qn(archive_schema)}")
+            detached.append(name)
+        if detached and model._meta.label == 'appointments.Appointment':
+            # Tarih hiyerarşisinin aylık sayıları ayrılan aylar için yeniden sayılır (bkz. appointments.rollups)
+            from .models import AppointmentMonthCount
+            from . import rollups
+            rollups.recount(AppointmentMonthCount.objects.filter(month__lte=cutoff).values_list('month', flat=True))
+        if detached:
+            # Ayrılan bölümlerdeki randevu/ödemeler panel sayaçlarından ve müşteri istatistiklerinden düşer
+            from . import client_stats, counters
+            counters.reconcile()
+            client_stats.reconcile()
+    return detached
+
+
+def explain_recent(key, days=90):
+    """
+    Son `days` güne ait COUNT sorgusunun planını döndürür ve planda taranan
+    bölümleri listeler; bölüm budama (partition pruning) çalışıyorsa yalnızca
+    ilgili aylar görünür.
+    """
+    _require_postgresql()
+    model, column = partitioned_models()[key]
+    table = model._meta.db_table
+    since = timezone.now() - timedelta(days=days)
+    plan = model._base_manager.filter(**{f'{column}__gte': since}).values('pk').explain()
+    scanned = sorted(set(re.findall(rf'\b({re.escape(table)}_p(?:\d{{6}}|default))\b', plan)))
+    total = len(list_partitions(table))
+    return plan, scanned, total
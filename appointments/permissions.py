@@ -0,0 +1,223 @@
+# appointments/permissions.py
+"""
+Randevu ve ödemeler için merkezi yetki kontrolleri.
+
+Nesne düzeyindeki kontroller (can_view, can_edit, can_cancel, can_pay) yüklenmiş
+randevunun alanları üzerinden yapılır; temsilci sorumluluğu gerektiğinde
+AppointmentAgentAccess tablosunda tek bir EXISTS sorgusu çalışır. Liste görünümleri, yönetim paneli ve JSON uç noktaları
+aynı kuralları scope_appointments / scope_payments ile sorgu düzeyinde uygular.
+"""
+
+from decimal import Decimal
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.http import Http404
+
+from accounts.models import CustomerAgent
+from .models import Appointment, AppointmentAgentAccess
+
+AssignedClient = CustomerAgent.assigned_clients.through
+
+OPEN_STATUSES = ('pending', 'confirmed')
+
+
+# --- Rol Yardımcıları ---
+
+def is_admin(user):
+    """
+    Her kaydı görebilen yönetici rolü: user_type == 'admin' veya süper kullanıcı.
+    Eski görünümler yalnızca user_type == 'admin' kontrol ediyordu; createsuperuser ile
+    açılan hesaplar varsayılan 'client' türünde kaldığından süper kullanıcılar da yöneticidir.
+    """
+    return user.is_authenticated and (user.user_type == 'admin' or user.is_superuser)
+
+
+def is_staff_user(user):
+    """
+    Yönetim tarafı seçimleri (tüm müşteriler, temsilci ataması): yönetici rolü veya
+    personel (is_staff) kullanıcılar. Personel kayıtların tamamını görmez (bkz. is_admin).
+    """
+    return is_admin(user) or (user.is_authenticated and user.is_staff)
+
+
+def agent_profile_of(user):
+    """Kullanıcının temsilci profilini, yoksa None döndürür."""
+    if not user.is_authenticated or user.user_type != 'agent':
+        return None
+    try:
+        return user.agent_profile
+    except ObjectDoesNotExist:
+        return None
+
+
+def expert_profile_of(user):
+    """Kullanıcının uzman profilini, yoksa None döndürür."""
+    if not user.is_authenticated or user.user_type != 'expert':
+        return None
+    try:
+        return user.expert_profile
+    except ObjectDoesNotExist:
+        return None
+
+
+def is_assigned_client(agent, client_id):
+    """Müşterinin temsilciye atanmış olup olmadığını tek bir EXISTS sorgusuyla kontrol eder."""
+    return AssignedClient.objects.filter(customeragent=agent, customuser_id=client_id).exists()
+
+
+# --- Sorgu Düzeyinde Kapsamlama ---
+
+def appointments_for_agent(agent, queryset=None, prefix=''):
+    """
+    Temsilcinin sorumlu olduğu kayıtları (kendisine atanmış randevular veya
+    atanmış müşterilerinin randevuları) döndürür. Sorumluluk bilgisi
+    AppointmentAgentAccess tablosunda denormalize tutulduğundan sorgu, (agent,
+    appointment) indeksi üzerinden tek bir eşitlik araması olur; (appointment,
+    agent) benzersiz olduğu için mükerrer satır oluşmaz ve distinct() gerekmez.
+    """
+    if queryset is None:
+        queryset = Appointment.objects.all()
+    return queryset.filter(**{f'{prefix}agent_access__agent': agent})
+
+
+def payments_for_agent(agent, queryset=None):
+    """Temsilcinin sorumlu olduğu randevulara ait ödemeleri döndürür."""
+    if queryset is None:
+        from payments.models import Payment
+        queryset = Payment.objects.all()
+    return appointments_for_agent(agent, queryset, prefix='appointment__')
+
+
+def sub_agent_earnings():
+    """
+    CustomerAgent sorgularına eklenecek ifade: alt temsilcilerin kendi randevularındaki
+    (appointment.agent) hesaplanmış temsilci komisyonlarından üst temsilciye düşen pay
+    (toplam × alt_temsilci_komisyon_orani / 100; temsilci kazanç sayfasıyla aynı hesap).
+    Komisyon randevunun temsilcisine yazıldığından AppointmentAgentAccess üzerinden
+    gidilmez; o tabloda randevu başına birden çok sorumlu temsilci olabilir ve ödeme
+    birden çok kez sayılırdı. Tüm satırlar için tek bir ilişkili alt sorgudur.
+    """
+    from payments.models import Payment
+    money = DecimalField(max_digits=14, decimal_places=2)
+    totals = Payment.objects.filter(
+        is_commission_calculated=True, appointment__agent__ust_temsilci=OuterRef('pk')
+    ).order_by().values('appointment__agent__ust_temsilci').annotate(
+        total=Sum('agent_commission')
+    ).values('total')
+    return ExpressionWrapper(
+        Coalesce(Subquery(totals, output_field=money), Value(Decimal('0.00')), output_field=money)
+        * F('alt_temsilci_komisyon_orani') / Value(Decimal('100')),
+        output_field=money,
+    )
+
+
+def scope_appointments(user, queryset=None, prefix=''):
+    """Kullanıcının görebileceği randevularla sınırlandırılmış sorguyu döndürür."""
+    if queryset is None:
+        queryset = Appointment.objects.all()
+    if not user.is_authenticated:
+        return queryset.none()
+    if is_admin(user):
+        return queryset
+    if user.user_type == 'client':
+        return queryset.filter(**{f'{prefix}client': user})
+    if user.user_type == 'expert':
+        expert = expert_profile_of(user)
+        return queryset.filter(**{f'{prefix}expert': expert}) if expert else queryset.none()
+    if user.user_type == 'agent':
+        agent = agent_profile_of(user)
+        return appointments_for_agent(agent, queryset, prefix=prefix) if agent else queryset.none()
+    return queryset.none()
+
+
+def scope_payments(user, queryset=None):
+    """Kullanıcının görebileceği ödemelerle sınırlandırılmış sorguyu döndürür."""
+    if queryset is None:
+        from payments.models import Payment
+        queryset = Payment.objects.all()
+    return scope_appointments(user, queryset, prefix='appointment__')
+
+
+# --- Nesne Düzeyinde Kontroller ---
+
+def _is_agent_of(user, appointment):
+    agent = agent_profile_of(user)
+    if agent is None:
+        return False
+    return appointment.agent_id == agent.pk or AppointmentAgentAccess.objects.filter(
+        appointment_id=appointment.pk, agent=agent
+    ).exists()
+
+
+def can_view(user, appointment):
+    """Admin, randevunun müşterisi, uzmanı veya sorumlu temsilcisi randevuyu görebilir."""
+    if not user.is_authenticated:
+        return False
+    if is_admin(user):
+        return True
+    if user.user_type == 'client':
+        return appointment.client_id == user.pk
+    if user.user_type == 'expert':
+        expert = expert_profile_of(user)
+        return expert is not None and appointment.expert_id == expert.pk
+    if user.user_type == 'agent':
+        return _is_agent_of(user, appointment)
+    return False
+
+
+def can_edit(user, appointment):
+    """Randevuyu görebilen roller (admin, müşteri, uzman, temsilci) düzenleyebilir."""
+    return can_view(user, appointment)
+
+
+def can_cancel(user, appointment):
+    """Admin, randevu sahibi müşteri veya sorumlu temsilci randevuyu iptal edebilir."""
+    if not user.is_authenticated:
+        return False
+    if is_admin(user):
+        return True
+    if user.user_type == 'client':
+        return appointment.client_id == user.pk
+    if user.user_type == 'agent':
+        return _is_agent_of(user, appointment)
+    return False
+
+
+def can_pay(user, appointment):
+    """Admin, sorumlu temsilci veya randevunun uzmanı ödeme kaydedebilir."""
+    if not user.is_authenticated:
+        return False
+    if is_admin(user):
+        return True
+    if user.user_type == 'agent':
+        return _is_agent_of(user, appointment)
+    if user.user_type == 'expert':
+        expert = expert_profile_of(user)
+        return expert is not None and appointment.expert_id == expert.pk
+    return False
+
+
+def is_payable(appointment):
+    """Tamamlanmamış ve ödemesi alınmamış randevular için ödeme kaydedilebilir."""
+    return appointment.status != 'completed' and not appointment.payment_status
+
+
+# --- İstek Bazında Önbellek ---
+
+def get_appointment(request, pk):
+    """
+    Randevuyu ilişkili kayıtlarıyla birlikte bir kez yükler ve istek nesnesinde saklar.
+    Aynı istekte test_func, get_form_kwargs, get_object gibi çağrılar aynı nesneyi kullanır.
+    """
+    cache = request.__dict__.setdefault('_appointment_cache', {})
+    pk = int(pk)
+    if pk not in cache:
+        try:
+            cache[pk] = Appointment.objects.select_related(
+                'client', 'expert__user', 'agent__user'
+            ).get(pk=pk)
+        except Appointment.DoesNotExist:
+            raise Http404("Randevu bulunamadı.")
+    return cache[pk]
@@ -0,0 +1,116 @@
+# appointments/rollups.py
+"""
+Aylık randevu sayıları (AppointmentMonthCount).
+
+Yönetim panelinin tarih hiyerarşisi (bkz. appointments.changelist) yıl ve ay
+bağlantılarını bu tablodan üretir; milyonlarca satırlık randevu tablosunda
+`SELECT DISTINCT date_trunc(...)` taraması yapılmaz.
+
+- Tekil kayıt/silme: sinyaller `adjust` ile ilgili ayı ±1 günceller (F ifadesi, yarış yok).
+- Toplu ekleme (legacy_import): `count_created` eklenen randevuların aylarını artırır.
+- Toplu silme (arşivleme): `batched()` bloğu içinde sinyallerin farkları biriktirilir ve
+  blok sonunda ay başına tek güncelleme yapılır.
+- Bölüm ayırma (partitioning.detach_old_partitions): `recount` ile ilgili aylar yeniden sayılır.
+- `rebuild` tabloyu tek bir gruplama sorgusuyla baştan hesaplar (`rebuild_month_counts` komutu);
+  sinyal tetiklemeyen harici işlemlerden sonra kullanılır.
+Sayısı sıfıra inen aylar silinir; tabloda yalnızca randevusu olan aylar bulunur.
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, time
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Appointment, AppointmentMonthCount
+
+_pending = ContextVar('rollup_pending', default=None)
+
+
+def month_of(moment):
+    """Anın yerel saate göre ayının ilk günü."""
+    local = timezone.localtime(moment) if timezone.is_aware(moment) else moment
+    return date(local.year, local.month, 1)
+
+
+def _next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def month_range(month):
+    """Ayın [başlangıç, bitiş) anları (yerel saat)."""
+    return (
+        timezone.make_aware(datetime.combine(month, time.min)),
+        timezone.make_aware(datetime.combine(_next_month(month), time.min)),
+    )
+
+
+@contextmanager
+def batched():
+    """Blok içindeki `adjust` çağrılarını biriktirir ve blok sonunda tek seferde uygular."""
+    pending = Counter()
+    token = _pending.set(pending)
+    try:
+        yield
+    finally:
+        _pending.reset(token)
+    adjust(pending)
+
+
+def adjust(deltas):
+    """{ay: fark} sözlüğünü uygular; satırı olmayan ay için satır açar, sıfıra inen ayı siler."""
+    pending = _pending.get()
+    if pending is not None:
+        pending.update(deltas)
+        return
+    for month, delta in deltas.items():
+        if not delta:
+            continue
+        updated = AppointmentMonthCount.objects.filter(month=month).update(total=F('total') + delta)
+        if not updated and delta > 0:
+            try:
+                with transaction.atomic():
+                    AppointmentMonthCount.objects.create(month=month, total=delta)
+            except IntegrityError:
+                # Eşzamanlı bir istek satırı az önce açtı
+                AppointmentMonthCount.objects.filter(month=month).update(total=F('total') + delta)
+        elif delta < 0:
+            AppointmentMonthCount.objects.filter(month=month, total__lte=0).delete()
+
+
+def count_created(dates):
+    """Toplu eklenen randevuların tarihlerine göre ayları artırır."""
+    return adjust(Counter(month_of(moment) for moment in dates))
+
+
+def recount(months):
+    """Verilen ayları randevu tablosundan (ay aralığıyla, indeksli) yeniden sayar."""
+    for month in set(months):
+        start, end = month_range(month)
+        total = Appointment.objects.filter(date__gte=start, date__lt=end).count()
+        if total:
+            AppointmentMonthCount.objects.update_or_create(month=month, defaults={'total': total})
+        else:
+            AppointmentMonthCount.objects.filter(month=month).delete()
+
+
+def rebuild():
+    """Tabloyu baştan hesaplar; oluşturulan ay sayısını döndürür."""
+    rows = [
+        AppointmentMonthCount(month=month_of(month), total=total)
+        for month, total in Appointment.objects.annotate(month=TruncMonth('date')).order_by().values('month')
+        .annotate(total=Count('pk')).values_list('month', 'total')
+    ]
+    with transaction.atomic():
+        AppointmentMonthCount.objects.all().delete()
+        AppointmentMonthCount.objects.bulk_create(rows)
+    return len(rows)
+
+
+def months():
+    """Randevusu olan aylar (ilk gün), eskiden yeniye."""
+    return list(AppointmentMonthCount.objects.filter(total__gt=0).values_list('month', flat=True))
@@ -0,0 +1,217 @@
+# appointments/scheduling.py
+"""
+Uzman ve kaynak (oda, cihaz) kısıtlı randevu planlaması.
+
+Müsaitlik aralık listeleri üzerinden hesaplanır; her liste başlangıca göre sıralı,
+çakışmayan (başlangıç, bitiş) çiftleridir ve işlemler tek geçişlik taramalardır
+(interval sweep):
+- Uzman: derlenmiş günlük program (appointments.availability) - aktif randevular.
+- Kaynak: kullanım sayısının kapasitenin altında kaldığı aralıklar.
+- Hizmet: gerektirdiği her kaynak türü için o türdeki kaynakların birleşimi,
+  türler arasında kesişim. Randevu için son aralık uzman ∩ hizmet olur.
+
+`DayPlan` bir günün tüm uzman ve kaynak verisini sabit sayıda sorguyla yükler; müsait
+saat servisi bütün uzmanlar için tek seferde cevap verir.
+
+Kaynak ataması (`allocate`) randevu kaydedilirken yapılır: aday kaynak satırları
+SELECT ... FOR UPDATE ile (kimlik sırasıyla, kilitlenme olmaması için) kilitlenir,
+kullanım yeniden sayılır ve boş kaynak yoksa ResourceUnavailableError yükseltilir.
+Aynı cihazı aynı saate iki uzman ayıramaz.
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .intervals import below_capacity, intersect, subtract, union
+from . import availability
+from .models import Appointment, AppointmentResource, Resource
+
+# Randevular bu uzunlukta kabul edilir ve müsait saatler bu adımla listelenir
+SLOT = timedelta(minutes=15)
+ACTIVE_STATUSES = ('pending', 'confirmed')
+
+
+class ResourceUnavailableError(Exception):
+    """Randevunun gerektirdiği türde boş kaynak kalmadı."""
+
+
+# --- Kaynak gereksinimleri ---
+
+def resource_pools(resources):
+    """{hizmet tipi: {kaynak türü: [kaynak kimlikleri]}}"""
+    pools = defaultdict(lambda: defaultdict(list))
+    for resource in resources:
+        for service_type in resource.service_types:
+            pools[service_type][resource.kind].append(resource.pk)
+    return pools
+
+
+def day_window(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+class DayPlan:
+    """Bir günün uzman ve kaynak müsaitliği; tüm veriler sabit sayıda sorguyla yüklenir."""
+
+    def __init__(self, day, expert_ids=None):
+        self.day = day
+        self.window = day_window(day)
+        tz = timezone.get_current_timezone()
+
+        appointments = Appointment.objects.filter(
+            date__gte=self.window[0], date__lt=self.window[1], status__in=ACTIVE_STATUSES
+        )
+        if expert_ids is not None:
+            appointments = appointments.filter(expert_id__in=expert_ids)
+
+        # Derlenmiş günlük program (bkz. appointments.availability): uzman başına tek satır
+        working = {
+            expert_id: [
+                (datetime.combine(day, start).replace(tzinfo=tz), datetime.combine(day, end).replace(tzinfo=tz))
+                for start, end in intervals
+            ]
+            for expert_id, (intervals, _on_holiday) in availability.day_schedules(day, expert_ids).items()
+        }
+        booked = defaultdict(list)
+        for expert_id, start in appointments.values_list('expert_id', 'date'):
+            booked[expert_id].append((start, start + SLOT))
+        self.working = {expert_id: union(intervals) for expert_id, intervals in working.items()}
+        self.expert_free = {
+            expert_id: subtract(intervals, union(booked[expert_id]))
+            for expert_id, intervals in self.working.items()
+        }
+
+        resources = list(Resource.objects.filter(is_active=True))
+        self.pools = resource_pools(resources)
+        usages = defaultdict(list)
+        for resource_id, start, end in AppointmentResource.objects.filter(
+            start__lt=self.window[1], end__gt=self.window[0]
+        ).values_list('resource_id', 'start', 'end'):
+            usages[resource_id].append((start, end))
+        self.resource_free = {
+            resource.pk: below_capacity(self.window, usages[resource.pk], resource.capacity)
+            for resource in resources
+        }
+        self._service_free = {}
+
+    def service_free(self, service_type):
+        """Hizmetin gerektirdiği tüm kaynak türlerinde en az bir kaynağın boş olduğu aralıklar."""
+        if service_type not in self._service_free:
+            free = [self.window]
+            for resource_ids in self.pools.get(service_type, {}).values():
+                free = intersect(free, union(*(self.resource_free[pk] for pk in resource_ids)))
+            self._service_free[service_type] = free
+        return self._service_free[service_type]
+
+    def free_intervals(self, expert_id, service_type=None):
+        free = self.expert_free.get(expert_id, [])
+        if service_type:
+            free = intersect(free, self.service_free(service_type))
+        return free
+
+    def slots(self, expert_id, service_type=None, not_before=None):
+        """
+        Randevunun tamamen boş aralığa sığdığı başlangıç saatleri. Saatler, uzmanın
+        çalışma aralığının başından itibaren SLOT adımlarıyla sıralanır.
+        """
+        free = self.free_intervals(expert_id, service_type)
+        result = []
+        i = 0
+        for start, end in self.working.get(expert_id, []):
+            moment = start
+            while moment + SLOT <= end:
+                while i < len(free) and free[i][1] < moment + SLOT:
+                    i += 1
+                if i == len(free):
+                    return result
+                if free[i][0] <= moment and (not_before is None or moment >= not_before):
+                    result.append(moment)
+                moment += SLOT
+        return result
+
+
+def _usage(resource_ids, start, end, exclude_appointment=None):
+    overlapping = AppointmentResource.objects.filter(resource_id__in=resource_ids, start__lt=end, end__gt=start)
+    if exclude_appointment:
+        overlapping = overlapping.exclude(appointment_id=exclude_appointment)
+    return dict(overlapping.values('resource_id').annotate(n=Count('id')).values_list('resource_id', 'n'))
+
+
+def missing_resources(service_type, start, exclude_appointment=None):
+    """Form doğrulaması için (kilitsiz): boş kaynağı kalmayan türlerin adları."""
+    resources = list(Resource.objects.filter(is_active=True))
+    pools = resource_pools(resources).get(service_type, {})
+    if not pools:
+        return []
+    capacity = {resource.pk: resource.capacity for resource in resources}
+    usage = _usage(capacity, start, start + SLOT, exclude_appointment)
+    kinds = dict(Resource.KIND_CHOICES)
+    return [
+        kinds[kind] for kind, resource_ids in sorted(pools.items())
+        if all(usage.get(pk, 0) >= capacity[pk] for pk in resource_ids)
+    ]
+
+
+def allocate(appointment):
+    """
+    Randevunun kaynaklarını (yeniden) atar. Aktif olmayan randevuların kaynakları
+    bırakılır. Boş kaynak yoksa ResourceUnavailableError yükseltir.
+    """
+    with transaction.atomic():
+        AppointmentResource.objects.filter(appointment_id=appointment.pk).delete()
+        if appointment.status not in ACTIVE_STATUSES:
+            return []
+
+        start, end = appointment.date, appointment.date + SLOT
+        candidates = Resource.objects.filter(is_active=True)
+        if connection.features.supports_json_field_contains:
+            candidates = candidates.filter(service_types__contains=[appointment.service_type])
+        # Kimlik sırasıyla kilitlenir; eşzamanlı iki atama birbirini bekler, kilitlenme oluşmaz
+        resources = [
+            resource for resource in candidates.select_for_update().order_by('pk')
+            if appointment.service_type in resource.service_types
+        ]
+        if not resources:
+            return []
+        usage = _usage([resource.pk for resource in resources], start, end)
+
+        chosen = []
+        for kind, resource_ids in sorted(resource_pools(resources)[appointment.service_type].items()):
+            free = [resource for resource in resources
+                    if resource.pk in resource_ids and usage.get(resource.pk, 0) < resource.capacity]
+            if not free:
+                raise ResourceUnavailableError(
+                    f"{appointment.date.astimezone(timezone.get_current_timezone()):%d.%m.%Y %H:%M} için boş "
+                    f"{dict(Resource.KIND_CHOICES)[kind].lower()} kalmadı ({appointment.get_service_type_display()}). "
+                    f"Lütfen başka bir saat seçin."
+                )
+            chosen.append(free[0])
+        return AppointmentResource.objects.bulk_create([
+            AppointmentResource(appointment_id=appointment.pk, resource=resource, start=start, end=end)
+            for resource in chosen
+        ])
+
+
+def release(appointment_ids):
+    """Toplu iptallerde (sinyal tetiklenmez) kaynakları bırakır."""
+    return AppointmentResource.objects.filter(appointment_id__in=list(appointment_ids)).delete()[0]
+
+
+class ResourceConflictMixin:
+    """
+    Randevu oluşturma/düzenleme görünümleri için: kayıt kendi savepoint'inde yapılır;
+    kaynak kalmadıysa değişiklik geri alınır ve hata formda gösterilir.
+    """
+
+    def form_valid(self, form):
+        try:
+            with transaction.atomic():
+                return super().form_valid(form)
+        except ResourceUnavailableError as exc:
+            form.add_error('date', str(exc))
+            return self.form_invalid(form)
@@ -0,0 +1,358 @@
+# appointments/signals.py
+"""
+Randevu–temsilci görünürlük tablosunu (AppointmentAgentAccess) güncel tutan ve
+durum geçişlerini geçmişe (AppointmentStatusChange) işleyen, randevunun oda/cihaz
+atamalarını (AppointmentResource), uzmanların derlenmiş günlük programlarını
+(ExpertDaySchedule), takvim beslemelerinin değişiklik sayaçlarını (CalendarFeed), aylık
+randevu sayılarını (AppointmentMonthCount) ve uzman/temsilci panel sayaçlarını
+(appointments.counters; randevu ve ödeme yazımları) ve müşteri istatistiklerini
+(appointments.client_stats) yenileyen sinyaller. SQLite geliştirme
+veritabanında not arama dizininin tetikleyicileri her migrate sonunda denetlenir.
+Toplu işlemler (bulk_create, update, toplu silme) sinyal tetiklemediğinden bu yollar
+aynı kancaları appointments.bulk üzerinden tek seferde çalıştırır.
+"""
+
+from django.db import connections
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_migrate, post_save
+from django.dispatch import receiver
+
+from accounts.models import CustomerAgent, CustomUser, Expert
+from payments.models import Payment
+from . import availability, client_stats, counters, history, ical, notes_search, rollups, scheduling
+from .models import Appointment, ExpertAvailability, ExpertAvailabilityOverride, ExpertHoliday
+from .visibility import sync_appointments, sync_clients
+
+
+# Kaynak atamasını (appointments.scheduling) etkileyen alanlar
+APPOINTMENT_SCHEDULE_FIELDS = ('date', 'service_type', 'status')
+# Panel sayaçlarını (appointments.counters) etkileyen alanlar
+APPOINTMENT_COUNTER_FIELDS = ('expert_id', 'agent_id', 'date', 'status')
+PAYMENT_COUNTER_FIELDS = ('appointment_id', 'payment_date', 'is_commission_calculated', 'expert_commission', 'agent_commission')
+# Müşteri istatistiklerini (appointments.client_stats) etkileyen alanlar
+APPOINTMENT_CLIENT_FIELDS = ('client_id', 'date', 'status', 'service_type', 'amount', 'payment_status')
+PAYMENT_CLIENT_FIELDS = ('appointment_id', 'amount_paid', 'payment_date')
+
+
+def _field_state(instance, names):
+    """Alanların yüklü değerleri; biri ertelenmişse (defer/only) None."""
+    values = instance.__dict__
+    if any(name not in values for name in names):
+        return None
+    return tuple(values[name] for name in names)
+
+
+@receiver(post_init, sender=Appointment)
+def remember_visibility_fields(sender, instance, **kwargs):
+    """Kayıttan sonra değişip değişmediğini anlamak için agent/client değerlerini saklar."""
+    # only()/defer() ile yüklenmiş nesnelerde ek sorgu (ve post_init içinde sonsuz yeniden yükleme)
+    # tetiklememek için doğrudan __dict__ okunur
+    instance._visibility_snapshot = (instance.__dict__.get('agent_id'), instance.__dict__.get('client_id'))
+    instance._status_snapshot = instance.__dict__.get('status')
+    instance._schedule_snapshot = _field_state(instance, APPOINTMENT_SCHEDULE_FIELDS)
+    instance._calendar_snapshot = tuple(instance.__dict__.get(name) for name in ('client_id', 'expert_id', 'agent_id', 'date'))
+    instance._rollup_snapshot = instance.__dict__.get('date')
+    instance._counter_snapshot = _field_state(instance, APPOINTMENT_COUNTER_FIELDS)
+    instance._client_stats_snapshot = _field_state(instance, APPOINTMENT_CLIENT_FIELDS)
+
+
+@receiver(post_save, sender=Appointment)
+def sync_appointment_visibility(sender, instance, created, raw=False, **kwargs):
+    """Yeni randevu oluşturulduğunda veya temsilcisi/müşterisi değiştiğinde erişim satırlarını günceller."""
+    if raw:
+        return
+    current = (instance.agent_id, instance.client_id)
+    if created or getattr(instance, '_visibility_snapshot', None) != current:
+        sync_appointments([instance.pk])
+    instance._visibility_snapshot = current
+
+
+@receiver(post_save, sender=Appointment)
+def record_status_change(sender, instance, created, raw=False, **kwargs):
+    """Yeni randevunun ilk durumunu ve sonraki her durum değişikliğini geçmişe ekler."""
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_status_snapshot', None)
+    changed = not created and previous is not None and previous != instance.status
+    if created or changed:
+        history.record(instance.pk, previous, instance.status)
+    instance._status_snapshot = instance.status
+    # Değişiklik akışı (notifications.outbox) durum geçişlerini ayırt edebilsin diye
+    instance._status_changed = changed
+
+
+@receiver(post_save, sender=Appointment)
+def allocate_resources(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """
+    Saat, hizmet tipi veya durum değiştiğinde kaynakları yeniden atar; yalnızca not, ücret
+    gibi alanları değişen kayıtta atama (silme, kilitleme, yeniden ekleme) yapılmaz. Boş kaynak
+    yoksa ResourceUnavailableError kaydı yapan işlemi geri aldırır (bkz. ResourceConflictMixin).
+    """
+    if raw:
+        return
+    if not created and update_fields is not None and not set(update_fields) & set(APPOINTMENT_SCHEDULE_FIELDS):
+        # VersionedModel yalnızca değişen alanları yazar; atamayı etkileyen alan yazılmadı
+        return
+    previous = None if created else getattr(instance, '_schedule_snapshot', None)
+    current = _field_state(instance, APPOINTMENT_SCHEDULE_FIELDS)
+    if previous is not None and previous == current:
+        return
+    # Ertelenmiş alanlarla yüklenmiş randevuda eski değerler bilinmez; atama yeniden yapılır
+    scheduling.allocate(instance)
+    instance._schedule_snapshot = _field_state(instance, APPOINTMENT_SCHEDULE_FIELDS)
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def touch_calendar_feeds(sender, instance, raw=False, **kwargs):
+    """Randevunun (ve değiştiyse önceki) müşteri, uzman ve temsilcisinin takvim beslemelerini değişmiş işaretler."""
+    if raw:
+        return
+    current = (instance.client_id, instance.expert_id, instance.agent_id, instance.date)
+    previous = getattr(instance, '_calendar_snapshot', None) or current
+    instance._calendar_snapshot = current
+    # Önceki tarih de bakılır: pencereden dışarı taşınan randevu beslemeden çıkmalıdır
+    if not ical.in_window(current[3], previous[3]):
+        return
+    ical.touch(
+        client_ids={values[0] for values in (current, previous) if values[0]},
+        expert_ids={values[1] for values in (current, previous) if values[1]},
+        agent_ids={values[2] for values in (current, previous) if values[2]},
+    )
+
+
+@receiver(post_save, sender=Appointment)
+def count_month_on_save(sender, instance, created, raw=False, **kwargs):
+    """Yeni randevunun ayını artırır; tarihi başka aya taşınan randevuyu eski aydan yeni aya aktarır."""
+    if raw:
+        return
+    current = instance.__dict__.get('date')
+    previous = getattr(instance, '_rollup_snapshot', None)
+    instance._rollup_snapshot = current
+    if current is None:
+        return
+    if created:
+        rollups.adjust({rollups.month_of(current): 1})
+    elif previous is not None and rollups.month_of(previous) != rollups.month_of(current):
+        rollups.adjust({rollups.month_of(previous): -1, rollups.month_of(current): 1})
+
+
+@receiver(post_delete, sender=Appointment)
+def count_month_on_delete(sender, instance, **kwargs):
+    """Silinen randevunun ayını azaltır (arşivleme bunu rollups.batched() ile toplu yapar)."""
+    moment = instance.__dict__.get('date')
+    if moment is not None:
+        rollups.adjust({rollups.month_of(moment): -1})
+
+
+@receiver(post_save, sender=Appointment)
+def count_dashboard_on_save(sender, instance, created, raw=False, **kwargs):
+    """Uzman/temsilci panel sayaçlarına randevunun eski ve yeni durumunun farkını ekler."""
+    if raw or counters.is_suppressed():
+        return
+    previous = None if created else getattr(instance, '_counter_snapshot', None)
+    current = _field_state(instance, APPOINTMENT_COUNTER_FIELDS)
+    instance._counter_snapshot = current
+    if previous is None and not created or current is None:
+        # Ertelenmiş alanlarla yüklenmiş randevu: eski durum bilinmez, güncel sahipler yeniden sayılır
+        for kind, owner_id in (('expert', instance.expert_id), ('agent', instance.agent_id)):
+            if owner_id:
+                counters.recount(kind, [owner_id])
+        return
+    if previous == current:
+        return
+    counters.track_appointment(previous, current)
+    if previous is not None and previous[:2] != current[:2]:
+        # Ödeme komisyonu randevunun uzman/temsilcisine yazılır; sahip değişince komisyon da taşınır
+        for payment in counters.payment_states([instance.pk]):
+            counters.track_payment((*previous[:2], *payment[2:]), payment)
+
+
+@receiver(post_delete, sender=Appointment)
+def count_dashboard_on_delete(sender, instance, **kwargs):
+    if not counters.is_suppressed():
+        counters.track_appointment(_field_state(instance, APPOINTMENT_COUNTER_FIELDS), None)
+
+
+@receiver(post_save, sender=Appointment)
+def refresh_client_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    """Müşteri, tarih, durum, hizmet, ücret veya ödeme durumu değiştiyse eski ve yeni müşterinin istatistiklerini yeniler."""
+    if raw or client_stats.is_suppressed():
+        return
+    previous = None if created else getattr(instance, '_client_stats_snapshot', None)
+    current = _field_state(instance, APPOINTMENT_CLIENT_FIELDS)
+    instance._client_stats_snapshot = current
+    if previous is not None and previous == current:
+        return
+    # Ertelenmiş alanlarla yüklenmiş randevuda eski durum bilinmez; güncel müşteri yenilenir
+    client_stats.refresh({instance.client_id, previous[0] if previous else None})
+
+
+@receiver(post_delete, sender=Appointment)
+def refresh_client_stats_on_delete(sender, instance, **kwargs):
+    if not client_stats.is_suppressed():
+        client_stats.refresh([instance.client_id])
+
+
+@receiver(post_init, sender=Payment)
+def remember_payment_counter_fields(sender, instance, **kwargs):
+    instance._counter_snapshot = _field_state(instance, PAYMENT_COUNTER_FIELDS)
+    instance._client_stats_snapshot = _field_state(instance, PAYMENT_CLIENT_FIELDS)
+
+
+def _payment_owners(instance, appointment_id):
+    """Ödemenin randevusunun (uzman, temsilci) değerleri; randevu nesnesi yüklüyse sorgu yapılmaz."""
+    if Payment.appointment.is_cached(instance) and instance.appointment.pk == appointment_id:
+        return instance.appointment.expert_id, instance.appointment.agent_id
+    return Appointment.objects.filter(pk=appointment_id).values_list('expert_id', 'agent_id').first() or (None, None)
+
+
+@receiver(post_save, sender=Payment)
+def count_commission_on_save(sender, instance, created, raw=False, **kwargs):
+    """Uzman/temsilci panellerindeki komisyon toplamlarını ödemenin farkıyla günceller."""
+    if raw or counters.is_suppressed():
+        return
+    previous = None if created else getattr(instance, '_counter_snapshot', None)
+    current = _field_state(instance, PAYMENT_COUNTER_FIELDS)
+    instance._counter_snapshot = current
+    if previous == current or current is None:
+        return
+    owners = _payment_owners(instance, current[0])
+    if previous is None and not created:
+        # Ertelenmiş alanlarla yüklenmiş ödeme: eski durum bilinmez, randevunun sahipleri yeniden sayılır
+        for kind, owner_id in zip(('expert', 'agent'), owners):
+            if owner_id:
+                counters.recount(kind, [owner_id])
+        return
+    if previous is not None:
+        previous_owners = owners if previous[0] == current[0] else _payment_owners(instance, previous[0])
+        previous = (*previous_owners, *previous[1:])
+    counters.track_payment(previous, (*owners, *current[1:]))
+
+
+@receiver(post_delete, sender=Payment)
+def count_commission_on_delete(sender, instance, **kwargs):
+    state = _field_state(instance, PAYMENT_COUNTER_FIELDS)
+    if state is not None and not counters.is_suppressed():
+        counters.track_payment((*_payment_owners(instance, state[0]), *state[1:]), None)
+
+
+def _refresh_payment_clients(instance, appointment_ids):
+    """Ödemenin randevularının müşterilerini yeniler; randevu nesnesi yüklüyse sorgu yapılmaz."""
+    appointment_ids = set(appointment_ids) - {None}
+    if Payment.appointment.is_cached(instance) and appointment_ids == {instance.appointment.pk}:
+        client_stats.refresh([instance.appointment.client_id])
+    else:
+        client_stats.refresh_appointments(appointment_ids)
+
+
+@receiver(post_save, sender=Payment)
+def refresh_client_stats_on_payment_save(sender, instance, created, raw=False, **kwargs):
+    """Ödeme tutarı, tarihi veya randevusu değiştiğinde müşterinin harcama ve son ödeme bilgisini yeniler."""
+    if raw or client_stats.is_suppressed():
+        return
+    previous = None if created else getattr(instance, '_client_stats_snapshot', None)
+    current = _field_state(instance, PAYMENT_CLIENT_FIELDS)
+    instance._client_stats_snapshot = current
+    if previous is not None and previous == current:
+        return
+    _refresh_payment_clients(instance, {instance.appointment_id, previous[0] if previous else None})
+
+
+@receiver(post_delete, sender=Payment)
+def refresh_client_stats_on_payment_delete(sender, instance, **kwargs):
+    if not client_stats.is_suppressed():
+        _refresh_payment_clients(instance, {instance.appointment_id})
+
+
+@receiver(m2m_changed, sender=CustomerAgent.assigned_clients.through)
+def sync_assignment_visibility(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Temsilci–müşteri atamaları değiştiğinde etkilenen müşterilerin randevularını günceller.
+    İlişki her iki yönden de (agent.assigned_clients / user.agents) değiştirilebilir.
+    """
+    if action == 'pre_clear':
+        # clear() sonrasında hangi müşterilerin etkilendiği bilinemeyeceği için önceden saklanır.
+        if reverse:
+            instance._cleared_client_ids = [instance.pk]
+        else:
+            instance._cleared_client_ids = list(instance.assigned_clients.values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        client_ids = getattr(instance, '_cleared_client_ids', [])
+    elif action in ('post_add', 'post_remove'):
+        client_ids = [instance.pk] if reverse else list(pk_set or ())
+    else:
+        return
+    if client_ids:
+        sync_clients(client_ids)
+
+
+# --- Uzman günlük programı ---
+# Değişiklikten önceki değerler de saklanır; örneğin tarihi değiştirilen bir iznin eski günleri de yeniden derlenir.
+
+SCHEDULE_SOURCES = {
+    ExpertAvailability: ('expert_id', 'day_of_week'),
+    ExpertHoliday: ('expert_id', 'start_date', 'end_date'),
+    ExpertAvailabilityOverride: ('expert_id', 'date'),
+}
+
+
+def _refresh_schedule(sender, values):
+    if values[0] is None:
+        return
+    if sender is ExpertAvailability:
+        availability.refresh_weekday(*values)
+    elif sender is ExpertHoliday:
+        availability.refresh_range(*values)
+    else:
+        expert_id, day = values
+        availability.refresh_range(expert_id, day, day)
+
+
+def remember_schedule_source(sender, instance, **kwargs):
+    instance._schedule_source = tuple(instance.__dict__.get(name) for name in SCHEDULE_SOURCES[sender])
+
+
+def refresh_schedule_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    current = tuple(getattr(instance, name) for name in SCHEDULE_SOURCES[sender])
+    previous = getattr(instance, '_schedule_source', None)
+    if previous and previous != current:
+        _refresh_schedule(sender, previous)
+    _refresh_schedule(sender, current)
+    instance._schedule_source = current
+
+
+def refresh_schedule_on_delete(sender, instance, **kwargs):
+    _refresh_schedule(sender, tuple(getattr(instance, name) for name in SCHEDULE_SOURCES[sender]))
+
+
+for source in SCHEDULE_SOURCES:
+    post_init.connect(remember_schedule_source, sender=source)
+    post_save.connect(refresh_schedule_on_save, sender=source)
+    post_delete.connect(refresh_schedule_on_delete, sender=source)
+
+
+@receiver(post_save, sender=Expert)
+def compile_new_expert_schedule(sender, instance, created, raw=False, **kwargs):
+    """Derlenmiş günlerde her uzmanın satırı bulunsun diye yeni uzmanın programı yazılır."""
+    if created and not raw:
+        availability.add_expert(instance.pk)
+
+
+@receiver(post_save, sender=CustomUser)
+def open_client_stats_row(sender, instance, created, raw=False, using=None, **kwargs):
+    """Yeni müşterinin istatistik satırı kullanıcıyla birlikte (aynı veritabanında) açılır; listeler okurken satır oluşturmaz."""
+    if created and not raw and instance.user_type == 'client':
+        client_stats.create_rows([instance.pk], using=using)
+
+
+@receiver(post_migrate)
+def restore_notes_search_triggers(sender, using='default', **kwargs):
+    """SQLite'ta tabloyu yeniden oluşturan migration'lar FTS tetikleyicilerini siler; eksikler kurulur."""
+    if getattr(sender, 'label', None) != 'appointments':
+        return
+    connection = connections[using]
+    if connection.vendor == 'sqlite' and notes_search.FTS_TABLE in connection.introspection.table_names():
+        notes_search.ensure_sqlite_index(connection)
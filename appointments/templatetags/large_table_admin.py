@@ -0,0 +1,62 @@
+# appointments/templatetags/large_table_admin.py
+"""
+Büyük tablo yönetim listelerinin tarih hiyerarşisi (bkz. appointments.changelist).
+
+Django'nun `date_hierarchy` etiketi yıl ve ay bağlantıları için tablonun tamamında
+`SELECT DISTINCT date_trunc(...)` çalıştırır. Liste ay sayıları tablosunu
+kullanabiliyorsa (changelist.hierarchy_months) yıl ve ay seçenekleri oradan üretilir;
+diğer durumlarda varsayılan etiket kullanılır.
+"""
+
+from django import template
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+from django.utils import formats
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+register = template.Library()
+
+
+@register.inclusion_tag('admin/date_hierarchy.html')
+def month_count_date_hierarchy(cl):
+    months = getattr(cl, 'hierarchy_months', None)
+    if months is None:
+        return date_hierarchy(cl)
+
+    field_name = cl.date_hierarchy
+    year_field = f'{field_name}__year'
+    month_field = f'{field_name}__month'
+    year_lookup = cl.params.get(year_field)
+
+    def link(filters):
+        return cl.get_query_string(filters, [f'{field_name}__'])
+
+    if not year_lookup and months and months[0].year == months[-1].year:
+        if months[0] == months[-1]:
+            # Tüm kayıtlar tek ayda: varsayılan etiket gün seçeneklerini o ayla sınırlı okur
+            return date_hierarchy(cl)
+        year_lookup = months[0].year
+
+    if year_lookup:
+        try:
+            year = int(year_lookup)
+        except ValueError:
+            return date_hierarchy(cl)
+        return {
+            'show': True,
+            'back': {'link': link({}), 'title': _('All dates')},
+            'choices': [
+                {
+                    'link': link({year_field: year, month_field: month.month}),
+                    'title': capfirst(formats.date_format(month, 'YEAR_MONTH_FORMAT')),
+                }
+                for month in months if month.year == year
+            ],
+        }
+
+    years = sorted({month.year for month in months})
+    return {
+        'show': True,
+        'back': None,
+        'choices': [{'link': link({year_field: str(year)}), 'title': str(year)} for year in years],
+    }
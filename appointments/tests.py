@@ -1,3 +1,842 @@
-from django.test import TestCase
+import json
+import tempfile
+import unittest
+from io import StringIO
+from unittest import mock
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts import autocomplete
+from accounts.models import CustomUser, CustomerAgent, Expert
+from payments.models import Payment
+from payments.views import PaymentCreateView
+from notifications.models import OutboxEvent
+from . import (
+    availability, bulk, counters, history, ical, idempotency, legacy_import, notes_search, partitioning, permissions,
+    scheduling, views,
+)
+from .versioning import ConcurrentUpdateError
+from .models import (
+    Appointment, AppointmentAgentAccess, AppointmentResource, AppointmentStatusChange, ArchivedAppointment,
+    ExpertAvailability, ExpertAvailabilityOverride, ExpertDashboardCounters, ExpertDaySchedule, ExpertHoliday,
+    IdempotencyRecord, Resource,
+)
+
+
+def create_appointments(expert, client, count, **fields):
+    """Sinyalleri tetiklemeden (bulk_create) gelecekte `count` randevu oluşturur."""
+    start = timezone.now() + timedelta(days=1)
+    return Appointment.objects.bulk_create([
+        Appointment(expert=expert, client=client, date=start + timedelta(hours=index), **fields)
+        for index in range(count)
+    ])
+
+
+def create_people(prefix=''):
+    """Testler için uzman ve müşteri oluşturur: (uzman, müşteri)."""
+    expert_user = CustomUser.objects.create_user(f'{prefix}dr', password='x', user_type='expert')
+    expert = Expert.objects.create(user=expert_user, specialization='Dermatoloji')
+    client = CustomUser.objects.create_user(f'{prefix}client', password='x', user_type='client')
+    return expert, client
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "Tablo bölümleme yalnızca PostgreSQL'de çalışır.")
+class PartitioningTests(TestCase):
+    """manage_partitions convert sonrası bölüm budaması ve korunan kısıtlar."""
+
+    MONTHS = 8
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.expert, cls.client_user = create_people()
+        now = timezone.now()
+        # Son MONTHS ay boyunca her 10 günde bir randevu (sinyaller bu testin konusu değil)
+        cls.appointments = Appointment.objects.bulk_create([
+            Appointment(expert=cls.expert, client=cls.client_user, date=now - timedelta(days=days),
+                        status='completed', amount=Decimal('100.00'))
+            for days in range(0, cls.MONTHS * 30, 10)
+        ])
+
+    def test_recent_query_scans_only_recent_partitions(self):
+        partitioning.convert_table('appointments', months_ahead=1, log=lambda message: None)
+        table = Appointment._meta.db_table
+        self.assertTrue(partitioning.is_partitioned(table))
+
+        days = 40
+        plan, scanned, total = partitioning.explain_recent('appointments', days=days)
+        first_month = partitioning._month_start(timezone.localtime(timezone.now() - timedelta(days=days)).date())
+        current_month = partitioning._month_start(timezone.localdate())
+
+        self.assertIn(partitioning.partition_name(table, current_month), scanned, plan)
+        self.assertLess(len(scanned), total, plan)
+        for name in scanned:
+            match = partitioning.PARTITION_NAME_RE.search(name)
+            if match:
+                month = date(int(match.group(1)), int(match.group(2)), 1)
+                self.assertGreaterEqual(month, first_month, f"{name} budanmadı:\n{plan}")
+        # Taşınan veri ORM'den aynen okunur
+        self.assertEqual(Appointment.objects.count(), len(self.appointments))
+
+    def test_convert_drops_referencing_constraints_only_when_partitioning(self):
+        table = Appointment._meta.db_table
+        with connection.cursor() as cursor:
+            self.assertTrue(partitioning._referencing_foreign_keys(cursor, table))
+        partitioning.convert_table('appointments', months_ahead=1, log=lambda message: None)
+        with connection.cursor() as cursor:
+            self.assertEqual(partitioning._referencing_foreign_keys(cursor, table), [])
+
+    def test_partitioned_payments_keep_one_payment_per_appointment(self):
+        appointment = self.appointments[0]
+        Payment.objects.bulk_create([Payment(appointment=appointment, amount_paid=Decimal('100.00'))])
+        partitioning.convert_table('payments', months_ahead=1, log=lambda message: None)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Payment.objects.bulk_create([Payment(appointment=appointment, amount_paid=Decimal('50.00'))])
+        Payment.objects.bulk_create([Payment(appointment=self.appointments[1], amount_paid=Decimal('50.00'))])
+        self.assertEqual(Payment.objects.count(), 2)
+
+
+class LegacyImportTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.state = legacy_import.ImportState(directory.name)
+        self.expert, _client = create_people()
+
+    def rejected(self):
+        with open(self.state.rejects_path, encoding='utf-8') as handle:
+            return [(entry['kind'], entry['line'], entry['errors']) for entry in map(json.loads, handle)]
+
+    def test_repeated_legacy_ids_are_rejected_per_batch(self):
+        maps = legacy_import.IdMaps()
+        imported = legacy_import.import_clients([
+            (2, {'legacy_id': 'm1', 'username': 'eski1'}),
+            (3, {'legacy_id': 'm1', 'username': 'eski2'}),
+        ], maps, self.state)
+        self.assertEqual(imported, 1)
+
+        date = (timezone.now() + timedelta(days=3)).isoformat()
+        row = {'legacy_id': 'r1', 'client': 'm1', 'expert': self.expert.user.username, 'date': date}
+        imported = legacy_import.import_appointments(
+            [(2, row), (3, dict(row, status='cancelled'))], maps, self.state, check_availability=False,
+        )
+        self.assertEqual(imported, 1)
+
+        payment = {'legacy_id': 'o1', 'appointment': 'r1', 'amount_paid': '100', 'payment_date': date}
+        imported = legacy_import.import_payments([(2, payment), (3, payment)], maps, self.state)
+        self.assertEqual(imported, 1)
+        self.assertEqual(
+            [(kind, line) for kind, line, _errors in self.rejected()],
+            [('clients', 3), ('appointments', 3), ('payments', 3)],
+        )
+
+    def test_payment_for_a_removed_appointment_is_rejected(self):
+        maps = legacy_import.IdMaps()
+        legacy_import.import_clients([(2, {'legacy_id': 'm1'})], maps, self.state)
+        row = {'legacy_id': 'r1', 'client': 'm1', 'expert': self.expert.user.username,
+               'date': (timezone.now() - timedelta(days=3)).isoformat()}
+        legacy_import.import_appointments([(2, row)], maps, self.state, check_availability=False)
+        Appointment.objects.filter(pk=maps.appointments['r1']).delete()
+
+        payment = {'legacy_id': 'o1', 'appointment': 'r1', 'amount_paid': '100', 'payment_date': row['date']}
+        self.assertEqual(legacy_import.import_payments([(2, payment)], maps, self.state), 0)
+        self.assertEqual(self.rejected(), [('payments', 2, ['Eşlenen randevu artık mevcut değil.'])])
+
+
+class AdminChangelistQueryTests(TestCase):
+    """Büyük tablo changelist'leri satır sayısından bağımsız, sabit sayıda sorgu yapar."""
+
+    # Oturum, kullanıcı ve accounts.context_processors.user_roles profil sorguları (uzman, temsilci)
+    PER_REQUEST = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser('yonetici', password='x', user_type='admin')
+        cls.expert, cls.client_user = create_people()
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def assertChangelistQueries(self, url, expected):
+        self.assertEqual(self.client.get(url).status_code, 200)  # katalog önbelleğini ısıtır
+        with self.assertNumQueries(expected + self.PER_REQUEST):
+            self.client.get(url)
+
+    def test_appointment_changelist(self):
+        # COUNT, date_hierarchy aylık sayıları (AppointmentMonthCount), sayfa
+        for count in (2, 20):
+            create_appointments(self.expert, self.client_user, count)
+            self.assertChangelistQueries('/admin/appointments/appointment/', 3)
+
+    def test_payment_changelist(self):
+        # COUNT, sayfa
+        for count in (2, 20):
+            Payment.objects.bulk_create([
+                Payment(appointment=appointment, amount_paid=Decimal('100.00'))
+                for appointment in create_appointments(self.expert, self.client_user, count)
+            ])
+            self.assertChangelistQueries('/admin/payments/payment/', 2)
+
+    def test_agent_changelist(self):
+        # Süzülmüş ve toplam COUNT, alt temsilci kazancı alt sorgulu sayfa
+        parent = None
+        for count in (2, 20):
+            for index in range(count):
+                user = CustomUser.objects.create_user(f'temsilci{count}-{index}', password='x', user_type='agent')
+                agent = CustomerAgent.objects.create(user=user, ust_temsilci=parent)
+                parent = parent or agent
+            self.assertChangelistQueries('/admin/accounts/customeragent/', 3)
+
+
+class SubAgentEarningsTests(TestCase):
+    def test_payment_is_counted_once_for_the_appointment_agent(self):
+        parent = CustomerAgent.objects.create(
+            user=CustomUser.objects.create_user('ust', password='x', user_type='agent'),
+            alt_temsilci_komisyon_orani=Decimal('10'),
+        )
+        first, second = [
+            CustomerAgent.objects.create(
+                user=CustomUser.objects.create_user(f'alt{index}', password='x', user_type='agent'),
+                ust_temsilci=parent,
+            )
+            for index in range(2)
+        ]
+        expert, client = create_people()
+        second.assigned_clients.add(client)
+        appointment = Appointment.objects.create(
+            expert=expert, client=client, agent=first, date=timezone.now() + timedelta(days=1),
+        )
+        # İki alt temsilci de randevudan sorumlu; komisyon yalnızca randevunun temsilcisine yazılır
+        self.assertEqual(AppointmentAgentAccess.objects.filter(appointment=appointment).count(), 2)
+        Payment.objects.bulk_create([Payment(
+            appointment=appointment, amount_paid=Decimal('1000.00'),
+            agent_commission=Decimal('100.00'), is_commission_calculated=True,
+        )])
+        self.assertEqual(parent.get_alt_temsilci_kazanci(), Decimal('10.00'))
+        self.assertEqual(second.get_alt_temsilci_kazanci(), Decimal('0.00'))
+
+
+class AgentAccessTests(TestCase):
+    def setUp(self):
+        self.expert, self.client_user = create_people()
+        self.assigned, self.direct = (
+            CustomerAgent.objects.create(user=CustomUser.objects.create_user(name, password='x', user_type='agent'))
+            for name in ('atanan', 'dogrudan')
+        )
+        self.assigned.assigned_clients.add(self.client_user)
+        self.appointment = Appointment.objects.create(
+            expert=self.expert, client=self.client_user, agent=self.direct, date=timezone.now() + timedelta(days=1),
+        )
+
+    def agents(self):
+        return set(AppointmentAgentAccess.objects.filter(appointment=self.appointment).values_list('agent_id', flat=True))
+
+    def test_rows_follow_the_appointment_agent_and_assignments(self):
+        self.assertEqual(self.agents(), {self.assigned.pk, self.direct.pk})
+        self.appointment.agent = None
+        self.appointment.save()
+        self.assertEqual(self.agents(), {self.assigned.pk})
+
+        self.client_user.agents.remove(self.assigned)
+        self.assertEqual(self.agents(), set())
+        self.direct.assigned_clients.add(self.client_user)
+        self.assertEqual(list(permissions.appointments_for_agent(self.direct)), [self.appointment])
+        self.direct.assigned_clients.clear()
+        self.assertFalse(permissions.appointments_for_agent(self.direct).exists())
+
+    def test_agent_scope_is_one_lookup_on_the_access_table(self):
+        sql = str(permissions.appointments_for_agent(self.assigned).query)
+        self.assertIn(AppointmentAgentAccess._meta.db_table, sql)
+        self.assertNotIn(CustomerAgent.assigned_clients.through._meta.db_table, sql)
+        self.assertNotIn('DISTINCT', sql)
+
+    def test_rebuild_restores_rows(self):
+        AppointmentAgentAccess.objects.all().delete()
+        call_command('rebuild_agent_access', stdout=StringIO())
+        self.assertEqual(self.agents(), {self.assigned.pk, self.direct.pk})
+
+
+class RoleTests(TestCase):
+    def test_admin_and_staff_roles(self):
+        expert, client = create_people()
+        create_appointments(expert, client, 2)
+        superuser = CustomUser.objects.create_superuser('kok', password='x')  # varsayılan tür 'client'
+        staff = CustomUser.objects.create_user('personel', password='x', is_staff=True)
+
+        self.assertTrue(permissions.is_admin(superuser))
+        self.assertEqual(permissions.scope_appointments(superuser).count(), 2)
+        # Personel yönetim seçimlerini yapabilir ama kayıtların tamamını görmez
+        self.assertFalse(permissions.is_admin(staff))
+        self.assertFalse(permissions.scope_appointments(staff).exists())
+        self.assertTrue(all(map(permissions.is_staff_user, (superuser, staff))))
+        self.assertIn(client, autocomplete.client_choices(staff))
+        self.assertIsNone(autocomplete.client_choices(client))
+
+    def test_superusers_are_admins_on_every_page(self):
+        superuser = CustomUser.objects.create_superuser('kok', password='x')
+        self.client.force_login(superuser)
+        for url in ('/payments/monthly-summary/', '/hesap/uzman-paneli/', '/appointments/randevu/olustur/'):
+            self.assertEqual(self.client.get(url).status_code, 200, url)
+        request = RequestFactory().get('/')
+        request.user = superuser
+        for view in (views.ExpertAppointmentListView, views.AgentAppointmentListView):
+            self.assertTrue(view(request=request).test_func())
+
+
+class VersioningTests(TestCase):
+    def setUp(self):
+        expert, client = create_people()
+        self.pk = create_appointments(expert, client, 1)[0].pk
+
+    def test_assigned_deferred_fields_are_saved(self):
+        appointment = Appointment.objects.only('pk', 'status', 'version').get(pk=self.pk)
+        appointment.notes = 'ertelenmiş alan'
+        self.assertIn('notes', appointment.dirty_fields())
+        appointment.save()
+        self.assertEqual(Appointment.objects.get(pk=self.pk).notes, 'ertelenmiş alan')
+
+        # Ertelenmiş alanı yalnızca okumak onu değişmiş saymaz
+        appointment = Appointment.objects.only('pk', 'version').get(pk=self.pk)
+        self.assertEqual(appointment.notes, 'ertelenmiş alan')
+        self.assertEqual(appointment.dirty_fields(), {})
+
+    def test_unchanged_save_still_checks_the_version(self):
+        stale = Appointment.objects.get(pk=self.pk)
+        fresh = Appointment.objects.get(pk=self.pk)
+        fresh.notes = 'başka kullanıcı'
+        fresh.save()
+
+        with self.assertRaises(ConcurrentUpdateError):
+            stale.save()
+
+        receiver = mock.Mock()
+        post_save.connect(receiver, sender=Appointment)
+        try:
+            fresh.save()
+        finally:
+            post_save.disconnect(receiver, sender=Appointment)
+        self.assertEqual(receiver.call_count, 1)
+        self.assertEqual(receiver.call_args.kwargs['update_fields'], {'version'})
+        self.assertEqual(Appointment.objects.get(pk=self.pk).version, 3)
+
+
+class IdempotencyTests(TestCase):
+    """Tekillik anahtarları ödeme oluşturma görünümü üzerinden (IdempotentPostMixin + JSONFormMixin)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user('yonetici', password='x', user_type='admin')
+        expert, client = create_people()
+        cls.appointment = Appointment.objects.create(
+            expert=expert, client=client, date=timezone.now() + timedelta(days=1), amount=Decimal('150.00'),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.url = f'/payments/create/{self.appointment.pk}/'
+        self.data = {'amount_paid': '150.00', 'payment_method': 'cash', 'appointment_version': self.appointment.version}
+
+    def post_form(self, key, **changes):
+        return self.client.post(self.url, {**self.data, **changes, idempotency.FIELD: key})
+
+    def post_json(self, key, **changes):
+        return self.client.post(
+            self.url, json.dumps({**self.data, **changes}), content_type='application/json',
+            headers={idempotency.HEADER: key},
+        )
+
+    def test_redirect_is_replayed(self):
+        first = self.post_form('f1')
+        replayed = self.post_form('f1')
+        self.assertEqual((first.status_code, replayed.status_code), (302, 302))
+        self.assertEqual(replayed['Location'], first['Location'])
+        self.assertEqual(replayed['Idempotent-Replayed'], 'true')
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_json_created_response_is_replayed(self):
+        first = self.post_json('j1')
+        replayed = self.post_json('j1')
+        self.assertEqual((first.status_code, replayed.status_code), (201, 201))
+        self.assertEqual(replayed.json(), first.json())
+        self.assertEqual(first.json()['id'], Payment.objects.get().pk)
+        self.assertNotIn('Idempotent-Replayed', first)
+        self.assertEqual(replayed['Idempotent-Replayed'], 'true')
+
+    def test_key_reused_for_a_different_request_is_rejected(self):
+        self.post_json('j2')
+        self.assertEqual(self.post_json('j2', amount_paid='100.00').status_code, 422)
+        self.assertEqual(Payment.objects.get().amount_paid, Decimal('150.00'))
+
+    def test_validation_error_releases_the_key(self):
+        response = self.post_json('j3', amount_paid='yüz')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('amount_paid', response.json()['errors'])
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+        self.assertEqual(self.post_json('j3').status_code, 201)
+        self.assertEqual(IdempotencyRecord.objects.get().status_code, 201)
+
+    def test_rolled_back_first_request_lets_the_retry_run(self):
+        with mock.patch.object(PaymentCreateView, 'form_valid', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.post_form('f2')
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+        response = self.post_form('f2')
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_claim_returns_the_existing_record(self):
+        record, existing = idempotency.claim(self.admin, 'c1', 'özet')
+        self.assertIsNone(existing)
+        self.assertEqual(idempotency.claim(self.admin, 'c1', 'özet'), (record, record))
+
+    def test_request_still_running_is_a_conflict(self):
+        with mock.patch.object(idempotency, 'claim', side_effect=OperationalError):
+            response = self.post_json('j4')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(Payment.objects.exists())
+
+    def test_invalid_json_body(self):
+        response = self.client.post(self.url, '[1, 2]', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(self.url, '{', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class StatusHistoryBufferTests(TestCase):
+    """İşlem içindeki geçişler kayıt noktası seviyesinde tamponlanır ve on_commit ile yazılır."""
+
+    def test_rolled_back_savepoints_drop_their_entries(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                history.record(1, 'pending', 'confirmed')
+                history.record(2, 'pending', 'cancelled')
+            try:
+                with transaction.atomic():
+                    history.record(3, 'pending', 'completed')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.assertFalse(AppointmentStatusChange.objects.exists())
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(
+            sorted(AppointmentStatusChange.objects.values_list('appointment_id', 'to_status')),
+            [(1, 'confirmed'), (2, 'cancelled')],
+        )
+
+
+class StatusHistoryTransactionTests(TransactionTestCase):
+    def test_entries_after_a_rolled_back_transaction_are_written(self):
+        try:
+            with transaction.atomic():
+                history.record(1, 'pending', 'confirmed')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        with transaction.atomic():
+            history.record(2, 'pending', 'confirmed')
+            with transaction.atomic():
+                history.record(3, 'confirmed', 'completed')
+        self.assertEqual(sorted(AppointmentStatusChange.objects.values_list('appointment_id', flat=True)), [2, 3])
+
+    def test_saves_in_one_transaction_are_written_with_one_insert(self):
+        expert, client = create_people()
+        appointments = list(Appointment.objects.filter(
+            pk__in=[appointment.pk for appointment in create_appointments(expert, client, 3)]
+        ))
+        try:
+            with transaction.atomic():
+                appointments[0].status = 'cancelled'
+                appointments[0].save()
+                raise RuntimeError
+        except RuntimeError:
+            appointments[0].refresh_from_db()
+
+        table = AppointmentStatusChange._meta.db_table
+        with CaptureQueriesContext(connection) as queries, transaction.atomic():
+            for appointment in appointments:
+                appointment.status = 'confirmed'
+                appointment.save()
+            # Geri alınan kayıt noktasındaki geçiş yazılmaz
+            try:
+                with transaction.atomic():
+                    appointments[0].status = 'completed'
+                    appointments[0].save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        inserts = [query for query in queries if query['sql'].startswith(f'INSERT INTO "{table}"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            sorted(AppointmentStatusChange.objects.values_list('appointment_id', 'to_status')),
+            sorted((appointment.pk, 'confirmed') for appointment in appointments),
+        )
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        # Uzman adları katalogdan okunur; sürüm on_commit ile arttığından test işleminde önbellek temizlenir
+        cache.clear()
+        self.expert, self.client_user = create_people()
+        now = timezone.now()
+        self.old, self.recent, self.open = Appointment.objects.bulk_create([
+            Appointment(expert=self.expert, client=self.client_user, date=now - timedelta(days=800),
+                        status='completed', amount=Decimal('150.00')),
+            Appointment(expert=self.expert, client=self.client_user, date=now - timedelta(days=10), status='completed'),
+            Appointment(expert=self.expert, client=self.client_user, date=now - timedelta(days=900), status='pending'),
+        ])
+        Payment.objects.create(appointment=self.old, amount_paid=Decimal('150.00'), payment_method='cash')
+
+    def archive(self, **options):
+        out = StringIO()
+        call_command('archive_appointments', older_than_years=1, sleep=0, stdout=out, **options)
+        return out.getvalue()
+
+    def test_old_closed_appointments_move_with_their_payment(self):
+        self.assertIn('1 randevu arşivlenecek', self.archive(dry_run=True))
+        self.assertTrue(Appointment.objects.filter(pk=self.old.pk).exists())
+
+        self.assertIn('Toplam 1 randevu arşivlendi.', self.archive())
+        self.assertEqual(set(Appointment.objects.values_list('pk', flat=True)), {self.recent.pk, self.open.pk})
+        self.assertFalse(Payment.objects.exists())
+        archived = ArchivedAppointment.objects.get()
+        self.assertEqual((archived.original_id, archived.client_id, archived.status), (self.old.pk, self.client_user.pk, 'completed'))
+        self.assertEqual(Decimal(archived.payment_data['amount_paid']), Decimal('150.00'))
+        self.assertEqual(archived.expert_name, 'dr')  # liste sayfası için katalogdaki ad
+        self.assertIn('Toplam 0 randevu arşivlendi.', self.archive())
+
+    def test_client_pages_through_the_archive(self):
+        self.archive()
+        self.client.force_login(self.client_user)
+        url = f'/appointments/randevu/musteri/{self.client_user.pk}/'
+        response = self.client.get(url)
+        self.assertTrue(response.context['has_archive'])
+        self.assertEqual(len(response.context['client_appointments']), 2)
+        archived = self.client.get(url, {'arsiv': 1}).context['client_appointments']
+        self.assertEqual([row.original_id for row in archived], [self.old.pk])
+
+
+class CounterReconcileTests(TestCase):
+    def test_created_and_drifted_rows_are_reported_separately(self):
+        expert, client = create_people()
+        create_appointments(expert, client, 3, status='completed')
+        self.assertEqual(counters.reconcile(['expert'])['expert'], (1, 1, 0))
+        self.assertEqual(ExpertDashboardCounters.objects.get(expert=expert).completed_count, 3)
+
+        ExpertDashboardCounters.objects.update(completed_count=1)
+        self.assertEqual(counters.reconcile(['expert'])['expert'], (1, 0, 1))
+        self.assertEqual(counters.reconcile(['expert'])['expert'], (1, 0, 0))
+
+        ExpertDashboardCounters.objects.all().delete()
+        out = StringIO()
+        call_command('reconcile_dashboard_counters', kind=['expert'], stdout=out)
+        self.assertIn('1 satır kontrol edildi, 1 satır oluşturuldu, 0 satır düzeltildi.', out.getvalue())
+
+
+class ResourceAllocationSignalTests(TestCase):
+    def setUp(self):
+        expert, client = create_people()
+        Resource.objects.create(name='Oda 1', kind='room', service_types=['botox'])
+        self.appointment = Appointment.objects.create(
+            expert=expert, client=client, date=timezone.now() + timedelta(days=1), service_type='botox',
+        )
+
+    def test_allocation_runs_only_when_date_service_or_status_changes(self):
+        self.assertEqual(AppointmentResource.objects.filter(appointment=self.appointment).count(), 1)
+        with mock.patch.object(scheduling, 'allocate', wraps=scheduling.allocate) as allocate:
+            self.appointment.notes = 'yalnızca not'
+            self.appointment.save()
+            appointment = Appointment.objects.get(pk=self.appointment.pk)
+            appointment.amount = Decimal('200.00')
+            appointment.save()
+            self.assertEqual(allocate.call_count, 0)
+
+            appointment.status = 'cancelled'
+            appointment.save()
+            self.assertEqual(allocate.call_count, 1)
+        self.assertFalse(AppointmentResource.objects.filter(appointment=self.appointment).exists())
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        self.expert, self.client_user = create_people()
+        self.appointment = Appointment.objects.create(
+            expert=self.expert, client=self.client_user, date=timezone.now() + timedelta(days=1), service_type='botox',
+        )
+        Appointment.objects.bulk_create([Appointment(
+            expert=self.expert, client=self.client_user, date=timezone.now() + timedelta(days=400),
+        )])
+        self.feed = ical.feed_for(self.expert.user)
+        self.url = f'/appointments/takvim/{self.feed.token}.ics'
+
+    def test_feed_lists_appointments_in_the_window(self):
+        response = self.client.get(self.url)
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+        self.assertIn(f'UID:appointment-{self.appointment.pk}@', body)
+        self.assertIn('SUMMARY:Botoks Uygulaması - client', body)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split('\r\n')))
+
+    def test_unchanged_feed_is_answered_with_304(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url, headers={'If-None-Match': etag}).status_code, 304)
+
+        self.appointment.status = 'confirmed'
+        self.appointment.save()
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_regenerated_token_invalidates_the_old_address(self):
+        self.client.force_login(self.expert.user)
+        self.client.post('/appointments/takvim/yenile/')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.feed.refresh_from_db()
+        self.assertEqual(self.client.get(f'/appointments/takvim/{self.feed.token}.ics').status_code, 200)
+
+
+class LeanListTests(TestCase):
+    URL = '/appointments/randevu/liste/'
+
+    def setUp(self):
+        self.expert, self.client_user = create_people()
+        self.agent = CustomerAgent.objects.create(user=CustomUser.objects.create_user(
+            'temsilci', password='x', user_type='agent', first_name='Deniz', last_name='Ak',
+        ))
+        self.client.force_login(CustomUser.objects.create_user('yonetici', password='x', user_type='admin'))
+
+    def test_rows_are_projected_with_names_and_labels(self):
+        appointment = create_appointments(self.expert, self.client_user, 1, agent=self.agent, status='confirmed')[0]
+        Payment.objects.create(appointment=appointment, amount_paid=Decimal('10.00'), payment_method='cash')
+
+        [row] = self.client.get(self.URL).context['object_list']
+        self.assertIsInstance(row, views.APPOINTMENT_ROWS.row)
+        self.assertEqual(
+            (row.pk, row.client_name, row.agent_name, row.status_label, row.service_type_label, row.payment_id),
+            (appointment.pk, 'client', 'Deniz Ak', 'Onaylandı', appointment.get_service_type_display(),
+             appointment.payment.pk),
+        )
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        self.client.get(self.URL)  # filtre seçenekleri için katalog önbelleğe alınır
+        counts = []
+        for total in (1, 10):
+            create_appointments(self.expert, self.client_user, total - Appointment.objects.count(), agent=self.agent)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.URL)
+            self.assertEqual(len(response.context['object_list']), total)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class NotesSearchTests(TestCase):
+    URL = '/appointments/randevu/notlar/ara/'
+
+    def setUp(self):
+        self.expert, self.client_user = create_people()
+        _expert, other = create_people('diger')
+        start = timezone.now() + timedelta(days=1)
+        self.rows = Appointment.objects.bulk_create([
+            Appointment(expert=self.expert, client=client, date=start + timedelta(hours=index), notes=notes)
+            for index, (client, notes) in enumerate([
+                (self.client_user, 'Sol yanakta kızarıklık var'),
+                (self.client_user, 'Kızarıklık geçti, kontrol gerekmez'),
+                (self.client_user, '<b>kızarıklık</b> notu'),
+                (self.client_user, 'Kontrol randevusu'),
+                (other, 'Başka müşteride kızarıklık'),
+            ])
+        ])
+        self.client.force_login(self.client_user)
+
+    def search(self, **params):
+        return self.client.get(self.URL, params)
+
+    def test_results_are_scoped_and_highlighted(self):
+        results, next_cursor = notes_search.search(self.client_user, 'kızarıklık')
+        self.assertIsNone(next_cursor)
+        self.assertEqual({appointment.pk for appointment, _rank, _snippet in results}, {row.pk for row in self.rows[:3]})
+        snippets = [snippet for _appointment, _rank, snippet in results]
+        self.assertTrue(all('<mark>' in snippet for snippet in snippets))
+        self.assertTrue(any('&lt;b&gt;' in snippet for snippet in snippets))
+        self.assertEqual(len(notes_search.search(self.client_user, 'kızarıklık kontrol')[0]), 1)
+
+    def test_pages_follow_the_cursor_and_edits_are_indexed(self):
+        seen, after = [], None
+        while True:
+            data = self.search(q='kızarıklık', limit=1, **({'after': after} if after else {})).json()
+            seen += [row['id'] for row in data['results']]
+            after = data['next']
+            if not after:
+                break
+        self.assertEqual(sorted(seen), sorted(row.pk for row in self.rows[:3]))
+
+        appointment = Appointment.objects.get(pk=self.rows[3].pk)
+        appointment.notes = 'Kontrolde kızarıklık görüldü'
+        appointment.save()
+        self.assertEqual(len(self.search(q='kızarıklık').json()['results']), 4)
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.search().status_code, 400)
+        self.assertEqual(self.search(q='not', after='bozuk').status_code, 400)
+        self.assertEqual(self.search(q='""').json()['results'], [])
+
+
+class ExpertDayScheduleTests(TestCase):
+    def setUp(self):
+        self.expert, _client = create_people()
+        self.day = timezone.localdate() + timedelta(days=2)
+        ExpertAvailability.objects.create(
+            expert=self.expert, day_of_week=self.day.weekday(), start_time=time(9), end_time=time(17),
+        )
+        call_command('compile_schedules', stdout=StringIO())
+
+    def compiled(self, day=None):
+        row = ExpertDaySchedule.objects.get(expert=self.expert, date=day or self.day)
+        return row.intervals, row.on_holiday
+
+    def test_overrides_and_holidays_are_compiled_into_the_day(self):
+        self.assertEqual(self.compiled(), ([['09:00', '17:00']], False))
+        override = ExpertAvailabilityOverride.objects.create(
+            expert=self.expert, date=self.day, kind='remove', start_time=time(14), end_time=time(17),
+        )
+        self.assertEqual(self.compiled(), ([['09:00', '14:00']], False))
+
+        ExpertHoliday.objects.create(expert=self.expert, start_date=self.day, end_date=self.day)
+        self.assertEqual(self.compiled(), ([], True))
+        # İzin gününe girilen ek aralık izne rağmen geçerlidir
+        ExpertAvailabilityOverride.objects.create(
+            expert=self.expert, date=self.day, kind='add', start_time=time(10), end_time=time(12),
+        )
+        self.assertEqual(self.compiled(), ([['10:00', '12:00']], True))
+
+        # Tarihi değişen istisnanın eski günü de yeniden derlenir
+        next_week = self.day + timedelta(days=7)
+        override.date = next_week
+        override.save()
+        self.assertEqual(self.compiled(next_week), ([['09:00', '14:00']], False))
+
+    def test_days_outside_the_horizon_are_computed_on_read(self):
+        far = self.day + timedelta(weeks=52)
+        self.assertGreaterEqual(far, availability.horizon()[1])
+        self.assertFalse(ExpertDaySchedule.objects.filter(date=far).exists())
+        self.assertEqual(availability.day_schedules(far, [self.expert.pk]), {self.expert.pk: ([(time(9), time(17))], False)})
+
+
+class ResourceSchedulingTests(TestCase):
+    def setUp(self):
+        self.expert, self.client_user = create_people()
+        self.other = Expert.objects.create(
+            user=CustomUser.objects.create_user('dr2', password='x', user_type='expert'), specialization='Estetik',
+        )
+        self.day = timezone.localdate() + timedelta(days=1)
+        for expert in (self.expert, self.other):
+            ExpertAvailability.objects.create(
+                expert=expert, day_of_week=self.day.weekday(), start_time=time(9), end_time=time(11),
+            )
+        Resource.objects.create(name='Oda 1', kind='room', service_types=['botox', 'filler'], capacity=2)
+        Resource.objects.create(name='Lazer', kind='device', service_types=['botox'])
+        self.at = timezone.make_aware(datetime.combine(self.day, time(10)))
+
+    def book(self, expert, service_type):
+        return Appointment.objects.create(expert=expert, client=self.client_user, date=self.at, service_type=service_type)
+
+    def test_a_device_cannot_be_booked_twice_at_the_same_time(self):
+        self.book(self.expert, 'botox')
+        self.assertEqual(scheduling.missing_resources('botox', self.at), ['Cihaz'])
+        self.assertEqual(scheduling.missing_resources('filler', self.at), [])
+        with self.assertRaises(scheduling.ResourceUnavailableError):
+            self.book(self.other, 'botox')
+        self.assertEqual(Appointment.objects.count(), 1)
+
+        self.book(self.other, 'filler')
+        self.assertEqual(scheduling.missing_resources('filler', self.at), ['Oda'])
+
+    def test_day_plan_intersects_expert_and_resource_availability(self):
+        self.book(self.expert, 'botox')
+        plan = scheduling.DayPlan(self.day)
+        self.assertEqual(len(plan.slots(self.other.pk)), 8)  # 09:00-11:00, 15 dakikalık adımlar
+        self.assertNotIn(self.at, plan.slots(self.expert.pk))
+        self.assertNotIn(self.at, plan.slots(self.other.pk, 'botox'))
+        self.assertIn(self.at, plan.slots(self.other.pk, 'filler'))
+
+
+class BulkChangesTests(TestCase):
+    """Toplu yollar appointments.bulk üzerinden tekil kayıtla aynı yan etkileri üretir."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.expert, cls.client_user = create_people()
+        agent_users = [CustomUser.objects.create_user(f'temsilci{index}', password='x', user_type='agent') for index in range(2)]
+        cls.agent, cls.other_agent = [CustomerAgent.objects.create(user=user) for user in agent_users]
+        Resource.objects.create(name='Oda 1', kind='room', service_types=['botox'], capacity=10)
+
+    def setUp(self):
+        start = timezone.now() + timedelta(days=1)
+        self.appointments = [
+            Appointment.objects.create(expert=self.expert, client=self.client_user, agent=self.agent,
+                                       date=start + timedelta(hours=index), service_type='botox')
+            for index in range(3)
+        ]
+        self.ids = [appointment.pk for appointment in self.appointments]
+        counters.reconcile()  # sinyallerin dokunmadığı sahiplerin (ikinci temsilci) satırları
+        OutboxEvent.objects.all().delete()
+
+    def assertCountersMatchSources(self):
+        # Kaynak tablolardan yeniden sayım hiçbir satırı düzeltmemelidir
+        for kind, (_checked, created, fixed) in counters.reconcile().items():
+            self.assertEqual((kind, created, fixed), (kind, 0, 0))
+
+    def test_status_update_writes_history_events_and_releases_resources(self):
+        with bulk.changes(source='admin_bulk') as change:
+            updated = change.update(Appointment.objects.filter(pk__in=self.ids[:2]), status='cancelled')
+
+        self.assertEqual(updated, 2)
+        self.assertEqual(
+            sorted(AppointmentStatusChange.objects.filter(source='admin_bulk').values_list('appointment_id', 'to_status')),
+            [(pk, 'cancelled') for pk in self.ids[:2]],
+        )
+        self.assertEqual(set(AppointmentResource.objects.values_list('appointment_id', flat=True)), {self.ids[2]})
+        events = OutboxEvent.objects.filter(topic='appointment')
+        self.assertEqual(sorted(events.values_list('object_id', flat=True)), self.ids[:2])
+        self.assertTrue(all(event.payload['status_changed'] for event in events))
+        self.assertCountersMatchSources()
+
+    def test_agent_update_moves_visibility_and_counters(self):
+        with bulk.changes() as change:
+            change.update(Appointment.objects.filter(pk__in=self.ids), agent_id=self.other_agent.pk)
+
+        self.assertEqual(
+            set(Appointment.objects.filter(agent_access__agent=self.other_agent).values_list('pk', flat=True)),
+            set(self.ids),
+        )
+        self.assertFalse(Appointment.objects.filter(agent_access__agent=self.agent).exists())
+        self.assertCountersMatchSources()
+
+    def test_delete_records_events_before_removing_rows(self):
+        Payment.objects.bulk_create([Payment(appointment=self.appointments[0], amount_paid=Decimal('100.00'))])
+        with bulk.changes() as change:
+            self.assertEqual(change.delete(self.ids[:2], action='archived'), 2)
+
+        self.assertEqual(sorted(OutboxEvent.objects.values_list('topic', 'action')),
+                         [('appointment', 'archived')] * 2 + [('payment', 'archived')])
+        self.assertEqual(list(Appointment.objects.values_list('pk', flat=True)), self.ids[2:])
+        self.assertFalse(Payment.objects.exists())
+        self.assertCountersMatchSources()
+
+    def test_fields_needing_allocation_are_rejected(self):
+        with self.assertRaises(ValueError), bulk.changes() as change:
+            change.update(Appointment.objects.filter(pk__in=self.ids), date=timezone.now())
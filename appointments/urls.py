@@ -5,6 +5,7 @@ from .views import (
     AppointmentCreateView,
     AppointmentListView,
     AppointmentUpdateView,
+    ClientAppointmentListView,
     cancel_appointment 
 )
 
@@ -14,6 +15,10 @@ urlpatterns = [
     path('randevu/olustur/', AppointmentCreateView.as_view(), name='create'),
     path('randevu/liste/', AppointmentListView.as_view(), name='list'),
     path('randevu/guncelle/<int:pk>/', AppointmentUpdateView.as_view(), name='update'),
+    path('randevu/musteri/<int:client_pk>/', ClientAppointmentListView.as_view(), name='client_list'),
     path('randevu/iptal/<int:pk>/', cancel_appointment, name='cancel'), # Yeni eklenen URL
     path('get-available-slots/', views.get_available_appointment_slots, name='get_available_appointment_slots'),
+    path('randevu/notlar/ara/', views.search_appointment_notes, name='search_notes'),
+    path('takvim/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
+    path('takvim/yenile/', views.regenerate_calendar_feed, name='regenerate_calendar_feed'),
 ]
\ No newline at end of file
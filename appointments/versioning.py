@@ -0,0 +1,183 @@
+# appointments/versioning.py
+"""
+Randevu ve ödeme düzenlemeleri için iyimser eşzamanlılık denetimi (optimistic locking).
+
+- `VersionedModel` her satırda bir `version` sütunu tutar. Güncelleme
+  `UPDATE ... SET ..., version = n + 1 WHERE id = .. AND version = n` olarak yapılır;
+  satır bu arada başkası tarafından değiştirildiyse (veya silindiyse) hiçbir satır
+  etkilenmez ve ConcurrentUpdateError yükseltilir. Kullanıcının gördüğü sürüm formlarda
+  gizli `version` alanıyla taşınır.
+- Veritabanından yüklenen örnekler yüklendikleri değerleri hatırlar (`dirty_fields`);
+  kayıt yalnızca değişen sütunları yazar ve eski değeri görmek için ayrıca SELECT
+  gerekmez. Hiçbir alan değişmediyse de sürüm denetimli UPDATE (yalnızca `version`)
+  yapılır: düzenleme yapılmadan gönderilen eski bir form da çakışma olarak yakalanır
+  ve post_save alıcıları çalışır.
+- Sinyal tetiklemeyen toplu güncellemeler (`queryset.update`) sürümü
+  `version=F('version') + 1` ile artırmalıdır.
+"""
+
+from django import forms
+from django.contrib import messages
+from django.db import models, router, transaction
+from django.db.models import DEFERRED
+from django.http import HttpResponseRedirect, JsonResponse
+
+
+class ConcurrentUpdateError(Exception):
+    """Kayıt, yüklendikten sonra başka bir işlem tarafından değiştirildi veya silindi."""
+
+    def __init__(self, instance):
+        self.instance = instance
+        super().__init__(
+            f"{instance._meta.verbose_name} #{instance.pk} siz düzenlerken başka bir kullanıcı tarafından "
+            f"değiştirildi. Lütfen sayfayı yenileyip değişikliklerinizi tekrar yapın."
+        )
+
+
+class VersionedModel(models.Model):
+    version = models.PositiveIntegerField(default=1, verbose_name="Sürüm")
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # field_names öznitelik adlarıdır (FK'larda *_id); ertelenen (defer) alanlar yer almaz
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def _remember_values(self):
+        self._loaded_values = {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None or fields is None:
+            self._remember_values()
+            return
+        # Ertelenen bir alana erişim de buradan geçer; yalnızca yenilenen alanlar yüklenmiş sayılır
+        for field in self._meta.concrete_fields:
+            if (field.name in fields or field.attname in fields) and field.attname in self.__dict__:
+                loaded[field.attname] = self.__dict__[field.attname]
+
+    def dirty_fields(self):
+        """
+        Yüklendikten sonra değişen alanlar: {öznitelik adı: yüklenen değer}. Ertelenmiş
+        (defer/only) olup sonradan atanan alanlar da değişmiş sayılır; yüklenen değerleri
+        bilinmediğinden DEFERRED döner. Örnek veritabanından yüklenmediyse (ör. elle
+        oluşturulduysa) None döner.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return None
+        dirty = {}
+        for field in self._meta.concrete_fields:
+            if field.primary_key or field.attname == 'version' or field.attname not in self.__dict__:
+                continue
+            if field.attname not in loaded:
+                dirty[field.attname] = DEFERRED
+            elif self.__dict__[field.attname] != loaded[field.attname]:
+                dirty[field.attname] = loaded[field.attname]
+        return dirty
+
+    def _atomic(self, kwargs):
+        return transaction.atomic(using=kwargs.get('using') or router.db_for_write(type(self), instance=self))
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.version = 1
+            # post_save alıcıları (ör. kaynak ataması) hata verirse eklenen satır da geri alınır
+            with self._atomic(kwargs):
+                super().save(*args, **kwargs)
+            self._remember_values()
+            return
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            # Değişen alan yoksa yalnızca sürüm yazılır (bkz. modül açıklaması)
+            update_fields = self.dirty_fields()
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'version'}
+
+        expected = self.version
+        self._expected_version = expected
+        self.version = expected + 1
+        try:
+            # Model.save_base hata durumunda açık işlemi geri alınacak olarak işaretler; kayıt kendi
+            # savepoint'inde yapılır ki çakışma yakalandığında istek işlemi kullanılabilir kalsın.
+            with self._atomic(kwargs):
+                super().save(*args, **kwargs)
+        except ConcurrentUpdateError:
+            self.version = expected
+            raise
+        finally:
+            self._expected_version = None
+        self._remember_values()
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        expected = getattr(self, '_expected_version', None)
+        if expected is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        if base_qs.filter(pk=pk_val, version=expected)._update(values) > 0:
+            return True
+        # Silinmiş bir satırın sessizce yeniden eklenmesi (INSERT) de engellenir
+        raise ConcurrentUpdateError(self)
+
+
+class VersionConflictMixin:
+    """
+    Düzenleme görünümleri için: çakışmada form hatası gösterir, JSON isteklerde
+    409 ve kaydın güncel sürümünü döndürür. form_valid içinde kayıttan önce mesaj
+    eklenmemelidir.
+    """
+    conflict_message = None
+
+    def form_valid(self, form):
+        try:
+            return super().form_valid(form)
+        except ConcurrentUpdateError as exc:
+            current = type(exc.instance)._base_manager.filter(pk=exc.instance.pk).values_list('version', flat=True).first()
+            if self.request.content_type == 'application/json':
+                return JsonResponse({'error': str(exc), 'current_version': current}, status=409)
+            form.add_error(None, self.conflict_message or str(exc))
+            return self.form_invalid(form)
+
+
+class VersionedAdminMixin:
+    """
+    Yönetim paneli için: gizli `version` alanını forma ekler; çakışmada değişiklikler
+    geri alınır, hata mesajıyla aynı sayfaya dönülür. `conflict_errors` ile aynı şekilde
+    ele alınacak başka hatalar eklenebilir.
+    """
+    conflict_errors = (ConcurrentUpdateError,)
+
+    def get_fieldsets(self, request, obj=None):
+        fieldsets = super().get_fieldsets(request, obj)
+        if obj is None:
+            return fieldsets
+        (name, options), *rest = fieldsets
+        return [(name, {**options, 'fields': tuple(options['fields']) + ('version',)}), *rest]
+
+    def get_form(self, request, obj=None, **kwargs):
+        if obj is not None:
+            kwargs['widgets'] = {**kwargs.get('widgets', {}), 'version': forms.HiddenInput}
+        return super().get_form(request, obj, **kwargs)
+
+    def changeform_view(self, request, *args, **kwargs):
+        try:
+            return super().changeform_view(request, *args, **kwargs)
+        except self.conflict_errors as exc:
+            self.message_user(request, str(exc), messages.ERROR)
+            return HttpResponseRedirect(request.get_full_path())
+
+    def changelist_view(self, request, *args, **kwargs):
+        try:
+            return super().changelist_view(request, *args, **kwargs)
+        except self.conflict_errors as exc:
+            self.message_user(request, str(exc), messages.ERROR)
+            return HttpResponseRedirect(request.get_full_path())
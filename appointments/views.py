@@ -1,24 +1,43 @@
 # appointments/views.py
 
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.contrib import messages
 from django.views.generic import CreateView, ListView, UpdateView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.shortcuts import redirect, get_object_or_404
 from django.db.models import Q 
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from datetime import datetime, timedelta, date
 from django.utils import timezone 
 from django.views.decorators.http import require_POST 
 from django.contrib.auth.decorators import login_required 
 from django.contrib.messages.views import SuccessMessageMixin # SuccessMessageMixin import edildi
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 
-from .models import Appointment, ExpertAvailability, ExpertHoliday
+from . import ical, notes_search
+from .models import Appointment, ArchivedAppointment, CalendarFeed
 from .forms import AppointmentForm
+from .history import timeline
+from .idempotency import IdempotentPostMixin, JSONFormMixin
+from .listing import LeanListMixin, LeanRows, choice_labels, full_name
+from .scheduling import DayPlan, ResourceConflictMixin, SLOT
+from .versioning import ConcurrentUpdateError, VersionConflictMixin
+from .permissions import (
+    agent_profile_of,
+    can_cancel,
+    can_edit,
+    expert_profile_of,
+    get_appointment,
+    is_admin,
+    is_assigned_client,
+    scope_appointments,
+)
 from accounts.models import CustomUser, Expert, CustomerAgent
+from accounts import catalog
 
 # --- Randevu Oluşturma Görünümü ---
-class AppointmentCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView): # SuccessMessageMixin eklendi
+class AppointmentCreateView(LoginRequiredMixin, IdempotentPostMixin, ResourceConflictMixin, JSONFormMixin, SuccessMessageMixin, CreateView): # SuccessMessageMixin eklendi
     """
     Yeni bir randevu oluşturmak için kullanılan görünüm.
     Müşteri, temsilci ve admin rolleri için randevu oluşturma yetkisi sağlar.
@@ -41,7 +60,18 @@ class AppointmentCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView)
         appointment = form.save(commit=False)
         user = self.request.user
 
-        if user.user_type == 'client':
+        if is_admin(user):
+            # Admin ise, formdaki değerleri kullanır. Müşteri atanmışsa temsilciyi de belirler.
+            client = appointment.client
+            if client:
+                assigned_agent = CustomerAgent.objects.filter(assigned_clients=client).first()
+                if assigned_agent:
+                    appointment.agent = assigned_agent
+                else:
+                    messages.warning(self.request, f"Seçilen müşteriye ({client.get_full_name() or client.username}) atanmış bir temsilci bulunamadı. Randevu temsilcisiz oluşturuldu.")
+            # Admin için varsayılan atama yok, formdan gelen değerler geçerlidir.
+
+        elif user.user_type == 'client':
             # Müşteri ise, randevuyu kendisine atar ve atanmış bir temsilci varsa onu belirler.
             appointment.client = user
             assigned_agent = CustomerAgent.objects.filter(assigned_clients=user).first()
@@ -64,17 +94,6 @@ class AppointmentCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView)
 
             appointment.status = 'pending'
             appointment.payment_status = False
-        
-        elif user.user_type == 'admin':
-            # Admin ise, formdaki değerleri kullanır. Müşteri atanmışsa temsilciyi de belirler.
-            client = appointment.client
-            if client:
-                assigned_agent = CustomerAgent.objects.filter(assigned_clients=client).first()
-                if assigned_agent:
-                    appointment.agent = assigned_agent
-                else:
-                    messages.warning(self.request, f"Seçilen müşteriye ({client.get_full_name() or client.username}) atanmış bir temsilci bulunamadı. Randevu temsilcisiz oluşturuldu.")
-            pass # Admin için varsayılan atama yok, formdan gelen değerler geçerlidir.
 
         self.object = appointment
         return super().form_valid(form)
@@ -85,56 +104,50 @@ class AppointmentCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView)
             return self.handle_no_permission() 
 
         allowed_user_types = ['admin', 'agent', 'client']
-        if request.user.user_type not in allowed_user_types:
+        if not is_admin(request.user) and request.user.user_type not in allowed_user_types:
             messages.error(request, "Randevu oluşturmak için yetkiniz bulunmamaktadır.")
             return redirect(reverse_lazy('home'))
 
         return super().dispatch(request, *args, **kwargs)
 
 # --- Genel Randevu Listeleme Görünümü (Admin veya Genel Bakış İçin) ---
-class AppointmentListView(LoginRequiredMixin, ListView):
+# Randevu listesi satırları: şablon model nesneleri yerine bu demetleri işler (bkz. listing.py)
+APPOINTMENT_ROWS = LeanRows('AppointmentRow', {
+    'pk': 'pk',
+    'client_name': full_name('client__', fallback='username'),
+    'agent_id': 'agent_id',
+    'agent_name': full_name('agent__user__'),
+    'expert_name': full_name('expert__user__'),
+    'date': 'date',
+    'service_type': 'service_type',
+    'status': 'status',
+    'payment_status': 'payment_status',
+    'payment_id': 'payment__id',
+}, labels={
+    'service_type': choice_labels(Appointment, 'service_type'),
+    'status': choice_labels(Appointment, 'status'),
+})
+
+
+class AppointmentListView(LoginRequiredMixin, LeanListMixin, ListView):
     """
     Tüm randevuları listeler ve rol bazında filtreleme ve arama seçenekleri sunar.
     Genellikle Admin ve diğer yetkililer için genel bir bakış sağlar.
+    Sayfa satırları hafif projeksiyonla (APPOINTMENT_ROWS) okunur.
     """
     model = Appointment
     template_name = 'appointments/list.html' 
     context_object_name = 'object_list'
     paginate_by = 10 
+    lean_rows = APPOINTMENT_ROWS
 
     def get_queryset(self):
         """Randevu listesini kullanıcı rolüne ve GET parametrelerine göre filtreler."""
-        queryset = Appointment.objects.select_related(
-            'client', 
-            'expert__user', 
-            'agent__user' 
-        ).order_by('-date') 
+        queryset = Appointment.objects.order_by('-date') 
 
-        user = self.request.user
-
-        # Kullanıcı rolüne göre başlangıç filtrelemesi
-        if user.user_type == 'client':
-            queryset = queryset.filter(client=user)
-        elif user.user_type == 'agent':
-            try:
-                agent_profile = user.agent_profile
-                # Temsilcinin atandığı müşterilerin veya direkt kendi atandığı randevuları
-                queryset = queryset.filter(
-                    Q(client__agents=agent_profile) | 
-                    Q(agent=agent_profile) 
-                )
-            except CustomerAgent.DoesNotExist:
-                messages.warning(self.request, "Müşteri temsilcisi profiliniz bulunamadığı için randevu listesi boş olabilir.")
-                return queryset.none()
-        elif user.user_type == 'admin':
-            pass # Admin tüm randevuları görür, ek rol tabanlı filtre yok
-        elif user.user_type == 'expert':
-            try:
-                expert_profile = user.expert_profile
-                queryset = queryset.filter(expert=expert_profile)
-            except Expert.DoesNotExist:
-                messages.warning(self.request, "Uzman profiliniz bulunamadığı için randevu listesi boş olabilir.")
-                return queryset.none()
+        # Kullanıcı rolüne göre başlangıç filtrelemesi (admin: tümü, müşteri: kendi randevuları,
+        # uzman: kendi randevuları, temsilci: kendisine veya müşterilerine ait randevular)
+        queryset = scope_appointments(self.request.user, queryset)
         
         # --- Ek Filtreleme MANTIĞI (GET parametrelerine göre) ---
         client_name = self.request.GET.get('client_name')
@@ -192,16 +205,14 @@ class AppointmentListView(LoginRequiredMixin, ListView):
         context['current_agent_filter'] = self.request.GET.get('agent_filter', '') # Yeni
         context['current_service_type'] = self.request.GET.get('service_type', '') # Yeni
 
-        # Filtreleme dropdown'ları için seçenekler
+        # Filtreleme dropdown'ları için seçenekler (uzman/temsilci adları önbellekteki katalogdan)
         context['appointment_statuses'] = Appointment.STATUS_CHOICES
-        context['experts'] = Expert.objects.all()
-        context['agents'] = CustomerAgent.objects.all()
-        context['service_choices'] = Appointment.SERVICE_CHOICES
+        context.update(catalog.filter_options())
 
         return context
     
 # --- Randevu Güncelleme Görünümü ---
-class AppointmentUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class AppointmentUpdateView(LoginRequiredMixin, UserPassesTestMixin, VersionConflictMixin, ResourceConflictMixin, JSONFormMixin, UpdateView):
     """
     Mevcut bir randevuyu güncellemek için kullanılan görünüm.
     Admin, atanmış temsilci, randevu sahibi müşteri veya randevu alınan uzman tarafından güncellenebilir.
@@ -210,6 +221,22 @@ class AppointmentUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView)
     form_class = AppointmentForm
     template_name = 'appointments/update.html'
     success_url = reverse_lazy('appointments:list')
+    json_success_status = 200
+
+    def get_object(self, queryset=None):
+        """
+        Randevuyu istek başına bir kez yükler (test_func, get ve post aynı nesneyi kullanır).
+        Form, nesneyi değiştirmeden önce korunan alanların ilk değerleri saklanır.
+        """
+        appointment = get_appointment(self.request, self.kwargs['pk'])
+        if not hasattr(self, 'original_values'):
+            self.original_values = {
+                'status': appointment.status,
+                'payment_status': appointment.payment_status,
+                'amount': appointment.amount,
+                'agent': appointment.agent,
+            }
+        return appointment
 
     def get_form_kwargs(self):
         """Forma mevcut kullanıcıyı gönderir."""
@@ -219,17 +246,23 @@ class AppointmentUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView)
 
     def form_valid(self, form):
         """Form geçerli olduğunda randevuyu kaydeder."""
-        current_appointment = self.get_object() 
+        original = self.original_values
 
         # Admin olmayanlar için belirli alanların değiştirilmesini kısıtla
-        if self.request.user.user_type != 'admin':
-            form.instance.status = current_appointment.status
-            form.instance.payment_status = current_appointment.payment_status
-            form.instance.amount = current_appointment.amount
+        if not is_admin(self.request.user):
+            form.instance.status = original['status']
+            form.instance.payment_status = original['payment_status']
+            form.instance.amount = original['amount']
         else:
             # Admin randevu oluştururken temsilci seçilmemişse, mevcut temsilciyi koru
-            if not form.instance.agent and current_appointment.agent:
-                form.instance.agent = current_appointment.agent
+            if not form.instance.agent and original['agent']:
+                form.instance.agent = original['agent']
+
+        # Kayıt sürüm çakışması (VersionConflictMixin) veya boş kaynak kalmaması (ResourceConflictMixin)
+        # nedeniyle reddedilirse form hatayla yeniden gösterilir
+        response = super().form_valid(form)
+        if form.errors:
+            return response
 
         if form.has_changed():
             messages.success(
@@ -238,33 +271,17 @@ class AppointmentUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView)
             )
         else:
             messages.info(self.request, "Randevuda herhangi bir değişiklik yapılmadı.")
+        return response
 
-        return super().form_valid(form)
+    def get_context_data(self, **kwargs):
+        """Randevunun durum geçmişini şablona ekler."""
+        context = super().get_context_data(**kwargs)
+        context['status_history'] = timeline(self.object.pk)
+        return context
 
     def test_func(self):
         """Kullanıcının randevuyu güncelleme yetkisini kontrol eder."""
-        appointment = self.get_object()
-        user = self.request.user
-
-        if user.user_type == 'admin':
-            return True
-        
-        if user.user_type == 'agent':
-            try:
-                agent_profile = user.agent_profile
-                # Temsilci, kendi atandığı randevuları VEYA müşterisi kendisine atanmışsa güncelleyebilir.
-                return (appointment.agent == agent_profile) or \
-                       (appointment.client in agent_profile.assigned_clients.all())
-            except CustomerAgent.DoesNotExist:
-                return False
-            
-        if user.user_type == 'client':
-            return appointment.client == user
-            
-        if user.user_type == 'expert':
-            return appointment.expert.user == user
-
-        return False
+        return can_edit(self.request.user, self.get_object())
 
     def dispatch(self, request, *args, **kwargs):
         """Yetkilendirme kontrolü yapar ve yetkisiz kullanıcıları yönlendirir."""
@@ -281,115 +298,61 @@ class AppointmentUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView)
 # --- AJAX Görünümü: Müsait Randevu Saatlerini Getir ---
 def get_available_appointment_slots(request):
     """
-    Belirli bir uzman ve tarih için müsait randevu saatlerini döndürür.
-    AJAX çağrıları ile kullanılır.
+    Belirli bir tarih için müsait randevu saatlerini döndürür. AJAX çağrıları ile kullanılır.
+    Uzman müsaitliği ile hizmetin gerektirdiği oda/cihazların boş zamanları kesiştirilir.
+
+    - expert_id verilirse: {'available_slots': ['09:00', ...]}
+    - verilmezse günün tüm uzmanları tek seferde: {'experts': {'<id>': ['09:00', ...], ...}}
+    - service_type (isteğe bağlı) verilirse kaynak kısıtları da uygulanır.
     """
     expert_id = request.GET.get('expert_id')
     selected_date_str = request.GET.get('date')
+    service_type = request.GET.get('service_type') or None
 
-    APPOINTMENT_INTERVAL_MINUTES = 15
-
-    if not expert_id or not selected_date_str:
-        return JsonResponse({'error': 'Uzman kimliği ve tarih gerekli.'}, status=400)
+    if not selected_date_str:
+        return JsonResponse({'error': 'Tarih gerekli.'}, status=400)
 
     try:
-        expert = get_object_or_404(Expert, id=expert_id)
         selected_date_dt = datetime.strptime(selected_date_str, '%Y-%m-%d').date()
-
+        if expert_id:
+            expert = get_object_or_404(Expert, id=expert_id)
     except (ValueError, Expert.DoesNotExist):
         return JsonResponse({'error': 'Geçersiz uzman veya tarih formatı.'}, status=400)
 
-    if selected_date_dt < timezone.localdate(): 
-        return JsonResponse({'available_slots': []})
-
-    day_of_week = selected_date_dt.weekday() 
-    expert_availabilities = ExpertAvailability.objects.filter(
-        expert=expert,
-        day_of_week=day_of_week
-    ).order_by('start_time')
-
-    if not expert_availabilities.exists():
-        return JsonResponse({'available_slots': []}) 
-
-    is_holiday = ExpertHoliday.objects.filter(
-        expert=expert,
-        start_date__lte=selected_date_dt,
-        end_date__gte=selected_date_dt
-    ).exists()
-
-    if is_holiday:
-        return JsonResponse({'available_slots': []})
-
-    booked_appointments = Appointment.objects.filter(
-        expert=expert,
-        date__date=selected_date_dt,
-        status__in=['confirmed', 'pending'] 
-    ).order_by('date')
-
-    booked_slots_datetime = set()
-    for app in booked_appointments:
-        app_start_aware = app.date.astimezone(timezone.get_current_timezone())
-        app_end_aware = app_start_aware + timedelta(minutes=APPOINTMENT_INTERVAL_MINUTES) 
-
-        current_slot_dt = app_start_aware
-        while current_slot_dt < app_end_aware:
-            booked_slots_datetime.add(current_slot_dt)
-            current_slot_dt += timedelta(minutes=APPOINTMENT_INTERVAL_MINUTES) 
-
-    available_slots_str = []
-    current_datetime_aware = timezone.now()
-
-    for availability in expert_availabilities:
-        slot_start_dt_aware = datetime.combine(selected_date_dt, availability.start_time).replace(tzinfo=timezone.get_current_timezone())
-        slot_end_dt_aware = datetime.combine(selected_date_dt, availability.end_time).replace(tzinfo=timezone.get_current_timezone())
-
-        temp_slot_dt = slot_start_dt_aware
-        while temp_slot_dt + timedelta(minutes=APPOINTMENT_INTERVAL_MINUTES) <= slot_end_dt_aware:
-            if selected_date_dt == current_datetime_aware.date() and \
-               temp_slot_dt < current_datetime_aware + timedelta(minutes=APPOINTMENT_INTERVAL_MINUTES):
-                temp_slot_dt += timedelta(minutes=APPOINTMENT_INTERVAL_MINUTES) # 'a' karakteri buradan kaldırıldı
-                continue
-
-            if temp_slot_dt not in booked_slots_datetime:
-                available_slots_str.append(temp_slot_dt.strftime('%H:%M'))
-            
-            temp_slot_dt += timedelta(minutes=APPOINTMENT_INTERVAL_MINUTES)
+    if service_type is not None and service_type not in dict(Appointment.SERVICE_CHOICES):
+        return JsonResponse({'error': 'Geçersiz hizmet tipi.'}, status=400)
 
-    available_slots_str.sort()
+    if selected_date_dt < timezone.localdate():
+        return JsonResponse({'available_slots': []} if expert_id else {'experts': {}})
 
-    return JsonResponse({'available_slots': available_slots_str})
+    # Bugün için en erken saat: şu andan bir randevu süresi sonrası
+    not_before = timezone.now() + SLOT if selected_date_dt == timezone.localdate() else None
+    plan = DayPlan(selected_date_dt, expert_ids=[expert.pk] if expert_id else None)
+
+    def slot_labels(pk):
+        return [
+            slot.astimezone(timezone.get_current_timezone()).strftime('%H:%M')
+            for slot in plan.slots(pk, service_type, not_before)
+        ]
+
+    if expert_id:
+        return JsonResponse({'available_slots': slot_labels(expert.pk)})
+    return JsonResponse({'experts': {str(pk): slot_labels(pk) for pk, hours in sorted(plan.working.items()) if hours}})
 
 # --- Randevu İptal Görünümü ---
 def is_admin_or_agent_or_owner(user, appointment):
     """
     Kullanıcının belirli bir randevuyu iptal etme yetkisi olup olmadığını kontrol eder.
     Admin, atanmış temsilci veya randevu sahibi müşteri iptal edebilir.
+    Kurallar appointments.permissions.can_cancel içinde tanımlıdır.
     """
-    if user.is_authenticated:
-        if user.user_type == 'admin':
-            return True
-        
-        if user.user_type == 'client' and appointment.client == user:
-            return True
-        
-        if user.user_type == 'agent':
-            try:
-                agent_profile = user.agent_profile
-                # Randevu bu temsilciye direkt atanmışsa VEYA randevunun müşterisi bu temsilciye atanmışsa
-                if appointment.agent == agent_profile:
-                    return True
-                if agent_profile.assigned_clients.filter(pk=appointment.client.pk).exists():
-                    return True
-            except CustomerAgent.DoesNotExist:
-                return False 
-        
-    return False 
+    return can_cancel(user, appointment)
 
 @login_required
 @require_POST
 def cancel_appointment(request, pk):
     """Randevunun durumunu 'cancelled' olarak günceller."""
-    appointment = get_object_or_404(Appointment, pk=pk)
+    appointment = get_appointment(request, pk)
 
     if not is_admin_or_agent_or_owner(request.user, appointment):
         messages.error(request, "Bu randevuyu iptal etme yetkiniz bulunmamaktadır.")
@@ -397,7 +360,11 @@ def cancel_appointment(request, pk):
 
     if appointment.status in ['pending', 'confirmed']:
         appointment.status = 'cancelled'
-        appointment.save()
+        try:
+            appointment.save()
+        except ConcurrentUpdateError as exc:
+            messages.error(request, str(exc))
+            return redirect('appointments:list')
         messages.success(request, f"Randevu (Dr. {appointment.expert.user.get_full_name()} - {appointment.date.strftime('%d %B %Y %H:%M')}) başarıyla iptal edildi.")
     else:
         messages.warning(request, "Bu randevu zaten tamamlanmış veya iptal edilmiş olduğu için değiştirilemez.")
@@ -409,15 +376,23 @@ class ClientAppointmentListView(LoginRequiredMixin, UserPassesTestMixin, ListVie
     """
     Belirli bir müşteriye ait tüm randevuları listeler.
     Admin, müşterinin kendisi, ilgili temsilci veya randevu aldığı uzmanlar görebilir.
+    `?arsiv=1` ile soğuk depoya taşınmış eski randevular (ArchivedAppointment) sayfalanır.
     """
     model = Appointment
     template_name = 'appointments/client_appointments_list.html' 
     context_object_name = 'client_appointments'
     paginate_by = 10
 
+    def show_archive(self):
+        return self.request.GET.get('arsiv') == '1'
+
     def get_queryset(self):
         """URL'den gelen müşteri ID'sine göre randevuları filtreler."""
         client_pk = self.kwargs['client_pk']
+        if self.show_archive():
+            # (client, -date) indeksiyle sayfalanır; uzman adı ve ödeme bilgisi arşiv satırındadır
+            return ArchivedAppointment.objects.filter(client_id=client_pk).order_by('-date', '-original_id')
+
         queryset = Appointment.objects.filter(
             client__pk=client_pk
         ).select_related(
@@ -435,6 +410,8 @@ class ClientAppointmentListView(LoginRequiredMixin, UserPassesTestMixin, ListVie
         context['target_client'] = get_object_or_404(CustomUser, pk=client_pk)
         context['title'] = f"{context['target_client'].get_full_name() or context['target_client'].username} Randevuları"
         context['show_client'] = False # Bu sayfada zaten tek müşterinin randevuları gösterildiği için müşteri sütunu gizlenir.
+        context['show_archive'] = self.show_archive()
+        context['has_archive'] = context['show_archive'] or ArchivedAppointment.objects.filter(client_id=client_pk).exists()
         return context
 
     def test_func(self):
@@ -444,20 +421,23 @@ class ClientAppointmentListView(LoginRequiredMixin, UserPassesTestMixin, ListVie
         target_client = get_object_or_404(CustomUser, pk=client_pk)
 
         # Adminler her müşterinin randevularını görebilir
-        if user.user_type == 'admin':
+        if is_admin(user):
             return True
         
         # Temsilciler, kendi atanan müşterilerinin randevularını görebilir
         if user.user_type == 'agent':
-            try:
-                agent_profile = user.agent_profile
-                return agent_profile.assigned_clients.filter(pk=client_pk).exists()
-            except CustomerAgent.DoesNotExist:
-                return False
+            agent_profile = agent_profile_of(user)
+            return agent_profile is not None and is_assigned_client(agent_profile, client_pk)
         
         # Uzmanlar, bu müşterinin kendilerinden aldığı randevular varsa görebilir.
         if user.user_type == 'expert':
-            return Appointment.objects.filter(expert__user=user, client=target_client).exists()
+            if scope_appointments(user).filter(client=target_client).exists():
+                return True
+            # Tüm ortak randevuları arşive taşınmış olsa da geçmişe erişebilmeli
+            expert_profile = expert_profile_of(user)
+            return expert_profile is not None and ArchivedAppointment.objects.filter(
+                client=target_client, expert=expert_profile
+            ).exists()
             
         # Müşteriler sadece kendi randevularını görebilir
         if user.user_type == 'client':
@@ -512,7 +492,7 @@ class ExpertAppointmentListView(LoginRequiredMixin, UserPassesTestMixin, ListVie
         return context
 
     def test_func(self):
-        return self.request.user.user_type == 'expert' or self.request.user.user_type == 'admin' # Adminler de bu listeyi görebilir
+        return self.request.user.user_type == 'expert' or is_admin(self.request.user) # Adminler de bu listeyi görebilir
 
     def handle_no_permission(self):
         messages.error(self.request, "Uzman randevularını görüntüleme yetkiniz bulunmamaktadır.")
@@ -534,10 +514,8 @@ class AgentAppointmentListView(LoginRequiredMixin, UserPassesTestMixin, ListView
         user = self.request.user
         try:
             agent_profile = user.agent_profile
-            queryset = Appointment.objects.filter(
-                Q(client__agents=agent_profile) | 
-                Q(agent=agent_profile) # Kendi direkt atadığı randevular
-            ).select_related(
+            # Kendisine atanmış randevular ve atanmış müşterilerinin randevuları
+            queryset = scope_appointments(user).select_related(
                 'client', 
                 'expert__user', 
                 'agent__user'
@@ -567,12 +545,83 @@ class AgentAppointmentListView(LoginRequiredMixin, UserPassesTestMixin, ListView
         context['current_status'] = self.request.GET.get('status', 'all')
         context['current_expert_filter'] = self.request.GET.get('expert_filter', '')
         context['appointment_statuses'] = [('all', 'Tümü')] + list(Appointment.STATUS_CHOICES)
-        context['experts'] = Expert.objects.all() # Temsilcinin uzmanlara göre filtrelemesi için
+        context['experts'] = catalog.experts() # Temsilcinin uzmanlara göre filtrelemesi için
         return context
 
     def test_func(self):
-        return self.request.user.user_type == 'agent' or self.request.user.user_type == 'admin'
+        return self.request.user.user_type == 'agent' or is_admin(self.request.user)
 
     def handle_no_permission(self):
         messages.error(self.request, "Temsilci randevularını görüntüleme yetkiniz bulunmamaktadır.")
         return redirect(reverse_lazy('home'))
+
+
+# --- Takvim Beslemesi (iCalendar) ---
+def calendar_feed(request, token):
+    """
+    Kullanıcının randevularını .ics olarak döndürür; oturum gerekmez, adres anahtarı yetkidir.
+    Değişiklik yoksa yalnızca besleme satırı okunur ve 304 döner.
+    """
+    feed = get_object_or_404(CalendarFeed.objects.select_related('user'), token=token)
+    user = feed.user
+    if not user.is_active or ical.owner_filter(user) is None:
+        raise Http404
+    etag, last_modified = ical.validators(feed)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = StreamingHttpResponse(
+            ical.render(feed, user, request.get_host()), content_type='text/calendar; charset=utf-8'
+        )
+        response['Content-Disposition'] = 'inline; filename="randevular.ics"'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+@login_required
+@require_POST
+def regenerate_calendar_feed(request):
+    """Takvim beslemesi adresini oluşturur veya yeniler; eski adres geçersiz olur."""
+    if ical.owner_filter(request.user) is None:
+        messages.error(request, "Takvim aboneliği yalnızca uzman, temsilci ve müşteri hesapları için kullanılabilir.")
+    else:
+        ical.regenerate(request.user)
+        messages.success(request, "Takvim adresiniz oluşturuldu. Eski adres artık çalışmayacaktır.")
+    return redirect('accounts:profile')
+
+
+# --- Randevu Notlarında Arama (AJAX) ---
+@login_required
+def search_appointment_notes(request):
+    """
+    Kullanıcının görebildiği randevuların notlarında tam metin arama yapar.
+    Sonuçlar ilgi ve tarihe göre sıralanır; `next` imleci `after` parametresiyle
+    gönderilerek sonraki sayfa alınır. Özetlerde eşleşen kelimeler <mark> ile işaretlidir.
+    """
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'error': 'Arama metni gerekli.'}, status=400)
+    try:
+        limit = min(max(int(request.GET.get('limit', notes_search.PAGE_SIZE)), 1), notes_search.MAX_PAGE_SIZE)
+        results, next_cursor = notes_search.search(request.user, query, after=request.GET.get('after'), limit=limit)
+    except ValueError:
+        # Geçersiz limit veya sayfa imleci (InvalidCursor)
+        return JsonResponse({'error': 'Geçersiz sayfa parametresi.'}, status=400)
+
+    return JsonResponse({
+        'results': [
+            {
+                'id': appointment.pk,
+                'date': timezone.localtime(appointment.date).strftime('%d.%m.%Y %H:%M'),
+                'client': appointment.client.get_full_name() or appointment.client.username,
+                'expert': appointment.expert.user.get_full_name(),
+                'service': appointment.get_service_type_display(),
+                'status': appointment.get_status_display(),
+                'snippet': snippet,
+                'rank': str(rank),
+                'url': reverse('appointments:update', args=[appointment.pk]),
+            }
+            for appointment, rank, snippet in results
+        ],
+        'next': next_cursor,
+    })
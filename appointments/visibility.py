@@ -0,0 +1,116 @@
+# appointments/visibility.py
+"""
+AppointmentAgentAccess (randevu–temsilci görünürlük tablosu) senkronizasyonu.
+
+Bir randevudan sorumlu temsilciler: randevunun `agent` alanındaki temsilci ve
+müşterinin `assigned_clients` üzerinden atandığı tüm temsilciler. Senkronizasyon
+küme tabanlıdır: etkilenen randevuların satırları silinir ve tek bir
+INSERT ... SELECT (UNION) ile yeniden oluşturulur.
+"""
+
+from django.db import connection, transaction
+
+from accounts.models import CustomerAgent
+from .models import Appointment, AppointmentAgentAccess
+
+AssignedClient = CustomerAgent.assigned_clients.through
+
+# SQL parametre sınırlarını (SQLite: 999/32766) aşmamak için kimlikler parçalanır.
+CHUNK_SIZE = 500
+
+
+def _chunks(ids):
+    ids = sorted(set(ids))
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def _rebuild(column=None, ids=()):
+    """
+    Verilen randevu kolonuna (id veya client_id) göre seçilen randevuların erişim
+    satırlarını yeniden oluşturur. column None ise tüm tablo yeniden kurulur.
+    """
+    qn = connection.ops.quote_name
+    access = qn(AppointmentAgentAccess._meta.db_table)
+    appointments = qn(Appointment._meta.db_table)
+    through = qn(AssignedClient._meta.db_table)
+
+    if column is None:
+        where, params = '', []
+        AppointmentAgentAccess.objects.all().delete()
+    else:
+        placeholders = ', '.join(['%s'] * len(ids))
+        where, params = f" AND a.{qn(column)} IN ({placeholders})", list(ids)
+        AppointmentAgentAccess.objects.filter(**{f'appointment__{column}__in': ids}).delete()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {access} (appointment_id, agent_id) "
+            f"SELECT a.id, a.agent_id FROM {appointments} a "
+            f"WHERE a.agent_id IS NOT NULL{where} "
+            f"UNION "
+            f"SELECT a.id, t.customeragent_id FROM {appointments} a "
+            f"INNER JOIN {through} t ON t.customuser_id = a.client_id "
+            f"WHERE 1 = 1{where}",
+            params + params
+        )
+        return cursor.rowcount
+
+
+def sync_appointments(appointment_ids):
+    """Belirtilen randevuların temsilci erişim satırlarını yeniden oluşturur."""
+    total = 0
+    with transaction.atomic():
+        for chunk in _chunks(appointment_ids):
+            total += _rebuild('id', chunk)
+    return total
+
+
+def sync_clients(client_ids):
+    """
+    Belirtilen müşterilerin tüm randevularının erişim satırlarını yeniden oluşturur.
+    Temsilci–müşteri atamaları değiştiğinde (ekleme, çıkarma, toplu aktarım) kullanılır.
+    """
+    total = 0
+    with transaction.atomic():
+        for chunk in _chunks(client_ids):
+            total += _rebuild('client_id', chunk)
+    return total
+
+
+def rebuild_all():
+    """Görünürlük tablosunu baştan oluşturur (ilk kurulum veya tutarsızlık onarımı)."""
+    with transaction.atomic():
+        return _rebuild()
+
+
+def transfer_clients(source_agent, target_agent, client_selection):
+    """
+    Müşterileri temsilciler arasında aktaran toplu işlemler (accounts.reassignment) için
+    görünürlük satırlarını küme tabanlı olarak günceller. client_selection, müşteri
+    kimliklerini (customuser_id) döndüren ve henüz kaynak temsilciden silinmemiş
+    atama kayıtlarını seçen bir sorgudur; randevu temsilcisi güncellendikten sonra çağrılmalıdır.
+    """
+    qn = connection.ops.quote_name
+    access = qn(AppointmentAgentAccess._meta.db_table)
+    appointments = qn(Appointment._meta.db_table)
+    selection_sql, selection_params = client_selection.query.sql_with_params()
+
+    # Hedef temsilciye, seçilen müşterilerin tüm randevularını görünür yap
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {access} (appointment_id, agent_id) "
+            f"SELECT a.id, %s FROM {appointments} a "
+            f"WHERE a.client_id IN ({selection_sql}) "
+            f"AND NOT EXISTS (SELECT 1 FROM {access} x "
+            f"WHERE x.appointment_id = a.id AND x.agent_id = %s)",
+            [target_agent.pk, *selection_params, target_agent.pk]
+        )
+        added = cursor.rowcount
+
+    # Kaynak temsilcinin erişimi, yalnızca doğrudan kendisine atanmış randevularda kalır
+    removed, _ = AppointmentAgentAccess.objects.filter(
+        agent=source_agent,
+        appointment__client_id__in=client_selection,
+    ).exclude(appointment__agent=source_agent).delete()
+    return added, removed
@@ -0,0 +1,202 @@
+# appointments/workspace.py
+"""
+Temsilci çalışma alanı: atanmış müşterilerin her biri için sonraki randevu, son
+tamamlanan ziyaret, son ödeme ve açık bakiye tek bir SQL ifadesiyle okunur.
+
+- Sayfa, müşteri istatistiklerinin (accounts.ClientProfile; bkz. appointments.client_stats)
+  indeksli alanlarına göre sıralanır ve anahtar kümesiyle (keyset: sıralama alanı, müşteri
+  id) sayfalanır; OFFSET kullanılmaz, 20 bin müşterili temsilcide de sayfa maliyeti sabittir.
+- Sayfadaki müşterilerin randevu ve ödeme ayrıntıları (hangi randevu, uzman, hizmet,
+  ödeme tarihi) aynı ifadede `ROW_NUMBER() OVER (PARTITION BY client_id ...)` ile
+  müşteri başına tek satıra indirgenen CTE'lerden birleştirilir. Pencere yalnızca
+  sayfadaki müşterilerin satırlarını tarar (appt_client_date_idx).
+- Sorgu PostgreSQL ve SQLite'ta (geliştirme) aynıdır: CTE ve pencere fonksiyonları
+  her ikisinde de desteklenir; LATERAL kullanılmaz.
+
+Sıralama alanlarının boş (NULL) değerleri her iki yönde de sona gelir.
+"""
+
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import DateTimeField, DecimalField, F, Q, Value
+from django.utils import timezone
+
+from accounts.models import ClientProfile
+from .listing import full_name
+from .models import Appointment
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+ACTIVE_STATUSES = ('pending', 'confirmed')
+# ?sort= değeri -> (ClientProfile alanı, azalan mı)
+SORTS = {
+    'next': ('next_appointment', False),
+    'last_visit': ('last_visit', True),
+    'last_payment': ('last_payment_amount', True),
+    'balance': ('open_balance', True),
+}
+DEFAULT_SORT = 'next'
+
+# Sayfa CTE'sinin kolonları (sıralama alanları imleç için dahil)
+PAGE_COLUMNS = (
+    'client_id', 'name', 'phone', 'visit_count',
+    'next_appointment', 'last_visit', 'last_payment_amount', 'open_balance',
+)
+DETAIL_COLUMNS = (
+    'next_id', 'next_date', 'next_status', 'next_service', 'next_expert',
+    'visit_id', 'visit_date', 'visit_service', 'visit_expert',
+    'payment_id', 'payment_date',
+)
+DATETIME_COLUMNS = ('next_appointment', 'last_visit', 'next_date', 'visit_date', 'payment_date')
+DECIMAL_COLUMNS = ('last_payment_amount', 'open_balance')
+
+
+class InvalidCursor(ValueError):
+    """Sayfa imleci çözülemedi."""
+
+
+def encode_cursor(sort, value, pk):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, Decimal):
+        value = str(value)
+    raw = json.dumps([sort, value, pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(value, sort):
+    try:
+        cursor_sort, key, pk = json.loads(base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)))
+        if cursor_sort != sort:
+            raise ValueError(cursor_sort)
+        if key is not None:
+            key = datetime.fromisoformat(key) if sort in ('next', 'last_visit') else Decimal(key)
+        return key, int(pk)
+    except (ValueError, TypeError, ArithmeticError) as exc:
+        raise InvalidCursor("Geçersiz sayfa imleci.") from exc
+
+
+def _after(field, descending, key, pk):
+    """(sıralama alanı, id) anahtarından sonra gelen satırlar (boş değerler sondadır)."""
+    path = f'client_stats__{field}'
+    if key is None:
+        return Q(**{f'{path}__isnull': True, 'pk__gt': pk})
+    beyond = Q(**{f'{path}__lt' if descending else f'{path}__gt': key})
+    return beyond | Q(**{path: key, 'pk__gt': pk}) | Q(**{f'{path}__isnull': True})
+
+
+def _page_query(agent, sort, after, limit):
+    field, descending = SORTS[sort]
+    clients = agent.assigned_clients.filter(client_stats__isnull=False)
+    if after:
+        clients = clients.filter(_after(field, descending, *decode_cursor(after, sort)))
+    ordering = F(f'client_stats__{field}')
+    clients = clients.annotate(workspace_name=full_name('', fallback='username')).order_by(
+        ordering.desc(nulls_last=True) if descending else ordering.asc(nulls_last=True), 'pk'
+    ).values_list(
+        'pk', 'workspace_name', 'phone', 'client_stats__visit_count', 'client_stats__next_appointment',
+        'client_stats__last_visit', 'client_stats__last_payment_amount', 'client_stats__open_balance',
+    )[:limit + 1]
+    return clients.query.sql_with_params()
+
+
+def _expert_name(alias):
+    return f"COALESCE(NULLIF(TRIM({alias}.first_name || ' ' || {alias}.last_name), ''), {alias}.username)"
+
+
+def _statement(page_sql, sort):
+    from payments.models import Payment
+
+    quote = connection.ops.quote_name
+    appointments = quote(Appointment._meta.db_table)
+    payments = quote(Payment._meta.db_table)
+    experts = quote(Appointment._meta.get_field('expert').related_model._meta.db_table)
+    users = quote(ClientProfile._meta.get_field('user').related_model._meta.db_table)
+    field, descending = SORTS[sort]
+    active = ', '.join(f"'{status}'" for status in ACTIVE_STATUSES)
+    return f"""
+        WITH page ({', '.join(PAGE_COLUMNS)}) AS ({page_sql}),
+        next_appointments AS (
+            SELECT a.client_id, a.id, a.date, a.status, a.service_type, a.expert_id,
+                   ROW_NUMBER() OVER (PARTITION BY a.client_id ORDER BY a.date, a.id) AS position
+            FROM {appointments} a
+            WHERE a.client_id IN (SELECT client_id FROM page)
+              AND a.status IN ({active}) AND a.date >= %s
+        ),
+        last_visits AS (
+            SELECT a.client_id, a.id, a.date, a.service_type, a.expert_id,
+                   ROW_NUMBER() OVER (PARTITION BY a.client_id ORDER BY a.date DESC, a.id DESC) AS position
+            FROM {appointments} a
+            WHERE a.client_id IN (SELECT client_id FROM page) AND a.status = 'completed'
+        ),
+        last_payments AS (
+            SELECT a.client_id, p.id, p.payment_date,
+                   ROW_NUMBER() OVER (PARTITION BY a.client_id ORDER BY p.payment_date DESC, p.id DESC) AS position
+            FROM {payments} p
+            JOIN {appointments} a ON a.id = p.appointment_id
+            WHERE a.client_id IN (SELECT client_id FROM page)
+        )
+        SELECT page.*,
+               n.id, n.date, n.status, n.service_type, {_expert_name('nu')},
+               v.id, v.date, v.service_type, {_expert_name('vu')},
+               lp.id, lp.payment_date
+        FROM page
+        LEFT JOIN next_appointments n ON n.client_id = page.client_id AND n.position = 1
+        LEFT JOIN {experts} ne ON ne.id = n.expert_id
+        LEFT JOIN {users} nu ON nu.id = ne.user_id
+        LEFT JOIN last_visits v ON v.client_id = page.client_id AND v.position = 1
+        LEFT JOIN {experts} ve ON ve.id = v.expert_id
+        LEFT JOIN {users} vu ON vu.id = ve.user_id
+        LEFT JOIN last_payments lp ON lp.client_id = page.client_id AND lp.position = 1
+        ORDER BY page.{field} IS NULL, page.{field} {'DESC' if descending else 'ASC'}, page.client_id
+    """
+
+
+def _converters():
+    """Ham sorgu kolonları için veritabanı dönüştürücüleri (SQLite tarih ve tutarları metin/float döndürür)."""
+    fields = {
+        **{name: DateTimeField() for name in DATETIME_COLUMNS},
+        **{name: DecimalField(max_digits=14, decimal_places=2) for name in DECIMAL_COLUMNS},
+    }
+    converters = {}
+    for name, field in fields.items():
+        expression = Value(None, output_field=field)
+        functions = connection.ops.get_db_converters(expression) + field.get_db_converters(connection)
+        if functions:
+            converters[name] = (expression, functions)
+    return converters
+
+
+def page(agent, sort=DEFAULT_SORT, after=None, limit=PAGE_SIZE):
+    """
+    (satır listesi, sonraki sayfa imleci veya None). Her satır kolon adı -> değer
+    sözlüğüdür (PAGE_COLUMNS + DETAIL_COLUMNS). `after` önceki sayfanın imlecidir.
+    """
+    if sort not in SORTS:
+        raise InvalidCursor("Geçersiz sıralama.")
+    page_sql, params = _page_query(agent, sort, after, limit)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(_statement(page_sql, sort), [*params, now])
+        fetched = cursor.fetchall()
+
+    converters = _converters()
+    columns = PAGE_COLUMNS + DETAIL_COLUMNS
+    rows = []
+    for values in fetched:
+        row = dict(zip(columns, values))
+        for name, (expression, functions) in converters.items():
+            for function in functions:
+                row[name] = function(row[name], expression, connection)
+        rows.append(row)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, last[SORTS[sort][0]], last['client_id'])
+    return rows, next_cursor
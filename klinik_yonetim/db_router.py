@@ -0,0 +1,145 @@
+# klinik_yonetim/db_router.py
+"""
+Rapor ve panel sorgularını okuma kopyasına (read replica) yönlendiren veritabanı yönlendiricisi.
+
+- Yönlendirme isteğe bağlıdır: yalnızca `reports_db` dekoratörü veya
+  `ReportsDatabaseMixin` ile işaretlenmiş görünümlerin okuma sorguları
+  `reports` veritabanına gider. Yazma işlemleri her zaman `default`'a gider.
+- Okuduğunu-yazdığını-görme (read-your-writes): POST gibi yazma istekleri sonrası
+  ReplicaStickinessMiddleware bir çerez bırakır; çerez süresi (REPORTS_PIN_SECONDS)
+  boyunca aynı kullanıcının rapor sorguları da `default` üzerinden çalışır,
+  böylece kopyadaki gecikme nedeniyle yeni kaydettiği veriyi kaybetmiş gibi görmez.
+- `reports` tanımlı değilse (settings.DATABASES) her şey `default` üzerinde çalışır.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+REPORTS_ALIAS = 'reports'
+PIN_COOKIE = 'db_pinned_until'
+
+_reports_active = ContextVar('reports_active', default=False)
+_pinned = ContextVar('db_pinned', default=False)
+
+
+def reports_alias_configured():
+    return REPORTS_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def use_reports():
+    """Blok içindeki okuma sorgularını (sabitlenmiş istekler hariç) `reports` veritabanına yönlendirir."""
+    token = _reports_active.set(True)
+    try:
+        yield
+    finally:
+        _reports_active.reset(token)
+
+
+@contextmanager
+def pinned_to_primary(pinned=True):
+    """Blok içindeki tüm sorguları `default` veritabanına sabitler."""
+    token = _pinned.set(pinned)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class ReportsRouter:
+    """settings.DATABASE_ROUTERS içinde kullanılır."""
+
+    def _routed_apps(self):
+        return getattr(settings, 'REPORTS_DB_APPS', ('accounts', 'appointments', 'payments'))
+
+    def db_for_read(self, model, **hints):
+        if not _reports_active.get() or _pinned.get() or not reports_alias_configured():
+            # Kopyadan okunmuş bir nesnenin ilişkili sorguları da rapor bloğu dışında ana veritabanına gider
+            return 'default'
+        # Oturum, yetki ve içerik tipi tabloları her zaman ana veritabanından okunur
+        if model._meta.app_label not in self._routed_apps():
+            return 'default'
+        return REPORTS_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Kopya, ana veritabanının birebir aynısıdır; iki alias arasındaki ilişkiler geçerlidir.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Kopya, şemasını ana veritabanından (replikasyon ile) alır; migrate edilmez.
+        if db == REPORTS_ALIAS:
+            return False
+        return None
+
+
+def _render_within(response):
+    # TemplateResponse şablonu görünüm döndükten sonra render eder; sorguların çoğu
+    # (sayfalama, şablondaki ilişkiler) o sırada çalıştığından render burada zorlanır.
+    if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+        response.render()
+    return response
+
+
+def reports_db(view_func):
+    """
+    Fonksiyon tabanlı rapor görünümleri için dekoratör. Yalnızca GET/HEAD isteklerinde
+    okuma sorguları `reports` veritabanına yönlendirilir.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view_func(request, *args, **kwargs)
+        with use_reports():
+            return _render_within(view_func(request, *args, **kwargs))
+    return wrapper
+
+
+class ReportsDatabaseMixin:
+    """
+    Sınıf tabanlı rapor görünümleri için karışım (mixin). Diğer karışımlardan önce
+    (en solda) yazılmalıdır ki yetki kontrolleri dahil tüm okuma sorgularını kapsasın.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        with use_reports():
+            return _render_within(super().dispatch(request, *args, **kwargs))
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Yazma isteklerinden (POST, PUT, PATCH, DELETE) sonra kullanıcıyı REPORTS_PIN_SECONDS
+    saniye boyunca ana veritabanına sabitleyen çerezi yönetir.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+        pinned = request.method not in ('GET', 'HEAD', 'OPTIONS') or pinned_until > time.time()
+
+        with pinned_to_primary(pinned):
+            response = self.get_response(request)
+
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            seconds = getattr(settings, 'REPORTS_PIN_SECONDS', 5)
+            response.set_cookie(
+                PIN_COOKIE,
+                str(time.time() + seconds),
+                max_age=seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import connections
+from django.http import JsonResponse
+from django.test import RequestFactory, TestCase
+
+from accounts.models import ClientProfile, CustomUser
+from .db_router import (
+    PIN_COOKIE, REPORTS_ALIAS, ReplicaStickinessMiddleware, ReportsRouter, reports_db, use_reports,
+)
+
+
+@reports_db
+def replica_probe(request):
+    """Yalnızca kopyada bulunan kullanıcıyı görüp görmediğini döndüren rapor görünümü."""
+    return JsonResponse({'replica': CustomUser.objects.filter(username='kopyada').exists()})
+
+
+class ReportsRouterTests(TestCase):
+    """`reports` olarak ikinci bir SQLite veritabanı; kopyada olup ana veritabanında olmayan bir satırla."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Alias test çalıştırıcısı veritabanlarını kurduktan sonra eklenir (kopya migrate edilmez);
+        # testler her iki veritabanında da kendi işlemleri içinde çalışır
+        cls.directory = tempfile.TemporaryDirectory()
+        config = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(cls.directory.name, 'reports.sqlite3')}
+        settings.DATABASES[REPORTS_ALIAS] = config
+        connections.settings[REPORTS_ALIAS] = connections.configure_settings(
+            {'default': dict(settings.DATABASES['default']), REPORTS_ALIAS: dict(config)}
+        )[REPORTS_ALIAS]
+        cls.databases = {'default', REPORTS_ALIAS}
+        with connections[REPORTS_ALIAS].schema_editor() as editor:
+            editor.create_model(CustomUser)
+            editor.create_model(ClientProfile)
+        CustomUser.objects.db_manager(REPORTS_ALIAS).create_user('kopyada', password='x')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.databases = {'default'}
+        connections[REPORTS_ALIAS].close()
+        del connections[REPORTS_ALIAS]
+        # connections.settings çoğunlukla settings.DATABASES sözlüğünün kendisidir
+        connections.settings.pop(REPORTS_ALIAS, None)
+        settings.DATABASES.pop(REPORTS_ALIAS, None)
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def test_reads_go_to_reports_only_inside_report_blocks(self):
+        router = ReportsRouter()
+        self.assertFalse(CustomUser.objects.filter(username='kopyada').exists())
+        self.assertEqual(router.db_for_read(CustomUser), 'default')
+        with use_reports():
+            self.assertTrue(CustomUser.objects.filter(username='kopyada').exists())
+            self.assertEqual(router.db_for_read(CustomUser), REPORTS_ALIAS)
+            # Oturum/yetki tabloları kopyaya yönlendirilmez
+            self.assertEqual(router.db_for_read(Session), 'default')
+
+    def test_writes_always_go_to_default(self):
+        with use_reports():
+            user = CustomUser.objects.create_user('yeni', password='x')
+            self.assertEqual(user._state.db, 'default')
+        self.assertTrue(CustomUser.objects.using('default').filter(username='yeni').exists())
+        self.assertFalse(CustomUser.objects.using(REPORTS_ALIAS).filter(username='yeni').exists())
+
+    def test_requests_after_a_write_are_pinned_to_default(self):
+        factory = RequestFactory()
+        view = ReplicaStickinessMiddleware(replica_probe)
+
+        self.assertEqual(view(factory.get('/rapor/')).content, b'{"replica": true}')
+
+        response = view(factory.post('/kaydet/'))
+        pinned_until = float(response.cookies[PIN_COOKIE].value)
+        self.assertGreater(pinned_until, time.time())
+
+        request = factory.get('/rapor/')
+        request.COOKIES[PIN_COOKIE] = str(pinned_until)
+        self.assertEqual(view(request).content, b'{"replica": false}')
+
+        request = factory.get('/rapor/')
+        request.COOKIES[PIN_COOKIE] = str(time.time() - 1)
+        self.assertEqual(view(request).content, b'{"replica": true}')
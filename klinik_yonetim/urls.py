@@ -12,6 +12,7 @@ urlpatterns = [
     path('appointments/', include('appointments.urls')), # Randevu uygulaması URL'leri
     path('hesap/', include('accounts.urls')),         # Hesap uygulaması URL'leri (kayıt, giriş, profil vb.)
     path('payments/', include('payments.urls')),         # Ödeme uygulaması URL'leri
+    path('notifications/', include('notifications.urls')),  # Değişiklik akışı (giden kutusu)
     
     # Ana Sayfa URL'si
     path('', TemplateView.as_view(template_name='home.html'), name='home'), 
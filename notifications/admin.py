@@ -1,3 +1,90 @@
+# notifications/admin.py
+
+import secrets
+
+from django import forms
 from django.contrib import admin
+from django.db.models import Count
+
+from .models import (
+    WEBHOOK_EVENT_CHOICES,
+    OutboxConsumer,
+    OutboxEvent,
+    WebhookDeadLetter,
+    WebhookEndpoint,
+)
+from .webhooks import requeue_dead_letters
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    """Giden kutusu salt okunurdur; olaylar yalnızca kod tarafından yazılır."""
+    list_display = ('id', 'sequence', 'topic', 'object_id', 'action', 'created_at')
+    list_filter = ('topic', 'action')
+    search_fields = ('=object_id', '=sequence')
+    # Tablo büyük olabileceğinden tam COUNT(*) yapılmaz
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OutboxConsumer)
+class OutboxConsumerAdmin(admin.ModelAdmin):
+    list_display = ('name', 'last_sequence', 'updated_at')
+    readonly_fields = ('updated_at',)
+
+
+class WebhookEndpointForm(forms.ModelForm):
+    event_types = forms.MultipleChoiceField(
+        choices=WEBHOOK_EVENT_CHOICES,
+        widget=forms.CheckboxSelectMultiple,
+        label="Olay Türleri",
+    )
+
+    class Meta:
+        model = WebhookEndpoint
+        fields = '__all__'
+
+
+@admin.register(WebhookEndpoint)
+class WebhookEndpointAdmin(admin.ModelAdmin):
+    form = WebhookEndpointForm
+    list_display = ('name', 'url', 'is_active', 'max_concurrency', 'batch_size', 'pending_count')
+    list_filter = ('is_active',)
+
+    def get_changeform_initial_data(self, request):
+        # Yeni adres için rastgele bir imza anahtarı önerilir
+        initial = super().get_changeform_initial_data(request)
+        initial.setdefault('secret', secrets.token_hex(32))
+        return initial
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(pending=Count('deliveries'))
+
+    def pending_count(self, obj):
+        return obj.pending
+    pending_count.short_description = 'Bekleyen Gönderim'
+    pending_count.admin_order_field = 'pending'
+
+
+@admin.register(WebhookDeadLetter)
+class WebhookDeadLetterAdmin(admin.ModelAdmin):
+    list_display = ('endpoint', 'sequence', 'event_type', 'attempts', 'failed_at', 'last_error')
+    list_filter = ('endpoint', 'event_type')
+    list_select_related = ('endpoint',)
+    actions = ['requeue']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
-# Register your models here.
+    def requeue(self, request, queryset):
+        count = requeue_dead_letters(queryset)
+        self.message_user(request, f"{count} olay yeniden kuyruğa alındı.")
+    requeue.short_description = "Seçili olayları yeniden gönder"
@@ -1,6 +1,13 @@
+# notifications/apps.py
+
 from django.apps import AppConfig
 
 
 class NotificationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notifications'
+    verbose_name = 'Bildirimler ve Değişiklik Akışı'
+
+    def ready(self):
+        # Randevu, ödeme ve temsilci değişikliklerini giden kutusuna yazan sinyaller
+        import notifications.signals  # noqa: F401
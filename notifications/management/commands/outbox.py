@@ -0,0 +1,55 @@
+# notifications/management/commands/outbox.py
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from notifications import outbox
+from notifications.models import OutboxEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "İşlemsel giden kutusunu yönetir. Eylemler: publish (olaylara sıra numarası verir), "
+        "pull (bekleyen olayları yayımlar, imleçten sonraki olayları JSON satırları olarak yazar), purge (sıkıştırma ve saklama "
+        "süresi temizliği, örn. her gece cron ile)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['publish', 'pull', 'purge'])
+        parser.add_argument('--after', type=int, default=0, help="pull: bu sıra numarasından sonraki olaylar (varsayılan: 0).")
+        parser.add_argument('--limit', type=int, default=500, help="pull: parti büyüklüğü (varsayılan: 500).")
+        parser.add_argument('--topic', action='append', choices=[value for value, _label in OutboxEvent.TOPIC_CHOICES],
+                            help="pull: yalnızca bu konu. Birden fazla kez verilebilir.")
+        parser.add_argument('--all', action='store_true', help="pull: tüm partileri sırayla oku.")
+        parser.add_argument('--consumer', help="pull: okunan son sıra numarasını bu tüketici adına onayla.")
+        parser.add_argument('--retention-days', type=int, help="purge: saklama süresi, gün (varsayılan: OUTBOX_RETENTION_DAYS).")
+        parser.add_argument('--compact-after-days', type=int, help="purge: sıkıştırma yaşı, gün (varsayılan: OUTBOX_COMPACT_AFTER_DAYS).")
+
+    def handle(self, *args, **options):
+        getattr(self, f"_{options['action']}")(options)
+
+    def _publish(self, options):
+        total = outbox.publish_all()
+        self.stdout.write(self.style.SUCCESS(f"{total} olay yayımlandı."))
+
+    def _pull(self, options):
+        if options['limit'] < 1:
+            raise CommandError("--limit en az 1 olmalıdır.")
+        outbox.publish_all()
+        cursor = options['after']
+        while True:
+            page = outbox.fetch(after=cursor, limit=options['limit'], topic_names=options['topic'])
+            for event in page['events']:
+                self.stdout.write(json.dumps(event, cls=DjangoJSONEncoder, ensure_ascii=False))
+            cursor = page['next_cursor']
+            if options['consumer']:
+                outbox.acknowledge(options['consumer'], cursor)
+            if not (options['all'] and page['more']):
+                break
+        self.stderr.write(f"next_cursor={cursor}")
+
+    def _purge(self, options):
+        compacted, expired = outbox.purge(options['retention_days'], options['compact_after_days'])
+        self.stdout.write(self.style.SUCCESS(f"{compacted} eski olay sıkıştırıldı, {expired} olay saklama süresi dolduğu için silindi."))
@@ -0,0 +1,33 @@
+# notifications/management/commands/webhook_dispatcher.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.webhooks import dispatch_once
+
+
+class Command(BaseCommand):
+    help = (
+        "Web kancası işçisi: giden kutusundaki olayları adreslere dağıtır ve partiler halinde "
+        "gönderir. Varsayılan olarak sürekli çalışır (örn. systemd/supervisor altında); "
+        "--once ile tek tur çalışıp çıkar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Tek tur çalıştır ve çık.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Boş turlar arasında bekleme, saniye (varsayılan: 2).")
+
+    def handle(self, *args, **options):
+        while True:
+            stats = dispatch_once()
+            if any(stats.values()):
+                self.stdout.write(
+                    f"kuyruğa alınan={stats['queued']} gönderilen={stats['delivered']} "
+                    f"yeniden denenecek={stats['retried']} gönderilemeyen={stats['dead']}"
+                )
+            if options['once']:
+                return
+            # İş varsa hemen devam edilir, kuyruk boşsa beklenir
+            if not (stats['queued'] or stats['delivered'] or stats['retried']):
+                time.sleep(options['interval'])
@@ -0,0 +1,56 @@
+# notifications/management/commands/webhook_stub_server.py
+
+import json
+import random
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from notifications.webhooks import SIGNATURE_HEADER, verify
+
+
+class Command(BaseCommand):
+    help = (
+        "Web kancalarını yerelde denemek için basit bir HTTP sunucusu. Gelen partileri yazdırır, "
+        "--secret verilirse imzayı doğrular, --fail-rate ile rastgele 503 döndürerek yeniden denemeyi sınar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--secret', help="İmza doğrulaması için adresin imza anahtarı.")
+        parser.add_argument('--fail-rate', type=float, default=0.0, help="503 döndürülecek isteklerin oranı (0-1).")
+
+    def handle(self, *args, **options):
+        command = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if options['secret'] and not verify(options['secret'], self.headers.get(SIGNATURE_HEADER, ''), body):
+                    command.stdout.write(command.style.ERROR("Geçersiz imza"))
+                    return self._reply(401)
+                if random.random() < options['fail_rate']:
+                    command.stdout.write(command.style.WARNING("503 döndürüldü (yapay hata)"))
+                    return self._reply(503)
+                deliveries = json.loads(body)['deliveries']
+                summary = ', '.join(f"{item['id']}:{item['type']}" for item in deliveries)
+                command.stdout.write(f"{len(deliveries)} olay alındı: {summary}")
+                self._reply(200)
+
+            def _reply(self, status):
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((options['host'], options['port']), Handler)
+        self.stdout.write(f"Web kancası test sunucusu http://{options['host']}:{options['port']}/ adresinde dinliyor.")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.2 on 2026-10-19 04:36
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxConsumer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Tüketici Adı')),
+                ('last_sequence', models.BigIntegerField(default=0, verbose_name='Son Onaylanan Sıra Numarası')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Güncellenme Tarihi')),
+            ],
+            options={
+                'verbose_name': 'Giden Kutusu Tüketicisi',
+                'verbose_name_plural': 'Giden Kutusu Tüketicileri',
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.BigIntegerField(blank=True, null=True, unique=True, verbose_name='Sıra Numarası')),
+                ('topic', models.CharField(choices=[('appointment', 'Randevu'), ('payment', 'Ödeme'), ('customer_agent', 'Temsilci')], max_length=20, verbose_name='Konu')),
+                ('object_id', models.BigIntegerField(verbose_name='Kayıt Kimliği')),
+                ('action', models.CharField(choices=[('created', 'Oluşturuldu'), ('updated', 'Güncellendi'), ('deleted', 'Silindi'), ('archived', 'Arşivlendi')], max_length=10, verbose_name='İşlem')),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Kayıt Verisi')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Oluşturulma Tarihi')),
+            ],
+            options={
+                'verbose_name': 'Giden Kutusu Olayı',
+                'verbose_name_plural': 'Giden Kutusu Olayları',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['topic', 'object_id', 'sequence'], name='outbox_topic_object_idx'), models.Index(condition=models.Q(('sequence__isnull', True)), fields=['id'], name='outbox_unpublished_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.2 on 2026-10-19 04:39
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+import notifications.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEndpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Ad')),
+                ('url', models.URLField(max_length=500, verbose_name='Adres')),
+                ('secret', models.CharField(max_length=128, verbose_name='İmza Anahtarı')),
+                ('event_types', models.JSONField(default=notifications.models.default_webhook_events, verbose_name='Olay Türleri')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Aktif')),
+                ('max_concurrency', models.PositiveSmallIntegerField(default=2, help_text='Bu adrese aynı anda gönderilebilecek en fazla istek sayısı.', verbose_name='En Fazla Eşzamanlı İstek')),
+                ('batch_size', models.PositiveSmallIntegerField(default=50, help_text='Tek bir POST isteğinde birleştirilen en fazla olay sayısı.', verbose_name='Parti Büyüklüğü')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Oluşturulma Tarihi')),
+            ],
+            options={
+                'verbose_name': 'Web Kancası Adresi',
+                'verbose_name_plural': 'Web Kancası Adresleri',
+            },
+        ),
+        migrations.CreateModel(
+            name='WebhookDeadLetter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.BigIntegerField(verbose_name='Olay Sıra Numarası')),
+                ('event_type', models.CharField(choices=[('appointment.created', 'Randevu oluşturuldu'), ('appointment.cancelled', 'Randevu iptal edildi'), ('payment.recorded', 'Ödeme kaydedildi')], max_length=50, verbose_name='Olay Türü')),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Olay Verisi')),
+                ('attempts', models.PositiveIntegerField(verbose_name='Deneme Sayısı')),
+                ('last_error', models.TextField(blank=True, verbose_name='Son Hata')),
+                ('failed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Başarısız Olma Tarihi')),
+                ('endpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dead_letters', to='notifications.webhookendpoint', verbose_name='Adres')),
+            ],
+            options={
+                'verbose_name': 'Gönderilemeyen Web Kancası',
+                'verbose_name_plural': 'Gönderilemeyen Web Kancaları',
+                'ordering': ['-failed_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WebhookDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.BigIntegerField(verbose_name='Olay Sıra Numarası')),
+                ('event_type', models.CharField(choices=[('appointment.created', 'Randevu oluşturuldu'), ('appointment.cancelled', 'Randevu iptal edildi'), ('payment.recorded', 'Ödeme kaydedildi')], max_length=50, verbose_name='Olay Türü')),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Olay Verisi')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Deneme Sayısı')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Sonraki Deneme')),
+                ('last_error', models.TextField(blank=True, verbose_name='Son Hata')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Oluşturulma Tarihi')),
+                ('endpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='notifications.webhookendpoint', verbose_name='Adres')),
+            ],
+            options={
+                'verbose_name': 'Web Kancası Gönderimi',
+                'verbose_name_plural': 'Web Kancası Gönderimleri',
+                'indexes': [models.Index(fields=['endpoint', 'next_attempt_at', 'sequence'], name='webhook_due_idx')],
+                'constraints': [models.UniqueConstraint(fields=('endpoint', 'sequence'), name='unique_webhook_delivery')],
+            },
+        ),
+    ]
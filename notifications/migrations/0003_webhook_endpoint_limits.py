@@ -0,0 +1,38 @@
+# notifications/migrations/0003_webhook_endpoint_limits.py
+#
+# Web kancası adreslerinde max_concurrency ve batch_size en az 1 olmalıdır. Kısıt
+# eklenmeden önce 0 kaydedilmiş adresler varsayılan değerlere çekilir.
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def fix_zero_limits(apps, schema_editor):
+    WebhookEndpoint = apps.get_model('notifications', 'WebhookEndpoint')
+    WebhookEndpoint.objects.filter(max_concurrency__lt=1).update(max_concurrency=2)
+    WebhookEndpoint.objects.filter(batch_size__lt=1).update(batch_size=50)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_webhooks'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='webhookendpoint',
+            name='batch_size',
+            field=models.PositiveSmallIntegerField(default=50, help_text='Tek bir POST isteğinde birleştirilen en fazla olay sayısı.', validators=[django.core.validators.MinValueValidator(1)], verbose_name='Parti Büyüklüğü'),
+        ),
+        migrations.AlterField(
+            model_name='webhookendpoint',
+            name='max_concurrency',
+            field=models.PositiveSmallIntegerField(default=2, help_text='Bu adrese aynı anda gönderilebilecek en fazla istek sayısı.', validators=[django.core.validators.MinValueValidator(1)], verbose_name='En Fazla Eşzamanlı İstek'),
+        ),
+        migrations.RunPython(fix_zero_limits, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='webhookendpoint',
+            constraint=models.CheckConstraint(condition=models.Q(('max_concurrency__gte', 1), ('batch_size__gte', 1)), name='webhook_endpoint_positive_limits'),
+        ),
+    ]
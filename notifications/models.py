@@ -1,3 +1,173 @@
+# notifications/models.py
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class OutboxEvent(models.Model):
+    """
+    İşlemsel giden kutusu (transactional outbox): Appointment, Payment ve CustomerAgent
+    üzerindeki her değişiklik, değişikliği yapan işlemle aynı işlem içinde buraya yazılır.
+
+    `id` ekleme sırasını, `sequence` ise yayımlanma sırasını verir. Eşzamanlı işlemler
+    farklı sırada tamamlanabildiği için tüketiciler `id` yerine, olaylar kalıcı hale
+    geldikten sonra tek bir yayımlayıcı tarafından sırayla atanan `sequence` ile okur
+    (bkz. notifications.outbox.publish); böylece bir imleçten sonra gelen hiçbir olay atlanmaz.
+    """
+    TOPIC_CHOICES = [
+        ('appointment', 'Randevu'),
+        ('payment', 'Ödeme'),
+        ('customer_agent', 'Temsilci'),
+    ]
+    ACTION_CHOICES = [
+        ('created', 'Oluşturuldu'),
+        ('updated', 'Güncellendi'),
+        ('deleted', 'Silindi'),
+        ('archived', 'Arşivlendi'),
+    ]
+
+    sequence = models.BigIntegerField(null=True, blank=True, unique=True, verbose_name="Sıra Numarası")
+    topic = models.CharField(max_length=20, choices=TOPIC_CHOICES, verbose_name="Konu")
+    object_id = models.BigIntegerField(verbose_name="Kayıt Kimliği")
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES, verbose_name="İşlem")
+    payload = models.JSONField(encoder=DjangoJSONEncoder, verbose_name="Kayıt Verisi")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Oluşturulma Tarihi")
+
+    class Meta:
+        verbose_name = "Giden Kutusu Olayı"
+        verbose_name_plural = "Giden Kutusu Olayları"
+        ordering = ['id']
+        indexes = [
+            # Sıkıştırma (aynı kaydın daha yeni olayı var mı?) için
+            models.Index(fields=['topic', 'object_id', 'sequence'], name='outbox_topic_object_idx'),
+            # Yayımlanmayı bekleyen olaylar; yayımlandıktan sonra indeksten çıkar
+            models.Index(fields=['id'], condition=Q(sequence__isnull=True), name='outbox_unpublished_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sequence or '-'} {self.topic}#{self.object_id} {self.action}"
+
+
+class OutboxConsumer(models.Model):
+    """
+    Giden kutusunu okuyan bir tüketicinin (CRM, veri ambarı...) onayladığı son sıra numarası.
+    Saklama süresi temizliği, tüm tüketicilerin henüz okumadığı olayları silmez.
+    """
+    name = models.CharField(max_length=100, unique=True, verbose_name="Tüketici Adı")
+    last_sequence = models.BigIntegerField(default=0, verbose_name="Son Onaylanan Sıra Numarası")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Güncellenme Tarihi")
+
+    class Meta:
+        verbose_name = "Giden Kutusu Tüketicisi"
+        verbose_name_plural = "Giden Kutusu Tüketicileri"
+
+    def __str__(self):
+        return f"{self.name} ({self.last_sequence})"
+
+
+WEBHOOK_EVENT_CHOICES = [
+    ('appointment.created', 'Randevu oluşturuldu'),
+    ('appointment.cancelled', 'Randevu iptal edildi'),
+    ('payment.recorded', 'Ödeme kaydedildi'),
+]
+
+
+def default_webhook_events():
+    return [value for value, _label in WEBHOOK_EVENT_CHOICES]
+
+
+class WebhookEndpoint(models.Model):
+    """
+    Bildirim gönderilen iş ortağı adresi (SMS sağlayıcısı, CRM...). Gövde, `secret` ile
+    HMAC-SHA256 imzalanır (bkz. notifications.webhooks.sign).
+    """
+    name = models.CharField(max_length=100, unique=True, verbose_name="Ad")
+    url = models.URLField(max_length=500, verbose_name="Adres")
+    secret = models.CharField(max_length=128, verbose_name="İmza Anahtarı")
+    event_types = models.JSONField(default=default_webhook_events, verbose_name="Olay Türleri")
+    is_active = models.BooleanField(default=True, verbose_name="Aktif")
+    max_concurrency = models.PositiveSmallIntegerField(
+        default=2,
+        validators=[MinValueValidator(1)],
+        verbose_name="En Fazla Eşzamanlı İstek",
+        help_text="Bu adrese aynı anda gönderilebilecek en fazla istek sayısı."
+    )
+    batch_size = models.PositiveSmallIntegerField(
+        default=50,
+        validators=[MinValueValidator(1)],
+        verbose_name="Parti Büyüklüğü",
+        help_text="Tek bir POST isteğinde birleştirilen en fazla olay sayısı."
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Oluşturulma Tarihi")
+
+    class Meta:
+        verbose_name = "Web Kancası Adresi"
+        verbose_name_plural = "Web Kancası Adresleri"
+        constraints = [
+            # 0 değerleri dağıtımı durdurur (parti bölme ve eşzamanlılık sınırı en az 1 ister)
+            models.CheckConstraint(
+                condition=Q(max_concurrency__gte=1) & Q(batch_size__gte=1),
+                name='webhook_endpoint_positive_limits',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class WebhookDelivery(models.Model):
+    """Gönderilmeyi bekleyen (veya yeniden denenecek) bir olay. Başarılı gönderimden sonra silinir."""
+    endpoint = models.ForeignKey(
+        WebhookEndpoint,
+        on_delete=models.CASCADE,
+        related_name='deliveries',
+        verbose_name="Adres"
+    )
+    sequence = models.BigIntegerField(verbose_name="Olay Sıra Numarası")
+    event_type = models.CharField(max_length=50, choices=WEBHOOK_EVENT_CHOICES, verbose_name="Olay Türü")
+    payload = models.JSONField(encoder=DjangoJSONEncoder, verbose_name="Olay Verisi")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Deneme Sayısı")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Sonraki Deneme")
+    last_error = models.TextField(blank=True, verbose_name="Son Hata")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Oluşturulma Tarihi")
+
+    class Meta:
+        verbose_name = "Web Kancası Gönderimi"
+        verbose_name_plural = "Web Kancası Gönderimleri"
+        constraints = [
+            # Aynı olay bir adrese bir kez kuyruğa alınır (dağıtım tekrarlanırsa çift kayıt oluşmaz)
+            models.UniqueConstraint(fields=['endpoint', 'sequence'], name='unique_webhook_delivery'),
+        ]
+        indexes = [
+            models.Index(fields=['endpoint', 'next_attempt_at', 'sequence'], name='webhook_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.endpoint} #{self.sequence} {self.event_type}"
+
+
+class WebhookDeadLetter(models.Model):
+    """En fazla deneme sayısına ulaşıp gönderilemeyen olaylar. Yönetim panelinden yeniden kuyruğa alınabilir."""
+    endpoint = models.ForeignKey(
+        WebhookEndpoint,
+        on_delete=models.CASCADE,
+        related_name='dead_letters',
+        verbose_name="Adres"
+    )
+    sequence = models.BigIntegerField(verbose_name="Olay Sıra Numarası")
+    event_type = models.CharField(max_length=50, choices=WEBHOOK_EVENT_CHOICES, verbose_name="Olay Türü")
+    payload = models.JSONField(encoder=DjangoJSONEncoder, verbose_name="Olay Verisi")
+    attempts = models.PositiveIntegerField(verbose_name="Deneme Sayısı")
+    last_error = models.TextField(blank=True, verbose_name="Son Hata")
+    failed_at = models.DateTimeField(default=timezone.now, verbose_name="Başarısız Olma Tarihi")
+
+    class Meta:
+        verbose_name = "Gönderilemeyen Web Kancası"
+        verbose_name_plural = "Gönderilemeyen Web Kancaları"
+        ordering = ['-failed_at']
 
-# Create your models here.
+    def __str__(self):
+        return f"{self.endpoint} #{self.sequence} {self.event_type}"
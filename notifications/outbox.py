@@ -0,0 +1,243 @@
+# notifications/outbox.py
+"""
+İşlemsel giden kutusu (OutboxEvent) yazımı, yayımlanması, okunması ve temizliği.
+
+Yazım:
+- Tekil kayıt/silme işlemleri notifications.signals üzerinden `record` ile,
+  değişikliği yapan işlem içinde yazılır: Appointment/Payment (VersionedModel) ve
+  CustomerAgent kayıtları kendi işlemlerinde yapılır, silme ve m2m değişiklikleri Django
+  tarafından zaten işlem içindedir. Birden fazla kaydı değiştiren görünümler
+  (ödeme kaydı, temsilcinin müşteri eklemesi) yazımlarını tek bir işlemde yapar.
+- Sinyal tetiklemeyen toplu yollar (bulk_create, queryset.update, ham SQL) aynı işlem
+  içinde `record_bulk` çağırır: etkilenen satırlar parça başına tek sorguda okunur ve
+  olaylar tek bir bulk_create ile eklenir.
+
+Okuma:
+- `publish` kalıcı hale gelmiş, henüz sıra numarası almamış olayları `id` sırasıyla
+  numaralandırır. Yayımlayıcı tek seferde bir tane çalışır (PostgreSQL advisory lock).
+  Yayımlama okuma yolunda yapılmaz: web kancası işçisi (webhook_dispatcher) her turda,
+  `outbox publish` komutu ise cron ile çalıştırıldığında yayımlar.
+- Tüketiciler `fetch(after=<son sıra numarası>)` ile partiler halinde okur; bir sonraki
+  çağrıda dönen `next_cursor` değerini gönderir. Okuma yazım veya kilit gerektirmez.
+
+Saklama:
+- `purge` belirli bir süreden eski olaylardan, aynı kaydın daha yeni bir olayı bulunanları
+  siler (sıkıştırma) ve saklama süresini aşmış, tüm tüketicilerin onayladığı olayları siler.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, Max, Min, OuterRef
+from django.utils import timezone
+
+from .models import OutboxConsumer, OutboxEvent
+
+# SQL parametre sınırlarını (SQLite: 999/32766) aşmamak için kimlikler parçalanır.
+CHUNK_SIZE = 500
+PUBLISH_BATCH_SIZE = 5000
+# Yayımlayıcıyı tekilleştiren PostgreSQL advisory lock anahtarı
+PUBLISH_LOCK_KEY = 7_301_037
+
+_suppressed = ContextVar('outbox_suppressed', default=False)
+
+
+def topics():
+    """Konu adından modele sözlük."""
+    from accounts.models import CustomerAgent
+    from appointments.models import Appointment
+    from payments.models import Payment
+    return {
+        'appointment': Appointment,
+        'payment': Payment,
+        'customer_agent': CustomerAgent,
+    }
+
+
+def topic_for(model):
+    for topic, topic_model in topics().items():
+        if topic_model is model:
+            return topic
+    raise LookupError(f"{model.__name__} için giden kutusu konusu tanımlı değil.")
+
+
+@contextmanager
+def suppressed():
+    """
+    Blok içindeki sinyal tabanlı olay yazımını kapatır. Olayları kendisi `record_bulk`
+    ile yazan toplu yollar (örn. arşivleme) çift olay üretmemek için kullanır.
+    """
+    token = _suppressed.set(True)
+    try:
+        yield
+    finally:
+        _suppressed.reset(token)
+
+
+def is_suppressed():
+    return _suppressed.get()
+
+
+def _chunks(ids):
+    ids = sorted(set(ids))
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def _field_names(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _add_assignments(topic, rows):
+    """Temsilci olaylarına, m2m olduğu için satırda bulunmayan atanmış müşteri listesini ekler."""
+    if topic != 'customer_agent' or not rows:
+        return
+    through = topics()['customer_agent'].assigned_clients.through
+    assigned = {row['id']: [] for row in rows}
+    for agent_id, client_id in through.objects.filter(
+        customeragent_id__in=list(assigned)
+    ).order_by('customeragent_id', 'customuser_id').values_list('customeragent_id', 'customuser_id'):
+        assigned[agent_id].append(client_id)
+    for row in rows:
+        row['assigned_client_ids'] = assigned[row['id']]
+
+
+def record(instance, action):
+    """Tek bir kaydın güncel halini olay olarak yazar."""
+    if is_suppressed():
+        return
+    topic = topic_for(type(instance))
+    row = {name: getattr(instance, name) for name in _field_names(type(instance))}
+    if topic == 'appointment':
+        # Web kancaları (notifications.webhooks) iptal gibi geçişleri buradan anlar
+        row['status_changed'] = getattr(instance, '_status_changed', False)
+    if action != 'deleted':
+        _add_assignments(topic, [row])
+    OutboxEvent.objects.create(topic=topic, object_id=instance.pk, action=action, payload=row)
+
+
+def record_bulk(model, ids, action, extra=None):
+    """
+    Sinyal tetiklemeyen toplu işlemler için: verilen kayıtların güncel halini olay olarak yazar.
+    Silme/arşivleme öncesinde, diğer işlemlerde değişiklikten sonra ve aynı işlem içinde çağrılmalıdır.
+    extra: her olayın verisine eklenecek alanlar (örn. {'status_changed': True}).
+    """
+    topic = topic_for(model)
+    total = 0
+    for chunk in _chunks(ids):
+        rows = list(model._base_manager.filter(pk__in=chunk).values(*_field_names(model)))
+        _add_assignments(topic, rows)
+        for row in rows:
+            row.update(extra or {})
+        OutboxEvent.objects.bulk_create([
+            OutboxEvent(topic=topic, object_id=row['id'], action=action, payload=row)
+            for row in rows
+        ])
+        total += len(rows)
+    return total
+
+
+def publish(limit=PUBLISH_BATCH_SIZE):
+    """Kalıcı hale gelmiş, numarasız olaylara sıra numarası verir. Numaralanan olay sayısını döndürür."""
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [PUBLISH_LOCK_KEY])
+        last = OutboxEvent.objects.aggregate(last=Max('sequence'))['last'] or 0
+        pending = list(OutboxEvent.objects.filter(sequence__isnull=True).order_by('id').only('id')[:limit])
+        for offset, event in enumerate(pending, start=1):
+            event.sequence = last + offset
+        OutboxEvent.objects.bulk_update(pending, ['sequence'], batch_size=1000)
+    return len(pending)
+
+
+def publish_all():
+    """Bekleyen tüm olayları partiler halinde yayımlar; yayımlanan olay sayısını döndürür."""
+    total = 0
+    while True:
+        published = publish()
+        total += published
+        if published < PUBLISH_BATCH_SIZE:
+            return total
+
+
+def serialize(event):
+    return {
+        'sequence': event.sequence,
+        'topic': event.topic,
+        'object_id': event.object_id,
+        'action': event.action,
+        'payload': event.payload,
+        'created_at': event.created_at.isoformat(),
+    }
+
+
+def fetch(after=0, limit=500, topic_names=None):
+    """
+    `after` sıra numarasından sonraki en fazla `limit` olayı döndürür:
+    {'events': [...], 'next_cursor': <son sıra numarası>, 'more': <devamı var mı>}.
+    Yalnızca yayımlanmış (sıra numarası almış) olaylar okunur.
+    """
+    queryset = OutboxEvent.objects.filter(sequence__gt=after).order_by('sequence')
+    if topic_names:
+        queryset = queryset.filter(topic__in=topic_names)
+    events = list(queryset[:limit + 1])
+    more = len(events) > limit
+    events = events[:limit]
+    return {
+        'events': [serialize(event) for event in events],
+        'next_cursor': events[-1].sequence if events else after,
+        'more': more,
+    }
+
+
+def acknowledge(consumer_name, sequence):
+    """Tüketicinin `sequence` dahil olmak üzere tüm olayları işlediğini kaydeder (imleç geri gitmez)."""
+    consumer, _created = OutboxConsumer.objects.get_or_create(name=consumer_name)
+    OutboxConsumer.objects.filter(pk=consumer.pk, last_sequence__lt=sequence).update(
+        last_sequence=sequence, updated_at=timezone.now()
+    )
+
+
+def _delete_in_batches(queryset, batch_size):
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += OutboxEvent.objects.filter(id__in=ids).delete()[0]
+
+
+def purge(retention_days=None, compact_after_days=None, batch_size=1000):
+    """
+    Giden kutusunu temizler; (sıkıştırılan, süresi dolan) olay sayılarını döndürür.
+    - Sıkıştırma: `compact_after_days` günden eski olaylardan, aynı kaydın daha yeni
+      (daha büyük sıra numaralı) bir olayı bulunanlar silinir; geride kalan tüketiciler
+      kaydın son halini yine alır.
+    - Saklama: `retention_days` günden eski ve tüm tüketicilerin onayladığı olaylar silinir.
+    """
+    retention_days = retention_days if retention_days is not None else getattr(settings, 'OUTBOX_RETENTION_DAYS', 30)
+    compact_after_days = compact_after_days if compact_after_days is not None else getattr(settings, 'OUTBOX_COMPACT_AFTER_DAYS', 7)
+    now = timezone.now()
+
+    newer = OutboxEvent.objects.filter(
+        topic=OuterRef('topic'), object_id=OuterRef('object_id'), sequence__gt=OuterRef('sequence')
+    )
+    compacted = _delete_in_batches(
+        OutboxEvent.objects.filter(
+            created_at__lt=now - timedelta(days=compact_after_days), sequence__isnull=False
+        ).filter(Exists(newer)).order_by('sequence'),
+        batch_size,
+    )
+
+    expired_queryset = OutboxEvent.objects.filter(
+        created_at__lt=now - timedelta(days=retention_days), sequence__isnull=False
+    )
+    acknowledged = OutboxConsumer.objects.aggregate(low=Min('last_sequence'))['low']
+    if acknowledged is not None:
+        expired_queryset = expired_queryset.filter(sequence__lte=acknowledged)
+    expired = _delete_in_batches(expired_queryset.order_by('sequence'), batch_size)
+    return compacted, expired
@@ -0,0 +1,46 @@
+# notifications/signals.py
+"""
+Appointment, Payment ve CustomerAgent kayıt/silme işlemlerini giden kutusuna yazan sinyaller.
+Toplu işlemler sinyal tetiklemediğinden bu yollar notifications.outbox.record_bulk çağırır.
+"""
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import CustomerAgent
+from appointments.models import Appointment
+from payments.models import Payment
+from .outbox import is_suppressed, record, record_bulk
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_save, sender=Payment)
+@receiver(post_save, sender=CustomerAgent)
+def outbox_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    record(instance, 'created' if created else 'updated')
+
+
+@receiver(post_delete, sender=Appointment)
+@receiver(post_delete, sender=Payment)
+@receiver(post_delete, sender=CustomerAgent)
+def outbox_on_delete(sender, instance, **kwargs):
+    record(instance, 'deleted')
+
+
+@receiver(m2m_changed, sender=CustomerAgent.assigned_clients.through)
+def outbox_on_assignment_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Müşteri atamaları temsilci olayının parçasıdır; ilişki her iki yönden de değişebilir."""
+    if action == 'pre_clear' and reverse:
+        # Müşteri tarafından clear() sonrasında hangi temsilcilerin etkilendiği bilinemez
+        instance._outbox_cleared_agent_ids = list(instance.agents.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear') or is_suppressed():
+        return
+    if not reverse:
+        record(instance, 'updated')
+    elif action == 'post_clear':
+        record_bulk(CustomerAgent, getattr(instance, '_outbox_cleared_agent_ids', []), 'updated')
+    elif pk_set:
+        record_bulk(CustomerAgent, pk_set, 'updated')
@@ -1,3 +1,138 @@
-from django.test import TestCase
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import CustomUser, CustomerAgent
+from . import outbox, webhooks
+from .models import OutboxEvent, WebhookDeadLetter, WebhookDelivery, WebhookEndpoint
+
+
+class StubServer:
+    """Web kancası isteklerini kaydeden ve ayarlanan durum koduyla yanıt veren yerel HTTP sunucusu."""
+
+    def __init__(self):
+        self.requests = []
+        self.status = 200
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                stub.requests.append((dict(self.headers), body))
+                self.send_response(stub.status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_address[1]}/hooks'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@override_settings(WEBHOOK_TIMEOUT_SECONDS=5, WEBHOOK_BACKOFF_BASE_SECONDS=10)
+class WebhookDispatchTests(TestCase):
+    def setUp(self):
+        self.stub = StubServer().__enter__()
+        self.addCleanup(self.stub.__exit__, None, None, None)
+        self.endpoint = WebhookEndpoint.objects.create(
+            name='crm', url=self.stub.url, secret='s3cret', batch_size=2, max_concurrency=2,
+        )
+
+    def queue(self, *sequences):
+        WebhookDelivery.objects.bulk_create([
+            WebhookDelivery(endpoint=self.endpoint, sequence=sequence, event_type='appointment.created',
+                            payload={'id': sequence})
+            for sequence in sequences
+        ])
+
+    def test_batches_are_signed_and_delivered(self):
+        self.queue(1, 2, 3)
+        stats = webhooks.dispatch_once()
+
+        self.assertEqual(stats['delivered'], 3)
+        self.assertFalse(WebhookDelivery.objects.exists())
+        self.assertEqual(len(self.stub.requests), 2)
+        batches = []
+        for headers, body in self.stub.requests:
+            self.assertTrue(webhooks.verify('s3cret', headers[webhooks.SIGNATURE_HEADER], body))
+            self.assertFalse(webhooks.verify('wrong', headers[webhooks.SIGNATURE_HEADER], body))
+            batches.append([item['id'] for item in json.loads(body)['deliveries']])
+        self.assertEqual(sorted(batches), [[1, 2], [3]])
+
+    def test_failed_batches_are_rescheduled(self):
+        self.stub.status = 503
+        self.queue(1)
+        before = timezone.now()
+        stats = webhooks.dispatch_once()
+
+        self.assertEqual((stats['delivered'], stats['retried'], stats['dead']), (0, 1, 0))
+        delivery = WebhookDelivery.objects.get()
+        self.assertEqual(delivery.attempts, 1)
+        self.assertEqual(delivery.last_error, 'HTTP 503')
+        self.assertGreater(delivery.next_attempt_at, before)
+        # Vadesi gelmemiş gönderim bir sonraki turda yeniden gönderilmez
+        webhooks.dispatch_once()
+        self.assertEqual(len(self.stub.requests), 1)
+
+    @override_settings(WEBHOOK_MAX_ATTEMPTS=2)
+    def test_exhausted_deliveries_move_to_dead_letters(self):
+        self.stub.status = 500
+        self.queue(7)
+        webhooks.dispatch_once()
+        WebhookDelivery.objects.update(next_attempt_at=timezone.now())
+        stats = webhooks.dispatch_once()
+
+        self.assertEqual(stats['dead'], 1)
+        self.assertFalse(WebhookDelivery.objects.exists())
+        letter = WebhookDeadLetter.objects.get()
+        self.assertEqual((letter.sequence, letter.attempts, letter.last_error), (7, 2, 'HTTP 500'))
+
+        self.stub.status = 200
+        self.assertEqual(webhooks.requeue_dead_letters(WebhookDeadLetter.objects.all()), 1)
+        self.assertEqual(webhooks.dispatch_once()['delivered'], 1)
+
+    def test_zero_limits_are_rejected(self):
+        endpoint = WebhookEndpoint(name='sms', url=self.stub.url, secret='x', batch_size=0, max_concurrency=0)
+        with self.assertRaises(ValidationError) as raised:
+            endpoint.full_clean()
+        self.assertEqual(set(raised.exception.message_dict), {'batch_size', 'max_concurrency'})
+        self.assertEqual(webhooks.claim(endpoint), [])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            endpoint.save()
+
+
+class OutboxTests(TestCase):
+    def test_agent_changes_are_recorded_with_the_write(self):
+        user = CustomUser.objects.create_user('temsilci', password='x', user_type='agent')
+        agent = CustomerAgent.objects.create(user=user)
+        self.assertEqual(list(OutboxEvent.objects.values_list('topic', 'object_id', 'action')),
+                         [('customer_agent', agent.pk, 'created')])
+
+    def test_fetch_reads_only_published_events(self):
+        user = CustomUser.objects.create_user('temsilci', password='x', user_type='agent')
+        CustomerAgent.objects.create(user=user)
+        self.assertEqual(outbox.fetch()['events'], [])
+        self.assertFalse(OutboxEvent.objects.filter(sequence__isnull=False).exists())
+
+        self.assertEqual(outbox.publish_all(), 1)
+        page = outbox.fetch()
+        self.assertEqual([event['sequence'] for event in page['events']], [1])
+        self.assertEqual(page['next_cursor'], 1)
@@ -0,0 +1,10 @@
+# notifications/urls.py
+from django.urls import path
+
+from . import views
+
+app_name = 'notifications'
+
+urlpatterns = [
+    path('outbox/', views.outbox_feed, name='outbox_feed'),
+]
@@ -1,3 +1,52 @@
-from django.shortcuts import render
+# notifications/views.py
 
-# Create your views here.
+import hmac
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from appointments.permissions import is_admin
+from . import outbox
+from .models import OutboxEvent
+
+MAX_LIMIT = 1000
+
+
+def _authorized(request):
+    """Sunucudan sunucuya erişim için OUTBOX_API_TOKEN (Bearer), tarayıcıdan erişim için admin oturumu."""
+    token = getattr(settings, 'OUTBOX_API_TOKEN', '')
+    header = request.headers.get('Authorization', '')
+    if token and header.startswith('Bearer '):
+        return hmac.compare_digest(header[len('Bearer '):], token)
+    return is_admin(request.user)
+
+
+@require_GET
+def outbox_feed(request):
+    """
+    Değişiklik akışı: ?after=<son okunan sıra numarası>&limit=<en fazla 1000>&topic=<konu>.
+    `consumer` verilirse `after` değeri o tüketicinin onayı olarak kaydedilir; saklama
+    süresi temizliği onaylanmamış olayları silmez. Yalnızca yayımlanmış olaylar döner
+    (webhook_dispatcher işçisi veya `outbox publish` komutu yayımlar); okuma yazım yapmaz.
+    """
+    if not _authorized(request):
+        return JsonResponse({'error': 'Bu akışa erişim yetkiniz yok.'}, status=403)
+
+    try:
+        after = int(request.GET.get('after', 0))
+        limit = int(request.GET.get('limit', 500))
+    except ValueError:
+        return JsonResponse({'error': 'after ve limit tam sayı olmalıdır.'}, status=400)
+    if after < 0 or not 1 <= limit <= MAX_LIMIT:
+        return JsonResponse({'error': f'after negatif olamaz, limit 1 ile {MAX_LIMIT} arasında olmalıdır.'}, status=400)
+
+    topic_names = request.GET.getlist('topic')
+    valid_topics = {value for value, _label in OutboxEvent.TOPIC_CHOICES}
+    if not set(topic_names) <= valid_topics:
+        return JsonResponse({'error': f"Geçersiz konu. Geçerli konular: {', '.join(sorted(valid_topics))}"}, status=400)
+
+    consumer = request.GET.get('consumer')
+    if consumer:
+        outbox.acknowledge(consumer[:100], after)
+    return JsonResponse(outbox.fetch(after=after, limit=limit, topic_names=topic_names))
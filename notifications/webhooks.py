@@ -0,0 +1,274 @@
+# notifications/webhooks.py
+"""
+İş ortaklarına giden web kancaları (webhook).
+
+Akış:
+1. `fan_out` bekleyen olayları yayımlar (outbox.publish_all; giden kutusunun yayımlayıcısı
+   bu işçidir), giden kutusunu (OutboxEvent) 'webhooks' tüketicisi olarak okur, olayları
+   web kancası olay türlerine çevirir ve ilgilenen her adres için bir WebhookDelivery
+   satırı ekler. Kuyruğa alma ile imlecin ilerlemesi aynı işlemdedir.
+2. `dispatch_once` her aktif adres için vadesi gelmiş gönderimleri sahiplenir
+   (SKIP LOCKED + kira süresi; birden fazla işçi çalışabilir), `batch_size` kadar olayı
+   tek bir POST gövdesinde birleştirir ve istekleri asyncio ile eşzamanlı gönderir.
+   Adres başına eşzamanlı istek sayısı `max_concurrency` ile sınırlıdır.
+3. 2xx yanıt alınan gönderimler silinir; diğerleri üstel geri çekilme (exponential
+   backoff) ile yeniden zamanlanır, WEBHOOK_MAX_ATTEMPTS denemeden sonra
+   WebhookDeadLetter tablosuna taşınır.
+
+İmza: `X-Klinik-Signature: t=<unix zamanı>,v1=<hex(HMAC-SHA256(secret, "<t>.<gövde>"))>`.
+Alıcı aynı olayı birden fazla kez alabilir (en az bir kez teslim); olaylar `id`
+(giden kutusu sıra numarası) ile tekilleştirilmelidir.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+import ssl
+import time
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import outbox
+from .models import OutboxConsumer, WebhookDeadLetter, WebhookDelivery, WebhookEndpoint
+
+CONSUMER_NAME = 'webhooks'
+FAN_OUT_BATCH_SIZE = 1000
+SIGNATURE_HEADER = 'X-Klinik-Signature'
+USER_AGENT = 'AnkaKlinik-Webhooks/1.0'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def event_type_for(event):
+    """Giden kutusu olayının web kancası olay türü; ilgili değilse None."""
+    topic, action, payload = event['topic'], event['action'], event['payload']
+    if topic == 'appointment' and action == 'created':
+        return 'appointment.created'
+    if topic == 'appointment' and action == 'updated' and payload.get('status') == 'cancelled' and payload.get('status_changed'):
+        return 'appointment.cancelled'
+    if topic == 'payment' and action == 'created':
+        return 'payment.recorded'
+    return None
+
+
+def fan_out():
+    """Giden kutusundaki yeni olayları adreslerin kuyruklarına dağıtır. Kuyruğa alınan gönderim sayısını döndürür."""
+    endpoints = list(WebhookEndpoint.objects.filter(is_active=True).only('pk', 'event_types'))
+    outbox.publish_all()
+    consumer = OutboxConsumer.objects.get_or_create(name=CONSUMER_NAME)[0]
+    cursor = consumer.last_sequence
+    queued = 0
+    while True:
+        with transaction.atomic():
+            page = outbox.fetch(after=cursor, limit=FAN_OUT_BATCH_SIZE)
+            deliveries = []
+            for event in page['events']:
+                event_type = event_type_for(event)
+                if event_type is None:
+                    continue
+                for endpoint in endpoints:
+                    if event_type in endpoint.event_types:
+                        deliveries.append(WebhookDelivery(
+                            endpoint_id=endpoint.pk,
+                            sequence=event['sequence'],
+                            event_type=event_type,
+                            payload=event['payload'],
+                        ))
+            WebhookDelivery.objects.bulk_create(deliveries, ignore_conflicts=True)
+            outbox.acknowledge(CONSUMER_NAME, page['next_cursor'])
+        queued += len(deliveries)
+        cursor = page['next_cursor']
+        if not page['more']:
+            return queued
+
+
+def sign(secret, timestamp, body):
+    mac = hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256)
+    return f"t={timestamp},v1={mac.hexdigest()}"
+
+
+def verify(secret, header, body, tolerance=300):
+    """İmza başlığını doğrular (alıcı tarafı ve test sunucusu için)."""
+    try:
+        parts = dict(item.split('=', 1) for item in header.split(','))
+        timestamp = int(parts['t'])
+    except (KeyError, ValueError):
+        return False
+    if abs(time.time() - timestamp) > tolerance:
+        return False
+    return hmac.compare_digest(sign(secret, timestamp, body), header)
+
+
+def build_body(batch):
+    return json.dumps({
+        'deliveries': [
+            {
+                'id': delivery.sequence,
+                'type': delivery.event_type,
+                'created_at': delivery.created_at.isoformat(),
+                'data': delivery.payload,
+            }
+            for delivery in batch
+        ],
+    }, cls=DjangoJSONEncoder, ensure_ascii=False).encode()
+
+
+def backoff_delay(attempts):
+    """n. başarısız denemeden sonra beklenecek süre (saniye); %20 rastgele sapma ile."""
+    base = _setting('WEBHOOK_BACKOFF_BASE_SECONDS', 10)
+    ceiling = _setting('WEBHOOK_BACKOFF_MAX_SECONDS', 3600)
+    return min(base * 2 ** (attempts - 1), ceiling) * random.uniform(0.8, 1.2)
+
+
+def claim(endpoint, now=None):
+    """
+    Adresin vadesi gelmiş gönderimlerini sahiplenir ve partilere böler. Sahiplenilen
+    satırların sonraki deneme zamanı kira süresi kadar ileri alınır; işçi yarıda
+    kalırsa kira dolduğunda başka bir işçi tarafından yeniden gönderilir.
+    """
+    if endpoint.batch_size < 1 or endpoint.max_concurrency < 1:
+        return []
+    now = now or timezone.now()
+    limit = endpoint.batch_size * endpoint.max_concurrency
+    with transaction.atomic():
+        due = WebhookDelivery.objects.filter(endpoint=endpoint, next_attempt_at__lte=now).order_by('sequence')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        deliveries = list(due[:limit])
+        if deliveries:
+            lease = timedelta(seconds=_setting('WEBHOOK_TIMEOUT_SECONDS', 10) * 3)
+            WebhookDelivery.objects.filter(pk__in=[d.pk for d in deliveries]).update(next_attempt_at=now + lease)
+    return [deliveries[i:i + endpoint.batch_size] for i in range(0, len(deliveries), endpoint.batch_size)]
+
+
+async def _post(url, body, headers, timeout):
+    """Yalın HTTP/1.1 POST; yanıt durum kodunu döndürür."""
+    parts = urlsplit(url)
+    secure = parts.scheme == 'https'
+    port = parts.port or (443 if secure else 80)
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(parts.hostname, port, ssl=ssl.create_default_context() if secure else None),
+        timeout,
+    )
+    try:
+        target = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        lines = [
+            f'POST {target} HTTP/1.1',
+            f'Host: {parts.netloc}',
+            f'User-Agent: {USER_AGENT}',
+            'Content-Type: application/json; charset=utf-8',
+            f'Content-Length: {len(body)}',
+            'Connection: close',
+        ] + [f'{name}: {value}' for name, value in headers.items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await asyncio.wait_for(writer.drain(), timeout)
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        try:
+            return int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise ValueError(f"Geçersiz HTTP yanıtı: {status_line[:100]!r}")
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+
+async def _deliver_all(jobs, timeout):
+    """jobs: [(adres, parti)]. Her iş için (adres, parti, başarılı mı, hata) döndürür."""
+    semaphores = {endpoint.pk: asyncio.Semaphore(endpoint.max_concurrency) for endpoint, _batch in jobs}
+
+    async def deliver(endpoint, batch):
+        body = build_body(batch)
+        headers = {
+            SIGNATURE_HEADER: sign(endpoint.secret, int(time.time()), body),
+            'X-Klinik-Delivery': f'{endpoint.pk}-{batch[0].sequence}-{batch[-1].sequence}',
+        }
+        async with semaphores[endpoint.pk]:
+            try:
+                status = await _post(endpoint.url, body, headers, timeout)
+            except (OSError, asyncio.TimeoutError, ValueError) as exc:
+                return endpoint, batch, False, f"{type(exc).__name__}: {exc}"
+        if 200 <= status < 300:
+            return endpoint, batch, True, ''
+        return endpoint, batch, False, f"HTTP {status}"
+
+    return await asyncio.gather(*(deliver(endpoint, batch) for endpoint, batch in jobs))
+
+
+def _record_results(results):
+    max_attempts = _setting('WEBHOOK_MAX_ATTEMPTS', 8)
+    now = timezone.now()
+    delivered, retry, dead = [], [], []
+    for _endpoint, batch, ok, error in results:
+        if ok:
+            delivered.extend(delivery.pk for delivery in batch)
+            continue
+        for delivery in batch:
+            delivery.attempts += 1
+            delivery.last_error = error[:1000]
+            if delivery.attempts >= max_attempts:
+                dead.append(delivery)
+            else:
+                delivery.next_attempt_at = now + timedelta(seconds=backoff_delay(delivery.attempts))
+                retry.append(delivery)
+
+    with transaction.atomic():
+        WebhookDelivery.objects.filter(pk__in=delivered).delete()
+        WebhookDelivery.objects.bulk_update(retry, ['attempts', 'next_attempt_at', 'last_error'], batch_size=500)
+        WebhookDeadLetter.objects.bulk_create([
+            WebhookDeadLetter(
+                endpoint_id=delivery.endpoint_id,
+                sequence=delivery.sequence,
+                event_type=delivery.event_type,
+                payload=delivery.payload,
+                attempts=delivery.attempts,
+                last_error=delivery.last_error,
+            )
+            for delivery in dead
+        ])
+        WebhookDelivery.objects.filter(pk__in=[delivery.pk for delivery in dead]).delete()
+    return {'delivered': len(delivered), 'retried': len(retry), 'dead': len(dead)}
+
+
+def dispatch_once():
+    """Bir dağıtım + gönderim turu çalıştırır; sayaçları içeren bir sözlük döndürür."""
+    stats = {'queued': fan_out(), 'delivered': 0, 'retried': 0, 'dead': 0}
+    # Sınırları geçersiz adresler (kısıttan önce kaydedilmiş) atlanır; diğer adresleri durdurmaz
+    endpoints = WebhookEndpoint.objects.filter(is_active=True, max_concurrency__gte=1, batch_size__gte=1)
+    jobs = [
+        (endpoint, batch)
+        for endpoint in endpoints
+        for batch in claim(endpoint)
+    ]
+    if jobs:
+        results = asyncio.run(_deliver_all(jobs, _setting('WEBHOOK_TIMEOUT_SECONDS', 10)))
+        stats.update(_record_results(results))
+    return stats
+
+
+def requeue_dead_letters(queryset):
+    """Gönderilemeyen olayları deneme sayısı sıfırlanmış olarak yeniden kuyruğa alır."""
+    with transaction.atomic():
+        letters = list(queryset)
+        WebhookDelivery.objects.bulk_create([
+            WebhookDelivery(
+                endpoint_id=letter.endpoint_id,
+                sequence=letter.sequence,
+                event_type=letter.event_type,
+                payload=letter.payload,
+            )
+            for letter in letters
+        ], ignore_conflicts=True)
+        WebhookDeadLetter.objects.filter(pk__in=[letter.pk for letter in letters]).delete()
+    return len(letters)
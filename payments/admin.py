@@ -1,8 +1,11 @@
 from django.contrib import admin
-from .models import Payment
+from .models import Payment, ProviderEvent
+from appointments.changelist import LargeTableAdminMixin
+from appointments.permissions import scope_payments
+from appointments.versioning import VersionedAdminMixin
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(LargeTableAdminMixin, VersionedAdminMixin, admin.ModelAdmin):
     # list_display: Admin listeleme sayfasında hangi sütunların gösterileceğini belirler
     list_display = (
         'appointment', 
@@ -13,16 +16,22 @@ class PaymentAdmin(admin.ModelAdmin):
         'agent_commission',  # Komisyon alanlarının burada olduğundan emin olun
         'is_commission_calculated'
     )
+    # 'appointment' sütunu (Appointment.__str__) müşteri ve uzman adlarını okur; satır başına sorgu yapılmaz
+    list_select_related = ('appointment__client', 'appointment__expert__user')
     
     # list_filter: Admin listeleme sayfasında filtreleme seçeneklerini sunar
     list_filter = ('payment_method', 'payment_date', 'is_commission_calculated')
     
-    # search_fields: Admin listeleme sayfasında arama yapabileceğiniz alanları belirler
+    # search_fields: Admin listeleme sayfasında arama yapabileceğiniz alanları belirler.
+    # Ad aramaları önek aramasıdır (PostgreSQL'de UPPER(...) text_pattern_ops indeksleri);
+    # sayısal terimler tutarı metne dönüştürüp LIKE ile aramak yerine ödeme/randevu numarası
+    # ve tutar üzerinde eşitlikle aranır (bkz. appointments.changelist).
     search_fields = (
-        'appointment__client__first_name', 
-        'appointment__client__last_name', 
-        'amount_paid'
+        '^appointment__client__first_name', 
+        '^appointment__client__last_name', 
+        '^appointment__client__username',
     )
+    numeric_search_fields = ('pk', 'appointment', 'amount_paid')
     
     # readonly_fields: Admin panelinde sadece okunur olacak alanları belirler.
     # Komisyonlar otomatik hesaplandığı için genellikle buraya eklenirler.
@@ -33,8 +42,8 @@ class PaymentAdmin(admin.ModelAdmin):
         'is_commission_calculated'
     )
     
-    # raw_id_fields satırı kaldırıldı, böylece 'appointment' alanı normal açılır menü olarak görünecek.
-    # raw_id_fields = ('appointment',) 
+    # Tüm randevuları açılır menüye basmak yerine randevu araması (AppointmentAdmin.search_fields) kullanılır.
+    autocomplete_fields = ('appointment',)
 
     # fieldsets: Admin panelinde ekleme/düzenleme formunun düzenini belirler.
     # Bu, alanları gruplamanıza ve isterseniz gizlemenize olanak tanır.
@@ -57,8 +66,31 @@ class PaymentAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # Admin dışı personel yalnızca kendi kapsamındaki randevuların ödemelerini görür
+        queryset = super().get_queryset(request).select_related(
+            'appointment__client', 'appointment__expert__user'
+        )
+        return scope_payments(request.user, queryset)
+
     # Django'nun save_model metodunu özelleştirme (eğer özel bir kaydetme mantığına ihtiyacınız varsa)
     # def save_model(self, request, obj, form, change):
     #     super().save_model(request, obj, form, change)
     #     # Eğer calculate_commissions sadece save metodu dışında çağrılıyorsa, burada ek bir işlem yapabilirsiniz.
-    #     # Ancak bizim durumumuzda, modelin save() metodu zaten komisyonları hesaplıyor.
\ No newline at end of file
+    #     # Ancak bizim durumumuzda, modelin save() metodu zaten komisyonları hesaplıyor.
+
+@admin.register(ProviderEvent)
+class ProviderEventAdmin(admin.ModelAdmin):
+    """Sağlayıcı geri çağrıları salt okunurdur; yalnızca inceleme için listelenir."""
+    list_display = ('idempotency_key', 'provider', 'event_type', 'status', 'amount', 'appointment_id', 'payment_id', 'received_at', 'processed_at')
+    list_filter = ('status', 'provider', 'event_type')
+    search_fields = ('idempotency_key',)
+    date_hierarchy = 'received_at'
+    # Olay sayısı çok büyüyebileceğinden tam sayım yapılmaz
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -1,6 +1,8 @@
 # payments/forms.py
 from django import forms
+from django.db import transaction
 from .models import Payment
+from appointments.history import status_actor
 from appointments.models import Appointment
 
 class PaymentCreateForm(forms.ModelForm):
@@ -9,6 +11,9 @@ class PaymentCreateForm(forms.ModelForm):
     İlgili randevunun otomatik olarak atanmasını ve randevu durumuna göre
     formun davranışını (başlangıç değerleri, salt okunurluk) yönetir.
     """
+    # Ödeme sayfasının açıldığı andaki randevu sürümü; randevu bu arada düzenlendiyse kaydetme reddedilir
+    appointment_version = forms.IntegerField(widget=forms.HiddenInput(), required=False, min_value=1)
+
     class Meta:
         model = Payment
         fields = ['amount_paid', 'payment_method']
@@ -39,6 +44,8 @@ class PaymentCreateForm(forms.ModelForm):
             # Normalde PaymentCreateView'deki get_form_kwargs metodu bunu zaten sağlar.
             raise ValueError("PaymentCreateForm, ilişkili bir randevu nesnesi ile başlatılmalıdır.")
 
+        self.fields['appointment_version'].initial = self.appointment.version
+
         # Eğer randevunun `amount` alanı doluysa, `amount_paid` alanına varsayılan değer olarak ata.
         if self.appointment.amount:
             self.fields['amount_paid'].initial = self.appointment.amount
@@ -78,6 +85,13 @@ class PaymentCreateForm(forms.ModelForm):
         """
         payment = super().save(commit=False)
         payment.appointment = self.appointment
+
+        # Randevu, kullanıcının gördüğü sürüm üzerinden güncellenir; sayfa açıldıktan sonra
+        # değiştirildiyse randevu kaydı ConcurrentUpdateError verir ve ödeme de yazılmaz.
+        # Gönderilmezse (ör. JSON istemcisi) randevunun yüklendiği andaki sürüm kullanılır.
+        seen_version = self.cleaned_data.get('appointment_version')
+        if seen_version:
+            payment.appointment.version = seen_version
         
         # Randevunun durumunu ve ödeme durumunu güncelle
         # Bu mantık burada olmalı çünkü ödeme formu, randevuyu tamamlar.
@@ -98,6 +112,10 @@ class PaymentCreateForm(forms.ModelForm):
         # payment.is_commission_calculated = True # Komisyonun hesaplandığını işaretle
 
         if commit:
-            payment.appointment.save() # Önce randevuyu kaydet
-            payment.save() 
+            # Randevu ve ödeme (ve giden kutusu olayları) birlikte kalıcı olur veya birlikte geri alınır
+            with transaction.atomic():
+                # Randevunun 'completed' geçişi durum geçmişine ödeme kaynağıyla yazılır
+                with status_actor(source='payment'):
+                    payment.appointment.save() # Önce randevuyu kaydet
+                payment.save() 
         return payment
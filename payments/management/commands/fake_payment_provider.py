@@ -0,0 +1,111 @@
+# payments/management/commands/fake_payment_provider.py
+
+import json
+import random
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from appointments.models import Appointment
+from notifications.webhooks import sign
+from payments.provider import MAX_EVENTS_PER_REQUEST, SIGNATURE_HEADER
+
+
+class Command(BaseCommand):
+    help = (
+        "Yerel geliştirme için sahte ödeme sağlayıcısı: ödenmemiş randevular için imzalı "
+        "'payment.succeeded' olaylarını partiler halinde geri çağrı adresine gönderir. "
+        "--duplicate-rate ile tekrar gönderimleri, --unmatched-rate ile bilinmeyen randevuları sınar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/payments/provider/callback/')
+        parser.add_argument('--secret', help="İmza anahtarı (varsayılan: PAYMENT_PROVIDER_SECRET).")
+        parser.add_argument('--count', type=int, default=1000, help="Gönderilecek farklı olay sayısı (varsayılan: 1000).")
+        parser.add_argument('--batch-size', type=int, default=100, help="İstek başına olay sayısı (varsayılan: 100).")
+        parser.add_argument('--concurrency', type=int, default=4, help="Eşzamanlı istek sayısı (varsayılan: 4).")
+        parser.add_argument('--duplicate-rate', type=float, default=0.1,
+                            help="Yeniden gönderilecek olayların oranı, 0-1 (varsayılan: 0.1).")
+        parser.add_argument('--unmatched-rate', type=float, default=0.0,
+                            help="Var olmayan randevuya ait olay oranı, 0-1 (varsayılan: 0).")
+
+    def handle(self, *args, **options):
+        secret = options['secret'] or getattr(settings, 'PAYMENT_PROVIDER_SECRET', '')
+        if not secret:
+            raise CommandError("İmza anahtarı yok: --secret verin veya PAYMENT_PROVIDER_SECRET ayarlayın.")
+        if not 1 <= options['batch_size'] <= MAX_EVENTS_PER_REQUEST:
+            raise CommandError(f"--batch-size 1 ile {MAX_EVENTS_PER_REQUEST} arasında olmalıdır.")
+
+        events = self._build_events(options)
+        if not events:
+            raise CommandError("Ödenmemiş randevu bulunamadı.")
+        duplicates = random.sample(events, int(len(events) * options['duplicate_rate']))
+        stream = events + duplicates
+        random.shuffle(stream)
+        batches = [stream[i:i + options['batch_size']] for i in range(0, len(stream), options['batch_size'])]
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            responses = list(pool.map(lambda batch: self._post(options['url'], secret, batch), batches))
+        elapsed = time.monotonic() - started
+
+        statuses, errors = Counter(), Counter()
+        duplicate_count = 0
+        for response in responses:
+            if 'error' in response:
+                errors[response['error']] += 1
+                continue
+            for result in response['results']:
+                statuses[result['status']] += 1
+                duplicate_count += bool(result.get('duplicate'))
+
+        self.stdout.write(
+            f"{len(stream)} olay ({len(duplicates)} tekrar) {len(batches)} istekte {elapsed:.2f} sn'de gönderildi "
+            f"(~{len(stream) / elapsed * 60:,.0f} olay/dk)."
+        )
+        self.stdout.write(f"Sonuçlar: {dict(statuses)}; tekrar olarak tanınan: {duplicate_count}")
+        for error, count in errors.items():
+            self.stdout.write(self.style.ERROR(f"{count} istek başarısız: {error}"))
+
+    def _build_events(self, options):
+        unpaid = list(
+            Appointment.objects.filter(payment_status=False).exclude(status='completed')
+            .values_list('pk', flat=True)[:options['count']]
+        )
+        unmatched = int(options['count'] * options['unmatched_rate'])
+        missing_from = (Appointment.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1_000_000
+        appointment_ids = unpaid[:options['count'] - unmatched] + list(range(missing_from, missing_from + unmatched))
+        return [
+            {
+                'id': f"evt_{uuid.uuid4().hex}",
+                'type': 'payment.succeeded',
+                'appointment_id': appointment_id,
+                'amount': str(Decimal(random.randint(500, 5000))),
+                'method': random.choice(['card', 'bank_transfer']),
+                'paid_at': timezone.now().isoformat(),
+            }
+            for appointment_id in appointment_ids
+        ]
+
+    def _post(self, url, secret, batch):
+        body = json.dumps({'events': batch}).encode()
+        request = Request(url, data=body, method='POST', headers={
+            'Content-Type': 'application/json',
+            SIGNATURE_HEADER: sign(secret, int(time.time()), body),
+            'X-Provider-Name': 'fake',
+        })
+        try:
+            with urlopen(request, timeout=30) as response:
+                return json.loads(response.read())
+        except HTTPError as exc:
+            return {'error': f"HTTP {exc.code}: {exc.read()[:200].decode(errors='replace')}"}
+        except URLError as exc:
+            return {'error': str(exc.reason)}
@@ -0,0 +1,20 @@
+# payments/management/commands/process_provider_events.py
+
+from django.core.management.base import BaseCommand
+
+from payments import provider
+
+
+class Command(BaseCommand):
+    help = (
+        "Alınmış ama işlenmesi yarıda kalmış ödeme sağlayıcısı olaylarını işler "
+        "(örn. birkaç dakikada bir cron ile)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=60,
+                            help="Bu kadar saniyeden eski olaylar işlenir (varsayılan: 60).")
+
+    def handle(self, *args, **options):
+        count = provider.process_pending(older_than_seconds=options['older_than'])
+        self.stdout.write(self.style.SUCCESS(f"{count} bekleyen olay işlendi."))
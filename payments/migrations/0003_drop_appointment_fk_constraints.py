@@ -0,0 +1,20 @@
+# Generated by Django 5.2.2 on 2026-10-19 04:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0007_drop_appointment_fk_constraints'),
+        ('payments', '0002_alter_payment_agent_commission_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='appointment',
+            field=models.OneToOneField(db_constraint=False, help_text='Bu ödemenin ilişkili olduğu randevu.', on_delete=django.db.models.deletion.CASCADE, related_name='payment', to='appointments.appointment', verbose_name='Randevu'),
+        ),
+    ]
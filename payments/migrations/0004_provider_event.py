@@ -0,0 +1,39 @@
+# Generated by Django 5.2.2 on 2026-10-19 04:41
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0009_appointmentstatuschange'),
+        ('payments', '0003_drop_appointment_fk_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=100, unique=True, verbose_name='Tekillik Anahtarı')),
+                ('provider', models.CharField(max_length=50, verbose_name='Sağlayıcı')),
+                ('event_type', models.CharField(max_length=50, verbose_name='Olay Türü')),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Tutar')),
+                ('status', models.CharField(choices=[('received', 'Alındı'), ('processed', 'İşlendi'), ('unmatched', 'Randevu Bulunamadı'), ('already_paid', 'Randevu Zaten Ödenmiş'), ('rejected', 'Geçersiz')], default='received', max_length=20, verbose_name='Durum')),
+                ('error', models.CharField(blank=True, max_length=255, verbose_name='Hata')),
+                ('payload', models.JSONField(verbose_name='Ham Olay Verisi')),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Alınma Tarihi')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='İşlenme Tarihi')),
+                ('appointment', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='provider_events', to='appointments.appointment', verbose_name='Randevu')),
+                ('payment', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='provider_events', to='payments.payment', verbose_name='Ödeme')),
+            ],
+            options={
+                'verbose_name': 'Sağlayıcı Olayı',
+                'verbose_name_plural': 'Sağlayıcı Olayları',
+                'ordering': ['-received_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'received')), fields=['received_at'], name='provider_event_pending_idx')],
+            },
+        ),
+    ]
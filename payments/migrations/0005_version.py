@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-19 04:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_provider_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='version',
+            field=models.PositiveIntegerField(default=1, verbose_name='Sürüm'),
+        ),
+    ]
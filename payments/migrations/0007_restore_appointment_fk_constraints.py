@@ -0,0 +1,36 @@
+# payments/migrations/0007_restore_appointment_fk_constraints.py
+#
+# Randevu/ödeme tablolarına işaret eden yabancı anahtar kısıtlarını geri ekler. Kısıtlar
+# yalnızca tablo PostgreSQL'de bölümlenirken (manage_partitions convert) kaldırılır; hedef
+# tablo zaten bölümlenmişse veritabanı işlemi atlanır (bkz. appointments/partitioning.py).
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from appointments.partitioning import AlterFieldUnlessPartitioned
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0018_restore_appointment_fk_constraints'),
+        ('payments', '0006_changelist_indexes'),
+    ]
+
+    operations = [
+        AlterFieldUnlessPartitioned(
+            model_name='payment',
+            name='appointment',
+            field=models.OneToOneField(help_text='Bu ödemenin ilişkili olduğu randevu.', on_delete=django.db.models.deletion.CASCADE, related_name='payment', to='appointments.appointment', verbose_name='Randevu'),
+        ),
+        AlterFieldUnlessPartitioned(
+            model_name='providerevent',
+            name='appointment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='provider_events', to='appointments.appointment', verbose_name='Randevu'),
+        ),
+        AlterFieldUnlessPartitioned(
+            model_name='providerevent',
+            name='payment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='provider_events', to='payments.payment', verbose_name='Ödeme'),
+        ),
+    ]
@@ -1,10 +1,23 @@
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from appointments.models import Appointment
+from appointments.versioning import VersionedModel
 from accounts.models import Expert, CustomerAgent
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
 
-class Payment(models.Model):
+
+def commission_amount(amount, rate):
+    """
+    Ödenen tutar ve yüzde olarak saklanan komisyon oranından komisyon tutarını hesaplar.
+    Sonuç, veritabanındaki DecimalField ile aynı şekilde 2 haneye yuvarlanır.
+    """
+    if amount is None or rate is None:
+        return Decimal('0.00')
+    return (amount * (rate / Decimal('100'))).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+class Payment(VersionedModel):
     PAYMENT_METHOD_CHOICES = [
         ('credit_card', _('Kredi Kartı')),
         ('bank_transfer', _('Banka Havalesi')),
@@ -65,6 +78,11 @@ class Payment(models.Model):
         verbose_name = _('Ödeme')
         verbose_name_plural = _('Ödemeler')
         ordering = ['-payment_date']
+        indexes = [
+            # Varsayılan sıralama (-payment_date, -id) ve yönetim panelindeki tutar araması (eşitlik)
+            models.Index(fields=['payment_date', 'id'], name='payment_date_id_idx'),
+            models.Index(fields=['amount_paid'], name='payment_amount_idx'),
+        ]
 
     def calculate_commissions(self):
         """
@@ -78,17 +96,9 @@ class Payment(models.Model):
         expert = self.appointment.expert
         agent = self.appointment.agent
 
-        if expert and expert.commission_rate is not None:
-            # commission_rate artık DecimalField olduğu için doğrudan kullanılabilir
-            self.expert_commission = self.amount_paid * (expert.commission_rate / Decimal('100'))
-        else:
-            self.expert_commission = Decimal('0.00')
-
-        if agent and agent.commission_rate is not None:
-            # commission_rate artık DecimalField olduğu için doğrudan kullanılabilir
-            self.agent_commission = self.amount_paid * (agent.commission_rate / Decimal('100'))
-        else:
-            self.agent_commission = Decimal('0.00')
+        # Hesaplama, toplu aktarımlarda da kullanılan commission_amount() ile yapılır.
+        self.expert_commission = commission_amount(self.amount_paid, expert.commission_rate if expert else None)
+        self.agent_commission = commission_amount(self.amount_paid, agent.commission_rate if agent else None)
         
         self.is_commission_calculated = True
 
@@ -109,15 +119,11 @@ class Payment(models.Model):
 
         if is_new_object or not self.is_commission_calculated:
             self.calculate_commissions()
-        elif self.pk:
-            try:
-                old_payment = Payment.objects.get(pk=self.pk)
-                if self.amount_paid != old_payment.amount_paid:
-                    # print(f"DEBUG: amount_paid değişti, komisyonlar yeniden hesaplanıyor. Payment ID: {self.pk}") # Debug çıktısı kaldırıldı
-                    self.is_commission_calculated = False
-                    self.calculate_commissions()
-            except Payment.DoesNotExist:
-                # print(f"DEBUG: Eski ödeme objesi bulunamadı, yeni gibi hesaplanıyor. Payment ID: {self.pk}") # Debug çıktısı kaldırıldı
+        else:
+            # Yüklenen değerlerle karşılaştırılır (VersionedModel.dirty_fields); eski satır için ayrıca SELECT yapılmaz.
+            # Örnek veritabanından yüklenmediyse eski tutar bilinemez, komisyonlar yeniden hesaplanır.
+            dirty = self.dirty_fields()
+            if dirty is None or 'amount_paid' in dirty:
                 self.is_commission_calculated = False
                 self.calculate_commissions()
 
@@ -128,3 +134,58 @@ class Payment(models.Model):
         
         # Debug çıktısı kaldırıldı
         # print(f"DEBUG: Ödeme kaydedildi. Final Komisyonlar: Uzman={self.expert_commission}, Temsilci={self.agent_commission}, Hesaplandı mı?={self.is_commission_calculated}")
+
+
+class ProviderEvent(models.Model):
+    """
+    Ödeme sağlayıcısından (POS / sanal POS) gelen geri çağrı olayları.
+
+    Sağlayıcılar aynı olayı birden fazla kez gönderebilir; `idempotency_key` üzerindeki
+    tekil indeks her olayın yalnızca bir kez işlenmesini sağlar. Olaylar payments.provider
+    tarafından partiler halinde işlenir ve sonuç (`status`) tekrar gönderimlerde aynen döndürülür.
+    """
+    STATUS_CHOICES = [
+        ('received', _('Alındı')),
+        ('processed', _('İşlendi')),
+        ('unmatched', _('Randevu Bulunamadı')),
+        ('already_paid', _('Randevu Zaten Ödenmiş')),
+        ('rejected', _('Geçersiz')),
+    ]
+
+    idempotency_key = models.CharField(max_length=100, unique=True, verbose_name=_('Tekillik Anahtarı'))
+    provider = models.CharField(max_length=50, verbose_name=_('Sağlayıcı'))
+    event_type = models.CharField(max_length=50, verbose_name=_('Olay Türü'))
+    appointment = models.ForeignKey(
+        Appointment,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='provider_events',
+        verbose_name=_('Randevu')
+    )
+    payment = models.ForeignKey(
+        Payment,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='provider_events',
+        verbose_name=_('Ödeme')
+    )
+    amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name=_('Tutar'))
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='received', verbose_name=_('Durum'))
+    error = models.CharField(max_length=255, blank=True, verbose_name=_('Hata'))
+    payload = models.JSONField(verbose_name=_('Ham Olay Verisi'))
+    received_at = models.DateTimeField(default=timezone.now, verbose_name=_('Alınma Tarihi'))
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name=_('İşlenme Tarihi'))
+
+    class Meta:
+        verbose_name = _('Sağlayıcı Olayı')
+        verbose_name_plural = _('Sağlayıcı Olayları')
+        ordering = ['-received_at']
+        indexes = [
+            # Yarıda kalmış (alınmış ama işlenmemiş) olayların yeniden işlenmesi için
+            models.Index(fields=['received_at'], condition=models.Q(status='received'), name='provider_event_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.provider}:{self.idempotency_key} ({self.get_status_display()})"
@@ -0,0 +1,244 @@
+# payments/provider.py
+"""
+Ödeme sağlayıcısı (POS / sanal POS) geri çağrılarının toplu ve tekil (idempotent) işlenmesi.
+
+1. Gelen olaylar doğrulanır ve ProviderEvent tablosuna `idempotency_key` tekil
+   indeksi sayesinde çakışmalar yok sayılarak (ON CONFLICT DO NOTHING) eklenir;
+   daha önce alınmış bir olay ikinci kez eklenmez.
+2. 'received' durumundaki olaylar SKIP LOCKED ile sahiplenilir; aynı olay eşzamanlı
+   iki istekte gelse de yalnızca biri işler.
+3. Eşleşen randevular için ödemeler tek seferde eklenir (PostgreSQL'de COPY), randevular
+   tek bir UPDATE ile 'completed' / ödendi yapılır; durum geçmişi ve değişiklik akışı
+   da küme tabanlı yazılır.
+
+İşleme yarıda kalırsa olay 'received' durumunda kalır; sağlayıcı aynı olayı yeniden
+gönderdiğinde (veya `process_pending` çağrıldığında) işlenir.
+"""
+
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import CustomerAgent, Expert
+from appointments import bulk
+from appointments.legacy_import import insert_rows
+from appointments.models import Appointment
+from .models import Payment, ProviderEvent, commission_amount
+
+SUPPORTED_EVENT_TYPES = {'payment.succeeded'}
+# Sağlayıcının ödeme yöntemi adlarından Payment.payment_method değerlerine
+PROVIDER_METHODS = {
+    'card': 'credit_card',
+    'credit_card': 'credit_card',
+    'bank_transfer': 'bank_transfer',
+    'cash': 'cash',
+}
+CHUNK_SIZE = 500
+MAX_EVENTS_PER_REQUEST = 1000
+# Daha uzun kimlikler kesilmez (kesilen iki kimlik aynı olayı gösterebilir); olay reddedilir
+MAX_KEY_LENGTH = ProviderEvent._meta.get_field('idempotency_key').max_length
+# Giden web kancalarıyla (notifications.webhooks.sign) aynı imza biçimi: t=<unix zamanı>,v1=<hex(HMAC-SHA256(secret, "<t>.<gövde>"))>
+SIGNATURE_HEADER = 'X-Provider-Signature'
+# Tutar Payment.amount_paid alanına sığmalıdır (max_digits=10, decimal_places=2)
+_AMOUNT_FIELD = Payment._meta.get_field('amount_paid')
+AMOUNT_STEP = Decimal(1).scaleb(-_AMOUNT_FIELD.decimal_places)
+MAX_AMOUNT = Decimal(10) ** (_AMOUNT_FIELD.max_digits - _AMOUNT_FIELD.decimal_places) - AMOUNT_STEP
+
+
+def parse_events(data):
+    """İstek gövdesinden olay listesini çıkarır: tek olay, olay listesi veya {'events': [...]}."""
+    if isinstance(data, dict) and isinstance(data.get('events'), list):
+        events = data['events']
+    elif isinstance(data, dict):
+        events = [data]
+    elif isinstance(data, list):
+        events = data
+    else:
+        raise ValueError("Gövde bir olay nesnesi veya olay listesi olmalıdır.")
+    if not all(isinstance(event, dict) for event in events):
+        raise ValueError("Her olay bir JSON nesnesi olmalıdır.")
+    return events
+
+
+def _build_event(raw, provider, now):
+    """Ham olaydan kaydedilecek ProviderEvent örneğini oluşturur; geçersiz olaylar 'rejected' olur."""
+    key = str(raw.get('id') or '').strip()
+    event = ProviderEvent(
+        idempotency_key=key,
+        provider=provider,
+        event_type=str(raw.get('type') or '')[:50],
+        payload=raw,
+        received_at=now,
+    )
+
+    errors = []
+    if event.event_type not in SUPPORTED_EVENT_TYPES:
+        errors.append(f"Desteklenmeyen olay türü: {event.event_type or '-'}")
+    try:
+        amount = Decimal(str(raw.get('amount')))
+    except (InvalidOperation, ValueError):
+        errors.append("amount geçerli bir sayı değil.")
+    else:
+        # Sığmayan tutarlar yuvarlanmaz veya kesilmez; olay reddedilir
+        if not amount.is_finite() or amount <= 0:
+            errors.append("amount pozitif olmalıdır.")
+        elif amount > MAX_AMOUNT:
+            errors.append(f"amount en fazla {MAX_AMOUNT} olabilir.")
+        elif amount != amount.quantize(AMOUNT_STEP):
+            errors.append(f"amount en fazla {_AMOUNT_FIELD.decimal_places} ondalık basamak içerebilir.")
+        else:
+            event.amount = amount.quantize(AMOUNT_STEP)
+    try:
+        event.appointment_id = int(raw.get('appointment_id') or raw.get('reference'))
+    except (TypeError, ValueError):
+        errors.append("appointment_id (veya reference) geçerli bir randevu numarası değil.")
+
+    if errors:
+        event.appointment_id = None
+        event.status = 'rejected'
+        event.error = ' '.join(errors)[:255]
+        event.processed_at = now
+    return event
+
+
+def _paid_at(event, now):
+    value = event.payload.get('paid_at')
+    paid_at = parse_datetime(value) if isinstance(value, str) else None
+    if paid_at is None:
+        return now
+    if timezone.is_naive(paid_at):
+        paid_at = timezone.make_aware(paid_at)
+    return paid_at
+
+
+def _process(keys):
+    """Verilen anahtarlardan henüz işlenmemiş olanları sahiplenip tek seferde işler."""
+    now = timezone.now()
+    with transaction.atomic():
+        pending = ProviderEvent.objects.filter(idempotency_key__in=keys, status='received').order_by('pk')
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        events = list(pending)
+        if not events:
+            return
+
+        appointment_ids = {event.appointment_id for event in events}
+        # Elle ödeme girişiyle (PaymentCreateView) yarışmamak için randevular kilitlenir
+        appointments = {
+            pk: (status, payment_status, expert_id, agent_id, moment)
+            for pk, status, payment_status, expert_id, agent_id, moment in Appointment.objects.select_for_update()
+            .filter(pk__in=appointment_ids)
+            .values_list('pk', 'status', 'payment_status', 'expert_id', 'agent_id', 'date')
+        }
+        paid = set(Payment.objects.filter(appointment_id__in=appointment_ids).values_list('appointment_id', flat=True))
+        expert_rates = dict(Expert.objects.filter(
+            pk__in={values[2] for values in appointments.values()}
+        ).values_list('pk', 'commission_rate'))
+        agent_rates = dict(CustomerAgent.objects.filter(
+            pk__in={values[3] for values in appointments.values() if values[3]}
+        ).values_list('pk', 'commission_rate'))
+
+        payments = []
+        for event in events:
+            event.processed_at = now
+            values = appointments.get(event.appointment_id)
+            if values is None:
+                event.status, event.appointment_id = 'unmatched', None
+                continue
+            status, payment_status, expert_id, agent_id, _moment = values
+            # PaymentCreateView ile aynı kural (appointments.permissions.is_payable) + aynı partide tekrar
+            if status == 'completed' or payment_status or event.appointment_id in paid:
+                event.status = 'already_paid'
+                continue
+            paid.add(event.appointment_id)
+            event.status = 'processed'
+            event.payment = Payment(
+                appointment_id=event.appointment_id,
+                amount_paid=event.amount,
+                payment_method=PROVIDER_METHODS.get(event.payload.get('method'), 'other'),
+                payment_date=_paid_at(event, now),
+                expert_commission=commission_amount(event.amount, expert_rates.get(expert_id)),
+                agent_commission=commission_amount(event.amount, agent_rates.get(agent_id)),
+                is_commission_calculated=True,
+            )
+            payments.append(event.payment)
+
+        # Toplu ekleme/güncelleme sinyal tetiklemez; geçmiş, sayaçlar, akış ve kaynaklar appointments.bulk ile güncellenir
+        with bulk.changes(source='payment') as change:
+            insert_rows(Payment, payments, preserve=('payment_date',))
+            change.update(
+                Appointment.objects.filter(pk__in=[payment.appointment_id for payment in payments]),
+                status='completed', payment_status=True,
+            )
+            change.created_payments(payments)
+
+        for event in events:
+            event.payment_id = event.payment.pk if event.status == 'processed' else None
+        ProviderEvent.objects.bulk_update(
+            events, ['status', 'appointment_id', 'payment_id', 'processed_at'], batch_size=CHUNK_SIZE
+        )
+
+
+def ingest(raw_events, provider='pos'):
+    """
+    Olayları kaydeder ve işler. Girdi sırasıyla her olay için
+    {'id', 'status', 'duplicate', ['error']} sözlüklerinin listesini döndürür.
+    """
+    now = timezone.now()
+    results = []
+    events = {}
+    for raw in raw_events:
+        event = _build_event(raw, provider, now)
+        if not event.idempotency_key:
+            results.append({'id': None, 'status': 'rejected', 'error': "id zorunludur."})
+            continue
+        if len(event.idempotency_key) > MAX_KEY_LENGTH:
+            results.append({
+                'id': None, 'status': 'rejected', 'error': f"id en fazla {MAX_KEY_LENGTH} karakter olabilir.",
+            })
+            continue
+        # Aynı istekte tekrar eden olaylarda ilki geçerlidir
+        events.setdefault(event.idempotency_key, event)
+        results.append({'id': event.idempotency_key})
+
+    keys = list(events)
+    existing = set()
+    for start in range(0, len(keys), CHUNK_SIZE):
+        chunk = keys[start:start + CHUNK_SIZE]
+        existing.update(ProviderEvent.objects.filter(idempotency_key__in=chunk).values_list('idempotency_key', flat=True))
+        ProviderEvent.objects.bulk_create(
+            [events[key] for key in chunk if key not in existing], ignore_conflicts=True
+        )
+        _process(chunk)
+
+    stored = {}
+    for start in range(0, len(keys), CHUNK_SIZE):
+        stored.update(
+            (key, (status, error))
+            for key, status, error in ProviderEvent.objects.filter(
+                idempotency_key__in=keys[start:start + CHUNK_SIZE]
+            ).values_list('idempotency_key', 'status', 'error')
+        )
+    seen = set()
+    for result in results:
+        key = result['id']
+        if key is None:
+            continue
+        status, error = stored[key]
+        result.update(status=status, duplicate=key in existing or key in seen)
+        if error:
+            result['error'] = error
+        seen.add(key)
+    return results
+
+
+def process_pending(older_than_seconds=60):
+    """Alınmış ama (işlem yarıda kaldığı için) işlenmemiş olayları işler. İşlenen anahtar sayısını döndürür."""
+    cutoff = timezone.now() - timedelta(seconds=older_than_seconds)
+    keys = list(ProviderEvent.objects.filter(status='received', received_at__lt=cutoff).values_list('idempotency_key', flat=True))
+    for start in range(0, len(keys), CHUNK_SIZE):
+        _process(keys[start:start + CHUNK_SIZE])
+    return len(keys)
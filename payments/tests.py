@@ -1,3 +1,124 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import F
 from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from appointments.models import Appointment
+from appointments.tests import create_people
+from . import provider
+from .models import Payment, ProviderEvent
+
+
+class ProviderIngestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.expert, cls.client_user = create_people()
+        tomorrow = timezone.now() + timedelta(days=1)
+        cls.pending, cls.other, cls.completed = (
+            Appointment.objects.create(expert=cls.expert, client=cls.client_user, date=tomorrow + timedelta(hours=hour),
+                                       status=status, amount=Decimal('150.00'))
+            for hour, status in ((0, 'pending'), (2, 'confirmed'), (4, 'completed'))
+        )
+
+    def event(self, key, appointment_id, amount='150.00'):
+        return {'id': key, 'type': 'payment.succeeded', 'amount': amount, 'appointment_id': appointment_id}
+
+    def test_duplicates_are_processed_once(self):
+        first = provider.ingest([self.event('e1', self.pending.pk), self.event('e1', self.pending.pk)])
+        self.assertEqual(
+            [(result['status'], result['duplicate']) for result in first],
+            [('processed', False), ('processed', True)],
+        )
+        again = provider.ingest([self.event('e1', self.pending.pk)])
+        self.assertEqual((again[0]['status'], again[0]['duplicate']), ('processed', True))
+
+        payment = Payment.objects.get()
+        self.assertEqual((payment.appointment_id, payment.amount_paid), (self.pending.pk, Decimal('150.00')))
+        self.pending.refresh_from_db()
+        self.assertEqual((self.pending.status, self.pending.payment_status), ('completed', True))
+        self.assertEqual(ProviderEvent.objects.get().payment_id, payment.pk)
+
+    def test_unknown_appointment_is_unmatched(self):
+        result = provider.ingest([self.event('e2', 999999)])[0]
+        self.assertEqual(result['status'], 'unmatched')
+        self.assertIsNone(ProviderEvent.objects.get().appointment_id)
+        self.assertFalse(Payment.objects.exists())
+
+    def test_already_paid_appointments_get_no_second_payment(self):
+        results = provider.ingest([
+            self.event('e3', self.completed.pk),
+            self.event('e4', self.other.pk),
+            self.event('e5', self.other.pk, amount='20.00'),
+        ])
+        self.assertEqual([result['status'] for result in results], ['already_paid', 'processed', 'already_paid'])
+        self.assertEqual(provider.ingest([self.event('e6', self.other.pk)])[0]['status'], 'already_paid')
+        self.assertEqual(list(Payment.objects.values_list('appointment_id', 'amount_paid')), [(self.other.pk, Decimal('150.00'))])
+
+    def test_amounts_that_do_not_fit_the_payment_are_rejected(self):
+        results = provider.ingest([
+            self.event('big', self.pending.pk, amount='100000000.00'),
+            self.event('cents', self.pending.pk, amount='10.005'),
+            self.event('nan', self.pending.pk, amount='NaN'),
+            self.event('text', self.pending.pk, amount='yüz'),
+        ])
+        self.assertEqual([result['status'] for result in results], ['rejected'] * 4)
+        self.assertTrue(all(event.amount is None for event in ProviderEvent.objects.all()))
+        self.assertFalse(Payment.objects.exists())
+
+        result = provider.ingest([self.event('max', self.pending.pk, amount=str(provider.MAX_AMOUNT))])[0]
+        self.assertEqual(result['status'], 'processed')
+        self.assertEqual(Payment.objects.get().amount_paid, Decimal('99999999.99'))
+
+    def test_ids_longer_than_the_column_are_rejected(self):
+        long_id = 'x' * provider.MAX_KEY_LENGTH
+        results = provider.ingest([self.event(long_id + 'a', self.pending.pk), self.event(long_id + 'b', self.pending.pk)])
+        self.assertEqual([(result['id'], result['status']) for result in results], [(None, 'rejected')] * 2)
+        self.assertFalse(ProviderEvent.objects.exists())
+
+        self.assertEqual(provider.ingest([self.event(long_id, self.pending.pk)])[0]['status'], 'processed')
+
+    def test_whole_amounts_are_stored_with_two_places(self):
+        provider.ingest([self.event('whole', self.pending.pk, amount=150)])
+        self.assertEqual(str(ProviderEvent.objects.get().amount), '150.00')
+
+
+class PaymentCreateViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user('yonetici', password='x', user_type='admin')
+        cls.expert, cls.client_user = create_people()
+        cls.appointment = Appointment.objects.create(
+            expert=cls.expert, client=cls.client_user, date=timezone.now() + timedelta(days=1),
+            amount=Decimal('150.00'),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.url = f'/payments/create/{self.appointment.pk}/'
+
+    def post(self, key, version):
+        return self.client.post(self.url, {
+            'idempotency_key': key, 'amount_paid': '150.00', 'payment_method': 'cash', 'appointment_version': version,
+        })
+
+    def test_form_carries_the_appointment_version(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['form']['appointment_version'].value(), self.appointment.version)
+        self.assertContains(response, 'name="appointment_version"')
+
+    def test_appointment_edited_after_render_is_a_conflict(self):
+        seen = self.appointment.version
+        Appointment.objects.filter(pk=self.appointment.pk).update(notes='değişti', version=F('version') + 1)
+
+        response = self.post('k1', seen)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].non_field_errors())
+        self.assertFalse(Payment.objects.exists())
+        self.appointment.refresh_from_db()
+        self.assertEqual((self.appointment.status, self.appointment.payment_status), ('pending', False))
 
-# Create your tests here.
+        self.assertRedirects(self.post('k2', seen + 1), '/appointments/randevu/liste/', fetch_redirect_response=False)
+        self.assertEqual(Payment.objects.get().appointment_id, self.appointment.pk)
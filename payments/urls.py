@@ -18,4 +18,6 @@ urlpatterns = [
     # Müşteri Temsilcisi Alt Temsilci Gelirleri Sayfası
     # 'name' parametresi, navbar'da kullanılan 'sub_agent_commissions' ile eşleştirildi
     path('agent/revenue/', views.agent_sub_agent_revenue_dashboard, name='sub_agent_commissions'),
+    # Ödeme sağlayıcısı geri çağrıları (imzalı, sunucudan sunucuya)
+    path('provider/callback/', views.provider_callback, name='provider_callback'),
 ]
\ No newline at end of file
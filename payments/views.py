@@ -10,6 +10,10 @@ from django.http import JsonResponse
 from datetime import datetime, timedelta, date
 from django.utils import timezone 
 from django.views.decorators.http import require_POST 
+from django.views.decorators.csrf import csrf_exempt
+from django.db import transaction
+from django.conf import settings
+import json
 from django.contrib.auth.decorators import login_required, user_passes_test 
 from django.contrib.messages.views import SuccessMessageMixin 
 from django.db.models.functions import TruncMonth 
@@ -17,11 +21,28 @@ from decimal import Decimal
 
 from .models import Payment
 from .forms import PaymentCreateForm
+from . import provider
+from notifications.webhooks import verify as verify_signature
 from appointments.models import Appointment
+from appointments.idempotency import IdempotentPostMixin, JSONFormMixin
+from appointments.listing import LeanListMixin, LeanRows, choice_labels, full_name
+from appointments.versioning import VersionConflictMixin
+from appointments.permissions import (
+    agent_profile_of,
+    can_pay,
+    expert_profile_of,
+    get_appointment,
+    is_admin,
+    is_payable,
+    payments_for_agent,
+    scope_payments,
+)
 from accounts.models import Expert, CustomerAgent, CustomUser 
+from accounts import catalog
+from klinik_yonetim.db_router import ReportsDatabaseMixin, reports_db
 
 # --- Randevu İçin Ödeme Kaydetme Görünümü ---
-class PaymentCreateView(LoginRequiredMixin, UserPassesTestMixin, SuccessMessageMixin, CreateView):
+class PaymentCreateView(LoginRequiredMixin, IdempotentPostMixin, UserPassesTestMixin, VersionConflictMixin, JSONFormMixin, SuccessMessageMixin, CreateView):
     """
     Belirli bir randevu için yeni bir ödeme kaydı oluşturur.
     Randevunun durumunu 'completed' ve ödeme durumunu 'True' olarak günceller.
@@ -40,8 +61,7 @@ class PaymentCreateView(LoginRequiredMixin, UserPassesTestMixin, SuccessMessageM
     def get_form_kwargs(self):
         """Forma randevu objesini kwargs olarak gönderir."""
         kwargs = super().get_form_kwargs()
-        appointment_pk = self.kwargs.get('pk')
-        self.appointment = get_object_or_404(Appointment, pk=appointment_pk)
+        self.appointment = get_appointment(self.request, self.kwargs.get('pk'))
         kwargs['appointment'] = self.appointment 
         return kwargs
 
@@ -68,7 +88,7 @@ class PaymentCreateView(LoginRequiredMixin, UserPassesTestMixin, SuccessMessageM
     def form_invalid(self, form):
         """Form geçerli olmadığında hata mesajı gösterir ve formu tekrar render eder."""
         messages.error(self.request, "Ödeme kaydedilirken bir hata oluştu. Lütfen formu kontrol edin.")
-        return self.render_to_response(self.get_context_data(form=form))
+        return super().form_invalid(form)
 
     def test_func(self):
         """
@@ -76,31 +96,14 @@ class PaymentCreateView(LoginRequiredMixin, UserPassesTestMixin, SuccessMessageM
         Sadece admin, ilgili temsilci veya ilgili uzman bu işlemi yapabilir.
         Ayrıca, sadece tamamlanmamış/ödenmemiş randevular için işlem yapılabilir.
         """
-        appointment_pk = self.kwargs.get('pk')
-        appointment = get_object_or_404(Appointment, pk=appointment_pk)
-        user = self.request.user
-        
-        can_access = False
-        if user.user_type == 'admin':
-            can_access = True
-        # Kullanıcının agent_profile'ı varsa ve randevuyla ilgiliyse
-        elif hasattr(user, 'agent_profile') and user.agent_profile:
-            agent_profile = user.agent_profile
-            if appointment.agent == agent_profile or \
-               agent_profile.assigned_clients.filter(pk=appointment.client.pk).exists():
-                can_access = True
-        # Kullanıcının expert_profile'ı varsa ve randevuyla ilgiliyse
-        elif hasattr(user, 'expert_profile') and user.expert_profile:
-            # appointment.expert null olabilir, bu yüzden kontrol etmek önemli
-            if appointment.expert and appointment.expert.user == user: 
-                can_access = True
+        appointment = get_appointment(self.request, self.kwargs.get('pk'))
         
         # Eğer randevu zaten tamamlandıysa veya ödendiyse, yetkisini engelle
-        if appointment.status == 'completed' or appointment.payment_status:
+        if not is_payable(appointment):
             messages.info(self.request, "Bu randevu zaten tamamlanmış ve ödemesi alınmıştır.")
             return False # Yetkilendirme başarısız
         
-        return can_access
+        return can_pay(self.request.user, appointment)
 
     def dispatch(self, request, *args, **kwargs):
         """Yetkilendirme kontrolü yapar ve yetkisiz kullanıcıları uygun sayfaya yönlendirir."""
@@ -110,23 +113,42 @@ class PaymentCreateView(LoginRequiredMixin, UserPassesTestMixin, SuccessMessageM
         return super().dispatch(request, *args, **kwargs)
 
 # --- Tüm Ödemeleri Listeleme Görünümü (Admin İçin) ---
-class PaymentListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+# Ödeme listesi satırları: şablon model nesneleri yerine bu demetleri işler (bkz. appointments/listing.py)
+PAYMENT_ROWS = LeanRows('PaymentRow', {
+    'pk': 'pk',
+    'appointment_id': 'appointment_id',
+    'client_name': full_name('appointment__client__'),
+    'expert_name': full_name('appointment__expert__user__'),
+    'agent_id': 'appointment__agent_id',
+    'agent_name': full_name('appointment__agent__user__'),
+    'service_type': 'appointment__service_type',
+    'amount_paid': 'amount_paid',
+    'payment_method': 'payment_method',
+    'payment_date': 'payment_date',
+    'expert_commission': 'expert_commission',
+    'agent_commission': 'agent_commission',
+    'is_commission_calculated': 'is_commission_calculated',
+}, labels={
+    'service_type': choice_labels(Appointment, 'service_type'),
+    'payment_method': choice_labels(Payment, 'payment_method'),
+})
+
+
+class PaymentListView(ReportsDatabaseMixin, LoginRequiredMixin, UserPassesTestMixin, LeanListMixin, ListView):
     """
     Adminin sistemdeki tüm ödeme kayıtlarını filtreleyip görüntülemesini sağlar.
-    Toplam gelir ve komisyon özetlerini de sunar.
+    Toplam gelir ve komisyon özetlerini de sunar. Sayfa satırları hafif projeksiyonla
+    (PAYMENT_ROWS) okunur.
     """
     model = Payment
     template_name = 'payments/list.html'
     context_object_name = 'payments'
     paginate_by = 20
+    lean_rows = PAYMENT_ROWS
 
     def get_queryset(self):
         """Ödeme listesini filtreleme parametrelerine göre döndürür."""
-        queryset = super().get_queryset().select_related(
-            'appointment__client',
-            'appointment__expert__user', 
-            'appointment__agent__user'
-        ).order_by('-payment_date')
+        queryset = super().get_queryset().order_by('-payment_date')
         
         # Filtreleme parametrelerini al
         expert_id = self.request.GET.get('expert')
@@ -152,9 +174,8 @@ class PaymentListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
     def get_context_data(self, **kwargs):
         """Şablon için ek bağlam verileri (filtre seçenekleri ve toplamlar) sağlar."""
         context = super().get_context_data(**kwargs)
-        context['experts'] = Expert.objects.all()
-        context['agents'] = CustomerAgent.objects.all()
-        context['service_choices'] = Appointment.SERVICE_CHOICES 
+        # Filtre seçenekleri önbellekteki katalogdan gelir (her uzman/temsilci için .user sorgusu yapılmaz)
+        context.update(catalog.filter_options())
 
 
 
@@ -166,9 +187,8 @@ class PaymentListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
 
                 total_share_from_sub_agents = Decimal('0.00')
                 for sub_agent in parent_agent.alt_temsilciler.all():
-                    sub_agent_payments = Payment.objects.filter(
-                        Q(appointment__agent=sub_agent) | Q(appointment__client__agents=sub_agent),
-                        is_commission_calculated=True
+                    sub_agent_payments = payments_for_agent(
+                        sub_agent, Payment.objects.filter(is_commission_calculated=True)
                     )
 
                     for payment in sub_agent_payments:
@@ -212,10 +232,10 @@ class PaymentListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
 
     def test_func(self):
         """Sadece 'admin' rolündeki kullanıcıların bu sayfaya erişmesine izin verir."""
-        return self.request.user.user_type == 'admin' 
+        return is_admin(self.request.user)
 
 # --- Uzman Komisyonlarını Listeleme Görünümü ---
-class ExpertCommissionListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class ExpertCommissionListView(ReportsDatabaseMixin, LoginRequiredMixin, UserPassesTestMixin, ListView):
     """
     Uzmanların yalnızca kendilerine ait kazandıkları komisyonları görmesini sağlar.
     Adminlerin de bu listeyi görüntülemesine izin verir.
@@ -230,15 +250,11 @@ class ExpertCommissionListView(LoginRequiredMixin, UserPassesTestMixin, ListView
         user = self.request.user
         try:
             # Adminler tüm uzmanların komisyonlarını görebilir
-            if user.user_type == 'admin':
+            if is_admin(user):
                 queryset = Payment.objects.filter(is_commission_calculated=True)
             # Kullanıcının expert_profile'ı varsa kendi komisyonlarını görsün
-            elif hasattr(user, 'expert_profile') and user.expert_profile is not None: 
-                expert_profile = user.expert_profile
-                queryset = Payment.objects.filter(
-                    appointment__expert=expert_profile,
-                    is_commission_calculated=True 
-                )
+            elif expert_profile_of(user) is not None: 
+                queryset = scope_payments(user, Payment.objects.filter(is_commission_calculated=True))
             else: # Expert profili yoksa veya yetkili değilse boş küme döndür (should not happen if test_func is correct)
                 messages.warning(self.request, "Uzman profiliniz bulunamadı veya yetkiniz yok.")
                 return Payment.objects.none()
@@ -261,13 +277,10 @@ class ExpertCommissionListView(LoginRequiredMixin, UserPassesTestMixin, ListView
 
         # Toplam komisyonu, sadece kullanıcının kendi komisyonları üzerinden hesapla (admin değilse)
         # veya admin ise tüm expert komisyonlarını al.
-        if user.user_type == 'admin':
+        if is_admin(user):
+            total_commission = self.get_queryset().aggregate(Sum('expert_commission'))['expert_commission__sum'] or Decimal('0.00')
+        elif expert_profile_of(user) is not None:
             total_commission = self.get_queryset().aggregate(Sum('expert_commission'))['expert_commission__sum'] or Decimal('0.00')
-        elif hasattr(user, 'expert_profile') and user.expert_profile is not None:
-             total_commission = Payment.objects.filter(
-                 appointment__expert=user.expert_profile,
-                 is_commission_calculated=True
-            ).aggregate(Sum('expert_commission'))['expert_commission__sum'] or Decimal('0.00')
         # else durumu için total_commission zaten Decimal('0.00') olarak ayarlandı.
 
         context['total_commission'] = total_commission
@@ -281,10 +294,10 @@ class ExpertCommissionListView(LoginRequiredMixin, UserPassesTestMixin, ListView
         """
         user = self.request.user
         # Kullanıcı admin ise veya bir Expert profiline sahipse erişime izin ver
-        return user.user_type == 'admin' or (hasattr(user, 'expert_profile') and user.expert_profile is not None)
+        return is_admin(user) or (hasattr(user, 'expert_profile') and user.expert_profile is not None)
 
 # --- Temsilci Komisyonlarını Listeleme Görünümü ---
-class AgentCommissionListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class AgentCommissionListView(ReportsDatabaseMixin, LoginRequiredMixin, UserPassesTestMixin, ListView):
     """
     Temsilcilerin kendi atanan müşterileriyle ilgili randevuların komisyonlarını
     veya doğrudan kendilerine atanmış randevuların komisyonlarını görmesini sağlar.
@@ -299,22 +312,18 @@ class AgentCommissionListView(LoginRequiredMixin, UserPassesTestMixin, ListView)
         """Mevcut temsilcinin komisyon ödemelerini döndürür."""
         user = self.request.user
         try:
-            if user.user_type == 'admin': # Adminler tüm temsilci komisyonlarını görebilir
+            if is_admin(user): # Adminler tüm temsilci komisyonlarını görebilir
                 queryset = Payment.objects.filter(is_commission_calculated=True)
             # Kullanıcının agent_profile'ı varsa kendi komisyonlarını görsün
-            elif hasattr(user, 'agent_profile') and user.agent_profile is not None: 
-                agent_profile = user.agent_profile
-                queryset = Payment.objects.filter(
-                    Q(appointment__agent=agent_profile) | 
-                    Q(appointment__client__agents=agent_profile), # Temsilcinin atanmış müşterilerine ait randevular
-                    is_commission_calculated=True 
-                )
+            elif agent_profile_of(user) is not None: 
+                # Temsilciye atanmış randevular ve atanmış müşterilerine ait randevular
+                queryset = scope_payments(user, Payment.objects.filter(is_commission_calculated=True))
             else: # Agent profili yoksa veya yetkili değilse boş küme döndür (should not happen if test_func is correct)
                 messages.warning(self.request, "Müşteri temsilcisi profiliniz bulunamadı veya yetkiniz yok.")
                 return Payment.objects.none()
 
-            # Sorgu sonuçlarında mükerrer kayıtları önlemek için distinct() kullanın
-            queryset = queryset.select_related('appointment__client', 'appointment__expert__user', 'appointment__agent__user').distinct().order_by('-payment_date')
+            # Kapsamlama EXISTS ile yapıldığından mükerrer kayıt oluşmaz, distinct() gerekmez
+            queryset = queryset.select_related('appointment__client', 'appointment__expert__user', 'appointment__agent__user').order_by('-payment_date')
             return queryset
         except CustomerAgent.DoesNotExist:
             messages.warning(self.request, "Müşteri temsilcisi profiliniz bulunamadı. Randevu listesi boş olabilir.")
@@ -332,14 +341,10 @@ class AgentCommissionListView(LoginRequiredMixin, UserPassesTestMixin, ListView)
 
         # Toplam komisyonu, sadece kullanıcının kendi komisyonları üzerinden hesapla (admin değilse)
         # veya admin ise tüm agent komisyonlarını al.
-        if user.user_type == 'admin':
+        if is_admin(user):
+            total_commission = self.get_queryset().aggregate(Sum('agent_commission'))['agent_commission__sum'] or Decimal('0.00')
+        elif agent_profile_of(user) is not None:
             total_commission = self.get_queryset().aggregate(Sum('agent_commission'))['agent_commission__sum'] or Decimal('0.00')
-        elif hasattr(user, 'agent_profile') and user.agent_profile is not None:
-            total_commission = Payment.objects.filter(
-                Q(appointment__agent=user.agent_profile) |
-                Q(appointment__client__agents=user.agent_profile),
-                is_commission_calculated=True
-            ).aggregate(Sum('agent_commission'))['agent_commission__sum'] or Decimal('0.00')
         # else durumu için total_commission zaten Decimal('0.00') olarak ayarlandı.
 
         context['total_commission'] = total_commission
@@ -353,10 +358,10 @@ class AgentCommissionListView(LoginRequiredMixin, UserPassesTestMixin, ListView)
         """
         user = self.request.user
         # Kullanıcı admin ise veya bir CustomerAgent profiline sahipse erişime izin ver
-        return user.user_type == 'admin' or (hasattr(user, 'agent_profile') and user.agent_profile is not None)
+        return is_admin(user) or (hasattr(user, 'agent_profile') and user.agent_profile is not None)
 
 # --- Aylık Özet Görünümü (Admin İçin) ---
-class MonthlySummaryView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class MonthlySummaryView(ReportsDatabaseMixin, LoginRequiredMixin, UserPassesTestMixin, ListView):
     """
     Adminin aylık bazda toplam ödenen tutarları, uzman ve temsilci komisyonlarını
     ve kliniğin net kazancını görmesini sağlar.
@@ -406,9 +411,9 @@ class MonthlySummaryView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         context = super().get_context_data(**kwargs)
         context['title'] = "Aylık Finansal Özet"
 
-        # Filtreleme için uzman ve temsilci listelerini ekle
-        context['experts'] = Expert.objects.all()
-        context['agents'] = CustomerAgent.objects.all()
+        # Filtreleme için uzman ve temsilci listelerini ekle (önbellekteki katalogdan)
+        context['experts'] = catalog.experts()
+        context['agents'] = catalog.agents()
 
         # Mevcut filtre değerlerini şablona göndererek formda korunmasını sağlar
         context['current_expert'] = self.request.GET.get('expert', '')
@@ -418,7 +423,7 @@ class MonthlySummaryView(LoginRequiredMixin, UserPassesTestMixin, ListView):
 
     def test_func(self):
         """Sadece 'admin' rolündeki kullanıcıların bu sayfaya erişmesine izin verir."""
-        return self.request.user.user_type == 'admin' 
+        return is_admin(self.request.user)
 
 # --- Müşteri Temsilcisi Alt Temsilci Gelirleri Görünümü ---
 def is_customer_agent(user):
@@ -426,6 +431,7 @@ def is_customer_agent(user):
     # Sadece user_type 'agent' olan ve agent_profile'ı olan kullanıcılar erişebilir.
     return user.is_authenticated and user.user_type == 'agent' and hasattr(user, 'agent_profile') and user.agent_profile is not None
 
+@reports_db # Okuma sorguları rapor veritabanına (okuma kopyası) yönlendirilir
 @login_required
 @user_passes_test(is_customer_agent, login_url=reverse_lazy('accounts:login')) # Yetkilendirme başarısız olursa login sayfasına yönlendir
 def agent_sub_agent_revenue_dashboard(request): 
@@ -436,10 +442,8 @@ def agent_sub_agent_revenue_dashboard(request):
     
     # 1. Temsilcinin doğrudan kazancını hesapla
     # Kendi atadığı müşterilerin veya kendisine atanan randevuların komisyonları
-    direkt_gelir = Payment.objects.filter(
-        Q(appointment__agent=current_agent) |
-        Q(appointment__client__agents=current_agent),
-        is_commission_calculated=True
+    direkt_gelir = payments_for_agent(
+        current_agent, Payment.objects.filter(is_commission_calculated=True)
     ).aggregate(Sum('agent_commission'))['agent_commission__sum'] or Decimal('0.00')
 
     # 2. Alt temsilcilerden gelen kazancı hesapla (toplam) ve detaylı listeyi oluştur
@@ -452,10 +456,8 @@ def agent_sub_agent_revenue_dashboard(request):
 
     for sub_agent in sub_agents_queryset:
         # Her bir alt temsilcinin kendi doğrudan kazancını hesapla
-        sub_agent_own_commission = Payment.objects.filter(
-            Q(appointment__agent=sub_agent) |
-            Q(appointment__client__agents=sub_agent),
-            is_commission_calculated=True
+        sub_agent_own_commission = payments_for_agent(
+            sub_agent, Payment.objects.filter(is_commission_calculated=True)
         ).aggregate(Sum('agent_commission'))['agent_commission__sum'] or Decimal('0.00')
         
         # Bu alt temsilcinin kazancından mevcut üst temsilciye (current_agent) düşen payı hesapla
@@ -482,4 +484,35 @@ def agent_sub_agent_revenue_dashboard(request):
         'alt_temsilciler_data': detailed_sub_agents_data, # Context değişken adını biraz değiştirdim karışıklığı önlemek için
         'title': 'Alt Temsilci Gelirleri Özeti' # Başlığı güncelledim
     }
-    return render(request, 'payments/agent_income_summary.html', context)
\ No newline at end of file
+    return render(request, 'payments/agent_income_summary.html', context)
+
+
+# --- Ödeme Sağlayıcısı Geri Çağrısı ---
+@csrf_exempt
+@require_POST
+def provider_callback(request):
+    """
+    Ödeme sağlayıcısının geri çağrı adresi. Tek olay, olay listesi veya {"events": [...]} kabul eder.
+    Gövde PAYMENT_PROVIDER_SECRET ile imzalanmalıdır (X-Provider-Signature: t=<unix zamanı>,v1=<HMAC-SHA256>).
+    Yanıt her olayın sonucunu girdi sırasıyla içerir; tekrar gönderilen olaylar yeniden işlenmez
+    ve ilk sonuçları "duplicate": true ile döner.
+    Olaylar parça parça kendi işlemlerinde işlenir; böylece büyük partilerde
+    kilitler kısa tutulur ve yarıda kalan bir istek tekrarlandığında kaldığı yerden devam eder.
+    """
+    secret = getattr(settings, 'PAYMENT_PROVIDER_SECRET', '')
+    if not secret:
+        return JsonResponse({'error': 'Ödeme sağlayıcısı yapılandırılmamış.'}, status=503)
+    if not verify_signature(secret, request.headers.get(provider.SIGNATURE_HEADER, ''), request.body):
+        return JsonResponse({'error': 'Geçersiz imza.'}, status=401)
+
+    try:
+        events = provider.parse_events(json.loads(request.body))
+    except (ValueError, UnicodeDecodeError) as exc:
+        return JsonResponse({'error': f'Geçersiz gövde: {exc}'}, status=400)
+    if len(events) > provider.MAX_EVENTS_PER_REQUEST:
+        return JsonResponse(
+            {'error': f'Bir istekte en fazla {provider.MAX_EVENTS_PER_REQUEST} olay gönderilebilir.'}, status=413
+        )
+
+    source = request.headers.get('X-Provider-Name', '')[:50] or 'pos'
+    return JsonResponse({'results': provider.ingest(events, provider=source)})
@@ -0,0 +1,102 @@
+// static/js/autocomplete.js
+// data-autocomplete-url özniteliği olan <select> alanlarının üzerine bir arama kutusu ekler.
+// Seçenekler accounts autocomplete uç noktalarından sayfa sayfa yüklenir
+// (yanıt biçimi: {"results": [{"id": 1, "text": "..."}], "more": true}).
+(function () {
+    'use strict';
+
+    function setupAutocomplete(select) {
+        if (select.dataset.autocompleteReady) {
+            return;
+        }
+        select.dataset.autocompleteReady = '1';
+
+        const url = select.dataset.autocompleteUrl;
+        const minChars = parseInt(select.dataset.minChars || '2', 10);
+        const search = document.createElement('input');
+        search.type = 'search';
+        search.className = 'form-control form-control-sm mb-1';
+        search.placeholder = select.dataset.placeholder || '';
+        search.setAttribute('autocomplete', 'off');
+        select.parentNode.insertBefore(search, select);
+
+        let timer = null;
+        let page = 1;
+        let controller = null;
+
+        function keepOptions() {
+            // Boş seçenek ve mevcut seçili değer her zaman korunur
+            return Array.from(select.options).filter(function (option) {
+                return option.value === '' || option.selected;
+            });
+        }
+
+        function load(append) {
+            const term = search.value.trim();
+            if (term.length < minChars) {
+                return;
+            }
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            const params = new URLSearchParams({ q: term, page: page });
+            fetch(url + '?' + params.toString(), {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' },
+                signal: controller.signal
+            })
+                .then(function (response) { return response.ok ? response.json() : { results: [], more: false }; })
+                .then(function (data) {
+                    const kept = append ? [] : keepOptions();
+                    if (!append) {
+                        select.innerHTML = '';
+                        kept.forEach(function (option) { select.appendChild(option); });
+                    } else {
+                        const moreOption = select.querySelector('option[data-more]');
+                        if (moreOption) {
+                            moreOption.remove();
+                        }
+                    }
+                    const existing = new Set(Array.from(select.options).map(function (option) { return option.value; }));
+                    data.results.forEach(function (item) {
+                        if (!existing.has(String(item.id))) {
+                            select.appendChild(new Option(item.text, item.id));
+                        }
+                    });
+                    if (data.more) {
+                        const more = new Option('Daha fazla sonuç yükle...', '');
+                        more.dataset.more = '1';
+                        select.appendChild(more);
+                    }
+                })
+                .catch(function (error) {
+                    if (error.name !== 'AbortError') {
+                        console.error('Otomatik tamamlama hatası:', error);
+                    }
+                });
+        }
+
+        search.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(function () {
+                page = 1;
+                load(false);
+            }, 250);
+        });
+
+        select.addEventListener('change', function (event) {
+            const option = select.options[select.selectedIndex];
+            if (option && option.dataset.more) {
+                // "Daha fazla" seçeneği bir değer değildir; sonraki sayfayı yükler
+                event.stopImmediatePropagation();
+                select.value = '';
+                page += 1;
+                load(true);
+            }
+        }, true);
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('select[data-autocomplete-url]').forEach(setupAutocomplete);
+    });
+})();